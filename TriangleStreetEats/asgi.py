@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'TriangleStreetEats.settings')
 
 application = get_asgi_application()
+
+# Page-view analytics are written from a background thread per process.
+from directory.analytics import start_background_flush  # noqa: E402
+
+start_background_flush()
@@ -21,12 +21,15 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "django-insecure-6^aw-v9jfxa07%i1v#*hyy4l6e9^zrsmmy9qn)x&56#-b%1xhn"
+SECRET_KEY = os.environ.get(
+    "DJANGO_SECRET_KEY", "django-insecure-6^aw-v9jfxa07%i1v#*hyy4l6e9^zrsmmy9qn)x&56#-b%1xhn"
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Set DJANGO_DEBUG=0 in production.
+DEBUG = os.environ.get("DJANGO_DEBUG", "1") == "1"
 
-ALLOWED_HOSTS = ["localhost", "127.0.0.1"]
+ALLOWED_HOSTS = os.environ.get("DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1").split(",")
 
 
 # Application definition
@@ -44,8 +47,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings include every other middleware. Removes itself
+    # unless DIRECTORY_PROFILING_ENABLED is set.
+    "directory.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # Compresses HTML and streamed exports; before anything that reads the
+    # body. Static files arrive precompressed (directory.static_assets).
+    "directory.static_assets.StaticAwareGZipMiddleware",
+    # ETags pages that set none, and answers a matching revisit with a 304.
+    "django.middleware.http.ConditionalGetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    # Needs the session, to keep visitors who just wrote on the primary.
+    "directory.routers.ReplicaRoutingMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -75,14 +88,180 @@ WSGI_APPLICATION = "TriangleStreetEats.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+#
+# Writes go to "default" (the primary). With DJANGO_DB_REPLICAS set, reads
+# made while serving GET and HEAD requests go to a read replica, unless the
+# visitor wrote something in the last DIRECTORY_REPLICA_STICKY_SECONDS (see
+# directory.routers).
+#
+# DJANGO_DB_ENGINE, DJANGO_DB_NAME, DJANGO_DB_HOST etc. describe the
+# primary and DJANGO_DB_REPLICAS is a comma-separated list of replica hosts,
+# or of database files for SQLite. To try routing locally with two SQLite
+# files, copy the primary into the replica whenever it should catch up:
+#
+#   export DJANGO_DB_REPLICAS=db-replica.sqlite3
+#   python manage.py sync_replicas
+#
+# DJANGO_CONN_MAX_AGE keeps connections open between requests (leave it at
+# 0 under ASGI); on PostgreSQL DJANGO_DB_POOL_SIZE uses psycopg's
+# connection pool instead.
+
+DB_ENGINE = os.environ.get("DJANGO_DB_ENGINE", "django.db.backends.sqlite3")
+DB_IS_SQLITE = DB_ENGINE.endswith("sqlite3")
+DB_POOL_SIZE = int(os.environ.get("DJANGO_DB_POOL_SIZE", "0"))
+
+PRIMARY_DATABASE = {
+    "ENGINE": DB_ENGINE,
+    "NAME": os.environ.get("DJANGO_DB_NAME", BASE_DIR / "db.sqlite3" if DB_IS_SQLITE else ""),
+    "USER": os.environ.get("DJANGO_DB_USER", ""),
+    "PASSWORD": os.environ.get("DJANGO_DB_PASSWORD", ""),
+    "HOST": os.environ.get("DJANGO_DB_HOST", ""),
+    "PORT": os.environ.get("DJANGO_DB_PORT", ""),
+    "CONN_MAX_AGE": 0 if DB_POOL_SIZE else int(os.environ.get("DJANGO_CONN_MAX_AGE", "0")),
+    "CONN_HEALTH_CHECKS": True,
+}
+if DB_POOL_SIZE and not DB_IS_SQLITE:
+    PRIMARY_DATABASE["OPTIONS"] = {"pool": {"min_size": 1, "max_size": DB_POOL_SIZE}}
 
-DATABASES = {
+DATABASES = {"default": PRIMARY_DATABASE}
+REPLICA_NAMES = [
+    name.strip() for name in os.environ.get("DJANGO_DB_REPLICAS", "").split(",") if name.strip()
+]
+# Without replicas a "replica" alias still reads the primary, unused
+# unless tests route to it.
+for index, replica in enumerate(REPLICA_NAMES or [None], start=1):
+    alias = "replica" if len(REPLICA_NAMES) <= 1 else f"replica{index}"
+    # Tests run against one database, which replica reads then use too.
+    DATABASES[alias] = {**PRIMARY_DATABASE, "TEST": {"MIRROR": "default"}}
+    if replica:
+        DATABASES[alias]["NAME" if DB_IS_SQLITE else "HOST"] = replica
+
+DATABASE_ROUTERS = ["directory.routers.PrimaryReplicaRouter"]
+
+DIRECTORY_DATABASE_REPLICAS = (
+    [alias for alias in DATABASES if alias != "default"] if REPLICA_NAMES else []
+)
+DIRECTORY_REPLICA_STICKY_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# Local memory by default. Point DJANGO_CACHE_BACKEND at
+# "django.core.cache.backends.redis.RedisCache" (and DJANGO_CACHE_LOCATION at
+# a redis:// URL) to share the cache between processes.
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": os.environ.get(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", "triangle-street-eats"),
+        "KEY_PREFIX": "tse",
     }
 }
 
+# Seconds cached directory pages and fragments live (see directory.cache).
+DIRECTORY_CACHE_TIMEOUT = 300
+
+
+# Sessions and authentication
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/#configuring-the-session-engine
+#
+# Anonymous visitors get no session until something is stored in it. For
+# signed-in ones, DJANGO_SESSION_ENGINE picks where the session lives:
+#
+# - "cached_db" (default): the database, read through the cache; cached
+#   copies live DIRECTORY_SESSION_CACHE_TIMEOUT seconds (directory.sessions).
+# - "signed_cookies": the cookie itself, signed but readable by the
+#   visitor, with no server-side state; a logout can't revoke a copied
+#   cookie, so keep SESSION_COOKIE_AGE short with this one.
+# - "db" or "cache", or the dotted path of any engine.
+#
+# CachedModelBackend keeps users in the cache as well (directory.auth).
+
+SESSION_ENGINES = {
+    "cached_db": "directory.sessions",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+    "db": "django.contrib.sessions.backends.db",
+    "cache": "django.contrib.sessions.backends.cache",
+}
+SESSION_ENGINE_NAME = os.environ.get("DJANGO_SESSION_ENGINE", "cached_db")
+SESSION_ENGINE = SESSION_ENGINES.get(SESSION_ENGINE_NAME, SESSION_ENGINE_NAME)
+DIRECTORY_SESSION_CACHE_TIMEOUT = 60
+
+AUTHENTICATION_BACKENDS = ["directory.auth.CachedModelBackend"]
+DIRECTORY_AUTH_CACHE_TIMEOUT = 60
+
+# Where views that need a signed-in user (directory.permissions) send
+# anonymous visitors.
+LOGIN_URL = "login"
+
+# Bearer token partners send to pull /export/trucks.<fmt>; exports stay
+# staff-only while it is empty.
+DIRECTORY_EXPORT_TOKEN = os.environ.get("DIRECTORY_EXPORT_TOKEN", "")
+
+# Request profiling (directory.profiling), viewed at /_profiling/ by staff.
+# Off by default; SAMPLE_RATE is the fraction of requests measured and
+# BUFFER_SIZE the number of recent samples kept per process.
+DIRECTORY_PROFILING_ENABLED = os.environ.get("DIRECTORY_PROFILING", "") == "1"
+DIRECTORY_PROFILING_SAMPLE_RATE = float(os.environ.get("DIRECTORY_PROFILING_SAMPLE_RATE", "1.0"))
+DIRECTORY_PROFILING_BUFFER_SIZE = 1000
+DIRECTORY_PROFILING_N_PLUS_ONE_THRESHOLD = 5
+
+# "Recommended for you" (directory.recommendations), refreshed by the
+# compute_recommendations command. Weights apply to the cuisine, dietary
+# fit and proximity scores; proximity halves roughly every 7 miles at 10.
+DIRECTORY_RECOMMENDATION_WEIGHTS = {"cuisine": 0.5, "dietary": 0.3, "proximity": 0.2}
+DIRECTORY_RECOMMENDATION_TOP_N = 12
+DIRECTORY_RECOMMENDATION_DISTANCE_MILES = 10.0
+
+# Email. The console backend prints messages; set DJANGO_EMAIL_BACKEND to
+# "django.core.mail.backends.smtp.EmailBackend" (plus the EMAIL_HOST
+# settings) to deliver them.
+EMAIL_BACKEND = os.environ.get(
+    "DJANGO_EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend"
+)
+DEFAULT_FROM_EMAIL = os.environ.get(
+    "DJANGO_DEFAULT_FROM_EMAIL", "Triangle Street Eats <no-reply@trianglestreeteats.com>"
+)
+
+# New-truck emails (directory.notifications), sent by send_notifications
+# workers. SITE_URL prefixes links in emails; RATE caps emails per second
+# per worker; BATCH_SIZE is users fanned out / emails claimed per step.
+DIRECTORY_SITE_URL = os.environ.get("DIRECTORY_SITE_URL", "http://localhost:8000")
+DIRECTORY_NOTIFICATION_RATE = float(os.environ.get("DIRECTORY_NOTIFICATION_RATE", "10"))
+DIRECTORY_NOTIFICATION_BATCH_SIZE = 500
+
+# Background tasks (directory.taskqueue), run by "manage.py run_workers".
+# A task still running after the lease is handed to another worker.
+DIRECTORY_TASK_LEASE_SECONDS = 600
+
+# Owner dashboard analytics (directory.analytics). Views are buffered in
+# each server process and written in bulk every FLUSH_SECONDS, or once
+# BATCH_SIZE are waiting; the analytics.rollup task folds them into daily
+# counts and keeps raw events for RETENTION_DAYS.
+DIRECTORY_ANALYTICS_ENABLED = os.environ.get("DIRECTORY_ANALYTICS", "1") == "1"
+DIRECTORY_ANALYTICS_BATCH_SIZE = 500
+DIRECTORY_ANALYTICS_FLUSH_SECONDS = 5.0
+DIRECTORY_ANALYTICS_RETENTION_DAYS = 7
+
+# Home page "Featured" and "Trending" lists (directory.home_snapshot),
+# rebuilt every SNAPSHOT_REFRESH seconds by the home.snapshot task and not
+# shown once older than SNAPSHOT_MAX_AGE. Set SNAPSHOT_PATH when CACHES is
+# per-process so web processes can read what the workers built.
+DIRECTORY_HOME_LIST_SIZE = 6
+DIRECTORY_HOME_TRENDING_DAYS = 7
+DIRECTORY_HOME_SNAPSHOT_REFRESH = int(os.environ.get("DIRECTORY_HOME_SNAPSHOT_REFRESH", "300"))
+DIRECTORY_HOME_SNAPSHOT_MAX_AGE = int(os.environ.get("DIRECTORY_HOME_SNAPSHOT_MAX_AGE", "3600"))
+DIRECTORY_HOME_SNAPSHOT_PATH = os.environ.get("DIRECTORY_HOME_SNAPSHOT_PATH", "")
+
+# Link health checks (directory.linkcheck), run by "manage.py check_links":
+# requests in flight overall and per host, and seconds allowed per request.
+DIRECTORY_LINKCHECK_CONCURRENCY = 200
+DIRECTORY_LINKCHECK_PER_HOST = 4
+DIRECTORY_LINKCHECK_TIMEOUT = 10.0
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -108,7 +287,8 @@ AUTH_PASSWORD_VALIDATORS = [
 
 LANGUAGE_CODE = "en-us"
 
-TIME_ZONE = "UTC"
+# Truck hours are local wall-clock times in the Triangle.
+TIME_ZONE = "America/New_York"
 
 USE_I18N = True
 
@@ -117,6 +297,11 @@ USE_TZ = True
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
+#
+# Without DEBUG, collectstatic stores content-hashed copies plus .gz (and,
+# with the brotli package installed, .br) variants, and Django serves them
+# with year-long cache headers unless a web server in front maps
+# STATIC_URL to STATIC_ROOT (see directory.static_assets).
 
 
 STATIC_URL = 'static/'
@@ -125,6 +310,16 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG
+            else "directory.static_assets.CompressedManifestStaticFilesStorage"
+        ),
+    },
+}
+
 # Media files (user-uploaded)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
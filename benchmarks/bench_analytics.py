@@ -0,0 +1,104 @@
+"""
+Cost of page-view capture on the truck page.
+
+Requests ``/truck/<pk>/?ref=search`` (a view and a click each) through the
+full handler stack with the test client, and reports latency and overhead
+relative to capture disabled:
+
+* disabled: ``DIRECTORY_ANALYTICS_ENABLED = False``
+* buffered: ``directory.analytics`` as shipped, appending to the
+  in-process buffer; a flush every ``--batch`` requests stands in for the
+  background thread, so p50 is the request path and the mean includes the
+  amortized writes
+* inline: the naive alternative, two ``PageViewEvent`` inserts (and their
+  commit) inside every request
+
+Rounds are interleaved so drift affects every configuration equally. It
+then times ``record()`` on its own, the bulk flush of a full batch, and a
+rollup over the events written.
+
+    python -m benchmarks.bench_analytics [--trucks 2000] [--repeat 1000] [--rounds 5]
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.common import report, seed_trucks, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trucks', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--batch', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import Client
+    from django.utils import timezone
+    from directory import analytics
+    from directory.models import FoodTruck, PageViewEvent
+    from directory.truck_pages import rebuild_truck_pages
+
+    settings.ALLOWED_HOSTS = ['*']
+    seed_trucks(args.trucks)
+    rebuild_truck_pages()
+    pk = FoodTruck.objects.order_by('pk').values_list('pk', flat=True).first()
+    url = f'/truck/{pk}/?ref=search'
+    client = Client()
+
+    # Flipped directly: override_settings would add its own cost per request.
+    def disabled():
+        settings.DIRECTORY_ANALYTICS_ENABLED = False
+        client.get(url)
+
+    def buffered():
+        settings.DIRECTORY_ANALYTICS_ENABLED = True
+        client.get(url)
+        if len(analytics.buffer) >= args.batch:
+            flush_samples.append(timed(analytics.flush_events, 1)[0])
+
+    def inline():
+        settings.DIRECTORY_ANALYTICS_ENABLED = False
+        client.get(url)
+        now = timezone.now()
+        PageViewEvent.objects.create(kind='view', page='truck', truck_id=pk, occurred_at=now)
+        PageViewEvent.objects.create(kind='click', page='search', truck_id=pk, occurred_at=now)
+
+    configs = [('disabled', disabled), ('buffered', buffered), ('inline insert', inline)]
+    flush_samples = []
+    for _, fetch in configs:
+        fetch()
+    samples = {label: [] for label, _ in configs}
+    for _ in range(args.rounds):
+        for label, fetch in configs:
+            samples[label] += timed(fetch, args.repeat // args.rounds)
+    settings.DIRECTORY_ANALYTICS_ENABLED = True
+    analytics.flush_events()
+
+    baseline = statistics.fmean(samples['disabled'])
+    for label, _ in configs:
+        report(label, samples[label])
+        overhead = (statistics.fmean(samples[label]) / baseline - 1) * 100
+        print(f'{"":<28} overhead {overhead:+.2f}% vs disabled')
+
+    analytics.buffer.drain()
+    record = timed(lambda: analytics.record('view', 'truck', truck_id=pk), args.repeat)
+    analytics.buffer.drain()
+    report('record()', record)
+    if flush_samples:
+        report(f'flush {args.batch} events', flush_samples)
+        per_event = statistics.fmean(flush_samples) / args.batch * 1000
+        print(f'{"":<28} {per_event:.2f} us per event written')
+
+    start = time.perf_counter()
+    events, rows, _ = analytics.rollup_page_views()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f'rollup: {events:,} events into {rows} daily rows in {elapsed:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Serializer throughput for the JSON API on 10k-row pages.
+
+Seeds ``--trucks`` trucks and times fetching and encoding one page of
+``--page-size`` rows several ways:
+
+* model instances turned into dicts field by field, stdlib ``json`` (what
+  a conventional serializer does)
+* ``.values()`` rows through ``directory.api``, stdlib ``json``
+* ``.values()`` rows through ``directory.api``, ``orjson`` (if installed)
+* the same with a sparse fieldset, ``name,city,cuisine``
+
+    python -m benchmarks.bench_api [--trucks 20000] [--page-size 10000] [--repeat 20]
+"""
+
+import argparse
+import json
+import statistics
+from unittest import mock
+
+from benchmarks.common import report, seed_trucks, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trucks', type=int, default=20_000)
+    parser.add_argument('--page-size', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.files.storage import default_storage
+    from django.core.serializers.json import DjangoJSONEncoder
+    from directory import api
+    from directory.models import FoodTruck
+
+    seed_trucks(args.trucks, latitude=lambda rng, i: 35.7 + rng.random() / 5,
+                longitude=lambda rng, i: -78.7 + rng.random() / 5,
+                website=lambda rng, i: f'https://truck{i}.example.com')
+    page = FoodTruck.objects.order_by('name', 'id')[:args.page_size]
+
+    def instances():
+        rows = []
+        for truck in page.all():
+            row = {field: getattr(truck, field) for field in api.LIST_FIELDS if field != 'image'}
+            row['image'] = default_storage.url(truck.image.name) if truck.image else None
+            rows.append(row)
+        return json.dumps({'results': rows}, cls=DjangoJSONEncoder).encode()
+
+    def values(fields):
+        def run():
+            rows = list(api.truck_values(page, fields))
+            return api.dumps({'results': api.finish_trucks(rows, fields)})
+        return run
+
+    full, sparse = list(api.LIST_FIELDS), ['name', 'city', 'cuisine']
+    orjson = api.orjson
+    cases = [('instances + json', instances, None), ('values + json', values(full), None)]
+    if orjson is not None:
+        cases += [('values + orjson', values(full), orjson),
+                  ('values + orjson, sparse', values(sparse), orjson)]
+    else:
+        print('orjson is not installed; skipping the orjson cases')
+
+    for label, func, encoder in cases:
+        with mock.patch.object(api, 'orjson', encoder):
+            size = len(func())
+            samples = timed(func, args.repeat)
+        report(label, samples)
+        rows_per_second = args.page_size / (statistics.fmean(samples) / 1000)
+        print(f'{"":<28} {rows_per_second:,.0f} rows/s  {size / 1024:,.0f} KiB per page')
+
+
+if __name__ == '__main__':
+    main()
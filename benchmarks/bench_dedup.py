@@ -0,0 +1,87 @@
+"""
+Duplicate checks against 100k trucks (target: under 20 ms each).
+
+Seeds trucks with generated names, a website on a third of them and an
+Instagram handle on another third, builds the signature index, and times
+``find_duplicates`` for
+
+* misspelled copies of existing names (should find the original),
+* names that are not in the directory,
+* a new name with an existing truck's Instagram handle.
+
+    python -m benchmarks.bench_dedup [--trucks 100000] [--queries 300]
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.common import menu_words, report, seed_trucks, setup_django, timed
+
+
+def name(rng, i):
+    # Distinct names: no shared numbered suffix making every truck alike.
+    return ' '.join(word.title() for word in menu_words(rng, rng.randint(2, 3)))
+
+
+def website(rng, i):
+    return f'https://truck{i}.example.com/' if i % 3 == 0 else None
+
+
+def social_links(rng, i):
+    return {'instagram': f'https://instagram.com/truck_{i}'} if i % 3 == 1 else None
+
+
+def misspell(rng, name):
+    chars = list(name)
+    position = rng.randrange(len(chars))
+    if rng.random() < 0.5:
+        del chars[position]
+    else:
+        chars.insert(position, rng.choice('aeiou'))
+    return ''.join(chars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trucks', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=300)
+    args = parser.parse_args()
+
+    setup_django()
+    from directory.dedup import find_duplicates, rebuild_dedup_index
+    from directory.models import FoodTruck, TruckDedupKey
+
+    seed_trucks(args.trucks, name=name, website=website, social_links=social_links)
+    start = time.perf_counter()
+    rebuild_dedup_index()
+    print(f'indexed {args.trucks} trucks in {time.perf_counter() - start:.1f}s '
+          f'({TruckDedupKey.objects.count()} keys)')
+
+    rng = random.Random(3)
+    sample = list(FoodTruck.objects.order_by('?').values_list('id', 'name')[:args.queries])
+    queries = iter([(truck_id, misspell(rng, name)) for truck_id, name in sample] * 2)
+    found = 0
+
+    def near_duplicate():
+        nonlocal found
+        truck_id, name = next(queries)
+        found += any(match.truck_id == truck_id for match in find_duplicates(name))
+
+    report('misspelled existing name', timed(near_duplicate, args.queries))
+    print(f'  original found for {found}/{args.queries}')
+
+    fresh = iter(f'Zzyzx Kitchen {i}' for i in range(args.queries * 2))
+    report('new name', timed(lambda: find_duplicates(next(fresh)), args.queries))
+
+    handles = iter(range(1, args.trucks, 3))
+    report('shared instagram handle', timed(
+        lambda: find_duplicates(
+            'Brand New Name', social_links={'ig': f'instagram.com/truck_{next(handles)}'}
+        ),
+        args.queries,
+    ))
+
+
+if __name__ == '__main__':
+    main()
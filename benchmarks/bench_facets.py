@@ -0,0 +1,82 @@
+"""
+Directory facet latency at 100k trucks.
+
+Seeds trucks (a quarter with verified owners, a third carrying one or two
+dietary tags), rebuilds the facet table, then reports p50/p99 for facet
+counts and for the first listing page under single and combined filters,
+plus the cost of a save that moves a truck between cells.
+
+    python -m benchmarks.bench_facets [--trucks 100000] [--repeat 200]
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.common import CITIES, CUISINES, report, seed_trucks, setup_django, timed
+
+FILTERS = [
+    {},
+    {'city': 'raleigh'},
+    {'cuisine': 'BBQ'},
+    {'verified': '1'},
+    {'tag': 'vegan'},
+    {'city': 'durham', 'cuisine': 'Thai'},
+    {'city': 'raleigh', 'verified': '1', 'tag': 'gluten-free'},
+    {'city': 'cary', 'cuisine': 'Vegan', 'verified': '1', 'tag': 'vegan'},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trucks', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from directory.facets import facet_counts, filter_trucks, rebuild_facet_counts
+    from directory.models import DietaryTag, FacetCount, FoodTruck
+    from directory.pagination import paginate_keyset
+
+    start = time.perf_counter()
+    seed_trucks(args.trucks, is_verified=lambda rng, i: rng.random() < 0.25)
+    tags = list(DietaryTag.objects.all())
+    through = FoodTruck.dietary_tags.through
+    rng = random.Random(5)
+    links = []
+    for truck_id in FoodTruck.objects.values_list('pk', flat=True).iterator():
+        if rng.random() < 0.33:
+            for tag in rng.sample(tags, rng.choice([1, 2])):
+                links.append(through(foodtruck_id=truck_id, dietarytag_id=tag.pk))
+    through.objects.bulk_create(links, batch_size=5000)
+    print(f'seeded {args.trucks} trucks and {len(links)} tag links '
+          f'in {time.perf_counter() - start:.1f}s')
+
+    start = time.perf_counter()
+    cells = rebuild_facet_counts()
+    print(f'rebuilt {cells} facet cells ({FacetCount.objects.count()} rows) '
+          f'in {(time.perf_counter() - start) * 1000:.0f} ms')
+
+    tag_by_slug = {tag.slug: tag for tag in tags}
+    for filters in FILTERS:
+        tag = tag_by_slug.get(filters.get('tag'))
+        label = ','.join(f'{k}={v}' for k, v in filters.items()) or 'unfiltered'
+        report(f'facets {label}', timed(lambda: facet_counts(filters, tag), args.repeat))
+        trucks = filter_trucks(FoodTruck.objects.all(), filters, tag)
+        report(f'page   {label}',
+               timed(lambda: list(paginate_keyset(trucks, page_size=24)), args.repeat))
+
+    truck_ids = list(FoodTruck.objects.values_list('pk', flat=True)[:args.repeat])
+    trucks = iter(FoodTruck.objects.filter(pk__in=truck_ids))
+
+    def move():
+        truck = next(trucks)
+        truck.city = rng.choice(CITIES)
+        truck.cuisine = rng.choice(CUISINES)
+        truck.save()
+
+    report('save moving cells', timed(move, len(truck_ids)))
+
+
+if __name__ == '__main__':
+    main()
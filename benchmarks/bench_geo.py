@@ -0,0 +1,75 @@
+"""
+"Trucks near me" latency at 50k truck locations.
+
+Seeds located trucks around the Triangle (denser downtown), then reports
+index build time and p50/p99 for 2-mile radius queries and k-nearest
+queries from random points, plus the full ``trucks_near`` view.
+
+    python -m benchmarks.bench_geo [--trucks 50000] [--repeat 500]
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks.common import report, seed_trucks, setup_django, timed
+
+CENTERS = [(35.7796, -78.6382), (35.9940, -78.8986), (35.9132, -79.0558),
+           (35.7915, -78.7811)]
+
+
+def located(rng, i):
+    lat, lon = rng.choice(CENTERS)
+    return lat + rng.gauss(0, 0.08), lon + rng.gauss(0, 0.08)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trucks', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from directory.geo import build_geo_index, get_geo_index
+    from directory.views import trucks_near
+
+    coords = {}
+
+    def coordinate(axis):
+        def value(rng, i):
+            if i not in coords:
+                coords[i] = located(rng, i)
+            return coords[i][axis]
+        return value
+
+    seed_trucks(args.trucks, latitude=coordinate(0), longitude=coordinate(1))
+
+    start = time.perf_counter()
+    index = build_geo_index()
+    print(f'built index over {len(index)} trucks in '
+          f'{(time.perf_counter() - start) * 1000:.1f} ms')
+    get_geo_index()
+
+    rng = random.Random(11)
+    probes = [located(rng, None) for _ in range(args.repeat)]
+    probe = iter(probes * 4)
+
+    report('radius 2 mi', timed(lambda: index.within(*next(probe), 2), args.repeat))
+    report('radius 10 mi', timed(lambda: index.within(*next(probe), 10), args.repeat))
+    report('10 nearest', timed(lambda: index.nearest(*next(probe), 10), args.repeat))
+
+    factory = RequestFactory()
+
+    def view():
+        lat, lon = next(probe)
+        request = factory.get('/trucks/near/', {'lat': lat, 'lon': lon})
+        request.user = AnonymousUser()
+        trucks_near(request)
+
+    report('trucks_near view 2 mi', timed(view, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Home page cost with the featured and trending lists.
+
+Seeds trucks and a week of daily view counts, then requests ``/`` as a
+signed-in user (so the full-page cache is bypassed and every request
+renders) with:
+
+* snapshot: the lists read from the published home snapshot
+* inline ranking: the same lists ranked per request, what the snapshot
+  replaces
+
+It also times building and publishing one snapshot.
+
+    python -m benchmarks.bench_home [--trucks 20000] [--repeat 300]
+"""
+
+import argparse
+import random
+import statistics
+from datetime import timedelta
+from unittest import mock
+
+from benchmarks.common import report, seed_trucks, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trucks', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=300)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import Client
+    from django.utils import timezone
+    from directory import home_snapshot, views
+    from directory.models import CustomUser, FoodTruck, TruckDailyStats
+
+    settings.ALLOWED_HOSTS = ['*']
+    seed_trucks(args.trucks, is_verified=lambda rng, i: rng.random() < 0.2)
+    rng = random.Random(7)
+    today = timezone.localdate()
+    TruckDailyStats.objects.bulk_create(
+        [TruckDailyStats(truck_id=pk, day=today - timedelta(days=offset), kind='view',
+                         page='truck', count=rng.randint(1, 500))
+         for pk in FoodTruck.objects.values_list('pk', flat=True)
+         for offset in range(7)],
+        batch_size=5000,
+    )
+    client = Client()
+    client.force_login(CustomUser.objects.create(username='eater'))
+
+    build = timed(home_snapshot.refresh_snapshot, 5)
+    report('build + publish snapshot', build)
+
+    def fetch():
+        response = client.get('/')
+        assert response.status_code == 200, response.status_code
+
+    fetch()
+    samples = {'snapshot': timed(fetch, args.repeat)}
+    with mock.patch.object(views, 'current_snapshot', home_snapshot.build_snapshot):
+        fetch()
+        samples['inline ranking'] = timed(fetch, args.repeat)
+    for label, latencies in samples.items():
+        report(label, latencies)
+        print(f'{"":<28} {1000 / statistics.fmean(latencies):,.0f} requests/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+``import_trucks`` throughput and memory on a large NDJSON or CSV file.
+
+Generates ``--rows`` synthetic trucks (1% of them invalid, half of them
+carrying an ``external_id``), imports them, then re-imports the keyed rows
+to measure the upsert path. Reports rows/s and peak RSS; peak RSS should
+stay flat as ``--rows`` grows. ``--defer-refresh`` rebuilds the search,
+duplicate and page data once per import instead of per batch (the rebuild
+is included in the timings).
+
+    python -m benchmarks.bench_import [--rows 1000000] [--format ndjson] [--batch-size 2000]
+                                      [--defer-refresh]
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+from io import StringIO
+
+from benchmarks.common import CITIES, CUISINES, menu_words, setup_django
+
+FIELDS = ['external_id', 'name', 'city', 'cuisine', 'description', 'website',
+          'latitude', 'longitude', 'social_instagram']
+
+
+def synthetic_rows(count, seed=3):
+    rng = random.Random(seed)
+    for i in range(count):
+        row = {
+            'external_id': f'ext-{i}' if i % 2 == 0 else '',
+            'name': ' '.join(menu_words(rng, 2)).title(),
+            'city': rng.choice(CITIES),
+            'cuisine': rng.choice(CUISINES),
+            'description': ' '.join(menu_words(rng, 12)),
+            'website': f'https://truck{i}.example.com',
+            'latitude': round(35.8 + rng.gauss(0, 0.1), 6),
+            'longitude': round(-78.7 + rng.gauss(0, 0.1), 6),
+            'social_instagram': f'https://instagram.com/truck{i}',
+        }
+        if i % 100 == 99:
+            row['website'] = 'not a url'
+        yield row
+
+
+def write_file(path, fmt, rows):
+    with open(path, 'w', newline='') as handle:
+        if fmt == 'csv':
+            writer = csv.DictWriter(handle, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                handle.write(json.dumps(row) + '\n')
+
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(path, batch_size, defer_refresh):
+    from django.core.management import call_command
+
+    out = StringIO()
+    start = time.perf_counter()
+    call_command('import_trucks', path, batch_size=batch_size, restart=True,
+                 defer_refresh=defer_refresh, stdout=out)
+    elapsed = time.perf_counter() - start
+    print(out.getvalue().strip())
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='ndjson')
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--defer-refresh', action='store_true')
+    args = parser.parse_args()
+
+    setup_django()
+    from directory.models import FoodTruck
+
+    workdir = tempfile.mkdtemp(prefix='tse-import-')
+    path = os.path.join(workdir, f'trucks.{args.format}')
+    start = time.perf_counter()
+    write_file(path, args.format, synthetic_rows(args.rows))
+    print(f'generated {args.rows} rows ({os.path.getsize(path) / 2**20:.0f} MiB) '
+          f'in {time.perf_counter() - start:.1f}s; RSS before import {peak_rss_mib():.0f} MiB')
+
+    elapsed = run(path, args.batch_size, args.defer_refresh)
+    print(f'insert: {args.rows / elapsed:,.0f} rows/s, {FoodTruck.objects.count()} trucks, '
+          f'peak RSS {peak_rss_mib():.0f} MiB')
+
+    keyed = os.path.join(workdir, f'keyed.{args.format}')
+    write_file(keyed, args.format,
+               (row for row in synthetic_rows(args.rows, seed=4) if row['external_id']))
+    elapsed = run(keyed, args.batch_size, args.defer_refresh)
+    print(f'upsert: {args.rows // 2 / elapsed:,.0f} rows/s, {FoodTruck.objects.count()} trucks, '
+          f'peak RSS {peak_rss_mib():.0f} MiB')
+
+
+if __name__ == '__main__':
+    main()
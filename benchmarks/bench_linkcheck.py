@@ -0,0 +1,116 @@
+"""
+Link checker throughput against a local stub server.
+
+A stub HTTP/1.1 server runs in a separate process on ``--hosts`` loopback
+addresses (127.0.0.1, 127.0.0.2, ...), each a separate host to the
+checker, and answers every request after ``--latency`` ms, with a 304 when
+the request's ETag matches. Every truck gets a website on one of the
+hosts, and every fourth an Instagram link on 127.0.0.1, the way one
+social site holds a large share of real links.
+
+Reports for ``manage.py check_links``'s ``check_links()``:
+
+* first run: every URL fetched
+* rerun: every URL revalidated with its stored ETag (304s)
+* sequential: one request at a time on a sample, extrapolated
+
+    python -m benchmarks.bench_linkcheck [--trucks 40000] [--hosts 50] [--latency 20]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import time
+
+from benchmarks.common import seed_trucks, setup_django
+
+
+async def answer(reader, writer, latency):
+    try:
+        while True:
+            head = await reader.readuntil(b'\r\n\r\n')
+            await asyncio.sleep(latency)
+            if b'if-none-match: "v1"' in head.lower():
+                writer.write(b'HTTP/1.1 304 Not Modified\r\nETag: "v1"\r\n\r\n')
+            else:
+                writer.write(b'HTTP/1.1 200 OK\r\nETag: "v1"\r\nContent-Length: 5\r\n\r\nhello')
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        writer.close()
+
+
+def serve(hosts, port, latency, ready):
+    async def main():
+        server = await asyncio.start_server(
+            lambda reader, writer: answer(reader, writer, latency), host=hosts, port=port,
+            backlog=1024,
+        )
+        ready.set()
+        async with server:
+            await server.serve_forever()
+    asyncio.run(main())
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trucks', type=int, default=40000)
+    parser.add_argument('--hosts', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=20.0, help='Milliseconds per response.')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--per-host', type=int, default=8)
+    parser.add_argument('--sample', type=int, default=100)
+    args = parser.parse_args()
+
+    port = free_port()
+    hosts = [f'127.0.0.{i}' for i in range(1, args.hosts + 1)]
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, daemon=True,
+                                     args=(hosts, port, args.latency / 1000, ready))
+    server.start()
+    ready.wait(10)
+
+    setup_django()
+    from directory.linkcheck import LinkChecker, check_links, truck_links
+
+    seed_trucks(
+        args.trucks,
+        website=lambda rng, i: f'http://{hosts[1 + i % (len(hosts) - 1)]}:{port}/trucks/{i}',
+        social_links=lambda rng, i: (
+            {'instagram': f'http://127.0.0.1:{port}/p/{i}'} if i % 4 == 0 else None
+        ),
+    )
+    options = {'concurrency': args.concurrency, 'per_host': args.per_host, 'timeout': 30}
+
+    for label in ('first run', 'rerun (304s)'):
+        start = time.perf_counter()
+        summary = check_links(**options)
+        elapsed = time.perf_counter() - start
+        print(f'{label:<28} {summary["urls"]:,} URLs in {elapsed:6.1f} s  '
+              f'{summary["urls"] / elapsed:8,.0f} URLs/s  ok={summary.get("ok", 0):,}  '
+              f'connections={summary["connections"]}')
+
+    urls = [url for _, _, url in truck_links()][:args.sample]
+
+    async def sequential():
+        checker = LinkChecker(concurrency=1, per_host=1, timeout=30)
+        async for _ in checker.check_all((url, '', '') for url in urls):
+            pass
+        await checker.close()
+
+    start = time.perf_counter()
+    asyncio.run(sequential())
+    per_url = (time.perf_counter() - start) / len(urls)
+    print(f'{"sequential":<28} {per_url * 1000:.1f} ms per URL, '
+          f'{per_url * summary["urls"] / 60:.1f} min for all {summary["urls"]:,}')
+    server.terminate()
+
+
+if __name__ == '__main__':
+    main()
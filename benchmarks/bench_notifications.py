@@ -0,0 +1,108 @@
+"""
+Notification fan-out and delivery at a million users.
+
+Seeds ``--users`` website users, most of them opted in and living in
+Raleigh, creates one Raleigh truck (which enqueues its event through the
+model signals) and reports
+
+* the audience query plan, which should use the partial
+  ``profile_notify_city_user`` index,
+* fan-out throughput (notifications queued per second) and how much RSS
+  grew while queueing them, which stays flat in ``--batch-size``,
+* delivery throughput through the dummy email backend, unthrottled, for
+  the first ``--deliver`` notifications.
+
+    python -m benchmarks.bench_notifications [--users 1000000] [--batch-size 500] [--deliver 20000]
+"""
+
+import argparse
+import random
+import resource
+import time
+
+from benchmarks.common import CITIES, CUISINES, setup_django
+
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed_users(count, seed=13, batch_size=10000):
+    from django.db import transaction
+    from directory.models import CustomUser, WebsiteUserProfile
+
+    rng = random.Random(seed)
+    for first in range(0, count, batch_size):
+        with transaction.atomic():
+            users = CustomUser.objects.bulk_create([
+                CustomUser(username=f'user{i}', email=f'user{i}@example.com', password='!')
+                for i in range(first, min(first + batch_size, count))
+            ])
+            WebsiteUserProfile.objects.bulk_create([
+                WebsiteUserProfile(
+                    user=user,
+                    home_city='Raleigh' if rng.random() < 0.6 else rng.choice(CITIES),
+                    favorite_cuisine_types=', '.join(rng.sample(CUISINES, rng.randint(0, 2))),
+                    notification_preferences=rng.random() < 0.9,
+                )
+                for user in users
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--deliver', type=int, default=20_000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.db import connection
+    from directory.models import FoodTruck, Notification
+    from directory.notifications import (
+        RateLimiter, audience, claim_event, deliver_batch, fan_out_batch,
+    )
+
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.dummy.EmailBackend'
+
+    start = time.perf_counter()
+    seed_users(args.users)
+    print(f'seeded {args.users} users in {time.perf_counter() - start:.1f}s; '
+          f'RSS {peak_rss_mib():.0f} MiB')
+
+    truck = FoodTruck.objects.create(name='Benchmark BBQ', city='Raleigh', cuisine='BBQ')
+    sql, params = audience(truck).filter(user_id__gt=0)[:args.batch_size].query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        print('audience plan:', '; '.join(row[-1] for row in cursor.fetchall()))
+
+    event, lease = claim_event()
+    rss_before = peak_rss_mib()
+    start = time.perf_counter()
+    queued = batches = 0
+    while lease is not None:
+        count, lease = fan_out_batch(event, lease, args.batch_size)
+        queued += count
+        batches += 1
+    elapsed = time.perf_counter() - start
+    print(f'fan-out: {queued} notifications in {batches} batches, {elapsed:.1f}s '
+          f'({queued / elapsed:,.0f}/s); peak RSS {peak_rss_mib():.0f} MiB '
+          f'(+{peak_rss_mib() - rss_before:.0f} MiB while fanning out)')
+
+    limiter = RateLimiter(None)
+    start = time.perf_counter()
+    sent = 0
+    while sent < args.deliver:
+        delivered, _, _ = deliver_batch(args.batch_size, limiter)
+        if not delivered:
+            break
+        sent += delivered
+    elapsed = time.perf_counter() - start
+    print(f'delivery: {sent} emails in {elapsed:.1f}s ({sent / elapsed:,.0f}/s, '
+          f'dummy backend); {Notification.objects.filter(status="pending").count()} pending')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Overhead of the profiling middleware.
+
+Runs the same requests through the full handler stack with profiling
+disabled, enabled at sample rate 0, and enabled at sample rate 1, and
+reports latency and overhead relative to disabled. Rounds are interleaved so
+drift affects every configuration equally. The target is under 1% overhead
+with sampling off.
+
+    python -m benchmarks.bench_profiling [--trucks 5000] [--repeat 300] [--rounds 5]
+"""
+
+import argparse
+import statistics
+
+from benchmarks.common import report, seed_trucks, setup_django, timed
+
+CONFIGS = [
+    ('disabled', {'DIRECTORY_PROFILING_ENABLED': False}),
+    ('sampling off (rate 0)', {'DIRECTORY_PROFILING_ENABLED': True,
+                               'DIRECTORY_PROFILING_SAMPLE_RATE': 0.0}),
+    ('sampling every request', {'DIRECTORY_PROFILING_ENABLED': True,
+                                'DIRECTORY_PROFILING_SAMPLE_RATE': 1.0}),
+]
+PATHS = ['/search/?q=tacos', '/trucks/raleigh/?open=now', '/directory/']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trucks', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=300)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import Client, override_settings
+
+    settings.ALLOWED_HOSTS = ['*']
+    seed_trucks(args.trucks)
+
+    clients = {}
+    for label, overrides in CONFIGS:
+        # Middleware is loaded on a client's first request, so each client
+        # keeps the configuration it was warmed up with.
+        with override_settings(**overrides):
+            client = Client()
+            for path in PATHS:
+                client.get(path)
+        clients[label] = (client, overrides)
+
+    samples = {label: [] for label, _ in CONFIGS}
+    for _ in range(args.rounds):
+        for label, (client, overrides) in clients.items():
+            with override_settings(**overrides):
+                for path in PATHS:
+                    samples[label] += timed(lambda: client.get(path), args.repeat // args.rounds)
+
+    baseline = statistics.fmean(samples['disabled'])
+    for label, _ in CONFIGS:
+        report(label, samples[label])
+        overhead = (statistics.fmean(samples[label]) / baseline - 1) * 100
+        print(f'{"":<28} overhead {overhead:+.2f}% vs disabled')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+``compute_recommendations`` wall time and memory: 100k users x 10k trucks.
+
+Seeds located trucks around the Triangle and website users with a mix of
+cuisine, dietary and location preferences, then reports
+
+* scoring alone (every block ranked in memory, nothing written),
+* the peak NumPy allocation of one block, which bounds the job's working
+  set independently of the number of users,
+* the full batch job including the ``UserRecommendations`` upserts,
+
+plus peak RSS.
+
+    python -m benchmarks.bench_recommendations [--users 100000] [--trucks 10000] [--block-size 1000]
+"""
+
+import argparse
+import random
+import resource
+import time
+import tracemalloc
+
+from benchmarks.common import CITIES, CUISINES, seed_trucks, setup_django
+
+DIETARY = ['', '', 'vegan', 'vegetarian', 'gluten free', 'halal', 'no dairy, nut allergy']
+
+
+def peak_rss_mib():
+    # ru_maxrss is KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed_users(count, seed=11, batch_size=5000):
+    from directory.models import CustomUser, WebsiteUserProfile
+
+    rng = random.Random(seed)
+    for first in range(0, count, batch_size):
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f'user{i}', password='!')
+            for i in range(first, min(first + batch_size, count))
+        ])
+        profiles = []
+        for user in users:
+            located = rng.random() < 0.5
+            profiles.append(WebsiteUserProfile(
+                user=user,
+                favorite_cuisine_types=', '.join(rng.sample(CUISINES, rng.randint(0, 3))),
+                dietary_preferences=rng.choice(DIETARY),
+                home_city=rng.choice(CITIES) if rng.random() < 0.8 else '',
+                home_latitude=35.8 + rng.gauss(0, 0.1) if located else None,
+                home_longitude=-78.7 + rng.gauss(0, 0.1) if located else None,
+            ))
+        WebsiteUserProfile.objects.bulk_create(profiles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--trucks', type=int, default=10_000)
+    parser.add_argument('--block-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from directory.models import WebsiteUserProfile
+    from directory.recommendations import (
+        compute_recommendations, load_trucks, recommend_block, recommendation_settings,
+    )
+
+    start = time.perf_counter()
+    seed_trucks(
+        args.trucks,
+        latitude=lambda rng, i: 35.8 + rng.gauss(0, 0.15),
+        longitude=lambda rng, i: -78.7 + rng.gauss(0, 0.15),
+    )
+    seed_users(args.users)
+    print(f'seeded {args.trucks} trucks and {args.users} users '
+          f'in {time.perf_counter() - start:.1f}s; RSS {peak_rss_mib():.0f} MiB')
+
+    weights, n, miles = recommendation_settings()
+    start = time.perf_counter()
+    vocabulary, trucks = load_trucks()
+    loaded = time.perf_counter() - start
+    profiles = list(WebsiteUserProfile.objects.order_by('user_id').values_list(
+        'favorite_cuisine_types', 'dietary_preferences',
+        'home_city', 'home_latitude', 'home_longitude',
+    ))
+
+    start = time.perf_counter()
+    ranked = 0
+    for first in range(0, len(profiles), args.block_size):
+        block = profiles[first:first + args.block_size]
+        ranked += sum(
+            result is not None
+            for result in recommend_block(vocabulary, trucks, block, n, weights, miles)
+        )
+    scored = time.perf_counter() - start
+    print(f'load trucks {loaded * 1000:.0f} ms; score only: {scored:.2f}s '
+          f'({len(profiles) / scored:,.0f} users/s, {ranked} ranked, top {n})')
+
+    tracemalloc.start()
+    recommend_block(vocabulary, trucks, profiles[:args.block_size], n, weights, miles)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'one block of {args.block_size} users: peak allocation {peak / 2**20:.0f} MiB')
+
+    start = time.perf_counter()
+    stored, cleared = compute_recommendations(block_size=args.block_size)
+    elapsed = time.perf_counter() - start
+    print(f'full job: {elapsed:.2f}s ({args.users / elapsed:,.0f} users/s), '
+          f'stored {stored}, cleared {cleared}; peak RSS {peak_rss_mib():.0f} MiB')
+
+
+if __name__ == '__main__':
+    main()
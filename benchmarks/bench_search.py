@@ -0,0 +1,45 @@
+"""
+Full-text search latency at 100k trucks.
+
+Seeds the trucks, rebuilds the index with ``rebuild_search_index`` and
+reports p50/p99 for single-word, multi-word and prefix queries. The target
+is p99 under 10 ms.
+
+    python -m benchmarks.bench_search [--trucks 100000] [--repeat 200]
+"""
+
+import argparse
+import time
+
+from benchmarks.common import percentile, report, seed_trucks, setup_django, timed
+
+QUERIES = ['tacos', 'smoked brisket', 'spicy pork dumplings', 'kim', 'vegan bowls',
+           'Smoked Tacos 4242', 'nothingmatches']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trucks', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from directory.search import search_trucks
+
+    start = time.perf_counter()
+    seed_trucks(args.trucks)
+    print(f'seeded {args.trucks} trucks in {time.perf_counter() - start:.1f}s')
+    call_command('rebuild_search_index')
+
+    worst = 0.0
+    for query in QUERIES:
+        samples = timed(lambda: search_trucks(query, args.limit), args.repeat)
+        worst = max(worst, percentile(samples, 99))
+        report(repr(query), samples)
+    print(f'worst p99 {worst:.3f} ms ({"PASS" if worst < 10 else "FAIL"} < 10 ms)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Session and authentication overhead on a one-query page.
+
+Requests ``/truck/<pk>/`` (one query for the page itself) through the full
+middleware stack with the test client, and reports latency, throughput and
+the queries per request:
+
+* anonymous: no session cookie at all
+* signed in, ``db`` sessions and ``ModelBackend`` (Django's defaults): a
+  session row and a user row every request
+* signed in, ``cached_db`` sessions (``directory.sessions``) and
+  ``CachedModelBackend``
+* signed in, ``signed_cookies`` sessions and ``CachedModelBackend``
+
+    python -m benchmarks.bench_sessions [--trucks 200] [--repeat 2000]
+"""
+
+import argparse
+import statistics
+from contextlib import ExitStack
+
+from benchmarks.common import report, seed_trucks, setup_django, timed
+
+CONFIGS = [
+    ('anonymous', None, None),
+    ('db + ModelBackend', 'django.contrib.sessions.backends.db',
+     'django.contrib.auth.backends.ModelBackend'),
+    ('cached_db + cached user', 'directory.sessions', 'directory.auth.CachedModelBackend'),
+    ('signed_cookies + cached user', 'django.contrib.sessions.backends.signed_cookies',
+     'directory.auth.CachedModelBackend'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trucks', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.db import connections
+    from django.test import Client, override_settings
+    from django.test.utils import CaptureQueriesContext
+    from directory.models import CustomUser, FoodTruck, WebsiteUserProfile
+    from directory.truck_pages import rebuild_truck_pages
+
+    seed_trucks(args.trucks)
+    rebuild_truck_pages()
+    user = CustomUser.objects.create_user(username='eater', password='correct horse battery')
+    WebsiteUserProfile.objects.create(user=user, home_city='Raleigh')
+    url = f'/truck/{FoodTruck.objects.order_by("pk").values_list("pk", flat=True).first()}/'
+
+    for label, engine, backend in CONFIGS:
+        overrides = {'SESSION_ENGINE': engine, 'AUTHENTICATION_BACKENDS': [backend]} if engine else {}
+        with override_settings(ALLOWED_HOSTS=['testserver'], **overrides):
+            cache.clear()
+            # A new client builds the middleware, and its session engine, afresh.
+            client = Client()
+            if engine:
+                client.force_login(user)
+
+            def fetch():
+                response = client.get(url)
+                assert response.status_code == 200, response.status_code
+
+            fetch()
+            # Reads may be routed to the replica alias; count every database.
+            with ExitStack() as stack:
+                captured = [stack.enter_context(CaptureQueriesContext(connections[alias]))
+                            for alias in connections]
+                fetch()
+            queries = sum(len(context) for context in captured)
+            samples = timed(fetch, args.repeat)
+        report(label, samples)
+        print(f'{"":<28} {1000 / statistics.fmean(samples):,.0f} requests/s  '
+              f'{queries} queries per request')
+
+
+if __name__ == '__main__':
+    main()
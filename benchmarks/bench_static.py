@@ -0,0 +1,177 @@
+"""
+Bytes transferred and time to first byte for page visits, before and after
+the production static pipeline.
+
+* ``before``: files collected under their own names and served by
+  ``django.views.static.serve``, uncompressed and without cache lifetimes;
+  HTML neither compressed nor given validators.
+* ``after``: ``CompressedManifestStaticFilesStorage`` and ``serve_static``,
+  with the gzip and conditional GET middleware on HTML.
+
+Each visit loads a page and the stylesheets and scripts it links from
+``/static/``, through a browser cache: a first visit with it empty, then a
+repeat visit a day later, where fresh entries aren't requested at all and
+stale ones are revalidated with ``If-None-Match``/``If-Modified-Since``.
+
+    python -m benchmarks.bench_static [--trucks 200] [--repeat 50]
+"""
+
+import argparse
+import gzip
+import re
+import shutil
+import statistics
+import tempfile
+import time
+from io import StringIO
+
+from benchmarks.common import percentile, seed_trucks, setup_django
+
+ACCEPT_ENCODING = 'gzip, deflate, br'
+ASSET_LINK = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+HTML_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+MAX_AGE = re.compile(r'max-age=(\d+)')
+DAY = 24 * 60 * 60
+
+
+def wire_bytes(response, body):
+    """Body plus status line and headers, roughly as HTTP/1.1 sends them."""
+    headers = sum(len(name) + len(value) + 4 for name, value in response.items())
+    return len(body) + headers + len(f'HTTP/1.1 {response.status_code} OK\r\n\r\n')
+
+
+class Browser:
+    """A private HTTP cache in front of ``fetch(url, headers)``."""
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.entries = {}
+        self.clock = 0.0
+
+    def get(self, url):
+        """``(bytes, ttfb_ms, body)`` for ``url``; bytes is 0 from a fresh cache entry."""
+        entry = self.entries.get(url)
+        if entry and entry['fresh_until'] > self.clock:
+            return 0, 0.0, entry['body']
+        headers = {'Accept-Encoding': ACCEPT_ENCODING}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        start = time.perf_counter()
+        response = self.fetch(url, headers)
+        if response.streaming:
+            chunks = iter(response.streaming_content)
+            first = next(chunks, b'')
+            ttfb = (time.perf_counter() - start) * 1000
+            body = first + b''.join(chunks)
+        else:
+            ttfb = (time.perf_counter() - start) * 1000
+            body = response.content
+        sent = wire_bytes(response, body)
+
+        if response.status_code == 304:
+            body = entry['body']
+        else:
+            if response.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            entry = {'body': body}
+            self.entries[url] = entry
+        max_age = MAX_AGE.search(response.get('Cache-Control', ''))
+        entry['fresh_until'] = self.clock + (int(max_age.group(1)) if max_age else 0)
+        entry['etag'] = response.get('ETag')
+        entry['last_modified'] = response.get('Last-Modified')
+        return sent, ttfb, body
+
+    def visit(self, url):
+        """Load ``url`` and its static assets; returns ``(bytes, html_ttfb, asset_ttfbs)``."""
+        sent, html_ttfb, body = self.get(url)
+        asset_ttfbs = []
+        html = HTML_COMMENT.sub('', body.decode())
+        for asset in dict.fromkeys(ASSET_LINK.findall(html)):
+            asset_sent, ttfb, _ = self.get(asset)
+            sent += asset_sent
+            if asset_sent:
+                asset_ttfbs.append(ttfb)
+        return sent, html_ttfb, asset_ttfbs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trucks', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from django.test import Client, RequestFactory, override_settings
+    from django.views.static import serve
+    from directory.models import FoodTruck
+    from directory.static_assets import serve_static
+
+    seed_trucks(args.trucks, latitude=lambda rng, i: 35.7 + rng.random() / 5,
+                longitude=lambda rng, i: -78.7 + rng.random() / 5)
+    truck = FoodTruck.objects.filter(city='Raleigh').first()
+    pages = ['/', '/directory/', '/trucks/raleigh/', f'/truck/{truck.pk}/']
+
+    middleware = list(settings.MIDDLEWARE)
+    modes = {
+        'before': {
+            'storage': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+            'middleware': [name for name in middleware
+                           if 'GZip' not in name and 'ConditionalGet' not in name],
+            'serve': lambda request, path: serve(request, path,
+                                                 document_root=settings.STATIC_ROOT),
+        },
+        'after': {
+            'storage': 'directory.static_assets.CompressedManifestStaticFilesStorage',
+            'middleware': middleware,
+            'serve': serve_static,
+        },
+    }
+
+    for mode, config in modes.items():
+        static_root = tempfile.mkdtemp(prefix='tse-bench-static-')
+        storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': config['storage']}}
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'], STATIC_ROOT=static_root,
+                               STORAGES=storages, MIDDLEWARE=config['middleware']):
+            call_command('collectstatic', interactive=False, verbosity=0, stdout=StringIO())
+            cache.clear()
+            client, factory = Client(), RequestFactory()
+
+            def fetch(url, headers, serve_file=config['serve']):
+                if url.startswith('/static/'):
+                    # Straight to the file view, in both modes.
+                    request = factory.get(url, headers=headers)
+                    return serve_file(request, url.removeprefix('/static/'))
+                return client.get(url, headers=headers)
+
+            first_bytes, repeat_bytes, html_ttfbs, asset_ttfbs = [], [], [], []
+            for _ in range(args.repeat):
+                for page in pages:
+                    browser = Browser(fetch)
+                    sent, html_ttfb, assets = browser.visit(page)
+                    first_bytes.append(sent)
+                    html_ttfbs.append(html_ttfb)
+                    asset_ttfbs.extend(assets)
+                    browser.clock += DAY
+                    sent, html_ttfb, assets = browser.visit(page)
+                    repeat_bytes.append(sent)
+                    html_ttfbs.append(html_ttfb)
+                    asset_ttfbs.extend(assets)
+        shutil.rmtree(static_root)
+
+        visits = len(first_bytes)
+        print(f'{mode:<7} first visit {sum(first_bytes) / visits:9.0f} B  '
+              f'repeat visit {sum(repeat_bytes) / visits:9.0f} B  '
+              f'html ttfb p50={percentile(html_ttfbs, 50):6.2f} ms '
+              f'p99={percentile(html_ttfbs, 99):6.2f} ms  '
+              f'asset ttfb mean={statistics.fmean(asset_ttfbs or [0]):6.2f} ms '
+              f'({len(asset_ttfbs)} fetched)')
+
+
+if __name__ == '__main__':
+    main()
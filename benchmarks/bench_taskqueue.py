@@ -0,0 +1,66 @@
+"""
+Task queue throughput as workers are added.
+
+Queues ``--tasks`` tasks that each spend ``--work-ms`` waiting (standing
+in for an SMTP or storage round trip) and drains them with
+``run_workers --once`` at each worker configuration, reporting tasks per
+second and queue wait percentiles. ``--work-ms 0`` measures the queue's
+own overhead: claiming, and recording each outcome.
+
+    python -m benchmarks.bench_taskqueue [--tasks 2000] [--work-ms 20] [--configs 1x1,1x4,2x4,4x4]
+"""
+
+import argparse
+import time
+from io import StringIO
+
+from benchmarks.common import percentile, setup_django
+
+WORK_SECONDS = [0.0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=2000)
+    parser.add_argument('--work-ms', type=float, default=20)
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--configs', default='1x1,1x2,1x4,1x8,2x4,4x4',
+                        help='Comma-separated PROCESSESxTHREADS pairs.')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from django.utils import timezone
+    from directory.models import Task
+    from directory.taskqueue import task
+
+    @task('bench.wait')
+    def wait():
+        if WORK_SECONDS[0]:
+            time.sleep(WORK_SECONDS[0])
+
+    WORK_SECONDS[0] = args.work_ms / 1000
+    print(f'{args.tasks} tasks of {args.work_ms:.0f} ms, claimed {args.batch_size} at a time')
+    for config in args.configs.split(','):
+        processes, threads = (int(part) for part in config.split('x'))
+        Task.objects.all().delete()
+        now = timezone.now()
+        Task.objects.bulk_create(
+            [Task(name='bench.wait', run_at=now) for _ in range(args.tasks)], batch_size=1000
+        )
+        start = time.perf_counter()
+        call_command(
+            'run_workers', '--once', '--processes', processes, '--threads', threads,
+            '--batch-size', args.batch_size, '--sleep', 0.05, stdout=StringIO(),
+        )
+        elapsed = time.perf_counter() - start
+        done = list(Task.objects.filter(status=Task.DONE).values_list('run_at', 'started_at'))
+        waits = [(started - run_at).total_seconds() * 1000 for run_at, started in done]
+        print(f'{processes} process(es) x {threads:>2} thread(s): '
+              f'{len(done) / elapsed:8.1f} tasks/s  '
+              f'wait p50={percentile(waits, 50):8.0f} ms p95={percentile(waits, 95):8.0f} ms  '
+              f'done {len(done)}/{args.tasks}')
+
+
+if __name__ == '__main__':
+    main()
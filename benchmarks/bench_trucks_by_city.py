@@ -0,0 +1,71 @@
+"""
+Latency of the ``trucks_by_city`` listing by page depth.
+
+Seeds 100k trucks, walks the keyset cursors for one city and reports
+p50/p99 of the full view (query + render) at several depths, next to the
+equivalent ``OFFSET`` query for comparison.
+
+    python -m benchmarks.bench_trucks_by_city [--trucks 100000] [--repeat 200]
+"""
+
+import argparse
+import time
+
+from benchmarks.common import report, seed_trucks, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--trucks', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--page-size', type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from directory.pagination import paginate_keyset
+    from directory.views import city_trucks_queryset, trucks_by_city
+
+    start = time.perf_counter()
+    seed_trucks(args.trucks)
+    print(f'seeded {args.trucks} trucks in {time.perf_counter() - start:.1f}s')
+
+    # Collect the cursor that starts each page so depths can be replayed.
+    cursors = [None]
+    while True:
+        page = paginate_keyset(city_trucks_queryset('raleigh'), cursors[-1],
+                               page_size=args.page_size)
+        if not page.has_next:
+            break
+        cursors.append(page.next_cursor)
+    print(f'raleigh has {len(cursors)} pages of {args.page_size}')
+
+    factory = RequestFactory()
+    depths = [d for d in (1, 10, 100, 500, 1000) if d <= len(cursors)]
+    for depth in depths:
+        params = {'page_size': args.page_size}
+        if cursors[depth - 1]:
+            params['cursor'] = cursors[depth - 1]
+        request = factory.get('/trucks/raleigh/', params)
+        request.user = AnonymousUser()
+        report(f'keyset view page {depth}',
+               timed(lambda: trucks_by_city(request, 'raleigh'), args.repeat))
+
+    for depth in depths:
+        cursor = cursors[depth - 1]
+        report(f'keyset query page {depth}',
+               timed(lambda: paginate_keyset(city_trucks_queryset('raleigh'), cursor,
+                                             page_size=args.page_size),
+                     args.repeat))
+
+    for depth in depths:
+        offset = (depth - 1) * args.page_size
+        queryset = city_trucks_queryset('raleigh').order_by('name', 'id')
+        report(f'OFFSET query page {depth}',
+               timed(lambda: list(queryset[offset:offset + args.page_size]),
+                     args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Each benchmark runs against a throwaway SQLite file so seeding 100k rows
+never touches ``db.sqlite3``. Run them from the repository root, e.g.::
+
+    python -m benchmarks.bench_trucks_by_city
+"""
+
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+CITIES = ['Raleigh', 'Durham', 'Chapel Hill', 'Cary', 'Carrboro', 'Apex',
+          'Morrisville', 'Wake Forest', 'Garner', 'Hillsborough']
+CUISINES = ['Mexican', 'BBQ', 'Asian Fusion', 'Vegan', 'Italian', 'Thai',
+            'American', 'Indian', 'Greek', 'Korean', 'Soul Food', 'Desserts']
+WORDS = ['smoked', 'tacos', 'brisket', 'noodles', 'curry', 'burgers', 'vegan',
+         'bowls', 'crepes', 'pizza', 'wings', 'dumplings', 'gyros', 'falafel',
+         'kimchi', 'donuts', 'lemonade', 'pulled', 'pork', 'spicy']
+_SYLLABLES = ['ba', 'ko', 'ri', 'mu', 'ten', 'sal', 'vo', 'gri', 'lan', 'pe',
+              'do', 'chi', 'ra', 'nu', 'zel', 'ma']
+
+
+def _vocabulary(size=4000):
+    """
+    Pseudo-words for names and descriptions, ranked for a Zipf-like draw.
+
+    Real menus share a long tail of rare words; drawing every truck from
+    the 20 ``WORDS`` would make each term match a large slice of the table.
+    """
+    vocab = []
+    for i in range(size):
+        word, n = '', i + 1
+        while n:
+            n, digit = divmod(n, len(_SYLLABLES))
+            word += _SYLLABLES[digit]
+        vocab.append(word)
+    for position, word in enumerate(WORDS):
+        vocab[5 + position * 40] = word
+    return vocab, list(itertools.accumulate(1 / (rank + 1) for rank in range(size)))
+
+
+VOCABULARY, VOCABULARY_CUM_WEIGHTS = _vocabulary()
+
+
+def menu_words(rng, k):
+    """Draw ``k`` words from the Zipf-weighted benchmark vocabulary."""
+    return rng.choices(VOCABULARY, cum_weights=VOCABULARY_CUM_WEIGHTS, k=k)
+
+
+def setup_django(db_path=None):
+    """Configure Django against a temporary database and migrate it."""
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'TriangleStreetEats.settings')
+    import django
+    from django.conf import settings
+
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='tse-bench-'), 'bench.sqlite3')
+    settings.DATABASES['default']['NAME'] = db_path
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return db_path
+
+
+def seed_trucks(count, batch_size=5000, seed=7, **extra):
+    """
+    Bulk insert ``count`` synthetic trucks; returns the number created.
+
+    ``extra`` maps field names to ``callable(rng, i)`` giving each truck's value.
+    """
+    import random
+    from directory.models import FoodTruck
+
+    rng = random.Random(seed)
+    created = 0
+    while created < count:
+        batch = []
+        for i in range(created, min(created + batch_size, count)):
+            words = menu_words(rng, 2)
+            fields = {
+                'name': f'{words[0].title()} {words[1].title()} {i}',
+                'city': rng.choice(CITIES),
+                'cuisine': rng.choice(CUISINES),
+                'description': ' '.join(menu_words(rng, 12)),
+            }
+            # ``extra`` may add fields or override the generated ones.
+            fields.update({key: value(rng, i) for key, value in extra.items()})
+            batch.append(FoodTruck(**fields))
+        FoodTruck.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def percentile(samples, pct):
+    """Return the ``pct`` percentile of ``samples`` (nearest rank)."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def timed(func, repeat):
+    """Call ``func`` ``repeat`` times and return latencies in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label, samples):
+    """Print a one-line latency summary."""
+    print(f'{label:<28} p50={percentile(samples, 50):8.3f} ms  '
+          f'p99={percentile(samples, 99):8.3f} ms  '
+          f'mean={statistics.fmean(samples):8.3f} ms  n={len(samples)}')
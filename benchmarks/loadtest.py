@@ -0,0 +1,228 @@
+"""
+WSGI vs ASGI under many concurrent, slow clients.
+
+Seeds a benchmark database, then for each server starts it on a local
+port and opens ``--connections`` keep-alive HTTP/1.1 connections that
+request pages in a loop for ``--duration`` seconds. Reports throughput,
+p50/p95/p99 latency and errors per server.
+
+* ``wsgi``: gunicorn with threaded workers, serving the sync views.
+* ``asgi``: uvicorn, serving the ``/async/`` views.
+
+Mobile clients are simulated with ``--send-delay``: each request's headers
+are written in two halves with a pause between, which ties up a thread on
+WSGI servers that read requests in their worker threads but costs an ASGI
+server nothing. ``--uncached`` sends a session cookie so every request
+runs its view instead of being served from the page cache.
+
+Needs ``gunicorn`` and ``uvicorn`` installed; the load generator itself is
+plain asyncio.
+
+    python -m benchmarks.loadtest [--connections 1000] [--duration 20] [--send-delay 50]
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import ROOT, percentile, seed_trucks, setup_django
+
+PATHS = {
+    'wsgi': ['/directory/?city=raleigh', '/search/?q=tacos', '/trucks/durham/?cuisine=BBQ'],
+    'asgi': ['/async/directory/?city=raleigh', '/async/search/?q=tacos',
+             '/async/trucks/durham/?cuisine=BBQ'],
+}
+
+
+def server_command(kind, port, workers, threads):
+    bind = f'127.0.0.1:{port}'
+    if kind == 'wsgi':
+        return ['gunicorn', 'TriangleStreetEats.wsgi:application', '--bind', bind,
+                '--workers', str(workers), '--worker-class', 'gthread',
+                '--threads', str(threads), '--backlog', '4096', '--log-level', 'warning']
+    return ['uvicorn', 'TriangleStreetEats.asgi:application', '--host', '127.0.0.1',
+            '--port', str(port), '--workers', str(workers), '--backlog', '4096',
+            '--log-level', 'warning', '--no-access-log']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not start on port {port}')
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns the status code."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    length = 0
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(length)
+    return status
+
+
+async def client(port, paths, offset, stop_at, send_delay, cookie, stats):
+    """One keep-alive connection issuing requests until ``stop_at``."""
+    reader = writer = None
+    index = offset
+    while time.monotonic() < stop_at:
+        path = paths[index % len(paths)]
+        index += 1
+        request = (
+            f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+            f'User-Agent: tse-loadtest\r\n{cookie}\r\n'
+        ).encode()
+        start = time.monotonic()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            if send_delay:
+                half = len(request) // 2
+                writer.write(request[:half])
+                await writer.drain()
+                await asyncio.sleep(send_delay)
+                writer.write(request[half:])
+            else:
+                writer.write(request)
+            await writer.drain()
+            status = await asyncio.wait_for(read_response(reader), timeout=30)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError,
+                asyncio.TimeoutError, ValueError, IndexError):
+            stats['errors'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.1)
+            continue
+        if status != 200:
+            stats['errors'] += 1
+        else:
+            stats['latencies'].append((time.monotonic() - start) * 1000)
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, paths, connections, duration, send_delay, uncached):
+    stats = {'latencies': [], 'errors': 0}
+    cookie = 'Cookie: sessionid=loadtest\r\n' if uncached else ''
+    stop_at = time.monotonic() + duration
+    await asyncio.gather(*(
+        client(port, paths, i, stop_at, send_delay, cookie, stats)
+        for i in range(connections)
+    ))
+    return stats
+
+
+def raise_fd_limit(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+
+def run_server(kind, args, env):
+    executable = 'gunicorn' if kind == 'wsgi' else 'uvicorn'
+    if shutil.which(executable) is None:
+        print(f'{kind}: skipped, {executable} is not installed')
+        return
+    port = free_port()
+    process = subprocess.Popen(
+        server_command(kind, port, args.workers, args.threads),
+        cwd=ROOT, env=env, preexec_fn=lambda: raise_fd_limit(args.connections * 2 + 256),
+    )
+    try:
+        wait_for_port(port)
+        # Warm up: import views, open database connections, fill the caches.
+        asyncio.run(load(port, PATHS[kind], 10, 2, 0, args.uncached))
+        start = time.monotonic()
+        stats = asyncio.run(load(
+            port, PATHS[kind], args.connections, args.duration,
+            args.send_delay / 1000, args.uncached,
+        ))
+        elapsed = time.monotonic() - start
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+    latencies = stats['latencies']
+    if not latencies:
+        print(f'{kind}: no successful requests, {stats["errors"]} errors')
+        return
+    print(f'{kind}: {len(latencies) / elapsed:8.1f} req/s  '
+          f'p50={percentile(latencies, 50):8.1f} ms  '
+          f'p95={percentile(latencies, 95):8.1f} ms  '
+          f'p99={percentile(latencies, 99):8.1f} ms  '
+          f'ok={len(latencies)} errors={stats["errors"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--send-delay', type=float, default=50,
+                        help='Milliseconds between the two halves of each request.')
+    parser.add_argument('--trucks', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=32,
+                        help='Threads per gunicorn worker.')
+    parser.add_argument('--uncached', action='store_true')
+    parser.add_argument('--servers', default='wsgi,asgi')
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    from directory.facets import rebuild_facet_counts
+    from directory.search import get_search_backend
+
+    seed_trucks(args.trucks)
+    rebuild_facet_counts()
+    get_search_backend().rebuild()
+    raise_fd_limit(args.connections * 2 + 256)
+
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'benchmarks.settings',
+           'TSE_BENCH_DB': db_path, 'PYTHONPATH': str(ROOT)}
+    print(f'{args.connections} connections for {args.duration:.0f}s, '
+          f'send delay {args.send_delay:.0f} ms, {args.workers} worker(s), '
+          f'{"uncached" if args.uncached else "cached"} pages')
+    for kind in args.servers.split(','):
+        run_server(kind, args, env)
+    sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+"""
+Settings for the servers ``benchmarks.loadtest`` starts: the project
+settings with ``DEBUG`` off, pointed at the benchmark's seeded database.
+"""
+
+import os
+
+from TriangleStreetEats.settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ["TSE_BENCH_DB"],
+    }
+}
@@ -1,10 +1,59 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, FoodTruckOwnerProfile, WebsiteUserProfile
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.html import format_html_join
+from .models import (
+    CustomUser, DietaryTag, FoodTruck, FoodTruckOwnerProfile, LinkCheck, OperatingHours,
+    TruckSubmission, WebsiteUserProfile,
+)
+from .pagination import EstimatedCountPaginator
 
 # Register your models here.
 
-class CustomUserAdmin(UserAdmin):
+def prefix_range(term):
+    """
+    ``(low, high)`` bounds matching every string that starts with ``term``.
+
+    ``low <= value < high`` is the sargable form of ``LIKE 'term%'``.
+    """
+    return term, term[:-1] + chr(ord(term[-1]) + 1)
+
+
+class ScalableChangeListMixin:
+    """
+    Changelist settings for tables with tens of thousands of rows.
+
+    Search is a case-insensitive *prefix* match on each of
+    ``search_fields``, written as a range over ``Lower(field)`` so it
+    is answered from the matching expression index instead of a
+    ``LIKE '%term%'`` scan. The page count comes from
+    ``EstimatedCountPaginator``, and the "N total" count is skipped.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        terms = search_term.lower().split()
+        search_fields = self.get_search_fields(request)
+        if not terms or not search_fields:
+            return queryset, False
+        aliases = {
+            f'_search_{i}': Lower(field_name)
+            for i, field_name in enumerate(search_fields)
+        }
+        queryset = queryset.alias(**aliases)
+        for term in terms:
+            low, high = prefix_range(term)
+            condition = Q()
+            for alias in aliases:
+                condition |= Q(**{f'{alias}__gte': low, f'{alias}__lt': high})
+            queryset = queryset.filter(condition)
+        return queryset, False
+
+
+class CustomUserAdmin(ScalableChangeListMixin, UserAdmin):
     """
     Admin configuration for CustomUser model.
     """
@@ -25,29 +74,159 @@ class CustomUserAdmin(UserAdmin):
     # Display these fields in the user list
     list_display = UserAdmin.list_display + ('role', 'phone_number')
     list_filter = UserAdmin.list_filter + ('role',)
+    search_fields = ('username', 'email')
 
 
-class FoodTruckOwnerProfileAdmin(admin.ModelAdmin):
+class FoodTruckOwnerProfileAdmin(ScalableChangeListMixin, admin.ModelAdmin):
     """
     Admin configuration for FoodTruckOwnerProfile model.
     """
     list_display = ('business_name', 'user', 'cuisine_type', 'is_verified')
     list_filter = ('is_verified', 'cuisine_type')
-    search_fields = ('business_name', 'user__username', 'business_license')
-    readonly_fields = ('user',)
+    list_select_related = ('user',)
+    search_fields = ('business_name', 'user__username')
+    autocomplete_fields = ('user',)
 
+    def get_readonly_fields(self, request, obj=None):
+        # The owner can be picked when adding a profile, not reassigned.
+        return ('user',) if obj else ()
 
-class WebsiteUserProfileAdmin(admin.ModelAdmin):
+
+class WebsiteUserProfileAdmin(ScalableChangeListMixin, admin.ModelAdmin):
     """
     Admin configuration for WebsiteUserProfile model.
     """
-    list_display = ('user', 'dietary_preferences', 'notification_preferences')
+    list_display = ('user', 'dietary_preferences', 'home_city', 'notification_preferences')
     list_filter = ('notification_preferences',)
-    search_fields = ('user__username', 'dietary_preferences')
-    readonly_fields = ('user',)
+    list_select_related = ('user',)
+    search_fields = ('user__username', 'user__email')
+    autocomplete_fields = ('user',)
+
+    def get_readonly_fields(self, request, obj=None):
+        return ('user',) if obj else ()
+
+
+class OperatingHoursInline(admin.TabularInline):
+    """
+    A truck's weekly hours, the ones open-now reads; the minute-of-week
+    columns are derived on save.
+    """
+    model = OperatingHours
+    fields = ('weekday', 'opens_at', 'closes_at')
+    extra = 1
+
+
+class FoodTruckAdmin(ScalableChangeListMixin, admin.ModelAdmin):
+    """
+    Admin configuration for FoodTruck model.
+    """
+    inlines = [OperatingHoursInline]
+    list_display = ('name', 'city', 'cuisine', 'owner', 'is_verified')
+    list_select_related = ('owner__user',)
+    search_fields = ('name', 'city')
+    autocomplete_fields = ('owner', 'dietary_tags')
+    readonly_fields = ('external_id',)
+
+
+class DietaryTagAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for DietaryTag model.
+    """
+    list_display = ('name', 'slug')
+    search_fields = ('name', 'slug')
+    prepopulated_fields = {'slug': ('name',)}
+
+
+class TruckSubmissionAdmin(admin.ModelAdmin):
+    """
+    Moderation queue for trucks submitted through the public form.
+    """
+    list_display = ('name', 'city', 'cuisine', 'status', 'duplicate_count', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('name', 'city', 'contact_email')
+    readonly_fields = ('submitted_by', 'duplicate_report', 'truck', 'created_at', 'reviewed_at')
+    exclude = ('possible_duplicates',)
+    actions = ('approve', 'reject', 'mark_duplicate')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('submitted_by', 'truck')
+
+    @admin.display(description='Possible duplicates')
+    def duplicate_count(self, obj):
+        return sum(1 for match in obj.possible_duplicates if match.get('likely'))
+
+    @admin.display(description='Resembles')
+    def duplicate_report(self, obj):
+        return format_html_join(
+            '\n', '<div>#{} {} ({}): {}</div>',
+            ((m['truck_id'], m['name'], m['city'], ', '.join(m['reasons']))
+             for m in obj.possible_duplicates),
+        ) or '-'
+
+    @admin.action(description='Approve and add to the directory')
+    def approve(self, request, queryset):
+        approved = 0
+        for submission in queryset.filter(status=TruckSubmission.PENDING):
+            submission.truck = FoodTruck.objects.create(
+                name=submission.name, city=submission.city, cuisine=submission.cuisine,
+                description=submission.description, website=submission.website or None,
+                social_links=submission.social_links,
+            )
+            submission.status = TruckSubmission.APPROVED
+            submission.reviewed_at = timezone.now()
+            submission.save(update_fields=['truck', 'status', 'reviewed_at'])
+            approved += 1
+        self.message_user(request, f'Added {approved} trucks to the directory.')
+
+    @admin.action(description='Reject')
+    def reject(self, request, queryset):
+        updated = queryset.filter(status=TruckSubmission.PENDING).update(
+            status=TruckSubmission.REJECTED, reviewed_at=timezone.now()
+        )
+        self.message_user(request, f'Rejected {updated} submissions.')
+
+    @admin.action(description='Mark as duplicate of the closest match')
+    def mark_duplicate(self, request, queryset):
+        marked = 0
+        for submission in queryset.filter(status=TruckSubmission.PENDING):
+            matches = [m['truck_id'] for m in submission.possible_duplicates]
+            closest = next(
+                (pk for pk in matches if FoodTruck.objects.filter(pk=pk).exists()), None
+            )
+            if closest is None:
+                continue
+            submission.truck_id = closest
+            submission.status = TruckSubmission.DUPLICATE
+            submission.reviewed_at = timezone.now()
+            submission.save(update_fields=['truck', 'status', 'reviewed_at'])
+            marked += 1
+        self.message_user(request, f'Marked {marked} submissions as duplicates.')
+
+
+class LinkCheckAdmin(admin.ModelAdmin):
+    """
+    Results of ``manage.py check_links``; filter by outcome to find dead links.
+    """
+    list_display = ('truck', 'source', 'url', 'outcome', 'status_code', 'checked_at',
+                    'failing_since')
+    list_filter = ('outcome', 'source')
+    list_select_related = ('truck',)
+    ordering = ('-failing_since', 'truck')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 # Register the models with their admin configurations
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(FoodTruckOwnerProfile, FoodTruckOwnerProfileAdmin)
 admin.site.register(WebsiteUserProfile, WebsiteUserProfileAdmin)
+admin.site.register(FoodTruck, FoodTruckAdmin)
+admin.site.register(DietaryTag, DietaryTagAdmin)
+admin.site.register(TruckSubmission, TruckSubmissionAdmin)
+admin.site.register(LinkCheck, LinkCheckAdmin)
@@ -0,0 +1,346 @@
+"""
+Page-view analytics for truck owners.
+
+Capture: ``track_page_views`` wraps the truck, city and search views
+(outside their caches, so cached pages count too). A successful GET
+records a ``PageViewEvent``: a view of the page, and, when a truck page
+was reached from a listing link carrying ``?ref=city:<city>`` or
+``?ref=search``, a click from that listing too.
+
+Recording only appends to an in-process buffer. A daemon thread, started
+in each server process by ``start_background_flush()`` (see ``wsgi.py``
+and ``asgi.py``), writes the buffer with one bulk insert every
+``DIRECTORY_ANALYTICS_FLUSH_SECONDS``, or sooner once it holds
+``DIRECTORY_ANALYTICS_BATCH_SIZE`` events; requests themselves never
+write. Without the thread (tests, management commands) events wait for an
+explicit ``flush_events()``. The buffer is bounded: if writes fall far
+behind, the oldest events are dropped, and events still buffered when a
+process is killed are lost. Counts are for trends, not billing.
+
+Rollup: ``rollup_page_views()`` (the ``rollup_analytics`` command, or the
+self-rescheduling ``analytics.rollup`` task) recounts the last couple of
+days of raw events into ``TruckDailyStats`` and ``PageDailyStats``, then
+prunes raw events past ``DIRECTORY_ANALYTICS_RETENTION_DAYS``. Recounting
+whole days keeps it idempotent. The owner dashboard reads only the daily
+tables.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime, time, timedelta
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import FoodTruck, PageDailyStats, PageViewEvent, TruckDailyStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_SECONDS = 5.0
+# Events kept while writes are failing or no flusher runs, in batches.
+BUFFER_BATCHES = 20
+DEFAULT_RETENTION_DAYS = 7
+ROLLUP_DAYS = 2
+DASHBOARD_DAYS = 30
+TRACKED_STATUSES = frozenset({200, 304})
+
+
+def analytics_settings():
+    return {
+        'enabled': getattr(settings, 'DIRECTORY_ANALYTICS_ENABLED', True),
+        'batch_size': getattr(settings, 'DIRECTORY_ANALYTICS_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+        'flush_seconds': getattr(
+            settings, 'DIRECTORY_ANALYTICS_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS
+        ),
+        'retention_days': getattr(
+            settings, 'DIRECTORY_ANALYTICS_RETENTION_DAYS', DEFAULT_RETENTION_DAYS
+        ),
+    }
+
+
+class EventBuffer:
+    """
+    Events waiting to be written, shared by a process's threads. Holds at
+    most ``capacity``; beyond that the oldest are dropped and counted.
+    """
+
+    def __init__(self, capacity):
+        self.events = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.events)
+
+    def add(self, event):
+        with self.lock:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+            return len(self.events)
+
+    def drain(self):
+        """Take every buffered event, oldest first."""
+        with self.lock:
+            events = list(self.events)
+            self.events.clear()
+            return events
+
+
+buffer = EventBuffer(analytics_settings()['batch_size'] * BUFFER_BATCHES)
+
+
+class Flusher(threading.Thread):
+    """Writes the buffer every ``interval`` seconds, or when woken early."""
+
+    def __init__(self, interval):
+        super().__init__(name='analytics-flusher', daemon=True)
+        self.interval = interval
+        self.wake = threading.Event()
+        self.stop = threading.Event()
+        self.pid = os.getpid()
+
+    def run(self):
+        while not self.stop.is_set():
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            close_old_connections()
+            flush_events()
+        flush_events()
+
+
+_flusher = None
+_flusher_lock = threading.Lock()
+_background_flush = False
+
+
+def start_background_flush():
+    """
+    Flush from a daemon thread in this process, and in any process forked
+    from it (the thread is started on the first event in each).
+    """
+    global _background_flush
+    _background_flush = True
+    ensure_flusher()
+
+
+def ensure_flusher():
+    global _flusher
+    if not _background_flush:
+        return None
+    with _flusher_lock:
+        # A forked worker inherits the flag but not the parent's thread.
+        if _flusher is None or _flusher.pid != os.getpid() or not _flusher.is_alive():
+            _flusher = Flusher(analytics_settings()['flush_seconds'])
+            _flusher.start()
+            atexit.register(stop_background_flush, _flusher)
+        return _flusher
+
+
+def stop_background_flush(flusher):
+    flusher.stop.set()
+    flusher.wake.set()
+    flusher.join(timeout=5)
+
+
+def record(kind, page, truck_id=None, city=''):
+    """Buffer one event; never touches the database."""
+    config = analytics_settings()
+    if not config['enabled']:
+        return
+    size = buffer.add((kind, page, truck_id, city[:100], timezone.now()))
+    flusher = ensure_flusher()
+    if flusher is not None and size >= config['batch_size']:
+        flusher.wake.set()
+
+
+def flush_events(using='default'):
+    """Write every buffered event in bulk inserts; returns how many."""
+    events = buffer.drain()
+    if not events:
+        return 0
+    rows = [
+        PageViewEvent(kind=kind, page=page, truck_id=truck_id, city=city, occurred_at=when)
+        for kind, page, truck_id, city, when in events
+    ]
+    try:
+        PageViewEvent.objects.using(using).bulk_create(
+            rows, batch_size=analytics_settings()['batch_size']
+        )
+    except Exception:
+        # Analytics must never take pages down; the batch is lost.
+        logger.exception('Could not write %d page-view events', len(rows))
+        return 0
+    return len(rows)
+
+
+def page_city(city):
+    """The key a city page's URL segment (``chapel-hill``) is counted under."""
+    return ' '.join(city.replace('-', ' ').split()).lower()
+
+
+def listing_ref(value):
+    """``(page, city)`` from a truck link's ``ref`` parameter, or ``None``."""
+    page, _, city = (value or '').partition(':')
+    if page == PageViewEvent.CITY_PAGE and city.strip():
+        return page, page_city(city)
+    if page == PageViewEvent.SEARCH_PAGE:
+        return page, ''
+    return None
+
+
+def record_request(request, page, kwargs):
+    if page == PageViewEvent.TRUCK_PAGE:
+        record(PageViewEvent.VIEW, page, truck_id=kwargs['pk'])
+        ref = listing_ref(request.GET.get('ref'))
+        if ref:
+            record(PageViewEvent.CLICK, ref[0], truck_id=kwargs['pk'], city=ref[1])
+    elif page == PageViewEvent.CITY_PAGE:
+        record(PageViewEvent.VIEW, page, city=page_city(kwargs['city']))
+    else:
+        record(PageViewEvent.VIEW, page)
+
+
+def track_page_views(page):
+    """
+    Record a view of ``page`` (a ``PageViewEvent.PAGES`` value) for every
+    GET the decorated view answers with a 200 or a 304. Goes outside any
+    caching decorator.
+    """
+    def should_record(request, response):
+        return request.method == 'GET' and response.status_code in TRACKED_STATUSES
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                response = await view(request, *args, **kwargs)
+                if should_record(request, response):
+                    record_request(request, page, kwargs)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if should_record(request, response):
+                record_request(request, page, kwargs)
+            return response
+        return wrapper
+    return decorator
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rollup_page_views(days=ROLLUP_DAYS, now=None, using='default'):
+    """
+    Recount the last ``days`` days (today included) of events into the
+    daily tables and prune raw events past retention. Returns
+    ``(events, rows, pruned)``.
+    """
+    now = now or timezone.now()
+    start = day_start(timezone.localdate(now) - timedelta(days=days - 1))
+    counts = (
+        PageViewEvent.objects.using(using)
+        .filter(occurred_at__gte=start)
+        .filter(Q(truck__isnull=True) | Q(truck__in=FoodTruck.objects.using(using).values('pk')))
+        .annotate(day=TruncDate('occurred_at'))
+        .values('day', 'kind', 'page', 'truck_id', 'city')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    truck_rows, page_rows, events = [], [], 0
+    for row in counts:
+        events += row['count']
+        if row['truck_id'] is None:
+            page_rows.append(PageDailyStats(day=row['day'], page=row['page'], city=row['city'],
+                                            views=row['count']))
+        else:
+            truck_rows.append(TruckDailyStats(
+                truck_id=row['truck_id'], day=row['day'], kind=row['kind'], page=row['page'],
+                city=row['city'], count=row['count'],
+            ))
+
+    batch_size = analytics_settings()['batch_size']
+    retention = timedelta(days=analytics_settings()['retention_days'])
+    with transaction.atomic(using=using):
+        TruckDailyStats.objects.using(using).bulk_create(
+            truck_rows, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['truck', 'day', 'kind', 'page', 'city'], update_fields=['count'],
+        )
+        PageDailyStats.objects.using(using).bulk_create(
+            page_rows, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['day', 'page', 'city'], update_fields=['views'],
+        )
+        pruned, _ = (
+            PageViewEvent.objects.using(using)
+            .filter(occurred_at__lt=min(start, now - retention)).delete()
+        )
+    return events, len(truck_rows) + len(page_rows), pruned
+
+
+def owner_dashboard_data(profile, days=DASHBOARD_DAYS, today=None):
+    """
+    Views and clicks of an owner's trucks over the last ``days`` days: a
+    row per day, per truck and per listing page clicked from, plus how
+    many views the city pages they were clicked from had.
+    """
+    today = today or timezone.localdate()
+    first = today - timedelta(days=days - 1)
+    stats = TruckDailyStats.objects.filter(truck__owner=profile, day__gte=first, day__lte=today)
+    views = Sum('count', filter=Q(kind=PageViewEvent.VIEW), default=0)
+    clicks = Sum('count', filter=Q(kind=PageViewEvent.CLICK), default=0)
+
+    by_day = {row['day']: row for row in stats.values('day').annotate(views=views, clicks=clicks)}
+    daily = [
+        {'day': day, 'views': by_day.get(day, {}).get('views', 0),
+         'clicks': by_day.get(day, {}).get('clicks', 0)}
+        for day in (first + timedelta(days=offset) for offset in range(days))
+    ]
+    trucks = list(
+        FoodTruck.objects.filter(owner=profile)
+        .annotate(
+            views=Sum('daily_stats__count', default=0, filter=Q(
+                daily_stats__kind=PageViewEvent.VIEW, daily_stats__day__gte=first,
+                daily_stats__day__lte=today,
+            )),
+            clicks=Sum('daily_stats__count', default=0, filter=Q(
+                daily_stats__kind=PageViewEvent.CLICK, daily_stats__day__gte=first,
+                daily_stats__day__lte=today,
+            )),
+        )
+        .values('pk', 'name', 'city', 'views', 'clicks')
+        .order_by('name', 'pk')
+    )
+    sources = list(
+        stats.filter(kind=PageViewEvent.CLICK).values('page', 'city')
+        .annotate(clicks=Sum('count')).order_by('-clicks', 'page', 'city')
+    )
+    cities = {source['city'] for source in sources if source['page'] == PageViewEvent.CITY_PAGE}
+    page_views = dict(
+        PageDailyStats.objects.filter(page=PageViewEvent.CITY_PAGE, city__in=cities,
+                                      day__gte=first, day__lte=today)
+        .values('city').annotate(views=Sum('views')).values_list('city', 'views')
+    ) if cities else {}
+    for source in sources:
+        source['page_views'] = page_views.get(source['city'])
+    return {
+        'first': first,
+        'last': today,
+        'daily': daily,
+        'trucks': trucks,
+        'sources': sources,
+        'total_views': sum(day['views'] for day in daily),
+        'total_clicks': sum(day['clicks'] for day in daily),
+    }
@@ -0,0 +1,348 @@
+"""
+Versioned JSON API over the directory, mounted at ``/api/v1/``.
+
+=====================  ====================================================
+``trucks/``            list, cursor paginated, with the directory filters
+                       (``city``, ``cuisine``, ``verified``, ``tag``)
+``trucks/<id>/``       one truck
+``trucks/search/``     ranked full-text search, ``?q=``
+``trucks/near/``       trucks within ``radius`` miles of ``lat``/``lon``,
+                       or the ``k`` nearest
+``trucks/batch/``      many trucks by id in one query: ``?ids=1,2,3``, or a
+                       POSTed ``{"ids": [...]}``
+``me/``                the signed-in user and their profile
+=====================  ====================================================
+
+Every truck endpoint takes ``?fields=name,city,cuisine`` (a sparse
+fieldset); only the columns behind the requested fields are selected.
+Rows are read with ``.values()`` rather than as model instances and
+encoded with ``orjson`` when it is installed, the standard library encoder
+otherwise. Errors are ``{"error": "..."}`` with a 4xx status.
+"""
+
+import json
+from collections import defaultdict
+from functools import wraps
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+
+from .facets import filter_trucks, parse_filters
+from .geo import get_geo_index
+from .models import CustomUser, DietaryTag, FoodTruck
+from .pagination import InvalidCursor, clamp_page_size, decode_cursor, paginate_keyset
+from .search import DEFAULT_LIMIT as SEARCH_LIMIT, search_trucks
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library encoder is just slower.
+    orjson = None
+
+# Public field name -> ``.values()`` lookup. ``None`` marks fields filled
+# in after the main query.
+TRUCK_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'city': 'city',
+    'cuisine': 'cuisine',
+    'description': 'description',
+    'website': 'website',
+    'social_links': 'social_links',
+    'image': 'image',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'is_verified': 'is_verified',
+    'owner_name': 'owner__business_name',
+    'dietary_tags': None,
+}
+LIST_FIELDS = (
+    'id', 'name', 'city', 'cuisine', 'description', 'website', 'image', 'latitude',
+    'longitude', 'is_verified',
+)
+DETAIL_FIELDS = tuple(TRUCK_FIELDS)
+LIST_ORDERING = ('name', 'id')
+MAX_BATCH_IDS = 500
+MAX_NEAREST = 100
+
+USER_FIELDS = {
+    'id': 'id',
+    'username': 'username',
+    'email': 'email',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'role': 'role',
+    'phone_number': 'phone_number',
+    'date_joined': 'date_joined',
+}
+OWNER_PROFILE_FIELDS = {
+    'business_name': 'food_truck_profile__business_name',
+    'business_license': 'food_truck_profile__business_license',
+    'cuisine_type': 'food_truck_profile__cuisine_type',
+    'operating_hours': 'food_truck_profile__operating_hours',
+    'is_verified': 'food_truck_profile__is_verified',
+}
+PREFERENCE_FIELDS = {
+    'dietary_preferences': 'website_user_profile__dietary_preferences',
+    'favorite_cuisine_types': 'website_user_profile__favorite_cuisine_types',
+    'notification_preferences': 'website_user_profile__notification_preferences',
+    'home_city': 'website_user_profile__home_city',
+}
+
+
+class APIError(Exception):
+    """A client error, returned as ``{"error": message}``."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def dumps(data):
+    """``data`` as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_UTC_Z)
+    return json.dumps(
+        data, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False,
+    ).encode()
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), content_type='application/json', status=status)
+
+
+def api_view(view):
+    """Turn ``APIError`` into a JSON error response."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except APIError as exc:
+            return json_response({'error': str(exc)}, status=exc.status)
+    return wrapper
+
+
+def parse_fields(value, default):
+    """Requested field names from a ``fields`` parameter, in order."""
+    if not value:
+        return list(default)
+    names = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in names if name not in TRUCK_FIELDS]
+    if unknown or not names:
+        raise APIError(f'Unknown fields: {", ".join(unknown) or value}. '
+                       f'Available: {", ".join(TRUCK_FIELDS)}')
+    return names
+
+
+def values_lookups(fields, mapping):
+    """``(names, expressions)`` arguments for ``.values()`` selecting ``fields``."""
+    names, expressions = [], {}
+    for field in fields:
+        lookup = mapping[field]
+        if lookup == field:
+            names.append(field)
+        elif lookup is not None:
+            expressions[field] = F(lookup)
+    return names, expressions
+
+
+def truck_values(queryset, fields, extra=()):
+    """
+    ``queryset.values()`` selecting what ``fields`` need, plus ``extra``
+    model fields (sort keys, ids) that ``finish_trucks`` strips again.
+    """
+    names, expressions = values_lookups(fields, TRUCK_FIELDS)
+    needed = ['id'] if 'dietary_tags' in fields else []
+    names += [name for name in (*extra, *needed) if name not in names]
+    return queryset.values(*names, **expressions)
+
+
+def finish_trucks(rows, fields, using='default'):
+    """
+    Complete ``truck_values`` rows in place for output: image URLs, dietary
+    tags (one query for all rows) and no helper columns.
+    """
+    if 'image' in fields:
+        for row in rows:
+            row['image'] = default_storage.url(row['image']) if row['image'] else None
+    if 'dietary_tags' in fields:
+        tags = defaultdict(list)
+        links = (
+            FoodTruck.dietary_tags.through.objects.using(using)
+            .filter(foodtruck_id__in=[row['id'] for row in rows])
+            .order_by('dietarytag__name')
+            .values_list('foodtruck_id', 'dietarytag__name')
+        )
+        for truck_id, name in links:
+            tags[truck_id].append(name)
+        for row in rows:
+            row['dietary_tags'] = tags[row['id']]
+    # Every row has the same keys, so work out the helper columns once.
+    helpers = [key for key in rows[0] if key not in set(fields)] if rows else []
+    if helpers:
+        for row in rows:
+            for key in helpers:
+                del row[key]
+    return rows
+
+
+def trucks_by_ids(truck_ids, fields):
+    """``(rows, missing)``: ``truck_ids`` serialized in the order given."""
+    queryset = truck_values(FoodTruck.objects.filter(pk__in=truck_ids), fields, extra=['id'])
+    found = {row['id']: row for row in queryset}
+    rows = [found[truck_id] for truck_id in dict.fromkeys(truck_ids) if truck_id in found]
+    missing = [truck_id for truck_id in dict.fromkeys(truck_ids) if truck_id not in found]
+    return finish_trucks(rows, fields, queryset.db), missing
+
+
+def parse_float(value, name, minimum, maximum):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise APIError(f'{name} must be a number') from None
+    if not minimum <= number <= maximum:
+        raise APIError(f'{name} must be between {minimum} and {maximum}')
+    return number
+
+
+def parse_ids(values):
+    """Integer ids from query-string text or a JSON list; floats and bools are refused."""
+    truck_ids = []
+    for value in values:
+        if isinstance(value, str) and value.strip().lstrip('-').isdigit():
+            value = int(value)
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise APIError('ids must be integers')
+        truck_ids.append(value)
+    if not truck_ids:
+        raise APIError('ids is required')
+    if len(truck_ids) > MAX_BATCH_IDS:
+        raise APIError(f'At most {MAX_BATCH_IDS} ids per request')
+    return truck_ids
+
+
+@require_GET
+@api_view
+def truck_list(request):
+    """Trucks ordered by name, a page at a time; follow ``next`` for more."""
+    fields = parse_fields(request.GET.get('fields'), LIST_FIELDS)
+    cursor = request.GET.get('cursor') or None
+    if cursor:
+        try:
+            decode_cursor(cursor, len(LIST_ORDERING))
+        except InvalidCursor:
+            raise APIError('Invalid cursor') from None
+    filters = parse_filters(request.GET)
+    tag = DietaryTag.objects.filter(slug=filters['tag']).first() if 'tag' in filters else None
+    trucks = truck_values(filter_trucks(FoodTruck.objects.all(), filters, tag), fields,
+                          extra=LIST_ORDERING)
+    page = paginate_keyset(trucks, cursor=cursor, ordering=LIST_ORDERING,
+                           page_size=clamp_page_size(request.GET.get('page_size')))
+    next_url = None
+    if page.has_next:
+        params = request.GET.copy()
+        params['cursor'] = page.next_cursor
+        next_url = f'{request.path}?{params.urlencode()}'
+    return json_response({
+        'results': finish_trucks(page.object_list, fields, trucks.db),
+        'next_cursor': page.next_cursor,
+        'next': next_url,
+    })
+
+
+@require_GET
+@api_view
+def truck_detail(request, pk):
+    fields = parse_fields(request.GET.get('fields'), DETAIL_FIELDS)
+    rows, _ = trucks_by_ids([pk], fields)
+    if not rows:
+        raise APIError('Truck not found', status=404)
+    return json_response(rows[0])
+
+
+@require_GET
+@api_view
+def truck_search(request):
+    """Trucks matching ``q``, best first; ``limit`` defaults to 50, at most 100."""
+    fields = parse_fields(request.GET.get('fields'), LIST_FIELDS)
+    query = request.GET.get('q', '').strip()
+    limit = clamp_page_size(request.GET.get('limit'), default=SEARCH_LIMIT)
+    hits = search_trucks(query, limit=limit) if query else []
+    rows, _ = trucks_by_ids([truck.pk for truck in hits], fields)
+    return json_response({'query': query, 'results': rows})
+
+
+@require_GET
+@api_view
+def trucks_near(request):
+    """Trucks within ``radius`` miles (default 2), or the ``k`` nearest, nearest first."""
+    fields = parse_fields(request.GET.get('fields'), LIST_FIELDS)
+    latitude = parse_float(request.GET.get('lat'), 'lat', -90, 90)
+    longitude = parse_float(request.GET.get('lon'), 'lon', -180, 180)
+    index = get_geo_index()
+    if request.GET.get('k'):
+        try:
+            k = max(1, min(int(request.GET['k']), MAX_NEAREST))
+        except ValueError:
+            raise APIError('k must be an integer') from None
+        hits = index.nearest(latitude, longitude, k)
+    else:
+        radius = parse_float(request.GET.get('radius', 2), 'radius', 0, 100)
+        hits = index.within(latitude, longitude, radius, limit=MAX_NEAREST)
+    distances = dict(hits)
+    rows, missing = trucks_by_ids(list(distances), fields)
+    found = [truck_id for truck_id in distances if truck_id not in missing]
+    for row, truck_id in zip(rows, found):
+        row['distance_miles'] = round(distances[truck_id], 3)
+    return json_response({'results': rows})
+
+
+@csrf_exempt  # Read-only, so there is nothing to forge.
+@require_http_methods(['GET', 'POST'])
+@api_view
+def truck_batch(request):
+    """Up to 500 trucks by id in one query, in the order asked; unknown ids are listed."""
+    fields = parse_fields(request.GET.get('fields'), LIST_FIELDS)
+    if request.method == 'POST':
+        try:
+            body = json.loads(request.body or b'{}')
+        except ValueError:
+            raise APIError('Body must be JSON') from None
+        if not isinstance(body, dict) or not isinstance(body.get('ids'), list):
+            raise APIError('Body must be {"ids": [...]}')
+        truck_ids = parse_ids(body['ids'])
+    else:
+        truck_ids = parse_ids(filter(None, request.GET.get('ids', '').split(',')))
+    rows, missing = trucks_by_ids(truck_ids, fields)
+    return json_response({'results': rows, 'missing': missing})
+
+
+@require_GET
+@api_view
+def me(request):
+    """The signed-in user with their owner profile and preferences, from one query."""
+    if not request.user.is_authenticated:
+        raise APIError('Authentication required', status=401)
+    profile_keys = {'owner_profile_id': F('food_truck_profile__id'),
+                    'preferences_id': F('website_user_profile__id')}
+    row = CustomUser.objects.filter(pk=request.user.pk).values(
+        *USER_FIELDS,
+        **{f'owner_{name}': F(lookup) for name, lookup in OWNER_PROFILE_FIELDS.items()},
+        **{f'prefs_{name}': F(lookup) for name, lookup in PREFERENCE_FIELDS.items()},
+        **profile_keys,
+    ).get()
+    data = {name: row[name] for name in USER_FIELDS}
+    data['owner_profile'] = (
+        {name: row[f'owner_{name}'] for name in OWNER_PROFILE_FIELDS}
+        if row['owner_profile_id'] is not None else None
+    )
+    data['preferences'] = (
+        {name: row[f'prefs_{name}'] for name in PREFERENCE_FIELDS}
+        if row['preferences_id'] is not None else None
+    )
+    response = json_response(data)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,131 @@
+"""
+``async def`` versions of the listing and search pages, served under
+``/async/``.
+
+Under an ASGI server these never hold a worker thread while a slow client
+uploads its request or drains the response: database reads go through the
+async ORM (``afirst``, ``async for``) and cache reads through the async
+cache API (``cached_async_view``). Django still runs each query on a
+thread behind the scenes, but only for the query itself.
+
+Templates are rendered on the event loop, so everything they touch is
+fetched first: the user is resolved with ``auser()`` and pages are built
+eagerly rather than lazily inside a fragment cache.
+
+Under WSGI these views still work; Django runs them in an event loop per
+request.
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponseBadRequest
+from django.shortcuts import render
+
+from .analytics import track_page_views
+from .cache import DIRECTORY, cached_async_view
+from .facets import facet_counts, filter_trucks, parse_filters
+from .hours import open_at, parse_open_param
+from .models import DietaryTag, FoodTruck, PageViewEvent, TruckPage
+from .pagination import InvalidCursor, apaginate_keyset, clamp_page_size, decode_cursor
+from .search import search_trucks
+from .views import (
+    add_page_validators, city_page_scopes, city_trucks_queryset, directory_next_query,
+    get_truck_page, not_modified,
+)
+
+LISTING_FIELDS = ('id', 'name', 'city', 'cuisine', 'description', 'image', 'image_variants')
+
+
+async def arender(request, template_name, context):
+    """``render()`` for async views; the user is loaded up front."""
+    # The auth context processor reads request.user; resolving it here keeps
+    # the session and user queries off the synchronous render path.
+    request.user = await request.auser()
+    return render(request, template_name, context)
+
+
+def valid_cursor(cursor):
+    try:
+        decode_cursor(cursor, 2)
+    except InvalidCursor:
+        return False
+    return True
+
+
+@cached_async_view(lambda request: [DIRECTORY])
+async def directory(request):
+    """Async ``views.directory``."""
+    filters = parse_filters(request.GET)
+    tag = None
+    if 'tag' in filters:
+        tag = await DietaryTag.objects.filter(slug=filters['tag']).afirst()
+    cursor = request.GET.get('cursor') or None
+    if cursor and not valid_cursor(cursor):
+        return HttpResponseBadRequest('Invalid cursor')
+    trucks = filter_trucks(FoodTruck.objects.all(), filters, tag).only(*LISTING_FIELDS)
+    page = await apaginate_keyset(
+        trucks, cursor=cursor, page_size=clamp_page_size(request.GET.get('page_size'))
+    )
+    # Several grouped queries over the small FacetCount table; run as one
+    # unit on the ORM's thread rather than a hop per query.
+    facets = await sync_to_async(facet_counts)(filters, tag)
+    context = {
+        'facets': facets,
+        'filters': filters,
+        'page': page,
+        'next_query': directory_next_query(filters, page),
+    }
+    return await arender(request, 'directory/directory.html', context)
+
+
+@track_page_views(PageViewEvent.CITY_PAGE)
+@cached_async_view(city_page_scopes)
+async def trucks_by_city(request, city):
+    """Async ``views.trucks_by_city``."""
+    cuisine = request.GET.get('cuisine') or None
+    try:
+        open_time = parse_open_param(request.GET.get('open'))
+    except ValueError:
+        return HttpResponseBadRequest('open must be "now" or an ISO datetime')
+    cursor = request.GET.get('cursor') or None
+    if cursor and not valid_cursor(cursor):
+        return HttpResponseBadRequest('Invalid cursor')
+    queryset = city_trucks_queryset(city, cuisine).only(*LISTING_FIELDS, 'website')
+    if open_time:
+        queryset = queryset.filter(open_at(open_time))
+    page_size = clamp_page_size(request.GET.get('page_size'))
+    page = await apaginate_keyset(queryset, cursor=cursor, page_size=page_size)
+    context = {
+        'city': city,
+        'cuisine': cuisine,
+        'open': request.GET.get('open', ''),
+        'cursor': cursor or '',
+        'page_size': page_size,
+        'page': page,
+        # The whole response is cached above; no synchronous fragment cache.
+        'cache_timeout': 0,
+    }
+    return await arender(request, 'directory/trucks_by_city.html', context)
+
+
+@track_page_views(PageViewEvent.SEARCH_PAGE)
+async def search(request):
+    """Async ``views.search``."""
+    query = request.GET.get('q', '').strip()
+    # Search runs raw FTS SQL, which has no async ORM counterpart.
+    results = await sync_to_async(search_trucks)(query) if query else []
+    context = {'query': query, 'results': results}
+    return await arender(request, 'directory/search.html', context)
+
+
+@track_page_views(PageViewEvent.TRUCK_PAGE)
+async def truck_detail(request, pk):
+    """Async ``views.truck_detail``."""
+    page = await TruckPage.objects.filter(truck_id=pk).afirst()
+    if page is None:
+        page = await sync_to_async(get_truck_page)(pk)
+    if page is None:
+        raise Http404('No such truck')
+    response = not_modified(request, page) or await arender(
+        request, 'directory/truck_detail.html', {'truck': page.data}
+    )
+    return add_page_validators(response, request, page)
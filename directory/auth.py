@@ -0,0 +1,95 @@
+"""
+Signed-in requests without a database round trip for the user.
+
+``AuthenticationMiddleware`` resolves ``request.user`` through the session
+backend's ``get_user()`` on the first access, and every page touches it
+(the navigation in ``global/base.html``). ``CachedModelBackend`` keeps
+the user, with both profiles already attached and their permissions
+resolved (see ``permissions``), in the cache, so the role checks,
+permission checks and profile lookups a page does cost nothing after the
+first. ``request.user`` itself is memoized per request by Django.
+
+Saving or deleting a user or one of their profiles drops the cached copy,
+and a change to group memberships or group permissions drops every user's
+(see ``signals``). With a per-process cache (the local-memory default)
+that only reaches the process that made the change; other processes keep
+their copy for at most ``DIRECTORY_AUTH_CACHE_TIMEOUT`` seconds. That
+includes a changed password, which signs out other sessions only once
+their process's copy expires; point ``CACHES`` at Redis to make it
+immediate.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Permission
+from django.db.models import Q
+
+from .cache import bump, get_cache, get_versions
+from .permissions import object_permissions, role_permissions
+
+DEFAULT_TIMEOUT = 60
+USER_KEY_PREFIX = 'directory:auth:user:'
+# Cache scope whose version is part of every user key.
+PERMISSIONS_SCOPE = 'permissions'
+# Reverse one-to-ones: a missing profile is cached as "none" too.
+USER_RELATED = ('food_truck_profile', 'website_user_profile')
+
+
+def auth_cache_timeout():
+    return getattr(settings, 'DIRECTORY_AUTH_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def user_cache_key(user_id):
+    version = get_versions([PERMISSIONS_SCOPE])[PERMISSIONS_SCOPE]
+    return f'{USER_KEY_PREFIX}{user_id}:{version}'
+
+
+def forget_user(user_id):
+    """Drop the cached copy of a user, after a change to them or a profile."""
+    get_cache().delete(user_cache_key(user_id))
+
+
+def forget_all_users():
+    """Drop every cached user, after a change to groups or their permissions."""
+    bump(PERMISSIONS_SCOPE)
+
+
+def granted_permissions(user):
+    """Permissions given to ``user`` or their groups in the admin, in one query."""
+    perms = Permission.objects.all()
+    if not user.is_superuser:
+        perms = perms.filter(Q(user=user) | Q(group__user=user))
+    perms = perms.values_list('content_type__app_label', 'codename').distinct().order_by()
+    return {f'{app_label}.{codename}' for app_label, codename in perms}
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ``ModelBackend`` whose ``get_user()`` reads through the cache, adding
+    role and owned-object permissions to the usual ones.
+    """
+
+    def get_user(self, user_id):
+        cache = get_cache()
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user_model = get_user_model()
+            try:
+                user = user_model._default_manager.select_related(*USER_RELATED).get(pk=user_id)
+            except user_model.DoesNotExist:
+                return None
+            # Resolved now so the set is cached with the user.
+            self.get_all_permissions(user)
+            cache.set(key, user, auth_cache_timeout())
+        return user if self.user_can_authenticate(user) else None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous:
+            return set()
+        if obj is not None:
+            return self.get_all_permissions(user_obj) | object_permissions(user_obj, obj)
+        if not hasattr(user_obj, '_perm_cache'):
+            user_obj._perm_cache = granted_permissions(user_obj) | role_permissions(user_obj)
+        return user_obj._perm_cache
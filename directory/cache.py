@@ -0,0 +1,193 @@
+"""
+Versioned caching for directory pages and template fragments.
+
+Cached entries never get deleted one by one. Instead every key embeds the
+current version number of the *scopes* it depends on (``home``,
+``directory``, ``city:raleigh``, ``cuisine:bbq``...), and a model change
+bumps just the affected scopes. Old entries stop being addressable and age
+out of the backend on their own.
+
+Only the plain Django cache API is used (``get_many``, ``add``, ``incr``),
+so the local-memory default and a Redis ``CACHES`` backend behave the same.
+Async views use the ``a``-prefixed twins of those calls (``aget_versions``,
+``cached_async_view``) so cache I/O never blocks the event loop.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+
+HOME = 'home'
+DIRECTORY = 'directory'
+DEFAULT_TIMEOUT = 300
+VERSION_PREFIX = 'directory:version:'
+
+
+def get_cache():
+    return caches[getattr(settings, 'DIRECTORY_CACHE_ALIAS', 'default')]
+
+
+def cache_timeout():
+    return getattr(settings, 'DIRECTORY_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def _scope_slug(value):
+    # Hyphenated so scope names stay valid memcached keys ('wake-forest').
+    return '-'.join(value.replace('-', ' ').split()).lower()
+
+
+def city_scope(city):
+    return f'city:{_scope_slug(city)}'
+
+
+def cuisine_scope(cuisine):
+    return f'cuisine:{_scope_slug(cuisine)}'
+
+
+def _fresh_version():
+    # Seeded from the clock so a version evicted from the cache is never
+    # reissued with a number an old entry was stored under.
+    return time.time_ns()
+
+
+def get_versions(scopes):
+    """Return ``{scope: version}``, creating missing versions."""
+    cache = get_cache()
+    keys = {scope: VERSION_PREFIX + scope for scope in scopes}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for scope, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _fresh_version(), None)
+            version = cache.get(key)
+        versions[scope] = version
+    return versions
+
+
+async def aget_versions(scopes):
+    """Async ``get_versions``."""
+    cache = get_cache()
+    keys = {scope: VERSION_PREFIX + scope for scope in scopes}
+    found = await cache.aget_many(keys.values())
+    versions = {}
+    for scope, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            await cache.aadd(key, _fresh_version(), None)
+            version = await cache.aget(key)
+        versions[scope] = version
+    return versions
+
+
+def version_token(scopes):
+    """A short string that changes whenever any of ``scopes`` is bumped."""
+    versions = get_versions(scopes)
+    return '.'.join(str(versions[scope]) for scope in scopes)
+
+
+async def aversion_token(scopes):
+    """Async ``version_token``."""
+    versions = await aget_versions(scopes)
+    return '.'.join(str(versions[scope]) for scope in scopes)
+
+
+def bump(*scopes):
+    """Invalidate everything cached under ``scopes``."""
+    cache = get_cache()
+    for scope in set(scopes):
+        key = VERSION_PREFIX + scope
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), None)
+
+
+def truck_scopes(*trucks):
+    """Scopes a change to any of ``trucks`` invalidates."""
+    scopes = {HOME, DIRECTORY}
+    for city, cuisine in trucks:
+        if city:
+            scopes.add(city_scope(city))
+        if cuisine:
+            scopes.add(cuisine_scope(cuisine))
+    return scopes
+
+
+def is_cacheable_request(request):
+    """
+    Only anonymous GET/HEAD requests share cached pages.
+
+    Anonymity is judged from the absence of a session cookie, so the check
+    itself never loads a session or a user from the database.
+    """
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def view_cache_key(view, request, token):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'directory:view:{view.__name__}:{path}:{token}'
+
+
+def should_store(response):
+    if response.status_code != 200 or response.streaming:
+        return False
+    if hasattr(response, 'render'):
+        response.render()
+    return not response.cookies
+
+
+def cached_view(scopes):
+    """
+    Cache a view's full response for anonymous visitors.
+
+    ``scopes(request, *args, **kwargs)`` returns the scopes the page depends
+    on, or ``None`` to bypass the cache for that request (for example when
+    the page depends on the current time).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            page_scopes = scopes(request, *args, **kwargs)
+            if page_scopes is None or not is_cacheable_request(request):
+                return view(request, *args, **kwargs)
+
+            key = view_cache_key(view, request, version_token(page_scopes))
+            cache = get_cache()
+            response = cache.get(key)
+            if response is not None:
+                return response
+            response = view(request, *args, **kwargs)
+            if should_store(response):
+                cache.set(key, response, cache_timeout())
+            return response
+        return wrapper
+    return decorator
+
+
+def cached_async_view(scopes):
+    """``cached_view`` for ``async def`` views, using the async cache API."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            page_scopes = scopes(request, *args, **kwargs)
+            if page_scopes is None or not is_cacheable_request(request):
+                return await view(request, *args, **kwargs)
+
+            key = view_cache_key(view, request, await aversion_token(page_scopes))
+            cache = get_cache()
+            response = await cache.aget(key)
+            if response is not None:
+                return response
+            response = await view(request, *args, **kwargs)
+            if should_store(response):
+                await cache.aset(key, response, cache_timeout())
+            return response
+        return wrapper
+    return decorator
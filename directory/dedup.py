@@ -0,0 +1,290 @@
+"""
+Duplicate detection for new trucks (``TruckSubmission``) against the
+directory.
+
+Every truck has a handful of rows in ``TruckDedupKey``:
+
+* ``b<band>:<hash>``: locality-sensitive hashing bands of a MinHash
+  signature over the character trigrams of its normalized name. Two names
+  share at least one band with high probability once their trigram
+  Jaccard similarity passes roughly ``(1 / BANDS) ** (1 / ROWS)`` (0.25),
+  low enough to survive a typo in a short name;
+* ``u:<host>/<path>``: its website and social links, normalized so that
+  ``https://www.instagram.com/SmokinJoes/`` and
+  ``instagram.com/smokinjoes`` are the same key.
+
+A check looks up the submission's keys (an indexed ``IN`` query), ranks
+the trucks that share any of them, and scores only the top few exactly,
+so its cost depends on how many trucks look alike rather than on the size
+of the table. Keys are kept current by ``directory.signals`` and
+rebuilt in bulk by ``manage.py rebuild_dedup_index``.
+"""
+
+import hashlib
+import re
+import unicodedata
+import zlib
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import Count
+
+NUM_PERM = 32
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MAX_CANDIDATES = 50
+# Trigram Jaccard at which a name alone makes a likely duplicate, and the
+# least similarity worth showing a moderator.
+LIKELY_NAME_SIMILARITY = 0.6
+MIN_NAME_SIMILARITY = 0.35
+
+# Multiply-shift hashing, one (odd multiplier, offset) pair per permutation,
+# with uint64 arithmetic wrapping around. The fixed seed matters:
+# signatures are stored, so they must not change between runs.
+_state = np.random.RandomState(5_461_827)
+_A = _state.randint(0, np.iinfo(np.uint64).max, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _state.randint(0, np.iinfo(np.uint64).max, size=NUM_PERM, dtype=np.uint64)
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+_NAME_FILLER = frozenset({'the', 'food', 'truck', 'trucks', 'co', 'company', 'llc', 'inc', 'and'})
+_HOST_PREFIXES = ('www.', 'm.', 'mobile.')
+_HOST_ALIASES = {'x.com': 'twitter.com', 'fb.com': 'facebook.com'}
+SOCIAL_HOSTS = frozenset({'facebook.com', 'instagram.com', 'twitter.com', 'tiktok.com',
+                          'youtube.com', 'threads.net'})
+
+
+def normalize_name(name):
+    """Lowercase ASCII words without punctuation or filler ("The", "Food Truck", "LLC")."""
+    text = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode()
+    # "Joe's" and "Joes" are the same name.
+    text = text.lower().replace("'", '')
+    words = [word for word in _NON_WORD.split(text) if word and word not in _NAME_FILLER]
+    return ' '.join(words)
+
+
+def shingles(normalized):
+    """Character trigrams of a normalized name, padded so short names still have some."""
+    padded = f' {normalized} '
+    return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+
+def minhashes(trigram_sets):
+    """
+    ``(len(trigram_sets), NUM_PERM)`` MinHash signatures, one row per
+    (non-empty) set of trigrams, hashed in one array operation.
+    """
+    values = np.fromiter(
+        (zlib.crc32(t.encode()) for trigrams in trigram_sets for t in trigrams),
+        dtype=np.uint64,
+    )
+    starts = np.cumsum([0] + [len(trigrams) for trigrams in trigram_sets[:-1]])
+    hashed = (np.outer(_A, values) + _B[:, None]) >> np.uint64(32)
+    return np.minimum.reduceat(hashed, starts, axis=1).T
+
+
+def minhash(trigrams):
+    """``NUM_PERM`` MinHash values for a set of trigrams."""
+    return minhashes([trigrams])[0]
+
+
+def band_keys(signature):
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(signature[band * ROWS:(band + 1) * ROWS].tobytes(),
+                                 digest_size=8).hexdigest()
+        keys.append(f'b{band}:{digest}')
+    return keys
+
+
+def names_keys(names):
+    """The signature band keys of each of ``names``; empty for names with no words."""
+    normalized = [normalize_name(name) for name in names]
+    named = [i for i, text in enumerate(normalized) if text]
+    keys = [[] for _ in names]
+    if named:
+        signatures = minhashes([shingles(normalized[i]) for i in named])
+        for i, signature in zip(named, signatures):
+            keys[i] = band_keys(signature)
+    return keys
+
+
+def name_keys(name):
+    return names_keys([name])[0]
+
+
+def normalize_link(url):
+    """``host/path`` of a website or profile URL, or ``None`` if it names no one."""
+    if not url or not isinstance(url, str):
+        return None
+    url = url.strip()
+    if '://' not in url:
+        url = f'//{url}'
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    host = (parts.hostname or '').lower()
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    host = _HOST_ALIASES.get(host, host)
+    if not host:
+        return None
+    segments = [s for s in parts.path.lower().split('/') if s]
+    if host in SOCIAL_HOSTS:
+        # The handle is what identifies a truck on a social network.
+        if not segments:
+            return None
+        return f'{host}/{segments[0].lstrip("@")}'
+    return '/'.join([host, *segments])
+
+
+def link_keys(website=None, social_links=None):
+    urls = [website, *((social_links or {}).values() if isinstance(social_links, dict) else ())]
+    return sorted({f'u:{link}' for link in map(normalize_link, urls) if link})
+
+
+def truck_keys(name, website=None, social_links=None):
+    return name_keys(name) + link_keys(website, social_links)
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+@dataclass
+class DuplicateMatch:
+    truck_id: int
+    name: str
+    city: str
+    score: float
+    reasons: list = field(default_factory=list)
+    likely: bool = False
+
+    def as_dict(self):
+        return {
+            'truck_id': self.truck_id, 'name': self.name, 'city': self.city,
+            'score': round(self.score, 3), 'reasons': self.reasons, 'likely': self.likely,
+        }
+
+
+def find_duplicates(name, website=None, social_links=None, city=None, limit=5,
+                    exclude_id=None, using='default'):
+    """
+    Trucks that ``name``/``website``/``social_links`` probably describe,
+    best first. ``likely`` marks matches on a link or a very similar name.
+    """
+    from .models import FoodTruck, TruckDedupKey
+
+    keys = truck_keys(name, website, social_links)
+    if not keys:
+        return []
+    shared = (
+        TruckDedupKey.objects.using(using).filter(key__in=keys)
+        .values('truck_id').annotate(hits=Count('id')).order_by('-hits', 'truck_id')
+    )
+    if exclude_id is not None:
+        shared = shared.exclude(truck_id=exclude_id)
+    candidates = [row['truck_id'] for row in shared[:MAX_CANDIDATES]]
+    if not candidates:
+        return []
+
+    wanted_links = {key[2:] for key in keys if key.startswith('u:')}
+    wanted = shingles(normalize_name(name))
+    city = ' '.join((city or '').split()).lower()
+    matches = []
+    rows = FoodTruck.objects.using(using).filter(pk__in=candidates).values_list(
+        'id', 'name', 'city', 'website', 'social_links'
+    )
+    for truck_id, truck_name, truck_city, truck_website, truck_social in rows:
+        similarity = jaccard(wanted, shingles(normalize_name(truck_name)))
+        links = wanted_links.intersection(key[2:] for key in link_keys(truck_website, truck_social))
+        if not links and similarity < MIN_NAME_SIMILARITY:
+            continue
+        reasons = []
+        if similarity == 1:
+            reasons.append('same name')
+        elif similarity >= MIN_NAME_SIMILARITY:
+            reasons.append(f'similar name ({similarity:.0%})')
+        reasons.extend(f'same link: {link}' for link in sorted(links))
+        same_city = bool(city) and ' '.join(truck_city.split()).lower() == city
+        if same_city:
+            reasons.append('same city')
+        score = max(similarity, 0.9 if links else 0.0) + (0.05 if same_city else 0.0)
+        matches.append(DuplicateMatch(
+            truck_id=truck_id, name=truck_name, city=truck_city, score=min(score, 1.0),
+            reasons=reasons, likely=bool(links) or similarity >= LIKELY_NAME_SIMILARITY,
+        ))
+    matches.sort(key=lambda match: (-match.score, match.truck_id))
+    return matches[:limit]
+
+
+def key_rows(trucks):
+    """
+    ``(truck_id, key)`` rows for ``(id, name, website, social_links)``
+    tuples; the names are signed together.
+    """
+    trucks = list(trucks)
+    signatures = names_keys([name for _, name, _, _ in trucks])
+    return [
+        (truck_id, key)
+        for (truck_id, _, website, social_links), name_part in zip(trucks, signatures)
+        for key in name_part + link_keys(website, social_links)
+    ]
+
+
+def insert_keys(key_model, rows, using='default'):
+    # Plain tuples through executemany: an index rebuild writes ~17 rows
+    # per truck, and model instances cost more than the hashing.
+    if not rows:
+        return
+    quote = connections[using].ops.quote_name
+    truck, key = (key_model._meta.get_field(name).column for name in ('truck', 'key'))
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {quote(key_model._meta.db_table)} ({quote(truck)}, {quote(key)}) '
+            'VALUES (%s, %s)',
+            rows,
+        )
+
+
+def index_trucks(trucks, using='default'):
+    """Replace the keys of ``trucks`` (saved ``FoodTruck`` instances)."""
+    from .models import TruckDedupKey
+
+    trucks = [(truck.pk, truck.name, truck.website, truck.social_links) for truck in trucks]
+    rows = key_rows(trucks)
+    with transaction.atomic(using=using):
+        TruckDedupKey.objects.using(using).filter(
+            truck_id__in=[truck[0] for truck in trucks]
+        ).delete()
+        insert_keys(TruckDedupKey, rows, using)
+
+
+def rebuild_keys(truck_model, key_model, batch_size=2000, using='default'):
+    """Recompute every truck's keys (usable from migrations); returns trucks indexed."""
+    trucks = truck_model.objects.using(using).order_by('pk').values_list(
+        'id', 'name', 'website', 'social_links'
+    )
+    total = 0
+    with transaction.atomic(using=using):
+        key_model.objects.using(using).all().delete()
+        batch = []
+        for truck in trucks.iterator(chunk_size=batch_size):
+            batch.append(truck)
+            if len(batch) >= batch_size:
+                insert_keys(key_model, key_rows(batch), using)
+                total += len(batch)
+                batch = []
+        insert_keys(key_model, key_rows(batch), using)
+        total += len(batch)
+    return total
+
+
+def rebuild_dedup_index(batch_size=2000, using='default'):
+    from .models import FoodTruck, TruckDedupKey
+
+    return rebuild_keys(FoodTruck, TruckDedupKey, batch_size, using)
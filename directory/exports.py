@@ -0,0 +1,164 @@
+"""
+Streaming CSV / NDJSON exports of trucks and users.
+
+Rows come from chunked ``.iterator()`` queries with the profile relations
+joined in via ``select_related``, so an export runs a fixed number of
+queries and holds one chunk in memory whatever the table size. Output is
+produced as a generator of byte chunks that ``StreamingHttpResponse`` and
+the ``export_directory`` command both consume, optionally gzip-compressed
+on the fly.
+"""
+
+import csv
+import hmac
+import json
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import CustomUser, FoodTruck
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+TRUCK_COLUMNS = [
+    ('id', lambda t: t.pk),
+    ('external_id', lambda t: t.external_id),
+    ('name', lambda t: t.name),
+    ('city', lambda t: t.city),
+    ('cuisine', lambda t: t.cuisine),
+    ('description', lambda t: t.description),
+    ('website', lambda t: t.website),
+    ('social_links', lambda t: t.social_links),
+    ('latitude', lambda t: t.latitude),
+    ('longitude', lambda t: t.longitude),
+    ('owner', lambda t: t.owner.business_name if t.owner else None),
+]
+
+
+def _profile_value(relation, field):
+    def get(user):
+        # select_related caches a missing profile, so this raises
+        # RelatedObjectDoesNotExist (an AttributeError) without a query.
+        profile = getattr(user, relation, None)
+        return getattr(profile, field) if profile is not None else None
+    return get
+
+
+USER_COLUMNS = [
+    ('id', lambda u: u.pk),
+    ('username', lambda u: u.username),
+    ('email', lambda u: u.email),
+    ('first_name', lambda u: u.first_name),
+    ('last_name', lambda u: u.last_name),
+    ('role', lambda u: u.role),
+    ('phone_number', lambda u: u.phone_number),
+    ('date_joined', lambda u: u.date_joined),
+    ('is_active', lambda u: u.is_active),
+    ('business_name', _profile_value('food_truck_profile', 'business_name')),
+    ('business_license', _profile_value('food_truck_profile', 'business_license')),
+    ('cuisine_type', _profile_value('food_truck_profile', 'cuisine_type')),
+    ('is_verified', _profile_value('food_truck_profile', 'is_verified')),
+    ('dietary_preferences', _profile_value('website_user_profile', 'dietary_preferences')),
+    ('favorite_cuisine_types', _profile_value('website_user_profile', 'favorite_cuisine_types')),
+    ('notification_preferences',
+     _profile_value('website_user_profile', 'notification_preferences')),
+]
+
+
+def truck_rows(chunk_size=CHUNK_SIZE):
+    trucks = (
+        FoodTruck.objects.select_related('owner')
+        .defer('image_variants', 'owner__operating_hours')
+        .order_by('pk')
+    )
+    # Pick the database now: rows are read while the response streams, after
+    # the request's read routing (directory.routers) has ended.
+    return trucks.using(trucks.db).iterator(chunk_size=chunk_size)
+
+
+def user_rows(role=None, chunk_size=CHUNK_SIZE):
+    users = (
+        CustomUser.objects.select_related('food_truck_profile', 'website_user_profile')
+        .order_by('pk')
+    )
+    if role:
+        users = users.filter(role=role)
+    return users.using(users.db).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return '' if value is None else value
+
+
+def render_csv(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in columns])
+    for row in rows:
+        yield writer.writerow([_csv_value(get(row)) for _, get in columns])
+
+
+def render_ndjson(columns, rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode({name: get(row) for name, get in columns}) + '\n'
+
+
+RENDERERS = {'csv': render_csv, 'ndjson': render_ndjson}
+
+
+def encode_chunks(lines, flush_bytes=FLUSH_BYTES):
+    """Join rendered lines into byte chunks of roughly ``flush_bytes``."""
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= flush_bytes:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of byte chunks incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(dataset, fmt, compress=False, **filters):
+    """Byte chunks of ``dataset`` (``'trucks'`` or ``'users'``) in ``fmt``."""
+    if dataset == 'trucks':
+        columns, rows = TRUCK_COLUMNS, truck_rows()
+    else:
+        columns, rows = USER_COLUMNS, user_rows(**filters)
+    chunks = encode_chunks(RENDERERS[fmt](columns, rows))
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def has_export_token(request):
+    """True when the request carries ``DIRECTORY_EXPORT_TOKEN`` as a bearer token."""
+    token = getattr(settings, 'DIRECTORY_EXPORT_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    if not token or not header.startswith('Bearer '):
+        return False
+    return hmac.compare_digest(header[len('Bearer '):].strip(), token)
@@ -0,0 +1,246 @@
+"""
+Faceted browsing for the directory page: city, cuisine, verified status
+and dietary tag, each option shown with the number of matching trucks.
+
+Counts are read from ``FacetCount``, a small table holding the number of
+trucks per (tag, city, cuisine, verified) cell. Facet counts under any
+combination of filters are then a ``GROUP BY`` over a few hundred cells.
+As usual for facets, each facet's counts ignore that facet's own filter,
+so picking a city still shows how many trucks the other cities have.
+
+The cells are kept current incrementally: the signal handlers in
+``directory.signals`` turn every truck save, delete, tag change and owner
+verification change into ``+1``/``-1`` deltas applied with ``F()``
+updates in the same transaction. ``rebuild_facet_counts`` recomputes the
+table from scratch, after bulk writes that bypass signals.
+"""
+
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Lower
+
+ALL_TRUCKS = 0
+
+
+def city_key(city):
+    return ' '.join((city or '').split()).lower()
+
+
+def truck_cells(city, cuisine, is_verified, tag_ids=()):
+    """Cells one truck is counted in: the all-trucks cell plus one per tag."""
+    base = (city_key(city), cuisine, bool(is_verified))
+    return [(ALL_TRUCKS, *base)] + [(tag_id, *base) for tag_id in tag_ids]
+
+
+def grouped_cells(trucks, through, sign=1):
+    """
+    ``Counter`` of cells for every truck in the ``trucks`` queryset.
+
+    Two ``GROUP BY`` queries (trucks, then truck-tag links) however many
+    trucks there are; ``sign=-1`` yields removal deltas.
+    """
+    deltas = Counter()
+    rows = trucks.order_by().values_list('city', 'cuisine', 'is_verified').annotate(n=Count('pk'))
+    for city, cuisine, is_verified, n in rows:
+        deltas[(ALL_TRUCKS, city_key(city), cuisine, is_verified)] += sign * n
+    tagged = (
+        through.objects.filter(foodtruck__in=trucks.order_by().values('pk'))
+        .order_by()
+        .values_list('dietarytag_id', 'foodtruck__city', 'foodtruck__cuisine',
+                     'foodtruck__is_verified')
+        .annotate(n=Count('pk'))
+    )
+    for tag_id, city, cuisine, is_verified, n in tagged:
+        deltas[(tag_id, city_key(city), cuisine, is_verified)] += sign * n
+    return deltas
+
+
+def apply_deltas(deltas, using='default'):
+    """Add ``{cell: delta}`` to ``FacetCount``, creating missing cells."""
+    from .models import FacetCount
+
+    for (tag_id, city, cuisine, is_verified), delta in deltas.items():
+        if not delta:
+            continue
+        cell = FacetCount.objects.using(using).filter(
+            tag_id=tag_id, city=city, cuisine=cuisine, is_verified=is_verified
+        )
+        if not cell.update(count=F('count') + delta):
+            FacetCount.objects.using(using).bulk_create([FacetCount(
+                tag_id=tag_id, city=city, cuisine=cuisine, is_verified=is_verified,
+            )], ignore_conflicts=True)
+            cell.update(count=F('count') + delta)
+
+
+def add_cells(cells, sign=1, using='default'):
+    apply_deltas(Counter({cell: sign for cell in cells}), using)
+
+
+def tag_deltas(tag_id, trucks, sign=1):
+    """Deltas for tagging (``sign=1``) or untagging the ``trucks`` queryset."""
+    rows = trucks.order_by().values_list('city', 'cuisine', 'is_verified').annotate(n=Count('pk'))
+    deltas = Counter()
+    for city, cuisine, is_verified, n in rows:
+        deltas[(tag_id, city_key(city), cuisine, is_verified)] += sign * n
+    return deltas
+
+
+def set_trucks_verified(trucks, is_verified, using='default'):
+    """
+    Set ``is_verified`` on the ``trucks`` queryset and move their counts.
+
+    Used when an owner's verification changes, so the trucks' cells are
+    moved in two ``GROUP BY`` queries rather than one delta per truck.
+    """
+    from .models import FoodTruck
+
+    trucks = trucks.exclude(is_verified=is_verified)
+    removed = grouped_cells(trucks, FoodTruck.dietary_tags.through, sign=-1)
+    deltas = Counter(removed)
+    for (tag_id, city, cuisine, _), delta in removed.items():
+        deltas[(tag_id, city, cuisine, is_verified)] -= delta
+    with transaction.atomic(using=using):
+        trucks.update(is_verified=is_verified)
+        apply_deltas(deltas, using)
+
+
+def rebuild_cells(truck_model, facet_model, using='default'):
+    """Recompute ``facet_model`` from ``truck_model`` (usable from migrations)."""
+    through = truck_model.dietary_tags.through
+    trucks = truck_model.objects.using(using).all()
+    deltas = grouped_cells(trucks, through)
+    with transaction.atomic(using=using):
+        facet_model.objects.using(using).all().delete()
+        facet_model.objects.using(using).bulk_create(
+            [
+                facet_model(tag_id=tag_id, city=city, cuisine=cuisine,
+                            is_verified=is_verified, count=count)
+                for (tag_id, city, cuisine, is_verified), count in deltas.items()
+                if count
+            ],
+            batch_size=1000,
+        )
+    return len(deltas)
+
+
+def rebuild_facet_counts(using='default'):
+    from .models import FacetCount, FoodTruck
+
+    return rebuild_cells(FoodTruck, FacetCount, using)
+
+
+def parse_filters(params):
+    """Directory filters from query parameters; unknown values are dropped."""
+    filters = {}
+    if params.get('city'):
+        filters['city'] = city_key(params['city'])
+    if params.get('cuisine'):
+        filters['cuisine'] = params['cuisine'].strip()
+    if params.get('verified') in ('1', 'true', 'yes'):
+        filters['verified'] = '1'
+    if params.get('tag'):
+        filters['tag'] = params['tag'].strip().lower()
+    return filters
+
+
+def filter_trucks(queryset, filters, tag=None):
+    """Apply parsed ``filters`` to a ``FoodTruck`` queryset."""
+    if 'city' in filters:
+        queryset = queryset.alias(city_key=Lower('city')).filter(city_key=filters['city'])
+    if 'cuisine' in filters:
+        queryset = queryset.filter(cuisine=filters['cuisine'])
+    if 'verified' in filters:
+        queryset = queryset.filter(is_verified=True)
+    if 'tag' in filters:
+        queryset = queryset.filter(dietary_tags=tag) if tag else queryset.none()
+    return queryset
+
+
+def _cells(filters, tag, ignore):
+    from .models import FacetCount
+
+    cells = FacetCount.objects.filter(count__gt=0)
+    if ignore == 'tag':
+        pass  # The caller picks the per-tag cells.
+    elif 'tag' in filters:
+        cells = cells.filter(tag_id=tag.pk)
+    else:
+        cells = cells.filter(tag_id=ALL_TRUCKS)
+    if ignore != 'city' and 'city' in filters:
+        cells = cells.filter(city=filters['city'])
+    if ignore != 'cuisine' and 'cuisine' in filters:
+        cells = cells.filter(cuisine=filters['cuisine'])
+    if ignore != 'verified' and 'verified' in filters:
+        cells = cells.filter(is_verified=True)
+    return cells
+
+
+def facet_counts(filters, tag=None):
+    """
+    Options and counts for each facet under ``filters``.
+
+    Returns ``{facet: [{'value', 'label', 'count', 'selected'}, ...]}``
+    plus ``'total'``, the number of trucks matching every filter.
+    """
+    from .models import DietaryTag
+
+    if 'tag' in filters and tag is None:
+        # Unknown tag: nothing matches, but keep the other options visible.
+        tag = DietaryTag(pk=-1, slug=filters['tag'])
+
+    def grouped(facet, column):
+        rows = (
+            _cells(filters, tag, ignore=facet).order_by()
+            .values_list(column).annotate(n=Sum('count')).order_by('-n', column)
+        )
+        return list(rows)
+
+    cities = [
+        {'value': city, 'label': city.title(), 'count': n,
+         'selected': filters.get('city') == city}
+        for city, n in grouped('city', 'city')
+    ]
+    cuisines = [
+        {'value': cuisine, 'label': cuisine, 'count': n,
+         'selected': filters.get('cuisine') == cuisine}
+        for cuisine, n in grouped('cuisine', 'cuisine')
+    ]
+    verified_count = (
+        _cells(filters, tag, ignore='verified').filter(is_verified=True)
+        .aggregate(n=Sum('count'))['n'] or 0
+    )
+    tag_rows = dict(
+        _cells(filters, tag, ignore='tag').exclude(tag_id=ALL_TRUCKS).order_by()
+        .values_list('tag_id').annotate(n=Sum('count'))
+    )
+    tags = [
+        {'value': dietary_tag.slug, 'label': dietary_tag.name,
+         'count': tag_rows[dietary_tag.pk], 'selected': filters.get('tag') == dietary_tag.slug}
+        for dietary_tag in DietaryTag.objects.filter(pk__in=tag_rows)
+    ]
+    tags.sort(key=lambda option: (-option['count'], option['label']))
+    facets = {
+        'city': cities,
+        'cuisine': cuisines,
+        'verified': [{'value': '1', 'label': 'Verified owners', 'count': verified_count,
+                      'selected': 'verified' in filters}],
+        'tag': tags,
+    }
+    for facet, options in facets.items():
+        for option in options:
+            option['query'] = facet_query(filters, facet, option['value'])
+    facets['total'] = _cells(filters, tag, ignore=None).aggregate(n=Sum('count'))['n'] or 0
+    return facets
+
+
+def facet_query(filters, facet, value):
+    """Query string that toggles ``facet=value`` and resets pagination."""
+    params = dict(filters)
+    if params.get(facet) == value:
+        del params[facet]
+    else:
+        params[facet] = value
+    return '?' + urlencode(params)
@@ -0,0 +1,73 @@
+from django import forms
+
+from .models import FoodTruck, FoodTruckOwnerProfile, TruckSubmission
+
+SOCIAL_PLATFORMS = ('instagram', 'facebook', 'twitter')
+
+
+class BootstrapFormMixin:
+    """Give every widget Bootstrap's class for its kind of input."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for form_field in self.fields.values():
+            widget = form_field.widget
+            input_type = getattr(widget, 'input_type', None)
+            css = 'form-check-input' if input_type in ('checkbox', 'radio') else 'form-control'
+            widget.attrs.setdefault('class', css)
+
+
+class TruckSubmissionForm(BootstrapFormMixin, forms.ModelForm):
+    """
+    The public "submit your truck" form. Social profiles are separate URL
+    fields, stored together as ``social_links`` like ``FoodTruck``'s.
+    """
+    instagram = forms.URLField(required=False, label='Instagram URL')
+    facebook = forms.URLField(required=False, label='Facebook URL')
+    twitter = forms.URLField(required=False, label='X / Twitter URL')
+    confirm_new = forms.BooleanField(
+        required=False,
+        label='This is a different truck from the ones listed above',
+    )
+
+    class Meta:
+        model = TruckSubmission
+        fields = ['name', 'city', 'cuisine', 'description', 'website', 'contact_email']
+        widgets = {'description': forms.Textarea(attrs={'rows': 4})}
+
+    def clean(self):
+        cleaned = super().clean()
+        links = {
+            platform: cleaned[platform]
+            for platform in SOCIAL_PLATFORMS if cleaned.get(platform)
+        }
+        self.instance.social_links = links or None
+        return cleaned
+
+
+class TruckEditForm(BootstrapFormMixin, forms.ModelForm):
+    """
+    An owner's form for their own truck. Ownership and verification are
+    the moderators' to change, in the admin.
+    """
+
+    class Meta:
+        model = FoodTruck
+        fields = ['name', 'city', 'cuisine', 'description', 'website', 'latitude', 'longitude',
+                  'dietary_tags']
+        widgets = {
+            'description': forms.Textarea(attrs={'rows': 4}),
+            'dietary_tags': forms.CheckboxSelectMultiple,
+        }
+
+
+class OwnerProfileForm(BootstrapFormMixin, forms.ModelForm):
+    """
+    An owner's form for their business profile; verification stays with
+    moderators. The legacy free-text hours are not offered: open-now reads
+    each truck's structured ``OperatingHours``.
+    """
+
+    class Meta:
+        model = FoodTruckOwnerProfile
+        fields = ['business_name', 'business_license', 'cuisine_type']
@@ -0,0 +1,236 @@
+"""
+In-process spatial index for "trucks near me" queries.
+
+Truck coordinates are bucketed into a fixed lat/lon grid and kept in NumPy
+arrays sorted by cell. A query turns its search circle into a handful of
+contiguous cell ranges (one per grid row), slices the candidates out with
+``searchsorted`` and refines them with a vectorized haversine. No GIS
+extension or external service is involved.
+
+The index is built lazily per process from ``FoodTruck`` rows, invalidated
+by the model signals and rebuilt at most every ``DIRECTORY_GEO_INDEX_TTL``
+seconds so other processes pick up changes too.
+"""
+
+import math
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+EARTH_RADIUS_MILES = 3958.8
+DEFAULT_CELL_DEGREES = 0.05
+DEFAULT_INDEX_TTL = 60
+
+
+def haversine_miles(lat, lon, lats, lons):
+    """
+    Great-circle distance in miles from one point to arrays of points.
+
+    ``lat``/``lon`` are scalars in radians, ``lats``/``lons`` NumPy arrays in
+    radians.
+    """
+    dlat = lats - lat
+    dlon = lons - lon
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def bounding_box(latitude, longitude, radius_miles):
+    """
+    ``(lat_lo, lat_hi, lon_lo, lon_hi)`` degrees enclosing a circle, for a
+    range query that an index can answer. Not split at the antimeridian.
+    """
+    dlat = math.degrees(radius_miles / EARTH_RADIUS_MILES)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    dlon = min(180.0, dlat / cos_lat)
+    return (
+        max(-90.0, latitude - dlat), min(90.0, latitude + dlat),
+        max(-180.0, longitude - dlon), min(180.0, longitude + dlon),
+    )
+
+
+def unit_vectors(lats, lons, dtype=np.float32):
+    """``(n, 3)`` points on the unit sphere for latitudes/longitudes in radians."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    cos_lat = np.cos(lats)
+    return np.stack(
+        [cos_lat * np.cos(lons), cos_lat * np.sin(lons), np.sin(lats)], axis=1
+    ).astype(dtype)
+
+
+def pairwise_chord_miles(points_a, points_b):
+    """
+    ``len(a) x len(b)`` matrix of straight-line distances in miles between
+    two sets of ``unit_vectors``.
+
+    The chord is shorter than the great-circle distance by under 0.01% up
+    to 200 miles and, unlike haversine, needs no trigonometry per pair, so
+    it suits scoring large blocks where only relative distance matters.
+    Coordinate differences are taken before squaring, so float32 inputs
+    stay accurate to a few feet.
+    """
+    out = np.subtract(points_b[:, 0], points_a[:, 0, None])
+    out *= out
+    scratch = np.empty_like(out)
+    for axis in (1, 2):
+        np.subtract(points_b[:, axis], points_a[:, axis, None], out=scratch)
+        scratch *= scratch
+        out += scratch
+    np.sqrt(out, out=out)
+    out *= EARTH_RADIUS_MILES
+    return out
+
+
+class GeoIndex:
+    """Immutable grid-cell index over ``(id, latitude, longitude)`` points."""
+
+    def __init__(self, ids, latitudes, longitudes, cell_degrees=DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.columns = int(math.ceil(360 / cell_degrees)) + 1
+
+        lat_deg = np.asarray(latitudes, dtype=np.float64)
+        lon_deg = np.asarray(longitudes, dtype=np.float64)
+        cells = self._cell_keys(lat_deg, lon_deg)
+        order = np.argsort(cells, kind='stable')
+
+        self.cells = cells[order]
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.lats = np.radians(lat_deg[order])
+        self.lons = np.radians(lon_deg[order])
+
+    @classmethod
+    def from_points(cls, points, **kwargs):
+        """Build from an iterable of ``(id, latitude, longitude)`` tuples."""
+        rows = list(points)
+        if not rows:
+            return cls([], [], [], **kwargs)
+        ids, lats, lons = zip(*rows)
+        return cls(ids, lats, lons, **kwargs)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _rows_cols(self, lat_deg, lon_deg):
+        rows = np.floor((lat_deg + 90) / self.cell_degrees).astype(np.int64)
+        cols = np.floor((lon_deg + 180) / self.cell_degrees).astype(np.int64)
+        return rows, cols
+
+    def _cell_keys(self, lat_deg, lon_deg):
+        rows, cols = self._rows_cols(lat_deg, lon_deg)
+        return rows * self.columns + cols
+
+    def _candidates(self, lat_deg, lon_deg, radius_miles):
+        """Indices of points in grid cells overlapping the search circle."""
+        dlat = math.degrees(radius_miles / EARTH_RADIUS_MILES)
+        cos_lat = math.cos(math.radians(lat_deg))
+        if cos_lat < 1e-6 or dlat >= 90:
+            return np.arange(len(self.ids))
+        dlon = min(180.0, dlat / cos_lat)
+
+        lat_lo, lat_hi = max(-90.0, lat_deg - dlat), min(90.0, lat_deg + dlat)
+        row_lo = int(math.floor((lat_lo + 90) / self.cell_degrees))
+        row_hi = int(math.floor((lat_hi + 90) / self.cell_degrees))
+        col_lo = int(math.floor((lon_deg - dlon + 180) / self.cell_degrees))
+        col_hi = int(math.floor((lon_deg + dlon + 180) / self.cell_degrees))
+        last_col = self.columns - 1
+        # A circle crossing the antimeridian becomes two column ranges.
+        if col_lo < 0:
+            col_ranges = [(col_lo + last_col, last_col), (0, col_hi)]
+        elif col_hi > last_col:
+            col_ranges = [(col_lo, last_col), (0, col_hi - last_col)]
+        else:
+            col_ranges = [(col_lo, col_hi)]
+
+        starts, stops = [], []
+        for row in range(row_lo, row_hi + 1):
+            base = row * self.columns
+            for first, last in col_ranges:
+                starts.append(base + first)
+                stops.append(base + last + 1)
+        lo = np.searchsorted(self.cells, starts, side='left')
+        hi = np.searchsorted(self.cells, stops, side='left')
+        slices = [np.arange(a, b) for a, b in zip(lo, hi) if b > a]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(slices)
+
+    def within(self, latitude, longitude, radius_miles, limit=None):
+        """
+        ``(id, distance_miles)`` pairs within ``radius_miles``, nearest first.
+        """
+        candidates = self._candidates(latitude, longitude, radius_miles)
+        if not len(candidates):
+            return []
+        distances = haversine_miles(
+            math.radians(latitude), math.radians(longitude),
+            self.lats[candidates], self.lons[candidates],
+        )
+        mask = distances <= radius_miles
+        hits, hit_distances = candidates[mask], distances[mask]
+        if limit is not None and len(hits) > limit:
+            # Partial selection first; only the survivors are fully sorted.
+            keep = np.argpartition(hit_distances, limit - 1)[:limit]
+            hits, hit_distances = hits[keep], hit_distances[keep]
+        order = np.argsort(hit_distances, kind='stable')
+        return list(zip(self.ids[hits[order]].tolist(), hit_distances[order].tolist()))
+
+    def nearest(self, latitude, longitude, k, max_radius_miles=None, accept=None):
+        """
+        The ``k`` nearest ``(id, distance_miles)`` pairs, nearest first.
+
+        Searches a growing circle so only nearby cells are refined; any
+        point inside the circle is guaranteed to be considered, so the
+        result is exact once ``k`` hits fall inside it. ``accept``, if
+        given, filters each round's hits (e.g. to trucks open right now)
+        before they count towards ``k``.
+        """
+        if k <= 0 or not len(self.ids):
+            return []
+        radius = self.cell_degrees * 69.0
+        limit_radius = max_radius_miles or math.pi * EARTH_RADIUS_MILES
+        while True:
+            radius = min(radius, limit_radius)
+            if accept is None:
+                hits = self.within(latitude, longitude, radius, limit=k)
+            else:
+                hits = accept(self.within(latitude, longitude, radius))[:k]
+            if len(hits) >= k or radius >= limit_radius:
+                return hits
+            radius *= 2
+
+
+_lock = threading.Lock()
+_index = None
+_built_at = 0.0
+
+
+def build_geo_index():
+    """Load every located truck into a fresh ``GeoIndex``."""
+    from .models import FoodTruck
+
+    points = FoodTruck.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).values_list('id', 'latitude', 'longitude')
+    cell = getattr(settings, 'DIRECTORY_GEO_CELL_DEGREES', DEFAULT_CELL_DEGREES)
+    return GeoIndex.from_points(points.iterator(chunk_size=5000), cell_degrees=cell)
+
+
+def get_geo_index():
+    """Return this process's index, rebuilding it if stale or invalidated."""
+    global _index, _built_at
+    ttl = getattr(settings, 'DIRECTORY_GEO_INDEX_TTL', DEFAULT_INDEX_TTL)
+    with _lock:
+        if _index is None or time.monotonic() - _built_at > ttl:
+            _index = build_geo_index()
+            _built_at = time.monotonic()
+        return _index
+
+
+def invalidate_geo_index():
+    """Drop this process's index so the next query rebuilds it."""
+    global _index
+    with _lock:
+        _index = None
@@ -0,0 +1,166 @@
+"""
+Precomputed "Featured" and "Trending" lists and top cities for the home page.
+
+The home page is the busiest page on the site, so it never ranks trucks
+or counts them itself. ``build_snapshot()`` picks the featured trucks
+(those with a verified owner, most viewed first), the trending ones (most
+viewed over the last ``DIRECTORY_HOME_TRENDING_DAYS`` days, from the
+analytics rollups) and the cities with the most trucks, and
+``publish_snapshot()`` stores the result as one small
+document: a single cache key, replaced in one ``set``, and optionally a
+JSON file on disk, replaced with ``os.replace``. Readers therefore see
+the old snapshot or the new one, never a mix. Publishing bumps the
+``home`` scope so cached home pages pick it up.
+
+The ``home.snapshot`` task (``build_home_snapshot --schedule``) rebuilds
+it every ``DIRECTORY_HOME_SNAPSHOT_REFRESH`` seconds. A snapshot older
+than ``DIRECTORY_HOME_SNAPSHOT_MAX_AGE`` is not shown at all; the home
+page then renders without the two lists rather than query for them.
+
+With a shared cache (Redis) the cache key is all web processes need. With
+the per-process local-memory default, the workers' cache is not the web
+processes', so set ``DIRECTORY_HOME_SNAPSHOT_PATH``: a process without the
+key reads the file and keeps it for one refresh interval before looking
+again. The file also lets a fresh process start from the last snapshot.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .api import dumps
+from .cache import HOME, bump, get_cache
+from .models import FoodTruck, PageViewEvent
+from .truck_pages import image_data
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the document's shape changes; older files and keys are ignored.
+SNAPSHOT_FORMAT = 2
+SNAPSHOT_KEY = f'directory:home:snapshot:{SNAPSHOT_FORMAT}'
+DEFAULT_LIST_SIZE = 6
+DEFAULT_TRENDING_DAYS = 7
+DEFAULT_REFRESH = 300
+DEFAULT_MAX_AGE = 3600
+EMPTY = {'featured': [], 'trending': [], 'top_cities': [], 'built_at': None}
+
+
+def snapshot_settings():
+    return {
+        'size': getattr(settings, 'DIRECTORY_HOME_LIST_SIZE', DEFAULT_LIST_SIZE),
+        'trending_days': getattr(settings, 'DIRECTORY_HOME_TRENDING_DAYS', DEFAULT_TRENDING_DAYS),
+        'refresh': getattr(settings, 'DIRECTORY_HOME_SNAPSHOT_REFRESH', DEFAULT_REFRESH),
+        'max_age': getattr(settings, 'DIRECTORY_HOME_SNAPSHOT_MAX_AGE', DEFAULT_MAX_AGE),
+        'path': getattr(settings, 'DIRECTORY_HOME_SNAPSHOT_PATH', ''),
+    }
+
+
+def truck_entry(truck):
+    """What a home page card shows for a truck."""
+    return {
+        'pk': truck.pk,
+        'name': truck.name,
+        'city': truck.city,
+        'cuisine': truck.cuisine,
+        'image': image_data(truck),
+        'views': truck.recent_views,
+    }
+
+
+def build_snapshot(now=None, using='default'):
+    """Rank the featured and trending trucks and the top cities; returns the snapshot document."""
+    config = snapshot_settings()
+    now = now or timezone.now()
+    first = timezone.localdate(now) - timedelta(days=config['trending_days'] - 1)
+    trucks = (
+        FoodTruck.objects.using(using)
+        .only('id', 'name', 'city', 'cuisine', 'image', 'image_variants')
+        .annotate(recent_views=Sum('daily_stats__count', default=0, filter=Q(
+            daily_stats__kind=PageViewEvent.VIEW, daily_stats__day__gte=first,
+        )))
+        .order_by('-recent_views', 'name', 'pk')
+    )
+    featured = trucks.filter(is_verified=True)[:config['size']]
+    trending = trucks.filter(recent_views__gt=0)[:config['size']]
+    top_cities = (
+        FoodTruck.objects.using(using).values('city')
+        .annotate(truck_count=Count('id'))
+        .order_by('-truck_count', 'city')[:config['size']]
+    )
+    return {
+        'format': SNAPSHOT_FORMAT,
+        'built_at': now.timestamp(),
+        'featured': [truck_entry(truck) for truck in featured],
+        'trending': [truck_entry(truck) for truck in trending],
+        'top_cities': list(top_cities),
+    }
+
+
+def write_file(snapshot, path):
+    """Replace the file at ``path`` in one step, so readers never see half of it."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.home-snapshot-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(dumps(snapshot))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_file(path):
+    try:
+        with open(path, 'rb') as snapshot_file:
+            snapshot = json.loads(snapshot_file.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.exception('Could not read the home snapshot from %s', path)
+        return None
+    return snapshot if snapshot.get('format') == SNAPSHOT_FORMAT else None
+
+
+def age(snapshot, now=None):
+    return (now or time.time()) - snapshot['built_at']
+
+
+def publish_snapshot(snapshot):
+    """Make ``snapshot`` the one home pages show."""
+    config = snapshot_settings()
+    get_cache().set(SNAPSHOT_KEY, snapshot, config['max_age'])
+    if config['path']:
+        write_file(snapshot, config['path'])
+    bump(HOME)
+
+
+def refresh_snapshot(using='default'):
+    snapshot = build_snapshot(using=using)
+    publish_snapshot(snapshot)
+    return snapshot
+
+
+def current_snapshot():
+    """
+    The published snapshot if it is no older than the configured maximum,
+    else ``EMPTY``. Makes no queries.
+    """
+    config = snapshot_settings()
+    cache = get_cache()
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None and config['path']:
+        snapshot = read_file(config['path'])
+        if snapshot is not None and age(snapshot) < config['max_age']:
+            # Checked again after a refresh interval, for a newer file.
+            timeout = min(config['refresh'], config['max_age'] - age(snapshot))
+            cache.set(SNAPSHOT_KEY, snapshot, timeout)
+    if snapshot is None or age(snapshot) >= config['max_age']:
+        return EMPTY
+    return snapshot
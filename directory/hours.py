@@ -0,0 +1,223 @@
+"""
+Structured operating hours and the "open now" filter.
+
+Weekly hours are stored as ``OperatingHours`` rows whose ``start_minute`` /
+``end_minute`` columns place each interval on a minute-of-week axis
+(Monday 00:00 is minute 0). Those columns are indexed, so "which trucks are
+open at time T" is a range predicate the database answers from the index,
+with no per-row parsing. Intervals that run past midnight simply end after
+their start day; one that runs past Sunday midnight ends beyond
+``MINUTES_PER_WEEK`` and is matched by also probing ``minute + week``.
+
+``parse_operating_hours`` turns the legacy free-text
+``FoodTruckOwnerProfile.operating_hours`` into weekly intervals; a truck
+takes its owner profile's hours when it is first linked to the profile.
+"""
+
+import re
+from datetime import time
+
+from django.db.models import Q
+from django.utils import timezone
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+DAY_PREFIXES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+DAY_GROUPS = {
+    'daily': range(7),
+    'everyday': range(7),
+    'every day': range(7),
+    '7 days': range(7),
+    'weekdays': range(5),
+    'weekends': range(5, 7),
+}
+
+_DAY = (
+    r'\b(?:mon(?:day)?|tue(?:s|sday)?|wed(?:s|nesday)?|thu(?:r|rs|rsday)?'
+    r'|fri(?:day)?|sat(?:urday)?|sun(?:day)?)\b\.?'
+)
+_TIME = r'(?:\d{1,2}(?::\d{2})?\s*(?:[ap]\.?m\.?)?|noon|midnight)'
+_DASH = r'\s*(?:-|–|—|to|through|thru|until|till)\s*'
+_TOKEN = re.compile(
+    rf'(?P<time_range>{_TIME}{_DASH}{_TIME})'
+    rf'|(?P<day_range>{_DAY}{_DASH}{_DAY})'
+    rf'|(?P<group>\b(?:every ?day|7 days|daily|weekdays|weekends)\b)'
+    rf'|(?P<day>{_DAY})',
+    re.IGNORECASE,
+)
+_TIME_PARTS = re.compile(
+    r'(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<meridiem>[ap])?', re.IGNORECASE
+)
+
+
+def day_index(token):
+    """Map ``'Tues'`` / ``'thursday'`` to 0-6, Monday first."""
+    return DAY_PREFIXES.index(token.strip().lower()[:3])
+
+
+def _split_range(text):
+    return re.split(_DASH, text, maxsplit=1, flags=re.IGNORECASE)
+
+
+def _parse_clock(text):
+    """Return ``(hour, minute, meridiem)``; meridiem is 'a', 'p' or None."""
+    text = text.strip().lower()
+    if text == 'noon':
+        return 12, 0, 'p'
+    if text == 'midnight':
+        return 12, 0, 'a'
+    match = _TIME_PARTS.match(text)
+    hour, minute = int(match['hour']), int(match['minute'] or 0)
+    meridiem = match['meridiem'].lower() if match['meridiem'] else None
+    return hour, minute, meridiem
+
+
+def _to_time(hour, minute, meridiem):
+    if meridiem == 'a' and hour == 12:
+        hour = 0
+    elif meridiem == 'p' and hour < 12:
+        hour += 12
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        raise ValueError(f'Invalid time {hour}:{minute:02d}')
+    return time(hour, minute)
+
+
+def parse_time_range(text):
+    """
+    Parse ``'11am-3pm'``, ``'11-3pm'``, ``'17:00 - 21:00'`` or ``'noon to 2'``.
+
+    A start without am/pm borrows the end's, unless that would put it after
+    the end (``'11-3pm'`` is 11am to 3pm).
+    """
+    start_text, end_text = _split_range(text)
+    start_h, start_m, start_mer = _parse_clock(start_text)
+    end_h, end_m, end_mer = _parse_clock(end_text)
+    if start_mer is None and end_mer is not None and start_h <= 12:
+        start_mer = end_mer
+        if _to_time(start_h, start_m, start_mer) > _to_time(end_h, end_m, end_mer):
+            start_mer = 'a' if end_mer == 'p' else 'p'
+    if end_mer is None and start_mer is not None and end_h <= 12:
+        end_mer = start_mer
+        if _to_time(end_h, end_m, end_mer) <= _to_time(start_h, start_m, start_mer):
+            end_mer = 'p' if start_mer == 'a' else 'a'
+    return _to_time(start_h, start_m, start_mer), _to_time(end_h, end_m, end_mer)
+
+
+def parse_operating_hours(text):
+    """
+    Parse free-text hours into ``(weekday, opens_at, closes_at)`` tuples.
+
+    Understands day lists and ranges (``Mon, Wed``, ``Mon-Fri``,
+    ``weekends``, ``daily``) each followed by one or more time ranges, e.g.
+    ``'Mon-Fri 11AM-3PM, Sat 10:30am-2pm; Sun noon-4'``. Time ranges with no
+    days before them apply every day. Unparseable fragments are skipped.
+    """
+    intervals = []
+    days = []
+    days_used = False
+    for match in _TOKEN.finditer(text or ''):
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'time_range':
+            try:
+                opens_at, closes_at = parse_time_range(value)
+            except ValueError:
+                continue
+            if opens_at == closes_at:
+                continue
+            for weekday in days or range(7):
+                intervals.append((weekday, opens_at, closes_at))
+            days_used = True
+            continue
+        if days_used:
+            days, days_used = [], False
+        if kind == 'day':
+            days.append(day_index(value))
+        elif kind == 'group':
+            days.extend(DAY_GROUPS[value.lower()])
+        else:
+            first, last = (day_index(part) for part in _split_range(value))
+            span = (last - first) % 7
+            days.extend((first + offset) % 7 for offset in range(span + 1))
+    return intervals
+
+
+def interval_minutes(weekday, opens_at, closes_at):
+    """
+    Minute-of-week ``(start, end)`` for a weekly interval.
+
+    ``closes_at`` at or before ``opens_at`` means the truck closes after
+    midnight, so the interval ends on the following day.
+    """
+    start = weekday * MINUTES_PER_DAY + opens_at.hour * 60 + opens_at.minute
+    end = weekday * MINUTES_PER_DAY + closes_at.hour * 60 + closes_at.minute
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+def hours_rows(hours_model, truck_id, text):
+    """
+    Unsaved ``hours_model`` rows for free-text ``text`` as ``truck_id``'s
+    hours; none if it does not parse. Works with historical models.
+    """
+    rows = []
+    for weekday, opens_at, closes_at in parse_operating_hours(text):
+        start, end = interval_minutes(weekday, opens_at, closes_at)
+        rows.append(hours_model(
+            truck_id=truck_id, weekday=weekday, opens_at=opens_at, closes_at=closes_at,
+            start_minute=start, end_minute=end,
+        ))
+    return rows
+
+
+def minute_of_week(at=None):
+    """Minute-of-week of ``at`` (default now) in the current time zone."""
+    local = timezone.localtime(at) if at is not None else timezone.localtime()
+    return local.weekday() * MINUTES_PER_DAY + local.hour * 60 + local.minute
+
+
+def open_at(at=None):
+    """
+    ``Q`` matching ``FoodTruck`` rows open at ``at`` (default now).
+
+    A truck is open if one of its weekly intervals or one-off event slots
+    covers the moment. Both are uncorrelated ``IN`` subqueries, so each is
+    a single range scan over its ``(start, end, truck)`` index rather than a
+    probe per truck.
+    """
+    from .models import EventSlot, OperatingHours
+
+    at = at or timezone.now()
+    minute = minute_of_week(at)
+    weekly = OperatingHours.objects.filter(
+        Q(start_minute__lte=minute, end_minute__gt=minute)
+        | Q(start_minute__lte=minute + MINUTES_PER_WEEK,
+            end_minute__gt=minute + MINUTES_PER_WEEK)
+    ).values('truck_id')
+    events = EventSlot.objects.filter(
+        starts_at__lte=at, ends_at__gt=at
+    ).values('truck_id')
+    return Q(pk__in=weekly) | Q(pk__in=events)
+
+
+def parse_open_param(value):
+    """
+    Interpret the ``open`` query parameter.
+
+    Returns ``None`` when absent, the current time for ``'now'``, or the
+    parsed ISO datetime. Raises ``ValueError`` for anything else.
+    """
+    if not value:
+        return None
+    if value == 'now':
+        return timezone.now()
+    from django.utils.dateparse import parse_datetime
+
+    at = parse_datetime(value)
+    if at is None:
+        raise ValueError(value)
+    if timezone.is_naive(at):
+        at = timezone.make_aware(at)
+    return at
@@ -0,0 +1,180 @@
+"""
+Responsive variants for ``FoodTruck.image``.
+
+Every upload is re-encoded into a few widths as WebP plus a JPEG fallback,
+with EXIF (GPS position, camera serials...) dropped after the orientation
+has been applied. Variant metadata lives in ``FoodTruck.image_variants`` so
+templates can emit ``srcset`` without touching storage.
+
+``render_variants`` is a pure bytes-in/bytes-out function, so it can run in
+a task queue worker (``directory.tasks``), or in a process pool for the
+``process_images`` backfill.
+"""
+
+import io
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .taskqueue import enqueue
+
+DEFAULT_WIDTHS = (320, 640, 1024)
+FORMATS = ('webp', 'jpeg')
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+CONTENT_TYPES = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+QUALITY = {'webp': 80, 'jpeg': 82}
+
+
+def variant_widths():
+    return tuple(getattr(settings, 'DIRECTORY_IMAGE_WIDTHS', DEFAULT_WIDTHS))
+
+
+def target_widths(source_width, widths):
+    """Widths to render: never upscale, but always produce one variant."""
+    targets = sorted({w for w in widths if w < source_width})
+    if not targets or source_width <= max(widths):
+        targets.append(min(source_width, max(widths)))
+    return sorted(set(targets))
+
+
+def render_variants(data, widths=DEFAULT_WIDTHS):
+    """
+    Re-encode image bytes into every width/format pair.
+
+    Returns a list of ``(width, height, format, bytes)``. The output carries
+    no EXIF block: orientation is baked into the pixels first and the
+    encoders are never handed the original metadata.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    variants = []
+    for width in target_widths(image.width, widths):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in FORMATS:
+            frame = resized
+            if fmt == 'jpeg' and frame.mode == 'RGBA':
+                # JPEG has no alpha channel; flatten onto white.
+                background = Image.new('RGB', frame.size, (255, 255, 255))
+                background.paste(frame, mask=frame.getchannel('A'))
+                frame = background
+            buffer = io.BytesIO()
+            options = {'quality': QUALITY[fmt], 'optimize': True}
+            if fmt == 'jpeg':
+                options['progressive'] = True
+            else:
+                options['method'] = 4
+            frame.save(buffer, fmt.upper(), **options)
+            variants.append((width, height, fmt, buffer.getvalue()))
+    return variants
+
+
+def variant_name(source_name, width, fmt):
+    """Storage path of one variant, next to the original upload."""
+    directory, filename = posixpath.split(source_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'variants', f'{stem}-{width}w.{EXTENSIONS[fmt]}')
+
+
+def needs_processing(truck):
+    """True when the truck's image has no variants for its current file."""
+    if not truck.image:
+        return False
+    return (truck.image_variants or {}).get('source') != truck.image.name
+
+
+def store_variants(truck, rendered, storage=None):
+    """
+    Write rendered variants to storage and record their metadata.
+
+    The metadata is written with ``update()`` so it does not re-trigger the
+    truck's save signals; the truck's cached pages are bumped and its detail
+    page rebuilt explicitly.
+    """
+    from .cache import bump, truck_scopes
+    from .models import FoodTruck
+    from .truck_pages import refresh_truck_pages
+
+    storage = storage or default_storage
+    previous = truck.image_variants or {}
+    for old in previous.get('variants', []):
+        storage.delete(old['name'])
+
+    variants = []
+    for width, height, fmt, data in rendered:
+        name = storage.save(variant_name(truck.image.name, width, fmt), ContentFile(data))
+        variants.append({
+            'name': name,
+            'width': width,
+            'height': height,
+            'format': fmt,
+            'bytes': len(data),
+        })
+    metadata = {'source': truck.image.name, 'variants': variants}
+    FoodTruck.objects.filter(pk=truck.pk, image=truck.image.name).update(
+        image_variants=metadata
+    )
+    truck.image_variants = metadata
+    bump(*truck_scopes((truck.city, truck.cuisine)))
+    refresh_truck_pages([truck.pk])
+    return metadata
+
+
+def process_truck_image(truck_id):
+    """Render and store variants for one truck; returns the metadata."""
+    from .models import FoodTruck
+
+    truck = FoodTruck.objects.filter(pk=truck_id).first()
+    if truck is None or not truck.image:
+        return None
+    with truck.image.open('rb') as source:
+        data = source.read()
+    return store_variants(truck, render_variants(data, variant_widths()))
+
+
+def schedule_image_processing(truck):
+    """
+    Queue variant generation for ``truck`` on the task queue; the task row
+    commits with the upload that caused it.
+
+    ``DIRECTORY_IMAGE_PROCESSING = 'sync'`` renders inline instead, which is
+    what the tests use.
+    """
+    if getattr(settings, 'DIRECTORY_IMAGE_PROCESSING', 'queue') == 'sync':
+        process_truck_image(truck.pk)
+        return
+    enqueue('images.process', {'truck_id': truck.pk},
+            unique_key=f'images.process:{truck.pk}')
+
+
+def srcset(truck, fmt):
+    """``srcset`` attribute value for one format, smallest width first."""
+    variants = (truck.image_variants or {}).get('variants', [])
+    return ', '.join(
+        f"{default_storage.url(v['name'])} {v['width']}w"
+        for v in sorted(variants, key=lambda v: v['width'])
+        if v['format'] == fmt
+    )
+
+
+def picture_sources(truck):
+    """
+    What a ``<picture>`` for the truck's image needs: both srcsets and the
+    smallest JPEG as the ``<img>`` fallback, with its dimensions. The
+    fallback is ``None`` until variants have been generated.
+    """
+    variants = (truck.image_variants or {}).get('variants', [])
+    jpeg = [v for v in variants if v['format'] == 'jpeg']
+    fallback = min(jpeg, key=lambda v: v['width']) if jpeg else None
+    return {
+        'webp_srcset': srcset(truck, 'webp'),
+        'jpeg_srcset': srcset(truck, 'jpeg'),
+        'fallback': {'width': fallback['width'], 'height': fallback['height']} if fallback else None,
+        'fallback_url': default_storage.url(fallback['name']) if fallback else None,
+    }
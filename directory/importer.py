@@ -0,0 +1,297 @@
+"""
+Streaming bulk import of food trucks from CSV or NDJSON.
+
+Records are read one at a time, validated against the ``FoodTruck`` field
+definitions and written in batches with ``bulk_create``. Rows carrying an
+``external_id`` are upserted on it; rows without one are always inserted.
+Each batch commits in its own transaction and is followed by a checkpoint,
+so an interrupted import resumes after the last committed line. Memory use
+is bounded by the batch size, not the file size.
+
+With ``defer_refresh`` the search, duplicate and page data are not updated
+batch by batch but rebuilt once the last batch is written; until then new
+rows are in the directory but not yet searchable.
+"""
+
+import csv
+import json
+import os
+import sys
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+
+from .facets import rebuild_facet_counts
+from .models import FoodTruck
+from .signals import refresh_all_trucks, refresh_bulk_trucks
+
+IMPORT_FIELDS = [
+    'external_id', 'name', 'city', 'cuisine', 'description', 'website',
+    'latitude', 'longitude',
+]
+UPSERT_FIELDS = [name for name in IMPORT_FIELDS if name != 'external_id'] + ['social_links']
+SOCIAL_PREFIX = 'social_'
+
+_validate_url = URLValidator()
+
+
+class ImportFormatError(ValueError):
+    """Raised for input that is not CSV or NDJSON."""
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.ndjson', '.jsonl', '.json'):
+        return 'ndjson'
+    raise ImportFormatError(f'Cannot tell the format of {path!r}; pass --format')
+
+
+def iter_records(stream, fmt):
+    """
+    Yield ``(line_number, record)`` from an open text stream.
+
+    NDJSON lines that are not JSON objects are yielded as ``ValueError``
+    instances so the caller can report them against their line.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield line_number, ValueError(f'Invalid JSON: {exc}')
+            continue
+        if not isinstance(record, dict):
+            yield line_number, ValueError('Each line must be a JSON object')
+            continue
+        yield line_number, record
+
+
+def clean_social_links(value):
+    """
+    Validate the ``social_links`` shape: a flat ``{platform: url}`` object.
+
+    Accepts a dict or a JSON string (as CSV cells carry it).
+    """
+    if value in (None, ''):
+        return None
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise ValidationError('Must be a JSON object of platform to URL.')
+    if not isinstance(value, dict):
+        raise ValidationError('Must be an object mapping platform names to URLs.')
+    cleaned = {}
+    for platform, url in value.items():
+        if not isinstance(platform, str) or not platform.strip():
+            raise ValidationError('Platform names must be non-empty strings.')
+        if not isinstance(url, str):
+            raise ValidationError(f'{platform}: URL must be a string.')
+        try:
+            _validate_url(url)
+        except ValidationError:
+            raise ValidationError(f'{platform}: {url!r} is not a valid URL.')
+        cleaned[platform.strip().lower()] = url
+    return cleaned
+
+
+def clean_record(record):
+    """
+    Validate one raw record and return ``FoodTruck`` field values.
+
+    Each field goes through the model field's own ``clean()``, so
+    ``max_length``, ``URLField`` and coordinate range rules are the same as
+    in forms and the admin. Raises ``ValidationError`` with a field map.
+    """
+    errors = {}
+    values = {}
+    for name in IMPORT_FIELDS:
+        model_field = FoodTruck._meta.get_field(name)
+        raw = record.get(name)
+        if isinstance(raw, str):
+            raw = raw.strip()
+        if raw in (None, '') and model_field.null:
+            values[name] = None
+            continue
+        try:
+            values[name] = model_field.clean(raw if raw is not None else '', None)
+        except ValidationError as exc:
+            errors[name] = exc.messages
+
+    social = record.get('social_links')
+    if social in (None, ''):
+        # CSV files may spread links over social_<platform> columns.
+        columns = {
+            key[len(SOCIAL_PREFIX):]: value.strip()
+            for key, value in record.items()
+            if key and key.startswith(SOCIAL_PREFIX) and isinstance(value, str) and value.strip()
+        }
+        social = columns or None
+    try:
+        values['social_links'] = clean_social_links(social)
+    except ValidationError as exc:
+        errors['social_links'] = exc.messages
+
+    if errors:
+        raise ValidationError(errors)
+    return values
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    imported: int = 0
+    failed: int = 0
+    skipped: int = 0
+    last_line: int = 0
+
+
+class Checkpoint:
+    """Progress marker persisted after each committed batch."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, source):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path) as handle:
+            state = json.load(handle)
+        if state.get('source') != source:
+            return 0
+        return int(state.get('line', 0))
+
+    def save(self, source, stats):
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as handle:
+            json.dump({
+                'source': source,
+                'line': stats.last_line,
+                'imported': stats.imported,
+                'failed': stats.failed,
+            }, handle)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class TruckImporter:
+    """
+    Validate and write records in batches.
+
+    ``error_writer`` is a ``csv.writer`` receiving one row per invalid field:
+    ``line, external_id, field, message``.
+    """
+
+    def __init__(self, batch_size=2000, checkpoint=None, error_writer=None,
+                 dry_run=False, source='', defer_refresh=False):
+        self.batch_size = batch_size
+        # A dry run validates every line and leaves any checkpoint alone.
+        self.checkpoint = checkpoint if checkpoint and not dry_run else Checkpoint(None)
+        self.error_writer = error_writer
+        self.dry_run = dry_run
+        self.source = source
+        self.defer_refresh = defer_refresh
+        self.stats = ImportStats()
+        self._batch = []
+        # (city, cuisine) pairs upserted trucks moved away from, for the
+        # deferred refresh.
+        self._previous_listings = set()
+
+    def run(self, records):
+        resume_after = self.checkpoint.load(self.source)
+        for line_number, record in records:
+            if line_number <= resume_after:
+                self.stats.skipped += 1
+                continue
+            self.stats.read += 1
+            try:
+                if isinstance(record, Exception):
+                    raise ValidationError({'__all__': [str(record)]})
+                values = clean_record(record)
+            except ValidationError as exc:
+                self._record_error(line_number, record, exc)
+            else:
+                self._batch.append(values)
+            self.stats.last_line = line_number
+            if len(self._batch) >= self.batch_size:
+                self.flush()
+        self.flush()
+        if not self.dry_run:
+            if self.defer_refresh:
+                # Also covers rows committed before a resume.
+                refresh_all_trucks(self._previous_listings)
+            # Bulk writes skip the incremental facet counters.
+            rebuild_facet_counts()
+            self.checkpoint.clear()
+        return self.stats
+
+    def _record_error(self, line_number, record, exc):
+        self.stats.failed += 1
+        external_id = record.get('external_id', '') if isinstance(record, dict) else ''
+        for field_name, messages in exc.message_dict.items():
+            for message in messages:
+                if self.error_writer:
+                    self.error_writer.writerow([line_number, external_id, field_name, message])
+
+    def flush(self):
+        batch, self._batch = self._batch, []
+        if not self.dry_run and batch:
+            with transaction.atomic():
+                self.stats.imported += self.write(batch)
+        if not self.dry_run:
+            self.checkpoint.save(self.source, self.stats)
+
+    def write(self, batch):
+        # Last row wins when one external_id repeats inside a batch.
+        keyed = {}
+        unkeyed = []
+        for values in batch:
+            if values['external_id']:
+                keyed[values['external_id']] = values
+            else:
+                unkeyed.append(values)
+
+        previous = list(
+            FoodTruck.objects.filter(external_id__in=list(keyed))
+            .values_list('city', 'cuisine')
+        ) if keyed else []
+
+        trucks = []
+        if keyed:
+            trucks += FoodTruck.objects.bulk_create(
+                [FoodTruck(**values) for values in keyed.values()],
+                update_conflicts=True,
+                unique_fields=['external_id'],
+                update_fields=UPSERT_FIELDS,
+            )
+        if unkeyed:
+            trucks += FoodTruck.objects.bulk_create(
+                [FoodTruck(**values) for values in unkeyed]
+            )
+        if self.defer_refresh:
+            self._previous_listings.update(previous)
+        else:
+            refresh_bulk_trucks(trucks, previous)
+        return len(batch)
+
+
+def open_source(path):
+    """Open ``path`` for streaming text reads; ``-`` is stdin."""
+    if path == '-':
+        return sys.stdin
+    return open(path, newline='', encoding='utf-8-sig')
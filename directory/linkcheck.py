@@ -0,0 +1,407 @@
+"""
+Health checks for truck websites and social links.
+
+``check_links()`` (``manage.py check_links``) gathers every truck's
+``website`` and ``social_links`` URLs, fetches each distinct URL once,
+however many trucks share it, and stores one ``LinkCheck`` row per truck
+and link. Rows for links a truck no longer has are deleted.
+
+Fetching runs on asyncio. There is no async HTTP client among our
+dependencies, so ``LinkChecker`` speaks just enough HTTP/1.1 over asyncio
+streams for a health check:
+
+* at most ``concurrency`` requests are in flight, and at most ``per_host``
+  of them to any one host, so a host holding most of the links (Instagram)
+  neither gets hammered nor takes every slot. URLs are queued round-robin
+  across hosts for the same reason;
+* keep-alive connections are parked per host and reused; bodies are read
+  (up to ``MAX_DRAIN_BYTES``) only so the connection can be;
+* every request, each redirect hop included, gets ``timeout`` seconds;
+* the ETag and Last-Modified of the previous check are sent back, so an
+  unchanged page answers 304 with no body and reruns cost little more
+  than the round trips.
+
+401, 403 and 429 answers are recorded as ``blocked`` rather than broken:
+social sites send them to anything that looks like a bot.
+"""
+
+import asyncio
+import ssl
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from urllib.parse import quote, urljoin, urlsplit
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import FoodTruck, LinkCheck
+
+DEFAULT_CONCURRENCY = 200
+DEFAULT_PER_HOST = 4
+DEFAULT_TIMEOUT = 10.0
+MAX_REDIRECTS = 5
+# Larger or unbounded bodies are cut off by closing the connection instead.
+MAX_DRAIN_BYTES = 256 * 1024
+# Checks started ahead of those running, per request slot.
+BACKLOG_PER_SLOT = 4
+BLOCKED_STATUSES = frozenset({401, 403, 429})
+FAILING_OUTCOMES = frozenset({LinkCheck.BROKEN, LinkCheck.ERROR})
+MAX_URL_LENGTH = 2000
+USER_AGENT = 'TriangleStreetEats-LinkChecker/1.0'
+WRITE_BATCH_SIZE = 1000
+RESULT_FIELDS = [
+    'source', 'outcome', 'status_code', 'error', 'final_url', 'etag', 'last_modified',
+    'elapsed_ms', 'checked_at', 'failing_since',
+]
+
+
+def linkcheck_settings():
+    return {
+        'concurrency': getattr(settings, 'DIRECTORY_LINKCHECK_CONCURRENCY', DEFAULT_CONCURRENCY),
+        'per_host': getattr(settings, 'DIRECTORY_LINKCHECK_PER_HOST', DEFAULT_PER_HOST),
+        'timeout': getattr(settings, 'DIRECTORY_LINKCHECK_TIMEOUT', DEFAULT_TIMEOUT),
+    }
+
+
+class ProtocolError(Exception):
+    """The server's response was not HTTP we understand."""
+
+
+@dataclass
+class Response:
+    status: int
+    headers: dict
+    url: str
+    # Time spent on requests, redirects included, but not waiting for a slot.
+    elapsed: float
+
+
+@dataclass
+class Result:
+    url: str
+    outcome: str
+    status_code: int = None
+    error: str = ''
+    final_url: str = ''
+    etag: str = ''
+    last_modified: str = ''
+    elapsed_ms: int = None
+
+
+def outcome_for(status):
+    if 200 <= status < 300 or status == 304:
+        return LinkCheck.OK
+    if status in BLOCKED_STATUSES:
+        return LinkCheck.BLOCKED
+    return LinkCheck.BROKEN
+
+
+def describe(exc):
+    return (f'{type(exc).__name__}: {exc}' if str(exc) else type(exc).__name__)[:200]
+
+
+def split_url(url):
+    """``((scheme, host, port), target, host header)``, or ``None`` if unsupported."""
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+        host = parts.hostname.encode('idna').decode('ascii') if parts.hostname else ''
+    except (ValueError, UnicodeError):
+        return None
+    if parts.scheme not in ('http', 'https') or not host:
+        return None
+    default_port = 443 if parts.scheme == 'https' else 80
+    target = quote(parts.path or '/', safe="/%:@!$&'()*+,;=-._~")
+    if parts.query:
+        target += '?' + quote(parts.query, safe="/%:@!$&'()*+,;=-._~?")
+    host_header = host if port in (None, default_port) else f'{host}:{port}'
+    return (parts.scheme, host, port or default_port), target, host_header
+
+
+class LinkChecker:
+    """
+    Checks URLs concurrently over reused connections; see the module
+    docstring. Create and use it inside one event loop.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST,
+                 timeout=DEFAULT_TIMEOUT, ssl_context=None):
+        self.concurrency = concurrency
+        self.slots = asyncio.Semaphore(concurrency)
+        self.host_slots = defaultdict(lambda: asyncio.Semaphore(per_host))
+        self.idle = defaultdict(list)
+        self.timeout = timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self.connections_opened = 0
+
+    async def check_all(self, targets):
+        """
+        Check ``(url, etag, last_modified)`` targets, yielding ``Result``\\ s
+        as they finish. Only a bounded backlog of checks exists at a time.
+        """
+        backlog = self.concurrency * BACKLOG_PER_SLOT
+        pending = set()
+        for url, etag, last_modified in targets:
+            if len(pending) >= backlog:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            pending.add(asyncio.create_task(self.check(url, etag, last_modified)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+
+    async def check(self, url, etag='', last_modified=''):
+        """Fetch ``url``, following redirects; never raises for network trouble."""
+        validators = {'etag': etag, 'last_modified': last_modified}
+        try:
+            response = await self.fetch(url, etag, last_modified)
+        except TimeoutError:
+            result = Result(url, LinkCheck.ERROR, error='Timed out', **validators)
+        except (OSError, EOFError, ValueError, ProtocolError) as exc:
+            result = Result(url, LinkCheck.ERROR, error=describe(exc), **validators)
+        else:
+            if response.status != 304:
+                validators = {'etag': response.headers.get('etag', ''),
+                              'last_modified': response.headers.get('last-modified', '')}
+            result = Result(
+                url, outcome_for(response.status), status_code=response.status,
+                final_url=response.url if response.url != url else '',
+                elapsed_ms=round(response.elapsed * 1000), **validators,
+            )
+        return result
+
+    async def fetch(self, url, etag='', last_modified=''):
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        elapsed = 0.0
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = split_url(url)
+            if parts is None:
+                raise ProtocolError(f'Not an http(s) URL: {url[:100]}')
+            key = parts[0]
+            async with self.host_slots[key[1]], self.slots:
+                started = time.perf_counter()
+                async with asyncio.timeout(self.timeout):
+                    status, response_headers = await self.request(*parts, headers)
+                elapsed += time.perf_counter() - started
+            location = response_headers.get('location')
+            if status not in (301, 302, 303, 307, 308) or not location:
+                return Response(status, response_headers, url, elapsed)
+            url = urljoin(url, location)
+        raise ProtocolError('Too many redirects')
+
+    async def request(self, key, target, host_header, headers):
+        lines = [
+            f'GET {target} HTTP/1.1', f'Host: {host_header}', f'User-Agent: {USER_AGENT}',
+            'Accept: */*', 'Accept-Encoding: identity', 'Connection: keep-alive',
+        ]
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        message = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        while True:
+            reader, writer, reused = await self.connect(key)
+            try:
+                writer.write(message)
+                await writer.drain()
+                status, response_headers, reusable = await self.read_response(reader)
+            except (OSError, EOFError, ProtocolError):
+                writer.close()
+                # The server may have closed a parked connection; try a new one.
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if reusable:
+                self.idle[key].append((reader, writer))
+            else:
+                writer.close()
+            return status, response_headers
+
+    async def connect(self, key):
+        idle = self.idle[key]
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer, True
+            writer.close()
+        scheme, host, port = key
+        tls = scheme == 'https'
+        reader, writer = await asyncio.open_connection(
+            host, port, ssl=self.ssl_context if tls else None,
+            server_hostname=host if tls else None,
+        )
+        self.connections_opened += 1
+        return reader, writer, False
+
+    async def read_response(self, reader):
+        """``(status, headers, reusable)``; reads the body only to reuse the connection."""
+        while True:
+            status_line = await reader.readline()
+            if not status_line:
+                raise ProtocolError('Connection closed before a response')
+            parts = status_line.decode('latin-1').split(None, 2)
+            if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+                raise ProtocolError(f'Bad status line: {status_line[:50]!r}')
+            version, status = parts[0], int(parts[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n'):
+                    break
+                if not line:
+                    raise ProtocolError('Connection closed in the headers')
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            # Skip "100 Continue" and other interim responses.
+            if not 100 <= status < 200:
+                break
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = 'close' not in connection if version == 'HTTP/1.1' else (
+            'keep-alive' in connection
+        )
+        if status in (204, 304):
+            return status, headers, keep_alive
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            return status, headers, keep_alive and await self.drain_chunked(reader)
+        length = headers.get('content-length')
+        if length is None or not length.isdigit() or int(length) > MAX_DRAIN_BYTES:
+            return status, headers, False
+        await reader.readexactly(int(length))
+        return status, headers, keep_alive
+
+    async def drain_chunked(self, reader):
+        total = 0
+        while True:
+            size = int((await reader.readline()).split(b';')[0].strip(), 16)
+            if size == 0:
+                # Trailers, up to the blank line.
+                while (await reader.readline()).strip():
+                    pass
+                return True
+            total += size
+            if total > MAX_DRAIN_BYTES:
+                return False
+            await reader.readexactly(size + 2)
+
+    async def close(self):
+        writers = [writer for idle in self.idle.values() for _, writer in idle]
+        self.idle.clear()
+        for writer in writers:
+            writer.close()
+        await asyncio.gather(*(writer.wait_closed() for writer in writers),
+                             return_exceptions=True)
+
+
+def truck_links(truck_ids=None, using='default'):
+    """``(truck_id, source, url)`` for each link of each truck, in truck order."""
+    trucks = FoodTruck.objects.using(using).order_by('pk')
+    if truck_ids:
+        trucks = trucks.filter(pk__in=truck_ids)
+    rows = trucks.values_list('pk', 'website', 'social_links').iterator(chunk_size=2000)
+    for pk, website, social_links in rows:
+        if website and website.strip():
+            yield pk, 'website', website.strip()
+        if isinstance(social_links, dict):
+            for platform, url in sorted(social_links.items()):
+                if isinstance(url, str) and url.strip():
+                    yield pk, str(platform)[:50], url.strip()
+
+
+def interleave_by_host(urls):
+    """``urls`` reordered round-robin across their hosts."""
+    by_host = defaultdict(deque)
+    for url in urls:
+        by_host[(urlsplit(url).hostname or '').lower()].append(url)
+    queues = deque(by_host.values())
+    while queues:
+        queue = queues.popleft()
+        yield queue.popleft()
+        if queue:
+            queues.append(queue)
+
+
+async def run_checks(targets, **options):
+    checker = LinkChecker(**options)
+    try:
+        results = [result async for result in checker.check_all(targets)]
+    finally:
+        await checker.close()
+    return results, checker.connections_opened
+
+
+def check_links(truck_ids=None, recheck_after=None, concurrency=None, per_host=None,
+                timeout=None, using='default'):
+    """
+    Check every truck's links (or those of ``truck_ids``) and store a
+    ``LinkCheck`` per truck and link. Links checked less than
+    ``recheck_after`` ago are skipped. Returns counts by outcome, plus
+    ``urls``, ``skipped`` and ``connections``.
+    """
+    config = linkcheck_settings()
+    now = timezone.now()
+    sources, trucks_by_url = {}, defaultdict(list)
+    for truck_id, source, url in truck_links(truck_ids, using):
+        if (truck_id, url) not in sources and len(url) <= MAX_URL_LENGTH:
+            sources[(truck_id, url)] = source
+            trucks_by_url[url].append(truck_id)
+
+    checks = LinkCheck.objects.using(using)
+    if truck_ids:
+        checks = checks.filter(truck_id__in=truck_ids)
+    previous = {(row.truck_id, row.url): row for row in checks}
+    removed = [row.pk for key, row in previous.items() if key not in sources]
+    for start in range(0, len(removed), WRITE_BATCH_SIZE):
+        LinkCheck.objects.using(using).filter(pk__in=removed[start:start + WRITE_BATCH_SIZE]).delete()
+
+    fresh_after = now - recheck_after if recheck_after else None
+    targets, skipped = [], 0
+    for url in interleave_by_host(trucks_by_url):
+        rows = [previous[key] for key in ((pk, url) for pk in trucks_by_url[url]) if key in previous]
+        if fresh_after and len(rows) == len(trucks_by_url[url]) and all(
+            row.checked_at >= fresh_after for row in rows
+        ):
+            skipped += 1
+            continue
+        known = next((row for row in rows if row.etag or row.last_modified), None)
+        targets.append((url, known.etag if known else '', known.last_modified if known else ''))
+
+    results, connections = asyncio.run(run_checks(
+        targets,
+        concurrency=concurrency or config['concurrency'],
+        per_host=per_host or config['per_host'],
+        timeout=timeout or config['timeout'],
+    ))
+
+    # Trucks deleted while the checks ran are left out.
+    existing = set(FoodTruck.objects.using(using).values_list('pk', flat=True))
+    summary = defaultdict(int, urls=len(results), skipped=skipped, connections=connections)
+    rows = []
+    for result in results:
+        summary[result.outcome] += 1
+        for truck_id in trucks_by_url[result.url]:
+            if truck_id not in existing:
+                continue
+            old = previous.get((truck_id, result.url))
+            failing_since = None
+            if result.outcome in FAILING_OUTCOMES:
+                failing_since = (old and old.failing_since) or now
+            rows.append(LinkCheck(
+                truck_id=truck_id, url=result.url, source=sources[(truck_id, result.url)],
+                outcome=result.outcome, status_code=result.status_code, error=result.error,
+                final_url=result.final_url[:MAX_URL_LENGTH], etag=result.etag[:200],
+                last_modified=result.last_modified[:64], elapsed_ms=result.elapsed_ms,
+                checked_at=now, failing_since=failing_since,
+            ))
+    LinkCheck.objects.using(using).bulk_create(
+        rows, batch_size=WRITE_BATCH_SIZE, update_conflicts=True,
+        unique_fields=['truck', 'url'], update_fields=RESULT_FIELDS,
+    )
+    return dict(summary)
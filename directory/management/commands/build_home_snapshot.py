@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from directory.home_snapshot import refresh_snapshot
+from directory.taskqueue import enqueue
+
+
+class Command(BaseCommand):
+    help = (
+        'Rank the featured and trending trucks for the home page and publish '
+        'the snapshot to the cache (and the snapshot file, when configured).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--schedule', action='store_true',
+            help='Queue the home.snapshot task, which then reruns itself, and exit.',
+        )
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to use (default: "default").',
+        )
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            enqueue('home.snapshot', unique_key='home.snapshot', using=options['database'])
+            self.stdout.write(self.style.SUCCESS('Queued home.snapshot'))
+            return
+        start = time.perf_counter()
+        snapshot = refresh_snapshot(using=options['database'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Published {len(snapshot["featured"])} featured and '
+            f'{len(snapshot["trending"])} trending trucks in {elapsed:.2f}s'
+        ))
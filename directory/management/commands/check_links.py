@@ -0,0 +1,61 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from directory.linkcheck import check_links, linkcheck_settings
+from directory.models import LinkCheck
+
+
+class Command(BaseCommand):
+    help = (
+        'Check every truck website and social link concurrently and store '
+        'each result per truck; reruns send conditional requests.'
+    )
+
+    def add_arguments(self, parser):
+        config = linkcheck_settings()
+        parser.add_argument(
+            '--truck', type=int, action='append', dest='truck_ids',
+            help='Only check this truck id (repeatable).',
+        )
+        parser.add_argument(
+            '--recheck-after', type=float, default=0, metavar='HOURS',
+            help='Skip links checked less than this many hours ago (default: check all).',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=config['concurrency'],
+            help=f'Requests in flight (default: {config["concurrency"]}).',
+        )
+        parser.add_argument(
+            '--per-host', type=int, default=config['per_host'],
+            help=f'Requests in flight to any one host (default: {config["per_host"]}).',
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=config['timeout'],
+            help=f'Seconds allowed per request (default: {config["timeout"]}).',
+        )
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to use (default: "default").',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        recheck_after = options['recheck_after']
+        summary = check_links(
+            truck_ids=options['truck_ids'],
+            recheck_after=timedelta(hours=recheck_after) if recheck_after else None,
+            concurrency=options['concurrency'],
+            per_host=options['per_host'],
+            timeout=options['timeout'],
+            using=options['database'],
+        )
+        elapsed = time.perf_counter() - start
+        outcomes = ', '.join(
+            f'{summary.get(outcome, 0)} {outcome}' for outcome, _ in LinkCheck.OUTCOMES
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {summary["urls"]} URLs ({outcomes}), skipped {summary["skipped"]}, '
+            f'over {summary["connections"]} connections in {elapsed:.2f}s'
+        ))
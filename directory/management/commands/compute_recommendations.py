@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from directory.recommendations import DEFAULT_BLOCK_SIZE, compute_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Score trucks for every website user from their profile preferences '
+        'and store each user\'s top picks for the home page.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--block-size', type=int, default=DEFAULT_BLOCK_SIZE,
+            help='Users scored per NumPy block; bounds peak memory '
+                 f'(default: {DEFAULT_BLOCK_SIZE}).',
+        )
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='Only recompute this user id (repeatable).',
+        )
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to use (default: "default").',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        stored, cleared = compute_recommendations(
+            user_ids=options['user_ids'],
+            block_size=options['block_size'],
+            using=options['database'],
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored recommendations for {stored} users, cleared {cleared}, '
+            f'in {elapsed:.2f}s'
+        ))
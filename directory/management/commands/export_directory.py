@@ -0,0 +1,49 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from directory.exports import FORMATS, export_stream
+from directory.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream the truck directory or the user list (with profile fields) '
+        'to CSV or NDJSON, optionally gzip-compressed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=['trucks', 'users'])
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument(
+            '--role', choices=[role for role, _ in CustomUser.USER_ROLES],
+            help='Only export users with this role.',
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='Destination file (default: stdout).',
+        )
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output.')
+
+    def handle(self, *args, **options):
+        filters = {'role': options['role']} if options['dataset'] == 'users' else {}
+        chunks = export_stream(
+            options['dataset'], options['format'], compress=options['gzip'], **filters
+        )
+        start = time.perf_counter()
+        written = 0
+        if options['output'] == '-':
+            target = sys.stdout.buffer
+            for chunk in chunks:
+                target.write(chunk)
+            target.flush()
+            return
+        with open(options['output'], 'wb') as target:
+            for chunk in chunks:
+                target.write(chunk)
+                written += len(chunk)
+        elapsed = time.perf_counter() - start
+        self.stderr.write(self.style.SUCCESS(
+            f'Wrote {written / 1024:.0f} KiB to {options["output"]} in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,134 @@
+import csv
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from directory.importer import (
+    Checkpoint, ImportFormatError, TruckImporter, detect_format, iter_records, open_source,
+)
+from directory.taskqueue import enqueue
+
+ERROR_HEADER = ['line', 'external_id', 'field', 'message']
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import food trucks from a CSV or NDJSON file, streaming rows in '
+        'batched transactions. Rows with an external_id are upserted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file, or - for stdin.')
+        parser.add_argument(
+            '--format', choices=['csv', 'ndjson'],
+            help='Input format (default: inferred from the file extension).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Rows written per transaction (default: 2000).',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Progress file used to resume (default: <path>.checkpoint.json).',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore an existing checkpoint and start from the first row.',
+        )
+        parser.add_argument(
+            '--errors',
+            help='CSV report of rejected rows (default: <path>.errors.csv).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Validate every row and report errors without writing.',
+        )
+        parser.add_argument(
+            '--defer-refresh', action='store_true',
+            help='Rebuild the search, duplicate and page data once after the last '
+                 'batch instead of after each one (faster for large files).',
+        )
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Queue the import for run_workers instead of running it now.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = max(1, options['batch_size'])
+        try:
+            fmt = options['format'] or detect_format(path)
+        except ImportFormatError as exc:
+            raise CommandError(str(exc))
+        if path != '-' and not os.path.exists(path):
+            raise CommandError(f'No such file: {path}')
+
+        stem = 'import' if path == '-' else path
+        checkpoint_path = None if path == '-' else (
+            options['checkpoint'] or f'{stem}.checkpoint.json'
+        )
+        # A dry run neither resumes from nor touches the checkpoint.
+        checkpoint = Checkpoint(None if options['dry_run'] else checkpoint_path)
+        if options['restart']:
+            checkpoint.clear()
+        if options['background']:
+            self.enqueue(path, fmt, batch_size, checkpoint_path, options)
+            return
+        source = os.path.abspath(path) if path != '-' else '-'
+        resuming = checkpoint.load(source) > 0
+
+        errors_path = options['errors'] or f'{stem}.errors.csv'
+        # A resumed run keeps the rejects already reported for earlier lines.
+        errors_mode = 'a' if resuming and os.path.exists(errors_path) else 'w'
+
+        start = time.perf_counter()
+        with open(errors_path, errors_mode, newline='') as errors_file:
+            error_writer = csv.writer(errors_file)
+            if errors_mode == 'w':
+                error_writer.writerow(ERROR_HEADER)
+            importer = TruckImporter(
+                batch_size=batch_size,
+                checkpoint=checkpoint,
+                error_writer=error_writer,
+                dry_run=options['dry_run'],
+                source=source,
+                defer_refresh=options['defer_refresh'],
+            )
+            stream = open_source(path)
+            try:
+                stats = importer.run(iter_records(stream, fmt))
+            finally:
+                if path != '-':
+                    stream.close()
+
+        elapsed = time.perf_counter() - start
+        rate = stats.read / elapsed if elapsed else 0.0
+        if stats.skipped:
+            self.stdout.write(f'Resumed from {checkpoint_path}: '
+                              f'skipped {stats.skipped} rows already imported')
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {stats.read - stats.failed} of {stats.read} rows '
+            f'({stats.failed} rejected) in {elapsed:.2f}s: {rate:.0f} rows/s'
+        ))
+        if stats.failed:
+            self.stdout.write(self.style.WARNING(f'Rejected rows written to {errors_path}'))
+
+    def enqueue(self, path, fmt, batch_size, checkpoint_path, options):
+        if path == '-':
+            raise CommandError('Only files can be imported in the background.')
+        kwargs = {
+            'format': fmt,
+            'batch_size': batch_size,
+            'checkpoint': os.path.abspath(checkpoint_path),
+            'dry_run': options['dry_run'],
+            'defer_refresh': options['defer_refresh'],
+        }
+        if options['errors']:
+            kwargs['errors'] = os.path.abspath(options['errors'])
+        # Retries of the task resume from the checkpoint rather than restarting.
+        enqueue('import_trucks', {'path': os.path.abspath(path), **kwargs})
+        self.stdout.write(self.style.SUCCESS(
+            f'Queued import of {path}; run_workers will pick it up.'
+        ))
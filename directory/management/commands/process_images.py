@@ -0,0 +1,98 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from directory.images import needs_processing, render_variants, store_variants, variant_widths
+from directory.models import FoodTruck
+
+
+class Command(BaseCommand):
+    help = (
+        'Backfill thumbnail and WebP variants for existing food truck images, '
+        'rendering in parallel across CPU cores.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Rendering processes (default: one per core; 1 renders inline).',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Re-render trucks that already have up-to-date variants.',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        trucks = (
+            FoodTruck.objects.exclude(image='').exclude(image__isnull=True)
+            .only('id', 'city', 'cuisine', 'image', 'image_variants')
+            .order_by('pk')
+        )
+        pending = (
+            truck for truck in trucks.iterator(chunk_size=500)
+            if options['force'] or needs_processing(truck)
+        )
+
+        start = time.perf_counter()
+        processed = failed = output_bytes = 0
+        widths = variant_widths()
+
+        def finish(truck, rendered):
+            nonlocal processed, output_bytes
+            store_variants(truck, rendered)
+            processed += 1
+            output_bytes += sum(len(data) for *_, data in rendered)
+
+        def report_failure(truck, exc):
+            nonlocal failed
+            failed += 1
+            self.stderr.write(f'Truck {truck.pk} ({truck.image.name}): {exc}')
+
+        if workers == 1:
+            for truck in pending:
+                try:
+                    finish(truck, render_variants(self.read(truck), widths))
+                except Exception as exc:
+                    report_failure(truck, exc)
+        else:
+            # Only the pure rendering runs in the pool; storage and DB writes
+            # stay in this process. In-flight work is capped so memory stays
+            # flat however many images there are.
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                in_flight = {}
+                for truck in pending:
+                    try:
+                        future = pool.submit(render_variants, self.read(truck), widths)
+                    except Exception as exc:
+                        report_failure(truck, exc)
+                        continue
+                    in_flight[future] = truck
+                    if len(in_flight) >= workers * 2:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        self.collect(done, in_flight, finish, report_failure)
+                self.collect(list(in_flight), in_flight, finish, report_failure)
+
+        elapsed = time.perf_counter() - start
+        rate = processed / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} images ({failed} failed) in {elapsed:.2f}s '
+            f'with {workers} worker(s): {rate:.1f} images/s, '
+            f'{output_bytes / 1024:.0f} KiB of variants written'
+        ))
+
+    @staticmethod
+    def read(truck):
+        with truck.image.open('rb') as source:
+            return source.read()
+
+    @staticmethod
+    def collect(futures, in_flight, finish, report_failure):
+        for future in futures:
+            truck = in_flight.pop(future)
+            try:
+                finish(truck, future.result())
+            except Exception as exc:
+                report_failure(truck, exc)
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from directory.facets import rebuild_facet_counts
+from directory.models import FoodTruck
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the directory facet counts from scratch, e.g. after bulk '
+        'writes that bypassed the model signals.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to rebuild (default: "default").',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        start = time.perf_counter()
+        # Re-derive the denormalized verification first; updates made with
+        # QuerySet.update() may have skipped it.
+        trucks = FoodTruck.objects.using(using)
+        trucks.filter(owner__is_verified=True).update(is_verified=True)
+        trucks.exclude(owner__is_verified=True).update(is_verified=False)
+        cells = rebuild_facet_counts(using)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {cells} facet cells in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from directory.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the food truck full-text search index in bulk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Trucks read and indexed per batch (default: 2000).',
+        )
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to rebuild (default: "default").',
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend(options['database'])
+        start = time.perf_counter()
+        total = backend.rebuild(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {total} trucks with {type(backend).__name__} in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from directory.truck_pages import BATCH_SIZE, rebuild_truck_pages
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild every truck detail page document, e.g. after deploying '
+        'template data changes or bulk writes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help=f'Pages built per transaction (default: {BATCH_SIZE}).',
+        )
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to rebuild (default: "default").',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        total = rebuild_truck_pages(options['batch_size'], options['database'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {total} truck pages in {elapsed:.2f}s'
+        ))
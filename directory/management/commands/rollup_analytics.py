@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from directory.analytics import ROLLUP_DAYS, flush_events, rollup_page_views
+from directory.taskqueue import enqueue
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold recent page-view and click events into the daily counts the '
+        'owner dashboard shows, and prune raw events past retention.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=ROLLUP_DAYS,
+            help=f'Days to recount, today included (default: {ROLLUP_DAYS}).',
+        )
+        parser.add_argument(
+            '--schedule', action='store_true',
+            help='Queue the analytics.rollup task, which then reruns itself, and exit.',
+        )
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to use (default: "default").',
+        )
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            enqueue('analytics.rollup', unique_key='analytics.rollup', using=options['database'])
+            self.stdout.write(self.style.SUCCESS('Queued analytics.rollup'))
+            return
+        start = time.perf_counter()
+        flush_events(using=options['database'])
+        events, rows, pruned = rollup_page_views(
+            days=options['days'], using=options['database'],
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up {events} events into {rows} daily rows, pruned {pruned}, '
+            f'in {elapsed:.2f}s'
+        ))
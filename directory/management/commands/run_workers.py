@@ -0,0 +1,137 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from directory.taskqueue import (
+    DEFAULT_BATCH_SIZE, autodiscover, purge_finished, queue_stats, run_threads,
+)
+
+
+def serve_process(threads, batch_size, idle_sleep, once, using):
+    """Entry point of a forked worker process; stops cleanly on SIGTERM."""
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_threads(threads, batch_size, idle_sleep, once, stop, using)
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background tasks (image variants, notifications, imports) from the '
+        'database task queue with a pool of worker processes and threads.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Worker processes (default: 1, which runs the threads in this process).',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Worker threads per process (default: 1).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help=f'Tasks claimed per round trip (default: {DEFAULT_BATCH_SIZE}).',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once no task is due.',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Seconds a worker waits when the queue is empty (default: 1).',
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Print queue depth and latency, then exit.',
+        )
+        parser.add_argument(
+            '--stats-interval', type=float, default=60.0,
+            help='Seconds between queue metrics in the log (default: 60).',
+        )
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to use (default: "default").',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if options['stats']:
+            self.print_stats(using)
+            return
+        autodiscover()
+        threads = max(1, options['threads'])
+        batch_size = max(1, options['batch_size'])
+        once, idle_sleep = options['once'], options['sleep']
+        stop = threading.Event()
+        previous_handler = signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        processes = max(1, options['processes'])
+        self.stdout.write(
+            f'Running {processes} process(es) x {threads} thread(s); pid {os.getpid()}'
+        )
+        start = time.perf_counter()
+        if processes == 1:
+            supervisor = threading.Thread(
+                target=run_threads, args=(threads, batch_size, idle_sleep, once, stop, using)
+            )
+            alive = supervisor.is_alive
+            supervisor.start()
+        else:
+            # Forked children must not share the parent's database connections.
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            children = [
+                context.Process(
+                    target=serve_process, name=f'task-process-{i}',
+                    args=(threads, batch_size, idle_sleep, once, using),
+                )
+                for i in range(processes)
+            ]
+            for child in children:
+                child.start()
+
+            def alive():
+                return any(child.is_alive() for child in children)
+
+        next_stats = time.monotonic() + options['stats_interval']
+        try:
+            while alive():
+                if stop.wait(0.5):
+                    break
+                if time.monotonic() >= next_stats:
+                    purge_finished(using=using)
+                    self.print_stats(using)
+                    next_stats = time.monotonic() + options['stats_interval']
+        except KeyboardInterrupt:
+            stop.set()
+        finally:
+            stop.set()
+            if processes == 1:
+                supervisor.join()
+            else:
+                for child in children:
+                    if child.is_alive():
+                        child.terminate()
+                for child in children:
+                    child.join()
+            signal.signal(signal.SIGTERM, previous_handler)
+        self.stdout.write(self.style.SUCCESS(
+            f'Workers stopped after {time.perf_counter() - start:.1f}s'
+        ))
+        self.print_stats(using)
+
+    def print_stats(self, using):
+        stats = queue_stats(using=using)
+        self.stdout.write(
+            f'queued={stats["queued"]} due={stats["due"]} running={stats["running"]} '
+            f'failed={stats["failed"]} oldest_due={stats["oldest_due_seconds"]:.1f}s '
+            f'finished_15m={stats["finished_in_window"]} '
+            f'wait p50/p95={stats["wait_p50"]:.3f}/{stats["wait_p95"]:.3f}s '
+            f'run p50/p95={stats["run_p50"]:.3f}/{stats["run_p95"]:.3f}s'
+        )
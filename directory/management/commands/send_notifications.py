@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from directory.notifications import notification_settings, run_worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Fan out new-truck notifications to interested users and email them, '
+        'rate limited. Several workers can run at once.'
+    )
+
+    def add_arguments(self, parser):
+        defaults = notification_settings()
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once nothing is left to fan out or send.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=defaults['batch_size'],
+            help=f'Users fanned out / emails claimed per step (default: {defaults["batch_size"]}).',
+        )
+        parser.add_argument(
+            '--rate', type=float, default=defaults['rate'],
+            help=f'Emails per second from this worker; 0 for no limit (default: {defaults["rate"]}).',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=5.0,
+            help='Seconds to wait when the queue is empty (default: 5).',
+        )
+        parser.add_argument(
+            '--database', default='default',
+            help='Database alias to use (default: "default").',
+        )
+
+    def handle(self, *args, **options):
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        totals = run_worker(
+            batch_size=options['batch_size'],
+            rate=options['rate'],
+            once=options['once'],
+            idle_sleep=options['sleep'],
+            using=options['database'],
+            log=log,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Queued {totals["queued"]} notifications; sent {totals["sent"]}, '
+            f'skipped {totals["skipped"]}, {totals["failed"]} failed'
+        ))
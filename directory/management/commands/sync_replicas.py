@@ -0,0 +1,43 @@
+import sqlite3
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from directory.routers import PRIMARY, replica_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database into the replica files, standing in '
+        'for replication when trying read routing locally.'
+    )
+
+    def handle(self, *args, **options):
+        primary = connections[PRIMARY]
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                f'{primary.vendor} replicas are kept current by the database server.'
+            )
+        aliases = replica_aliases()
+        if not aliases:
+            raise CommandError('No replicas configured; set DJANGO_DB_REPLICAS.')
+        primary.ensure_connection()
+        for alias in aliases:
+            target_name = connections[alias].settings_dict['NAME']
+            if Path(target_name).resolve() == Path(primary.settings_dict['NAME']).resolve():
+                self.stdout.write(f'{alias} reads the primary itself; nothing to copy')
+                continue
+            start = time.perf_counter()
+            # The online backup API copies a consistent snapshot even while
+            # the primary is being written to.
+            target = sqlite3.connect(target_name)
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(
+                f'Copied the primary to {alias} ({target_name}) in {elapsed:.2f}s'
+            ))
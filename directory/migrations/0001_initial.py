@@ -0,0 +1,84 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:14
+
+import django.contrib.auth.models
+import django.contrib.auth.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoodTruck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Name of the food truck', max_length=100)),
+                ('city', models.CharField(help_text='City where the food truck operates', max_length=50)),
+                ('cuisine', models.CharField(help_text='Type of cuisine served', max_length=50)),
+                ('description', models.TextField(blank=True, help_text='Description of the food truck and its offerings', null=True)),
+                ('website', models.URLField(blank=True, help_text='Food truck website URL', null=True)),
+                ('social_links', models.JSONField(blank=True, help_text='Social media links (Facebook, Instagram, Twitter, etc.)', null=True)),
+                ('image', models.ImageField(blank=True, help_text='Food truck image', null=True, upload_to='food_trucks/')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CustomUser',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='email address')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('role', models.CharField(choices=[('food_truck_owner', 'Food Truck Owner'), ('admin', 'Admin'), ('website_user', 'Website User')], default='website_user', help_text='User role type', max_length=20)),
+                ('phone_number', models.CharField(blank=True, help_text='Phone number for contact', max_length=15, null=True)),
+                ('address', models.TextField(blank=True, help_text='User address', null=True)),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions')),
+            ],
+            options={
+                'verbose_name': 'user',
+                'verbose_name_plural': 'users',
+                'abstract': False,
+            },
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FoodTruckOwnerProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_name', models.CharField(help_text='Name of the food truck business', max_length=100)),
+                ('business_license', models.CharField(blank=True, help_text='Business license number', max_length=50, null=True)),
+                ('cuisine_type', models.CharField(blank=True, help_text='Type of cuisine served', max_length=50, null=True)),
+                ('operating_hours', models.TextField(blank=True, help_text='Operating hours and schedule', null=True)),
+                ('is_verified', models.BooleanField(default=False, help_text='Whether the food truck is verified by admin')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='food_truck_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WebsiteUserProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dietary_preferences', models.CharField(blank=True, help_text='Dietary preferences (vegetarian, vegan, etc.)', max_length=100, null=True)),
+                ('favorite_cuisine_types', models.TextField(blank=True, help_text='Favorite types of cuisine', null=True)),
+                ('notification_preferences', models.BooleanField(default=True, help_text='Whether to receive notifications about new food trucks')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='website_user_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:14
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='foodtruck',
+            index=models.Index(fields=['city', 'cuisine', 'name'], name='foodtruck_city_cuisine_name'),
+        ),
+        migrations.AddIndex(
+            model_name='foodtruck',
+            index=models.Index(django.db.models.functions.text.Lower('city'), models.F('name'), models.F('id'), name='foodtruck_lcity_name_id'),
+        ),
+        migrations.AddIndex(
+            model_name='foodtruck',
+            index=models.Index(django.db.models.functions.text.Lower('city'), models.F('cuisine'), models.F('name'), models.F('id'), name='foodtruck_lcity_cuis_name_id'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from directory.search import PostgresSearchBackend, SQLiteFTSBackend
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        SQLiteFTSBackend.create_table(schema_editor)
+        schema_editor.execute(
+            'INSERT INTO directory_foodtruck_fts (rowid, name, cuisine, description) '
+            "SELECT id, name, cuisine, COALESCE(description, '') FROM directory_foodtruck"
+        )
+    elif vendor == 'postgresql':
+        FoodTruck = apps.get_model('directory', 'FoodTruck')
+        schema_editor.add_index(FoodTruck, PostgresSearchBackend.gin_index())
+
+
+def drop_search_index(apps, schema_editor):
+    from directory.search import PostgresSearchBackend, SQLiteFTSBackend
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        SQLiteFTSBackend.drop_table(schema_editor)
+    elif vendor == 'postgresql':
+        FoodTruck = apps.get_model('directory', 'FoodTruck')
+        schema_editor.remove_index(FoodTruck, PostgresSearchBackend.gin_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0002_foodtruck_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:25
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0003_foodtruck_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodtruck',
+            name='latitude',
+            field=models.FloatField(blank=True, help_text='Latitude of the usual serving location (WGS84 degrees)', null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='foodtruck',
+            name='longitude',
+            field=models.FloatField(blank=True, help_text='Longitude of the usual serving location (WGS84 degrees)', null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+    ]
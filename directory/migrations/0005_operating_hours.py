@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0004_foodtruck_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodtruck',
+            name='owner',
+            field=models.ForeignKey(blank=True, help_text='Owner profile that manages this truck', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trucks', to='directory.foodtruckownerprofile'),
+        ),
+        migrations.CreateModel(
+            name='EventSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField(help_text='When service starts')),
+                ('ends_at', models.DateTimeField(help_text='When service ends')),
+                ('location', models.CharField(blank=True, help_text='Where the truck will be', max_length=200)),
+                ('truck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='directory.foodtruck')),
+            ],
+            options={
+                'ordering': ['starts_at'],
+                'indexes': [models.Index(fields=['starts_at', 'ends_at', 'truck'], name='eventslot_interval')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OperatingHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')], help_text='Day the interval starts on')),
+                ('opens_at', models.TimeField(help_text='Opening time (local)')),
+                ('closes_at', models.TimeField(help_text='Closing time (local); at or before opening means after midnight')),
+                ('start_minute', models.PositiveIntegerField(editable=False, help_text='Minute of the week the interval starts (Monday 00:00 = 0)')),
+                ('end_minute', models.PositiveIntegerField(editable=False, help_text='Minute of the week the interval ends')),
+                ('truck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hours', to='directory.foodtruck')),
+            ],
+            options={
+                'verbose_name_plural': 'operating hours',
+                'ordering': ['truck', 'start_minute'],
+                'indexes': [models.Index(fields=['start_minute', 'end_minute', 'truck'], name='hours_week_interval')],
+            },
+        ),
+    ]
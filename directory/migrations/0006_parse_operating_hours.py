@@ -0,0 +1,44 @@
+"""
+Convert free-text ``FoodTruckOwnerProfile.operating_hours`` into
+``OperatingHours`` rows for the owner's trucks.
+
+``FoodTruck.owner`` is new in 0005 and starts out empty, and ownership
+grants edit rights, so it is never inferred here from matching names. On
+an existing database this migration therefore converts nothing: the text
+stays on the profile, and a truck takes the parsed hours when an admin
+first links it to the profile (``signals.adopt_owner_hours``). Trucks
+that already have an owner here (a database where links were added before
+this ran) are converted now. Text that does not parse is left alone; the
+original field is kept either way.
+"""
+
+from django.db import migrations
+
+
+def parse_free_text_hours(apps, schema_editor):
+    from directory.hours import hours_rows
+
+    FoodTruck = apps.get_model('directory', 'FoodTruck')
+    OperatingHours = apps.get_model('directory', 'OperatingHours')
+    db = schema_editor.connection.alias
+
+    trucks = (
+        FoodTruck.objects.using(db).filter(owner__isnull=False, hours__isnull=True)
+        .exclude(owner__operating_hours__isnull=True).exclude(owner__operating_hours='')
+        .values_list('id', 'owner__operating_hours')
+    )
+    rows = []
+    for truck_id, text in trucks.iterator():
+        rows += hours_rows(OperatingHours, truck_id, text)
+    OperatingHours.objects.using(db).bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0005_operating_hours'),
+    ]
+
+    operations = [
+        migrations.RunPython(parse_free_text_hours, migrations.RunPython.noop),
+    ]
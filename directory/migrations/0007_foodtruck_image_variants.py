@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0006_parse_operating_hours'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodtruck',
+            name='image_variants',
+            field=models.JSONField(blank=True, editable=False, help_text='Resized WebP/JPEG variants of the image (see directory.images)', null=True),
+        ),
+    ]
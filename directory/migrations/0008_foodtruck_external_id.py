@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0007_foodtruck_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodtruck',
+            name='external_id',
+            field=models.CharField(blank=True, help_text='Identifier from an import source; bulk imports upsert on it', max_length=100, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:40
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('directory', '0008_foodtruck_external_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('username'), name='customuser_lusername'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='customuser_lemail'),
+        ),
+        migrations.AddIndex(
+            model_name='foodtruck',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='foodtruck_lname'),
+        ),
+        migrations.AddIndex(
+            model_name='foodtruckownerprofile',
+            index=models.Index(django.db.models.functions.text.Lower('business_name'), name='ownerprofile_lbusiness_name'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0009_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DietaryTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(help_text='URL value used in directory filters', max_length=40, unique=True)),
+                ('name', models.CharField(help_text='Label shown to visitors', max_length=60)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag_id', models.PositiveIntegerField(default=0, help_text='DietaryTag id, or 0 for all trucks')),
+                ('city', models.CharField(help_text='Lower-cased city', max_length=50)),
+                ('cuisine', models.CharField(help_text='Cuisine', max_length=50)),
+                ('is_verified', models.BooleanField(help_text='Whether the trucks have a verified owner')),
+                ('count', models.IntegerField(default=0, help_text='Trucks in this cell')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='foodtruck',
+            name='is_verified',
+            field=models.BooleanField(default=False, editable=False, help_text="Copy of the owner profile's is_verified, kept for filtering"),
+        ),
+        migrations.AddField(
+            model_name='foodtruck',
+            name='dietary_tags',
+            field=models.ManyToManyField(blank=True, help_text='Dietary options the truck caters for', related_name='trucks', to='directory.dietarytag'),
+        ),
+        migrations.AddIndex(
+            model_name='foodtruck',
+            index=models.Index(fields=['name', 'id'], name='foodtruck_name_id'),
+        ),
+        migrations.AddIndex(
+            model_name='foodtruck',
+            index=models.Index(fields=['is_verified', 'name', 'id'], name='foodtruck_verified_name_id'),
+        ),
+        migrations.AddConstraint(
+            model_name='facetcount',
+            constraint=models.UniqueConstraint(fields=('tag_id', 'city', 'cuisine', 'is_verified'), name='facetcount_cell'),
+        ),
+    ]
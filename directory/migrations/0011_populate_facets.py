@@ -0,0 +1,41 @@
+"""
+Seed the common dietary tags, copy each owner's verification onto their
+trucks and build the initial ``FacetCount`` cells.
+"""
+
+from django.db import migrations
+
+DIETARY_TAGS = [
+    ('vegan', 'Vegan'),
+    ('vegetarian', 'Vegetarian'),
+    ('gluten-free', 'Gluten-Free'),
+    ('dairy-free', 'Dairy-Free'),
+    ('nut-free', 'Nut-Free'),
+    ('halal', 'Halal'),
+    ('kosher', 'Kosher'),
+]
+
+
+def populate_facets(apps, schema_editor):
+    from directory.facets import rebuild_cells
+
+    DietaryTag = apps.get_model('directory', 'DietaryTag')
+    FacetCount = apps.get_model('directory', 'FacetCount')
+    FoodTruck = apps.get_model('directory', 'FoodTruck')
+    db = schema_editor.connection.alias
+
+    for slug, name in DIETARY_TAGS:
+        DietaryTag.objects.using(db).get_or_create(slug=slug, defaults={'name': name})
+    FoodTruck.objects.using(db).filter(owner__is_verified=True).update(is_verified=True)
+    rebuild_cells(FoodTruck, FacetCount, using=db)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0010_facets'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_facets, migrations.RunPython.noop),
+    ]
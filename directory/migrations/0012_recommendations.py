@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:50
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0011_populate_facets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='websiteuserprofile',
+            name='home_city',
+            field=models.CharField(blank=True, help_text='City the user usually eats in; used for recommendations', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='websiteuserprofile',
+            name='home_latitude',
+            field=models.FloatField(blank=True, help_text='Latitude used for nearby recommendations (WGS84 degrees)', null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='websiteuserprofile',
+            name='home_longitude',
+            field=models.FloatField(blank=True, help_text='Longitude used for nearby recommendations (WGS84 degrees)', null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.CreateModel(
+            name='UserRecommendations',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('truck_ids', models.JSONField(default=list, help_text='Recommended FoodTruck ids, best first')),
+                ('computed_at', models.DateTimeField(help_text='When the batch job produced this list')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'user recommendations',
+            },
+        ),
+    ]
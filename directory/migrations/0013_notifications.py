@@ -0,0 +1,72 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:08
+
+import django.db.models.deletion
+import django.db.models.functions.text
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0012_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0, help_text='Delivery attempts so far')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time a worker may (re)try the row')),
+                ('claim_token', models.CharField(blank=True, help_text='Identifies the worker batch holding the row', max_length=32)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NotificationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('new_truck', 'New truck'), ('truck_verified', 'Truck verified')], help_text='What happened', max_length=20)),
+                ('idempotency_key', models.CharField(help_text='Events with the same key are enqueued once', max_length=100, unique=True)),
+                ('fanout_cursor', models.BigIntegerField(default=0, help_text='Highest user id already fanned out to')),
+                ('leased_until', models.DateTimeField(blank=True, help_text='A worker is fanning the event out until then', null=True)),
+                ('fanned_out_at', models.DateTimeField(blank=True, help_text='When every recipient had been queued', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='websiteuserprofile',
+            index=models.Index(django.db.models.functions.text.Lower('home_city'), models.F('user'), condition=models.Q(('notification_preferences', True)), name='profile_notify_city_user'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='notificationevent',
+            name='truck',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_events', to='directory.foodtruck'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='directory.notificationevent'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationevent',
+            index=models.Index(condition=models.Q(('fanned_out_at__isnull', True)), fields=['id'], name='notifyevent_pending'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['status', 'available_at', 'id'], name='notification_queue'),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(fields=('event', 'user'), name='notification_event_user'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0013_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Registered task name', max_length=100)),
+                ('kwargs', models.JSONField(blank=True, default=dict, help_text='Keyword arguments for the task function')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('unique_key', models.CharField(blank=True, help_text='At most one queued task may have this key', max_length=200, null=True)),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, help_text='When the task becomes due')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('claim_token', models.CharField(blank=True, help_text='Identifies the worker batch running the task', max_length=32)),
+                ('locked_until', models.DateTimeField(blank=True, help_text='The task is requeued if its worker has not finished by then', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_at', 'id'], name='task_queue'), models.Index(fields=['finished_at'], name='task_finished')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'queued')), fields=('unique_key',), name='task_unique_queued_key')],
+            },
+        ),
+    ]
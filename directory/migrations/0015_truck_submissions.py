@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0014_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TruckDedupKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Name signature band or normalized link', max_length=200)),
+                ('truck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dedup_keys', to='directory.foodtruck')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'truck'], name='dedupkey_key_truck')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TruckSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Name of the food truck', max_length=100)),
+                ('city', models.CharField(help_text='City where the food truck operates', max_length=50)),
+                ('cuisine', models.CharField(help_text='Type of cuisine served', max_length=50)),
+                ('description', models.TextField(blank=True, help_text='Description of the food truck and its offerings')),
+                ('website', models.URLField(blank=True, help_text='Food truck website URL')),
+                ('social_links', models.JSONField(blank=True, help_text='Social media links (Facebook, Instagram, Twitter, etc.)', null=True)),
+                ('contact_email', models.EmailField(help_text='Where moderators can reach the submitter', max_length=254)),
+                ('status', models.CharField(choices=[('pending', 'Pending review'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('duplicate', 'Duplicate')], default='pending', max_length=10)),
+                ('possible_duplicates', models.JSONField(blank=True, default=list, help_text='Existing trucks this submission resembled when it was made')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('submitted_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='truck_submissions', to=settings.AUTH_USER_MODEL)),
+                ('truck', models.ForeignKey(blank=True, help_text='The truck created from, or identified as, this submission', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='directory.foodtruck')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='submission_status_created')],
+            },
+        ),
+    ]
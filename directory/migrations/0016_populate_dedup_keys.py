@@ -0,0 +1,26 @@
+"""
+Build the duplicate-detection keys for the trucks already listed.
+"""
+
+from django.db import migrations
+
+
+def populate_dedup_keys(apps, schema_editor):
+    from directory.dedup import rebuild_keys
+
+    rebuild_keys(
+        apps.get_model('directory', 'FoodTruck'),
+        apps.get_model('directory', 'TruckDedupKey'),
+        using=schema_editor.connection.alias,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0015_truck_submissions'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_dedup_keys, migrations.RunPython.noop),
+    ]
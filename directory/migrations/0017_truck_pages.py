@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-17 03:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0016_populate_dedup_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TruckPage',
+            fields=[
+                ('truck', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='page', serialize=False, to='directory.foodtruck')),
+                ('data', models.JSONField(help_text='Truck, owner, hours, tags, image and nearby trucks')),
+                ('etag', models.CharField(help_text='Hash of data', max_length=32)),
+                ('updated_at', models.DateTimeField(help_text='When data last changed')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='foodtruck',
+            index=models.Index(fields=['latitude', 'longitude'], name='foodtruck_lat_lon'),
+        ),
+    ]
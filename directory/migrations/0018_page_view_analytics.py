@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0017_truck_pages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('page', models.CharField(choices=[('truck', 'Truck page'), ('city', 'City page'), ('search', 'Search')], max_length=10)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('views', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'page daily stats',
+                'constraints': [models.UniqueConstraint(fields=('day', 'page', 'city'), name='pagedailystats_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PageViewEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('view', 'Page view'), ('click', 'Click through to a truck')], max_length=5)),
+                ('page', models.CharField(choices=[('truck', 'Truck page'), ('city', 'City page'), ('search', 'Search')], help_text='The page viewed, or for a click the listing clicked from', max_length=10)),
+                ('city', models.CharField(blank=True, help_text='Lower-cased city of a city page, or of the city page clicked from', max_length=100)),
+                ('occurred_at', models.DateTimeField()),
+                ('truck', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='directory.foodtruck')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['occurred_at'], name='pageview_occurred')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TruckDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('kind', models.CharField(choices=[('view', 'Page view'), ('click', 'Click through to a truck')], max_length=5)),
+                ('page', models.CharField(choices=[('truck', 'Truck page'), ('city', 'City page'), ('search', 'Search')], max_length=10)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('truck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='directory.foodtruck')),
+            ],
+            options={
+                'verbose_name_plural': 'truck daily stats',
+                'constraints': [models.UniqueConstraint(fields=('truck', 'day', 'kind', 'page', 'city'), name='truckdailystats_unique')],
+            },
+        ),
+    ]
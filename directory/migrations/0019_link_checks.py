@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0018_page_view_analytics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text="'website', or the social_links platform name", max_length=50)),
+                ('url', models.URLField(max_length=2000)),
+                ('outcome', models.CharField(choices=[('ok', 'OK'), ('broken', 'Broken (4xx/5xx)'), ('blocked', 'Blocked (401/403/429, often bot protection)'), ('error', 'Unreachable (DNS, connection or timeout)')], max_length=10)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, help_text='Status of the last response, after redirects', null=True)),
+                ('error', models.CharField(blank=True, max_length=200)),
+                ('final_url', models.URLField(blank=True, help_text='Where redirects ended, when that differs from the link', max_length=2000)),
+                ('etag', models.CharField(blank=True, max_length=200)),
+                ('last_modified', models.CharField(blank=True, max_length=64)),
+                ('elapsed_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('checked_at', models.DateTimeField()),
+                ('failing_since', models.DateTimeField(blank=True, help_text='First of the consecutive failed checks, while the link keeps failing', null=True)),
+                ('truck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='link_checks', to='directory.foodtruck')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['outcome', 'checked_at'], name='linkcheck_outcome')],
+                'constraints': [models.UniqueConstraint(fields=('truck', 'url'), name='linkcheck_unique')],
+            },
+        ),
+    ]
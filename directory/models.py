@@ -1,4 +1,11 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .hours import interval_minutes
 from django.contrib.auth.models import AbstractUser
 
 # Create your models here.
@@ -35,6 +42,13 @@ class CustomUser(AbstractUser):
         help_text='User address'
     )
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive prefix search in the admin (see admin.py).
+            models.Index(Lower('username'), name='customuser_lusername'),
+            models.Index(Lower('email'), name='customuser_lemail'),
+        ]
+    
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
@@ -79,6 +93,11 @@ class FoodTruckOwnerProfile(models.Model):
         help_text='Whether the food truck is verified by admin'
     )
     
+    class Meta:
+        indexes = [
+            models.Index(Lower('business_name'), name='ownerprofile_lbusiness_name'),
+        ]
+    
     def __str__(self):
         return f"{self.business_name} - {self.user.username}"
 
@@ -111,15 +130,75 @@ class WebsiteUserProfile(models.Model):
         help_text='Whether to receive notifications about new food trucks'
     )
     
+    home_city = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text='City the user usually eats in; used for recommendations'
+    )
+    
+    home_latitude = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        help_text='Latitude used for nearby recommendations (WGS84 degrees)'
+    )
+    
+    home_longitude = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        help_text='Longitude used for nearby recommendations (WGS84 degrees)'
+    )
+    
+    class Meta:
+        indexes = [
+            # Notification fan-out: opted-in users in a city, in id order.
+            models.Index(
+                Lower('home_city'), 'user',
+                condition=Q(notification_preferences=True),
+                name='profile_notify_city_user',
+            ),
+        ]
+    
     def __str__(self):
         return f"Profile for {self.user.username}"
 
 
+class DietaryTag(models.Model):
+    """
+    A dietary label (vegan, gluten-free, halal...) that trucks can carry.
+    """
+    slug = models.SlugField(
+        max_length=40,
+        unique=True,
+        help_text='URL value used in directory filters'
+    )
+    
+    name = models.CharField(
+        max_length=60,
+        help_text='Label shown to visitors'
+    )
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
 class FoodTruck(models.Model):
     """
     Model to store information about each food truck, including its name, 
     location, cuisine, contact details, and an image.
     """
+    external_id = models.CharField(
+        max_length=100,
+        unique=True,
+        blank=True,
+        null=True,
+        help_text='Identifier from an import source; bulk imports upsert on it'
+    )
+    
     name = models.CharField(
         max_length=100,
         help_text='Name of the food truck'
@@ -160,5 +239,900 @@ class FoodTruck(models.Model):
         help_text='Food truck image'
     )
     
+    image_variants = models.JSONField(
+        blank=True,
+        null=True,
+        editable=False,
+        help_text='Resized WebP/JPEG variants of the image (see directory.images)'
+    )
+    
+    latitude = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        help_text='Latitude of the usual serving location (WGS84 degrees)'
+    )
+    
+    longitude = models.FloatField(
+        blank=True,
+        null=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        help_text='Longitude of the usual serving location (WGS84 degrees)'
+    )
+    
+    owner = models.ForeignKey(
+        FoodTruckOwnerProfile,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='trucks',
+        help_text='Owner profile that manages this truck'
+    )
+    
+    is_verified = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text="Copy of the owner profile's is_verified, kept for filtering"
+    )
+    
+    dietary_tags = models.ManyToManyField(
+        DietaryTag,
+        blank=True,
+        related_name='trucks',
+        help_text='Dietary options the truck caters for'
+    )
+    
+    class Meta:
+        indexes = [
+            # Covers city listings filtered by cuisine and ordered by name.
+            models.Index(
+                fields=['city', 'cuisine', 'name'],
+                name='foodtruck_city_cuisine_name',
+            ),
+            # Case-insensitive city lookups; (name, id) is the keyset order.
+            models.Index(
+                Lower('city'), 'name', 'id',
+                name='foodtruck_lcity_name_id',
+            ),
+            models.Index(
+                Lower('city'), 'cuisine', 'name', 'id',
+                name='foodtruck_lcity_cuis_name_id',
+            ),
+            # Case-insensitive prefix search in the admin.
+            models.Index(Lower('name'), name='foodtruck_lname'),
+            # Directory facets: the unfiltered and verified-only listings.
+            models.Index(fields=['name', 'id'], name='foodtruck_name_id'),
+            models.Index(
+                fields=['is_verified', 'name', 'id'],
+                name='foodtruck_verified_name_id',
+            ),
+            # Bounding-box lookups for the "nearby trucks" on detail pages.
+            models.Index(
+                fields=['latitude', 'longitude'],
+                name='foodtruck_lat_lon',
+            ),
+        ]
+    
+    def save(self, *args, **kwargs):
+        self.is_verified = bool(self.owner_id and self.owner.is_verified)
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return self.name
+
+
+
+class OperatingHours(models.Model):
+    """
+    One weekly opening interval for a food truck.
+
+    ``start_minute``/``end_minute`` are derived on save and index the
+    interval on a minute-of-week axis; see ``directory.hours``.
+    """
+    WEEKDAYS = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+    
+    truck = models.ForeignKey(
+        FoodTruck,
+        on_delete=models.CASCADE,
+        related_name='hours'
+    )
+    
+    weekday = models.PositiveSmallIntegerField(
+        choices=WEEKDAYS,
+        help_text='Day the interval starts on'
+    )
+    
+    opens_at = models.TimeField(
+        help_text='Opening time (local)'
+    )
+    
+    closes_at = models.TimeField(
+        help_text='Closing time (local); at or before opening means after midnight'
+    )
+    
+    start_minute = models.PositiveIntegerField(
+        editable=False,
+        help_text='Minute of the week the interval starts (Monday 00:00 = 0)'
+    )
+    
+    end_minute = models.PositiveIntegerField(
+        editable=False,
+        help_text='Minute of the week the interval ends'
+    )
+    
+    class Meta:
+        ordering = ['truck', 'start_minute']
+        verbose_name_plural = 'operating hours'
+        indexes = [
+            models.Index(
+                fields=['start_minute', 'end_minute', 'truck'],
+                name='hours_week_interval',
+            ),
+        ]
+    
+    def set_minutes(self):
+        """Recompute the minute-of-week columns from the visible fields."""
+        self.start_minute, self.end_minute = interval_minutes(
+            self.weekday, self.opens_at, self.closes_at
+        )
+    
+    def save(self, *args, **kwargs):
+        self.set_minutes()
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return (
+            f"{self.truck} {self.get_weekday_display()} "
+            f"{self.opens_at:%H:%M}-{self.closes_at:%H:%M}"
+        )
+
+
+class EventSlot(models.Model):
+    """
+    A one-off appearance, such as a festival or brewery night.
+    """
+    truck = models.ForeignKey(
+        FoodTruck,
+        on_delete=models.CASCADE,
+        related_name='events'
+    )
+    
+    starts_at = models.DateTimeField(
+        help_text='When service starts'
+    )
+    
+    ends_at = models.DateTimeField(
+        help_text='When service ends'
+    )
+    
+    location = models.CharField(
+        max_length=200,
+        blank=True,
+        help_text='Where the truck will be'
+    )
+    
+    class Meta:
+        ordering = ['starts_at']
+        indexes = [
+            models.Index(
+                fields=['starts_at', 'ends_at', 'truck'],
+                name='eventslot_interval',
+            ),
+        ]
+    
+    def clean(self):
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError({'ends_at': 'Events must end after they start.'})
+    
+    def __str__(self):
+        return f"{self.truck} @ {self.location or 'event'} {self.starts_at:%Y-%m-%d %H:%M}"
+
+
+
+class FacetCount(models.Model):
+    """
+    Number of trucks in one (tag, city, cuisine, verified) cell.
+
+    ``tag_id`` is 0 for the cell that counts every truck, otherwise the
+    ``DietaryTag`` the count is restricted to. The signal handlers in
+    ``directory.signals`` keep the counts current, so directory facet counts
+    for any combination of filters are sums over this small table rather
+    than ``GROUP BY`` queries over ``FoodTruck``; see ``directory.facets``.
+    """
+    tag_id = models.PositiveIntegerField(
+        default=0,
+        help_text='DietaryTag id, or 0 for all trucks'
+    )
+    
+    city = models.CharField(
+        max_length=50,
+        help_text='Lower-cased city'
+    )
+    
+    cuisine = models.CharField(
+        max_length=50,
+        help_text='Cuisine'
+    )
+    
+    is_verified = models.BooleanField(
+        help_text='Whether the trucks have a verified owner'
+    )
+    
+    count = models.IntegerField(
+        default=0,
+        help_text='Trucks in this cell'
+    )
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tag_id', 'city', 'cuisine', 'is_verified'],
+                name='facetcount_cell',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.tag_id}/{self.city}/{self.cuisine}/{self.is_verified}: {self.count}"
+
+
+class UserRecommendations(models.Model):
+    """
+    Precomputed "recommended for you" trucks for one user.
+
+    Written by the ``compute_recommendations`` batch job (see
+    ``directory.recommendations``); pages only read the stored list.
+    """
+    user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='recommendations'
+    )
+    
+    truck_ids = models.JSONField(
+        default=list,
+        help_text='Recommended FoodTruck ids, best first'
+    )
+    
+    computed_at = models.DateTimeField(
+        help_text='When the batch job produced this list'
+    )
+    
+    class Meta:
+        verbose_name_plural = 'user recommendations'
+    
+    def __str__(self):
+        return f"Recommendations for user {self.user_id}"
+
+
+class NotificationEvent(models.Model):
+    """
+    Something opted-in website users get told about, such as a new truck.
+
+    Written in the same transaction as the change that causes it (see
+    ``directory.signals``); ``idempotency_key`` makes repeated changes
+    enqueue it once. Workers fan it out into ``Notification`` rows in
+    batches, recording progress in ``fanout_cursor``; see
+    ``directory.notifications``.
+    """
+    NEW_TRUCK = 'new_truck'
+    TRUCK_VERIFIED = 'truck_verified'
+    KINDS = [
+        (NEW_TRUCK, 'New truck'),
+        (TRUCK_VERIFIED, 'Truck verified'),
+    ]
+    
+    kind = models.CharField(
+        max_length=20,
+        choices=KINDS,
+        help_text='What happened'
+    )
+    
+    truck = models.ForeignKey(
+        FoodTruck,
+        on_delete=models.CASCADE,
+        related_name='notification_events'
+    )
+    
+    idempotency_key = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text='Events with the same key are enqueued once'
+    )
+    
+    fanout_cursor = models.BigIntegerField(
+        default=0,
+        help_text='Highest user id already fanned out to'
+    )
+    
+    leased_until = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='A worker is fanning the event out until then'
+    )
+    
+    fanned_out_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='When every recipient had been queued'
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True
+    )
+    
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=Q(fanned_out_at__isnull=True),
+                name='notifyevent_pending',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.truck_id}"
+
+
+class Notification(models.Model):
+    """
+    One email owed to one user for one ``NotificationEvent``.
+
+    The unique (event, user) pair is the delivery idempotency key. Workers
+    claim rows by moving ``available_at`` into the future, so rows held by
+    a worker that died become available again once the lease runs out.
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    SKIPPED = 'skipped'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (SKIPPED, 'Skipped'),
+        (FAILED, 'Failed'),
+    ]
+    
+    event = models.ForeignKey(
+        NotificationEvent,
+        on_delete=models.CASCADE,
+        related_name='notifications'
+    )
+    
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='notifications'
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING
+    )
+    
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text='Delivery attempts so far'
+    )
+    
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        help_text='Earliest time a worker may (re)try the row'
+    )
+    
+    claim_token = models.CharField(
+        max_length=32,
+        blank=True,
+        help_text='Identifies the worker batch holding the row'
+    )
+    
+    sent_at = models.DateTimeField(
+        blank=True,
+        null=True
+    )
+    
+    last_error = models.TextField(
+        blank=True
+    )
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event', 'user'],
+                name='notification_event_user',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['status', 'available_at', 'id'],
+                name='notification_queue',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.event} -> user {self.user_id} ({self.status})"
+
+
+class Task(models.Model):
+    """
+    A unit of background work for ``run_workers``; see
+    ``directory.taskqueue``.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    
+    name = models.CharField(
+        max_length=100,
+        help_text='Registered task name'
+    )
+    
+    kwargs = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text='Keyword arguments for the task function'
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    
+    unique_key = models.CharField(
+        max_length=200,
+        blank=True,
+        null=True,
+        help_text='At most one queued task may have this key'
+    )
+    
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        help_text='When the task becomes due'
+    )
+    
+    attempts = models.PositiveSmallIntegerField(
+        default=0
+    )
+    
+    claim_token = models.CharField(
+        max_length=32,
+        blank=True,
+        help_text='Identifies the worker batch running the task'
+    )
+    
+    locked_until = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='The task is requeued if its worker has not finished by then'
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True
+    )
+    
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True
+    )
+    
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True
+    )
+    
+    last_error = models.TextField(
+        blank=True
+    )
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['unique_key'],
+                condition=Q(status='queued'),
+                name='task_unique_queued_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_at', 'id'], name='task_queue'),
+            models.Index(fields=['finished_at'], name='task_finished'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class TruckDedupKey(models.Model):
+    """
+    One lookup key of a truck in the duplicate-detection index; see
+    ``directory.dedup``.
+    """
+    truck = models.ForeignKey(
+        FoodTruck,
+        on_delete=models.CASCADE,
+        related_name='dedup_keys'
+    )
+    
+    key = models.CharField(
+        max_length=200,
+        help_text='Name signature band or normalized link'
+    )
+    
+    class Meta:
+        indexes = [
+            # Covers the candidate lookup: key IN (...) grouped by truck.
+            models.Index(fields=['key', 'truck'], name='dedupkey_key_truck'),
+        ]
+    
+    def __str__(self):
+        return f"{self.truck_id}: {self.key}"
+
+
+class TruckSubmission(models.Model):
+    """
+    A truck suggested through the public submission form, waiting for a
+    moderator to approve it into the directory.
+    """
+    PENDING = 'pending'
+    APPROVED = 'approved'
+    REJECTED = 'rejected'
+    DUPLICATE = 'duplicate'
+    STATUSES = [
+        (PENDING, 'Pending review'),
+        (APPROVED, 'Approved'),
+        (REJECTED, 'Rejected'),
+        (DUPLICATE, 'Duplicate'),
+    ]
+    
+    name = models.CharField(
+        max_length=100,
+        help_text='Name of the food truck'
+    )
+    
+    city = models.CharField(
+        max_length=50,
+        help_text='City where the food truck operates'
+    )
+    
+    cuisine = models.CharField(
+        max_length=50,
+        help_text='Type of cuisine served'
+    )
+    
+    description = models.TextField(
+        blank=True,
+        help_text='Description of the food truck and its offerings'
+    )
+    
+    website = models.URLField(
+        blank=True,
+        help_text='Food truck website URL'
+    )
+    
+    social_links = models.JSONField(
+        blank=True,
+        null=True,
+        help_text='Social media links (Facebook, Instagram, Twitter, etc.)'
+    )
+    
+    contact_email = models.EmailField(
+        help_text='Where moderators can reach the submitter'
+    )
+    
+    submitted_by = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='truck_submissions'
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING
+    )
+    
+    possible_duplicates = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='Existing trucks this submission resembled when it was made'
+    )
+    
+    truck = models.ForeignKey(
+        FoodTruck,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='submissions',
+        help_text='The truck created from, or identified as, this submission'
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True
+    )
+    
+    reviewed_at = models.DateTimeField(
+        blank=True,
+        null=True
+    )
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='submission_status_created'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+
+class TruckPage(models.Model):
+    """
+    Everything a truck's detail page shows, as one JSON document.
+
+    Rebuilt on write (see ``directory.truck_pages``) so a page view is a
+    single primary-key lookup; ``etag`` and ``updated_at`` only change
+    when the document does.
+    """
+    truck = models.OneToOneField(
+        FoodTruck,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='page'
+    )
+    
+    data = models.JSONField(
+        help_text='Truck, owner, hours, tags, image and nearby trucks'
+    )
+    
+    etag = models.CharField(
+        max_length=32,
+        help_text='Hash of data'
+    )
+    
+    updated_at = models.DateTimeField(
+        help_text='When data last changed'
+    )
+    
+    def __str__(self):
+        return f"Page for truck {self.truck_id}"
+
+
+class PageViewEvent(models.Model):
+    """
+    One page view, or one click from a listing through to a truck.
+
+    Written in batches by ``directory.analytics`` and rolled up into
+    ``TruckDailyStats`` and ``PageDailyStats``; raw rows are pruned after
+    a few days.
+    """
+    VIEW = 'view'
+    CLICK = 'click'
+    KINDS = [
+        (VIEW, 'Page view'),
+        (CLICK, 'Click through to a truck'),
+    ]
+    
+    TRUCK_PAGE = 'truck'
+    CITY_PAGE = 'city'
+    SEARCH_PAGE = 'search'
+    PAGES = [
+        (TRUCK_PAGE, 'Truck page'),
+        (CITY_PAGE, 'City page'),
+        (SEARCH_PAGE, 'Search'),
+    ]
+    
+    kind = models.CharField(
+        max_length=5,
+        choices=KINDS
+    )
+    
+    page = models.CharField(
+        max_length=10,
+        choices=PAGES,
+        help_text='The page viewed, or for a click the listing clicked from'
+    )
+    
+    # No constraint: a batch may still hold views of a truck deleted since.
+    truck = models.ForeignKey(
+        FoodTruck,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        blank=True,
+        null=True,
+        related_name='+'
+    )
+    
+    city = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text='Lower-cased city of a city page, or of the city page clicked from'
+    )
+    
+    occurred_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['occurred_at'], name='pageview_occurred'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.page} {self.truck_id or self.city} at {self.occurred_at}"
+
+
+class TruckDailyStats(models.Model):
+    """
+    A day's views of a truck's page, or clicks through to it from one
+    listing page, rolled up from ``PageViewEvent``.
+    """
+    truck = models.ForeignKey(
+        FoodTruck,
+        on_delete=models.CASCADE,
+        related_name='daily_stats'
+    )
+    
+    day = models.DateField()
+    
+    kind = models.CharField(
+        max_length=5,
+        choices=PageViewEvent.KINDS
+    )
+    
+    page = models.CharField(
+        max_length=10,
+        choices=PageViewEvent.PAGES
+    )
+    
+    city = models.CharField(
+        max_length=100,
+        blank=True
+    )
+    
+    count = models.PositiveIntegerField(
+        default=0
+    )
+    
+    class Meta:
+        verbose_name_plural = 'truck daily stats'
+        constraints = [
+            # Also serves the owner dashboard's (truck, day range) lookups.
+            models.UniqueConstraint(
+                fields=['truck', 'day', 'kind', 'page', 'city'], name='truckdailystats_unique',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Truck {self.truck_id} {self.day}: {self.count} {self.kind} ({self.page})"
+
+
+class PageDailyStats(models.Model):
+    """A day's views of the city pages and of search, rolled up from ``PageViewEvent``."""
+    day = models.DateField()
+    
+    page = models.CharField(
+        max_length=10,
+        choices=PageViewEvent.PAGES
+    )
+    
+    city = models.CharField(
+        max_length=100,
+        blank=True
+    )
+    
+    views = models.PositiveIntegerField(
+        default=0
+    )
+    
+    class Meta:
+        verbose_name_plural = 'page daily stats'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'page', 'city'], name='pagedailystats_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.page} {self.city} {self.day}: {self.views} views"
+
+
+class LinkCheck(models.Model):
+    """
+    The latest health check of one of a truck's links: its website or an
+    entry of its ``social_links``. Written by ``manage.py check_links``.
+    """
+    OK = 'ok'
+    BROKEN = 'broken'
+    BLOCKED = 'blocked'
+    ERROR = 'error'
+    OUTCOMES = [
+        (OK, 'OK'),
+        (BROKEN, 'Broken (4xx/5xx)'),
+        (BLOCKED, 'Blocked (401/403/429, often bot protection)'),
+        (ERROR, 'Unreachable (DNS, connection or timeout)'),
+    ]
+    
+    truck = models.ForeignKey(
+        FoodTruck,
+        on_delete=models.CASCADE,
+        related_name='link_checks'
+    )
+    
+    source = models.CharField(
+        max_length=50,
+        help_text="'website', or the social_links platform name"
+    )
+    
+    url = models.URLField(
+        max_length=2000
+    )
+    
+    outcome = models.CharField(
+        max_length=10,
+        choices=OUTCOMES
+    )
+    
+    status_code = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        help_text='Status of the last response, after redirects'
+    )
+    
+    error = models.CharField(
+        max_length=200,
+        blank=True
+    )
+    
+    final_url = models.URLField(
+        max_length=2000,
+        blank=True,
+        help_text='Where redirects ended, when that differs from the link'
+    )
+    
+    etag = models.CharField(
+        max_length=200,
+        blank=True
+    )
+    
+    last_modified = models.CharField(
+        max_length=64,
+        blank=True
+    )
+    
+    elapsed_ms = models.PositiveIntegerField(
+        blank=True,
+        null=True
+    )
+    
+    checked_at = models.DateTimeField()
+    
+    failing_since = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='First of the consecutive failed checks, while the link keeps failing'
+    )
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['truck', 'url'], name='linkcheck_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['outcome', 'checked_at'], name='linkcheck_outcome'),
+        ]
+    
+    def __str__(self):
+        return f"{self.url}: {self.outcome} ({self.status_code or self.error})"
@@ -0,0 +1,400 @@
+"""
+Email website users about new and newly verified trucks in their city.
+
+Delivery is a database-backed job queue worked in three steps, so a truck with a
+million interested users never has them all in memory or in one
+transaction:
+
+1. **Events.** Creating a truck, or verifying its owner, writes a
+   ``NotificationEvent`` in the same transaction as the change (see
+   ``directory.signals``). Its ``idempotency_key`` makes the same change
+   enqueue once however often it is saved.
+2. **Fan-out.** A worker leases one event and walks its audience (opted-in,
+   active users whose ``home_city`` is the truck's city and whose favorite
+   cuisines include the truck's, or who listed none) in user-id order,
+   ``batch_size`` users at a time. Each batch of ``Notification`` rows is
+   written together with the event's ``fanout_cursor``, so a worker that
+   dies resumes after the last committed batch; the unique (event, user)
+   pair makes a repeated batch harmless.
+3. **Delivery.** Workers claim pending notifications by pushing their
+   ``available_at`` past a lease, send them through Django's configured
+   ``EMAIL_BACKEND`` at no more than ``DIRECTORY_NOTIFICATION_RATE`` emails
+   a second, and mark them sent. A worker renews its lease while it works
+   through a batch, however long the rate limit makes that take; if it
+   dies, the lease runs out. Failures are retried with exponential
+   backoff up to ``MAX_ATTEMPTS``; rows claimed by a worker that died are
+   picked up again when its lease runs out.
+
+Delivery is at least once: a worker killed between sending and marking a
+batch sent resends it. Every message carries a ``Message-ID`` derived from
+the notification, so the resend is recognisably the same email.
+
+Fan-out and delivery run as tasks on the task queue (``run_workers``; see
+``directory.tasks``), or in dedicated ``manage.py send_notifications``
+workers; any number of either can run at once.
+"""
+
+import threading
+import time
+import uuid
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .facets import city_key
+from .recommendations import Vocabulary
+from .taskqueue import enqueue
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_RATE = 10.0
+LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 60
+
+
+def notification_settings():
+    return {
+        'batch_size': getattr(settings, 'DIRECTORY_NOTIFICATION_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+        'rate': getattr(settings, 'DIRECTORY_NOTIFICATION_RATE', DEFAULT_RATE),
+    }
+
+
+def enqueue_truck_events(kind, trucks, using='default'):
+    """
+    Record that ``kind`` happened to each of ``trucks``.
+
+    Trucks without a city have no audience and are skipped. Already
+    enqueued events are left alone.
+    """
+    from .models import NotificationEvent
+
+    events = [
+        NotificationEvent(kind=kind, truck=truck, idempotency_key=f'{kind}:{truck.pk}')
+        for truck in trucks if city_key(truck.city)
+    ]
+    if not events:
+        return
+    NotificationEvent.objects.using(using).bulk_create(events, ignore_conflicts=True)
+    enqueue('notifications.fan_out', unique_key='notifications.fan_out', using=using)
+
+
+def enqueue_truck_event(kind, truck, using='default'):
+    enqueue_truck_events(kind, [truck], using)
+
+
+# Fan-out
+
+def audience(truck, using='default'):
+    """
+    ``(user_id, favorite_cuisine_types)`` of users who may want to hear
+    about ``truck``, in user-id order. Cuisine is matched in Python.
+    """
+    from .models import WebsiteUserProfile
+
+    return (
+        WebsiteUserProfile.objects.using(using)
+        .alias(city=Lower('home_city'))
+        .filter(city=city_key(truck.city), notification_preferences=True,
+                user__is_active=True)
+        .exclude(user__email='')
+        .order_by('user_id')
+        .values_list('user_id', 'favorite_cuisine_types')
+    )
+
+
+def wants_cuisine(vocabulary, favorites):
+    """Users who named no favorite cuisines hear about every truck."""
+    return not (favorites or '').strip() or bool(vocabulary.cuisine_indices(favorites))
+
+
+def claim_event(using='default'):
+    """
+    Lease the oldest event still being fanned out; returns
+    ``(event, lease)`` or ``(None, None)`` when there is none.
+    """
+    from .models import NotificationEvent
+
+    now = timezone.now()
+    claimable = NotificationEvent.objects.using(using).filter(
+        Q(leased_until__isnull=True) | Q(leased_until__lt=now),
+        fanned_out_at__isnull=True,
+    )
+    for event_id in claimable.order_by('id').values_list('id', flat=True)[:10]:
+        lease = now + LEASE
+        if claimable.filter(pk=event_id).update(leased_until=lease):
+            event = NotificationEvent.objects.using(using).select_related('truck').get(pk=event_id)
+            return event, lease
+    return None, None
+
+
+def fan_out_batch(event, lease, batch_size=DEFAULT_BATCH_SIZE, using='default'):
+    """
+    Queue notifications for the next ``batch_size`` users of ``event``.
+
+    Returns ``(queued, lease)``: the number of notifications created and
+    the renewed lease, or ``None`` once the event is fully fanned out or
+    another worker took it over.
+    """
+    from .models import Notification, NotificationEvent
+
+    vocabulary = Vocabulary([event.truck.cuisine], [])
+    rows = list(audience(event.truck, using).filter(user_id__gt=event.fanout_cursor)[:batch_size])
+    recipients = [
+        Notification(event=event, user_id=user_id)
+        for user_id, favorites in rows if wants_cuisine(vocabulary, favorites)
+    ]
+    now = timezone.now()
+    done = len(rows) < batch_size
+    changes = {
+        'fanout_cursor': rows[-1][0] if rows else event.fanout_cursor,
+        'leased_until': None if done else now + LEASE,
+        'fanned_out_at': now if done else None,
+    }
+    with transaction.atomic(using=using):
+        # The lease value doubles as this worker's claim on the event.
+        updated = NotificationEvent.objects.using(using).filter(
+            pk=event.pk, leased_until=lease
+        ).update(**changes)
+        if not updated:
+            return 0, None
+        Notification.objects.using(using).bulk_create(
+            recipients, batch_size=batch_size, ignore_conflicts=True
+        )
+    event.fanout_cursor = changes['fanout_cursor']
+    return len(recipients), changes['leased_until']
+
+
+def fan_out_event(event, lease, batch_size=DEFAULT_BATCH_SIZE, using='default'):
+    """Fan ``event`` out to its whole audience; returns notifications queued."""
+    total = 0
+    while lease is not None:
+        queued, lease = fan_out_batch(event, lease, batch_size, using)
+        total += queued
+    return total
+
+
+def fan_out_pending(batch_size=DEFAULT_BATCH_SIZE, using='default'):
+    """Fan out every event no other worker holds; returns notifications queued."""
+    total = 0
+    event, lease = claim_event(using)
+    while event is not None:
+        total += fan_out_event(event, lease, batch_size, using)
+        event, lease = claim_event(using)
+    return total
+
+
+# Delivery
+
+class RateLimiter:
+    """
+    Token bucket allowing ``rate`` operations a second with bursts of up
+    to ``burst``, across every thread using it. A falsy ``rate`` disables
+    limiting.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate or 0)
+        self.tokens = self.burst
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        # Shared by the worker threads of a process.
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.rate:
+            return
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                self.sleep((1 - self.tokens) / self.rate)
+                self.tokens = 1
+                self.updated = self.clock()
+            self.tokens -= 1
+
+
+def claim_notifications(batch_size=DEFAULT_BATCH_SIZE, using='default'):
+    """
+    Claim up to ``batch_size`` notifications that are due; returns the
+    claim token.
+
+    The claim is a single ``UPDATE`` guarded by ``available_at``, so two
+    workers never claim the same row, and a row whose worker died becomes
+    due again when its lease runs out.
+    """
+    from .models import Notification
+
+    now = timezone.now()
+    due = Notification.objects.using(using).filter(
+        status__in=[Notification.PENDING, Notification.SENDING], available_at__lte=now
+    )
+    token = uuid.uuid4().hex
+    # Picking and claiming in one statement keeps a worker that loses the
+    # race from coming back empty-handed while rows are still due.
+    due.filter(pk__in=due.values('id')[:batch_size]).update(
+        status=Notification.SENDING, claim_token=token,
+        available_at=now + LEASE, attempts=F('attempts') + 1,
+    )
+    return token
+
+
+def renew_claim(token, using='default'):
+    """
+    Push the lease on the rows of claim ``token`` still being sent; returns
+    when to renew it next.
+    """
+    from .models import Notification
+
+    now = timezone.now()
+    Notification.objects.using(using).filter(
+        claim_token=token, status=Notification.SENDING
+    ).update(available_at=now + LEASE)
+    return now + LEASE / 2
+
+
+def message_id(notification):
+    """The same id on every attempt, so a resent email can be recognised."""
+    domain = urlsplit(getattr(settings, 'DIRECTORY_SITE_URL', '')).hostname or 'localhost'
+    return f'<notification-{notification.pk}@{domain}>'
+
+
+def build_message(notification, connection=None):
+    truck = notification.event.truck
+    site_url = getattr(settings, 'DIRECTORY_SITE_URL', '').rstrip('/')
+    context = {
+        'notification': notification,
+        'event': notification.event,
+        'truck': truck,
+        'user': notification.user,
+        'truck_url': site_url + reverse('trucks_by_city', args=[city_key(truck.city)]),
+        'profile_url': site_url + reverse('profile'),
+    }
+    subject = render_to_string('directory/email/truck_notification_subject.txt', context)
+    body = render_to_string('directory/email/truck_notification.txt', context)
+    return EmailMessage(
+        subject=' '.join(subject.split()),
+        body=body,
+        to=[notification.user.email],
+        headers={'Message-ID': message_id(notification)},
+        connection=connection,
+    )
+
+
+def still_wanted(notification):
+    """The user may have opted out or been deactivated since the fan-out."""
+    user = notification.user
+    profile = getattr(user, 'website_user_profile', None)
+    return bool(user.is_active and user.email and profile and profile.notification_preferences)
+
+
+def retry_later(notification, error, using='default'):
+    from .models import Notification
+
+    if notification.attempts >= MAX_ATTEMPTS:
+        changes = {'status': Notification.FAILED}
+    else:
+        delay = RETRY_BASE_SECONDS * 2 ** (notification.attempts - 1)
+        changes = {
+            'status': Notification.PENDING,
+            'available_at': timezone.now() + timedelta(seconds=delay),
+        }
+    Notification.objects.using(using).filter(
+        pk=notification.pk, claim_token=notification.claim_token
+    ).update(last_error=str(error)[:1000], **changes)
+
+
+def deliver_batch(batch_size=DEFAULT_BATCH_SIZE, limiter=None, connection=None, using='default'):
+    """
+    Claim and send one batch of notifications.
+
+    Returns ``(sent, skipped, failed)``; all zeros when nothing was due.
+    """
+    from .models import Notification
+
+    token = claim_notifications(batch_size, using)
+    claimed = list(
+        Notification.objects.using(using)
+        .filter(claim_token=token, status=Notification.SENDING)
+        .select_related('event__truck', 'user__website_user_profile')
+        .order_by('id')
+    )
+    if not claimed:
+        return 0, 0, 0
+    limiter = limiter or RateLimiter(None)
+    connection = connection or get_connection()
+    sent, skipped, failed = [], [], 0
+    # A limiter shared by several threads can stretch a batch well past
+    # LEASE, so the claim is renewed halfway through each lease.
+    renew_at = timezone.now() + LEASE / 2
+    with connection:
+        for notification in claimed:
+            if not still_wanted(notification):
+                skipped.append(notification.pk)
+                continue
+            limiter.wait()
+            if timezone.now() >= renew_at:
+                renew_at = renew_claim(token, using)
+            try:
+                build_message(notification, connection).send()
+            except Exception as exc:
+                retry_later(notification, exc, using)
+                failed += 1
+            else:
+                sent.append(notification.pk)
+    mine = Notification.objects.using(using).filter(claim_token=token)
+    with transaction.atomic(using=using):
+        mine.filter(pk__in=sent).update(status=Notification.SENT, sent_at=timezone.now())
+        mine.filter(pk__in=skipped).update(status=Notification.SKIPPED)
+    return len(sent), len(skipped), failed
+
+
+def next_delivery(using='default'):
+    """When the earliest unsent notification is due, or ``None``."""
+    from .models import Notification
+
+    return (
+        Notification.objects.using(using)
+        .filter(status__in=[Notification.PENDING, Notification.SENDING])
+        .order_by('available_at').values_list('available_at', flat=True).first()
+    )
+
+
+def run_worker(batch_size=DEFAULT_BATCH_SIZE, rate=DEFAULT_RATE, once=False, idle_sleep=5.0,
+               using='default', log=None):
+    """
+    Alternate fan-out and delivery batches until stopped, or until there
+    is nothing left to do when ``once`` is true. Returns the totals.
+    """
+    limiter = RateLimiter(rate)
+    totals = {'queued': 0, 'sent': 0, 'skipped': 0, 'failed': 0}
+    event, lease = None, None
+    while True:
+        if lease is None:
+            event, lease = claim_event(using)
+        queued = 0
+        if lease is not None:
+            queued, lease = fan_out_batch(event, lease, batch_size, using)
+            totals['queued'] += queued
+        sent, skipped, failed = deliver_batch(batch_size, limiter, using=using)
+        totals['sent'] += sent
+        totals['skipped'] += skipped
+        totals['failed'] += failed
+        if log and (queued or sent or skipped or failed):
+            log(f'queued {queued}, sent {sent}, skipped {skipped}, failed {failed}')
+        if event is None and not (sent or skipped or failed):
+            if once:
+                return totals
+            time.sleep(idle_sleep)
+        if lease is None:
+            event = None
@@ -0,0 +1,209 @@
+"""
+Keyset (cursor) pagination for food truck listings.
+
+Instead of ``OFFSET n`` scans, each page remembers the sort key of its last
+row and the next page starts strictly after it. With a matching index the
+database seeks straight to the cursor, so page 1,000 costs the same as page 1.
+
+``EstimatedCountPaginator`` serves the admin changelists, which need page
+numbers: it replaces the exact ``COUNT(*)`` with a cheap estimate once a
+table is large.
+"""
+
+import base64
+import json
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q, QuerySet
+from django.utils.functional import cached_property
+
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded."""
+
+
+def encode_cursor(values):
+    """Encode a tuple of sort key values into an opaque URL-safe token."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, length):
+    """
+    Decode a cursor produced by ``encode_cursor`` for a ``length``-field
+    ordering. Every ordering here is text fields ending in the integer
+    ``id``, so a cursor holding anything else is rejected rather than
+    passed on to the database.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(token) from exc
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor(token)
+    *names, last_id = values
+    if not all(isinstance(name, str) for name in names) or (
+        not isinstance(last_id, int) or isinstance(last_id, bool)
+    ):
+        raise InvalidCursor(token)
+    return values
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the "row comes after ``values``" condition for an ascending
+    ``ordering`` such as ``('name', 'id')``.
+
+    For ``(a, b)`` this expands to ``a >= x AND (a > x OR (a = x AND b > y))``.
+    The redundant leading ``a >= x`` lets SQLite and Postgres turn the
+    predicate into a range seek on a matching index instead of a scan.
+    """
+    condition = Q()
+    for position, field_name in enumerate(ordering):
+        equal_prefix = {
+            ordering[i]: values[i] for i in range(position)
+        }
+        condition |= Q(**equal_prefix, **{f'{field_name}__gt': values[position]})
+    return Q(**{f'{ordering[0]}__gte': values[0]}) & condition
+
+
+@dataclass
+class KeysetPage:
+    """A single page of results plus the cursor for the following page."""
+
+    object_list: list
+    next_cursor: str = None
+    page_size: int = DEFAULT_PAGE_SIZE
+    ordering: tuple = field(default=('name', 'id'))
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def clamp_page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Parse a user-supplied page size, falling back to ``default``."""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def paginate_keyset(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE,
+                    ordering=('name', 'id')):
+    """
+    Return a ``KeysetPage`` of ``queryset`` ordered by ``ordering``.
+
+    The last field in ``ordering`` must be unique (normally ``id``) so the
+    order is total. One extra row is fetched to learn whether a next page
+    exists without issuing a ``COUNT(*)``.
+    """
+    queryset = keyset_queryset(queryset, cursor, page_size, ordering)
+    return keyset_page(list(queryset), page_size, ordering)
+
+
+async def apaginate_keyset(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE,
+                           ordering=('name', 'id')):
+    """Async ``paginate_keyset``, fetching the page with the async ORM."""
+    queryset = keyset_queryset(queryset, cursor, page_size, ordering)
+    return keyset_page([row async for row in queryset], page_size, ordering)
+
+
+def keyset_queryset(queryset, cursor, page_size, ordering):
+    """The rows of one page plus the look-ahead row, still unevaluated."""
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, len(ordering))
+        queryset = queryset.filter(keyset_filter(ordering, values))
+    return queryset[:page_size + 1]
+
+
+def keyset_page(rows, page_size, ordering):
+    """Build the ``KeysetPage`` from the rows ``keyset_queryset`` fetched."""
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        if isinstance(last, dict):
+            key = [last[name] for name in ordering]
+        else:
+            key = [getattr(last, name) for name in ordering]
+        next_cursor = encode_cursor(key)
+    return KeysetPage(
+        object_list=rows,
+        next_cursor=next_cursor,
+        page_size=page_size,
+        ordering=tuple(ordering),
+    )
+
+
+DEFAULT_EXACT_COUNT_LIMIT = 10_000
+
+
+def exact_count_limit():
+    return getattr(settings, 'DIRECTORY_EXACT_COUNT_LIMIT', DEFAULT_EXACT_COUNT_LIMIT)
+
+
+def _planner_rows(queryset):
+    """Postgres planner estimate of the rows ``queryset`` returns."""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimate_count(queryset):
+    """
+    Approximate ``queryset.count()`` without scanning the table.
+
+    Postgres asks the planner, which works for filtered querysets too.
+    Elsewhere an unfiltered queryset is estimated from ``MAX(pk)``, an
+    index lookup that overcounts only by the number of deleted rows;
+    filtered querysets return ``None``.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        return _planner_rows(queryset)
+    if queryset.query.has_filters() or queryset.query.distinct:
+        return None
+    return queryset.order_by().aggregate(top=Max('pk'))['top'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for changelists over tables too large to ``COUNT(*)``.
+
+    Counts exactly while the result has at most ``exact_count_limit()`` rows,
+    which only costs a bounded ``LIMIT`` query. Past that the count is
+    estimated; when no estimate is available it stays at the limit, so page
+    links stop there and searching narrows the list instead.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        limit = exact_count_limit()
+        bounded = queryset.order_by()[:limit + 1].count()
+        if bounded <= limit:
+            return bounded
+        estimate = estimate_count(queryset)
+        return max(estimate, bounded) if estimate is not None else bounded
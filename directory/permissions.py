@@ -0,0 +1,123 @@
+"""
+Who may do what, by role and by ownership.
+
+Permissions are Django's ``"app_label.codename"`` strings, checked with
+``user.has_perm()`` in views and ``{{ perms.directory.change_foodtruck }}``
+in templates. A user holds:
+
+* the permissions granted to them or their groups in the admin,
+* the fixed set for their ``CustomUser.role`` (``ROLE_PERMISSIONS``), and,
+* for a food truck owner, change permissions on their own trucks and
+  business profile only (``OWNER_OBJECT_PERMISSIONS``), checked with
+  ``user.has_perm(perm, obj)``.
+
+``CachedModelBackend`` resolves the first two once, when it loads the
+user, and caches them with the user; ownership is decided from the cached
+``food_truck_profile``. So authorization adds no queries to a request.
+"""
+
+from functools import wraps
+
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+
+from .models import FoodTruck, FoodTruckOwnerProfile
+
+OWNER = 'food_truck_owner'
+ADMIN = 'admin'
+WEBSITE_USER = 'website_user'
+
+ROLE_PERMISSIONS = {
+    WEBSITE_USER: frozenset({
+        'directory.add_trucksubmission',
+    }),
+    OWNER: frozenset({
+        'directory.add_trucksubmission',
+    }),
+    # Site admins moderate: they review submissions and may correct any
+    # truck or owner profile, without needing Django staff status.
+    ADMIN: frozenset({
+        'directory.add_trucksubmission',
+        'directory.view_trucksubmission',
+        'directory.change_trucksubmission',
+        'directory.change_foodtruck',
+        'directory.change_foodtruckownerprofile',
+    }),
+}
+
+OWNER_OBJECT_PERMISSIONS = {
+    FoodTruck: frozenset({'directory.change_foodtruck'}),
+    FoodTruckOwnerProfile: frozenset({'directory.change_foodtruckownerprofile'}),
+}
+
+
+def role_permissions(user):
+    return ROLE_PERMISSIONS.get(user.role, frozenset())
+
+
+def owner_profile_id(user):
+    """The pk of ``user``'s business profile, or ``None``; no query for a cached user."""
+    profile = getattr(user, 'food_truck_profile', None)
+    return profile.pk if profile is not None else None
+
+
+def owns(user, obj):
+    """Whether ``obj`` (a truck or owner profile) belongs to ``user``."""
+    if isinstance(obj, FoodTruck):
+        profile_id = owner_profile_id(user)
+        return profile_id is not None and obj.owner_id == profile_id
+    if isinstance(obj, FoodTruckOwnerProfile):
+        return obj.user_id == user.pk
+    return False
+
+
+def object_permissions(user, obj):
+    """Permissions ``user`` holds on ``obj`` because they own it."""
+    if user.role != OWNER or not owns(user, obj):
+        return frozenset()
+    return OWNER_OBJECT_PERMISSIONS.get(type(obj), frozenset())
+
+
+def check_object_permission(user, perm, obj):
+    """Raise ``PermissionDenied`` unless ``user`` has ``perm`` on ``obj``."""
+    if not user.has_perm(perm, obj):
+        raise PermissionDenied
+
+
+def role_required(*roles):
+    """
+    Let signed-in users with one of ``roles`` (and superusers) through;
+    others get a 403, and anonymous visitors the login page.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            user = request.user
+            if not user.is_authenticated:
+                return redirect_to_login(request.get_full_path())
+            if not (user.is_superuser or user.role in roles):
+                raise PermissionDenied
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def permission_required(perm):
+    """
+    Let signed-in users holding ``perm`` through; others get a 403, and
+    anonymous visitors the login page.
+
+    Unlike Django's decorator of the same name this never sends a signed-in
+    user round the login page. For object-level checks, look the object up
+    in the view and call ``check_object_permission()``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return redirect_to_login(request.get_full_path())
+            if not request.user.has_perm(perm):
+                raise PermissionDenied
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,279 @@
+"""
+Opt-in per-request profiling: query count and time, template render time
+and total latency, kept in a bounded in-memory ring buffer.
+
+Enable with ``DIRECTORY_PROFILING_ENABLED = True``. When it is off the
+middleware removes itself at startup (``MiddlewareNotUsed``), so it costs
+nothing. When it is on, ``DIRECTORY_PROFILING_SAMPLE_RATE`` of requests are
+measured; unsampled requests pay for one ``random()`` call.
+
+Queries are grouped by *shape* (the SQL with literals and ``IN`` lists
+collapsed). A shape repeated ``DIRECTORY_PROFILING_N_PLUS_ONE_THRESHOLD``
+times in one request is flagged as a likely N+1.
+
+The buffer is per process; with several workers each one reports its own
+recent requests.
+"""
+
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+DEFAULT_BUFFER_SIZE = 1000
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+PROFILING_URL_NAMES = ('profiling_dashboard', 'profiling_data')
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+_current = ContextVar('directory_profiling_sample', default=None)
+
+
+def sql_shape(sql):
+    """Normalize SQL so queries differing only in parameters compare equal."""
+    sql = _STRING.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _NUMBER.sub('?', sql)
+    return ' '.join(sql.split())
+
+
+@dataclass
+class RequestSample:
+    """Measurements for one sampled request."""
+
+    view: str
+    method: str
+    path: str
+    status: int = 0
+    total_ms: float = 0.0
+    db_ms: float = 0.0
+    queries: int = 0
+    template_ms: float = 0.0
+    started_at: float = field(default_factory=time.time)
+    shapes: Counter = field(default_factory=Counter, repr=False)
+    repeated: list = field(default_factory=list)
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper().
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - start) * 1000
+            self.queries += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    def finish(self, threshold):
+        self.repeated = [
+            {'sql': shape, 'count': count}
+            for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+        self.shapes = Counter()
+
+    def as_dict(self):
+        data = asdict(self)
+        data.pop('shapes')
+        return data
+
+
+class SampleBuffer:
+    """Thread-safe ring buffer of the most recent ``RequestSample`` objects."""
+
+    def __init__(self, size=DEFAULT_BUFFER_SIZE):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def resize(self, size):
+        with self._lock:
+            if self._samples.maxlen != size:
+                self._samples = deque(self._samples, maxlen=size)
+
+    def append(self, sample):
+        with self._lock:
+            self._samples.append(sample)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._samples)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+
+samples = SampleBuffer()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(recorded=None):
+    """
+    Per-view statistics, slowest p95 first.
+
+    Each entry has request count, p50/p95/p99 latency, p95 DB and template
+    time, mean and max query count, and the repeated query shapes seen.
+    """
+    recorded = samples.snapshot() if recorded is None else recorded
+    by_view = {}
+    for sample in recorded:
+        by_view.setdefault(sample.view, []).append(sample)
+
+    summary = []
+    for view, view_samples in by_view.items():
+        totals = [s.total_ms for s in view_samples]
+        queries = [s.queries for s in view_samples]
+        repeated = Counter()
+        for s in view_samples:
+            for entry in s.repeated:
+                repeated[entry['sql']] = max(repeated[entry['sql']], entry['count'])
+        summary.append({
+            'view': view,
+            'requests': len(view_samples),
+            'p50_ms': round(percentile(totals, 50), 2),
+            'p95_ms': round(percentile(totals, 95), 2),
+            'p99_ms': round(percentile(totals, 99), 2),
+            'db_p95_ms': round(percentile([s.db_ms for s in view_samples], 95), 2),
+            'template_p95_ms': round(
+                percentile([s.template_ms for s in view_samples], 95), 2
+            ),
+            'queries_mean': round(sum(queries) / len(queries), 1),
+            'queries_max': max(queries),
+            'n_plus_one': [
+                {'sql': shape, 'count': count} for shape, count in repeated.most_common(5)
+            ],
+        })
+    summary.sort(key=lambda entry: entry['p95_ms'], reverse=True)
+    return summary
+
+
+_template_timer_lock = threading.Lock()
+_template_timer_installed = False
+
+
+def install_template_timer():
+    """
+    Time top-level template renders for the sampled request.
+
+    Wraps the Django template backend's ``Template.render``, which runs once
+    per ``render()``/``TemplateResponse``; ``{% include %}`` and inclusion
+    tags render inside it and are counted with their parent.
+    """
+    global _template_timer_installed
+    from django.template.backends.django import Template
+
+    with _template_timer_lock:
+        if _template_timer_installed:
+            return
+        original = Template.render
+
+        def render(self, context=None, request=None):
+            sample = _current.get()
+            if sample is None:
+                return original(self, context, request)
+            start = time.perf_counter()
+            try:
+                return original(self, context, request)
+            finally:
+                sample.template_ms += (time.perf_counter() - start) * 1000
+
+        Template.render = render
+        _template_timer_installed = True
+
+
+def wrap_connections(stack, sample):
+    """Count every query on this thread's connections into ``sample``."""
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(sample))
+
+
+class ProfilingMiddleware:
+    """
+    Record cost metrics for a sample of requests into ``samples``. Runs in
+    the handler's own mode, so under ASGI it doesn't force every request
+    through a sync adapter, and unsampled requests pass straight through.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'DIRECTORY_PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.sample_rate = float(getattr(settings, 'DIRECTORY_PROFILING_SAMPLE_RATE', 1.0))
+        self.threshold = getattr(
+            settings, 'DIRECTORY_PROFILING_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD
+        )
+        samples.resize(getattr(settings, 'DIRECTORY_PROFILING_BUFFER_SIZE', DEFAULT_BUFFER_SIZE))
+        install_template_timer()
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        sample = RequestSample(view='', method=request.method, path=request.path)
+        token = _current.set(sample)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                wrap_connections(stack, sample)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        sample.total_ms = (time.perf_counter() - start) * 1000
+        self.record(sample, request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        sample = RequestSample(view='', method=request.method, path=request.path)
+        token = _current.set(sample)
+        start = time.perf_counter()
+        stack = ExitStack()
+        try:
+            # Connections are per thread, and the async ORM queries from
+            # sync_to_async's thread, so the wrappers go on that thread's.
+            await sync_to_async(wrap_connections)(stack, sample)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current.reset(token)
+        sample.total_ms = (time.perf_counter() - start) * 1000
+        self.record(sample, request, response)
+        return response
+
+    def record(self, sample, request, response):
+        match = request.resolver_match
+        if match is not None and match.url_name in PROFILING_URL_NAMES:
+            return
+        sample.view = match.view_name if match is not None else 'unresolved'
+        sample.status = response.status_code
+        sample.finish(self.threshold)
+        samples.append(sample)
@@ -0,0 +1,358 @@
+"""
+"Recommended for you": trucks ranked per user from the free-text
+preferences on ``WebsiteUserProfile``.
+
+``favorite_cuisine_types`` and ``dietary_preferences`` are split into terms
+and matched against the cuisines trucks actually list and the
+``DietaryTag`` vocabulary, giving every user a cuisine vector and a vector
+of required tags. A truck's score is a weighted sum
+(``DIRECTORY_RECOMMENDATION_WEIGHTS``) of three terms in ``[0, 1]``:
+
+* cuisine: 1 if the truck serves one of the user's favorite cuisines;
+* dietary fit: the share of the user's requirements the truck meets (a
+  truck whose cuisine is itself a tag, like "Vegan", meets that tag);
+  1 for users without requirements;
+* proximity: ``exp(-miles / DIRECTORY_RECOMMENDATION_DISTANCE_MILES)``
+  from the user's home coordinates, or from the centroid of the trucks in
+  their home city; 0 when neither is known.
+
+Users are scored a block at a time against every truck with NumPy, and the
+best ``DIRECTORY_RECOMMENDATION_TOP_N`` per user are stored in
+``UserRecommendations`` by the ``compute_recommendations`` command. Pages
+only read the stored list.
+"""
+
+import math
+import re
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .facets import city_key
+from .geo import pairwise_chord_miles, unit_vectors
+
+DEFAULT_WEIGHTS = {'cuisine': 0.5, 'dietary': 0.3, 'proximity': 0.2}
+DEFAULT_TOP_N = 12
+DEFAULT_DISTANCE_MILES = 10.0
+DEFAULT_BLOCK_SIZE = 1000
+
+_SEPARATORS = re.compile(r'[,;/|&+\n]|\band\b|\bor\b', re.IGNORECASE)
+_FILLER = re.compile(r'\b(?:food|foods|cuisine|style|dishes|friendly|options?|only)\b')
+
+# Common phrasings of the seeded dietary tags, keyed by tag slug.
+DIETARY_SYNONYMS = {
+    'vegetarian': ['veggie', 'no meat'],
+    'vegan': ['plant based'],
+    'gluten-free': ['celiac', 'coeliac', 'no gluten'],
+    'dairy-free': ['lactose free', 'lactose intolerant', 'no dairy'],
+    'nut-free': ['nut allergy', 'peanut allergy', 'no nuts'],
+}
+
+
+def normalize_term(text):
+    text = _FILLER.sub(' ', text.lower().replace('-', ' '))
+    return ' '.join(text.split())
+
+
+def split_terms(text):
+    """Normalized, de-duplicated terms of a free-text preference field."""
+    terms = []
+    for part in _SEPARATORS.split(text or ''):
+        term = normalize_term(part)
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def recommendation_settings():
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'DIRECTORY_RECOMMENDATION_WEIGHTS', {})}
+    top_n = getattr(settings, 'DIRECTORY_RECOMMENDATION_TOP_N', DEFAULT_TOP_N)
+    miles = getattr(settings, 'DIRECTORY_RECOMMENDATION_DISTANCE_MILES', DEFAULT_DISTANCE_MILES)
+    return weights, top_n, miles
+
+
+class Vocabulary:
+    """
+    The cuisines and dietary tags preferences are matched against.
+
+    Parsing is memoized per distinct text, since many users write the same
+    few preferences.
+    """
+
+    def __init__(self, cuisines, tags):
+        self.cuisines = list(cuisines)
+        self.tag_ids = [tag_id for tag_id, _, _ in tags]
+        self._cuisine_words = [frozenset(normalize_term(c).split()) for c in self.cuisines]
+        self._tag_keys = {}
+        for index, (_, slug, name) in enumerate(tags):
+            self._tag_keys[normalize_term(slug)] = index
+            self._tag_keys[normalize_term(name)] = index
+            for synonym in DIETARY_SYNONYMS.get(slug, ()):
+                self._tag_keys.setdefault(normalize_term(synonym), index)
+        # Cuisines that name a tag ("Vegan") imply it.
+        self.cuisine_tags = [self._tag_keys.get(normalize_term(c)) for c in self.cuisines]
+        self._parsed = {}
+
+    def cuisine_indices(self, text):
+        key = ('cuisine', text)
+        if key not in self._parsed:
+            indices = set()
+            for term in split_terms(text):
+                words = frozenset(term.split())
+                indices.update(
+                    index for index, cuisine_words in enumerate(self._cuisine_words)
+                    if cuisine_words and (words <= cuisine_words or cuisine_words <= words)
+                )
+            self._parsed[key] = sorted(indices)
+        return self._parsed[key]
+
+    def tag_indices(self, text):
+        key = ('tag', text)
+        if key not in self._parsed:
+            indices = {self._tag_keys[term] for term in split_terms(text) if term in self._tag_keys}
+            self._parsed[key] = sorted(indices)
+        return self._parsed[key]
+
+
+class TruckMatrix:
+    """Column-oriented arrays describing every truck, in ``ids`` order."""
+
+    def __init__(self, vocabulary, rows, tag_links):
+        """
+        ``rows`` are ``(id, cuisine, city, latitude, longitude)`` tuples and
+        ``tag_links`` ``(truck_id, tag_id)`` pairs.
+        """
+        cuisine_index = {cuisine: index for index, cuisine in enumerate(vocabulary.cuisines)}
+        unknown = len(vocabulary.cuisines)
+        count = len(rows)
+        self.ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+        # Trucks without a known cuisine point at an always-zero column.
+        self.cuisine = np.fromiter(
+            (cuisine_index.get(row[1], unknown) for row in rows), dtype=np.intp, count=count
+        )
+        self.points = unit_vectors(
+            np.radians(np.array([math.nan if row[3] is None else row[3] for row in rows])),
+            np.radians(np.array([math.nan if row[4] is None else row[4] for row in rows])),
+        )
+        # Trucks without coordinates sit at the earth's center, a full
+        # radius from every user, which scores as no proximity at all.
+        np.nan_to_num(self.points, copy=False, nan=0.0)
+
+        tags = np.zeros((len(vocabulary.tag_ids), count), dtype=np.float32)
+        position = {truck_id: index for index, truck_id in enumerate(self.ids.tolist())}
+        tag_row = {tag_id: index for index, tag_id in enumerate(vocabulary.tag_ids)}
+        for truck_id, tag_id in tag_links:
+            if truck_id in position and tag_id in tag_row:
+                tags[tag_row[tag_id], position[truck_id]] = 1
+        for cuisine, tag in enumerate(vocabulary.cuisine_tags):
+            if tag is not None:
+                tags[tag, self.cuisine == cuisine] = 1
+
+        # Trucks with the same cuisine and tags score the same on both, so
+        # those terms are computed once per distinct "kind" (a few hundred
+        # at most) and gathered per truck.
+        kinds, kind = np.unique(
+            np.vstack([self.cuisine[None, :], tags]), axis=1, return_inverse=True
+        )
+        self.kind = kind.reshape(-1)
+        self.kind_cuisine = kinds[0].astype(np.intp)
+        self.kind_tags = kinds[1:].astype(np.float32)
+
+        sums = {}
+        for _, _, city, latitude, longitude in rows:
+            if latitude is not None and longitude is not None:
+                total = sums.setdefault(city_key(city), [0.0, 0.0, 0])
+                total[0] += latitude
+                total[1] += longitude
+                total[2] += 1
+        self.city_centroids = {
+            city: (lat_sum / n, lon_sum / n) for city, (lat_sum, lon_sum, n) in sums.items()
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_trucks(using='default'):
+    """Build the ``Vocabulary`` and ``TruckMatrix`` from the database."""
+    from .models import DietaryTag, FoodTruck
+
+    rows = list(
+        FoodTruck.objects.using(using).order_by('pk')
+        .values_list('id', 'cuisine', 'city', 'latitude', 'longitude')
+        .iterator(chunk_size=5000)
+    )
+    tags = list(DietaryTag.objects.using(using).order_by('pk').values_list('id', 'slug', 'name'))
+    vocabulary = Vocabulary(sorted({row[1] for row in rows if row[1]}), tags)
+    links = FoodTruck.dietary_tags.through.objects.using(using).values_list(
+        'foodtruck_id', 'dietarytag_id'
+    )
+    return vocabulary, TruckMatrix(vocabulary, rows, links.iterator(chunk_size=5000))
+
+
+def user_vectors(vocabulary, trucks, profiles):
+    """
+    Preference arrays for ``profiles``, ``(favorite_cuisine_types,
+    dietary_preferences, home_city, home_latitude, home_longitude)`` tuples.
+
+    Returns ``(cuisine, required, points)``: a users x (cuisines + 1)
+    matrix, a users x tags matrix and home ``unit_vectors`` (NaN when
+    unknown).
+    """
+    count = len(profiles)
+    cuisine = np.zeros((count, len(vocabulary.cuisines) + 1), dtype=np.float32)
+    required = np.zeros((count, len(vocabulary.tag_ids)), dtype=np.float32)
+    lats = np.full(count, math.nan)
+    lons = np.full(count, math.nan)
+    for row, (cuisines, dietary, city, latitude, longitude) in enumerate(profiles):
+        cuisine[row, vocabulary.cuisine_indices(cuisines)] = 1
+        required[row, vocabulary.tag_indices(dietary)] = 1
+        if latitude is None or longitude is None:
+            latitude, longitude = trucks.city_centroids.get(city_key(city), (None, None))
+        if latitude is not None and longitude is not None:
+            lats[row], lons[row] = latitude, longitude
+    return cuisine, required, unit_vectors(np.radians(lats), np.radians(lons))
+
+
+def score_block(trucks, cuisine, required, points, weights, distance_miles):
+    """
+    users x trucks float32 score matrix for one block of users.
+
+    Rows with a home location should come first: their proximity is then
+    added to a slice of ``scores`` rather than scattered into it.
+    """
+    # Cuisine and dietary fit (the share of a user's required tags a kind
+    # meets), users x kinds, then one gather to users x trucks.
+    need = required.sum(axis=1)
+    fit = required @ trucks.kind_tags
+    fit /= np.maximum(need, 1)[:, None]
+    fit[need == 0] = 1
+    kind_scores = weights['cuisine'] * cuisine[:, trucks.kind_cuisine] + weights['dietary'] * fit
+    scores = kind_scores[:, trucks.kind]
+
+    located = ~np.isnan(points[:, 0])
+    count = int(located.sum())
+    if count and weights['proximity']:
+        proximity = pairwise_chord_miles(points[located], trucks.points)
+        # weight * exp(-miles / distance) as a single exp.
+        proximity *= -1 / distance_miles
+        proximity += math.log(weights['proximity'])
+        np.exp(proximity, out=proximity)
+        if located[:count].all():
+            scores[:count] += proximity
+        else:
+            scores[located] += proximity
+    return scores
+
+
+def top_n(scores, n):
+    """Column indices and scores of each row's ``n`` best entries, best first."""
+    rows, columns = scores.shape
+    n = min(n, columns)
+    if n < columns:
+        # Partial selection; only the n survivors per row are sorted.
+        best = np.argpartition(scores, columns - n, axis=1)[:, columns - n:]
+    else:
+        best = np.tile(np.arange(columns), (rows, 1))
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    return np.take_along_axis(best, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+def recommend_block(vocabulary, trucks, profiles, n, weights, distance_miles):
+    """
+    Top-``n`` truck ids per profile, or ``None`` for profiles that gave
+    nothing to rank by (no matched cuisine or tag and no location).
+    """
+    cuisine, required, points = user_vectors(vocabulary, trucks, profiles)
+    has_signal = cuisine.any(axis=1) | required.any(axis=1) | ~np.isnan(points[:, 0])
+    results = [None] * len(profiles)
+    rows = np.flatnonzero(has_signal)
+    if not len(rows) or not len(trucks):
+        return results
+    rows = rows[np.argsort(np.isnan(points[rows, 0]), kind='stable')]
+    scores = score_block(trucks, cuisine[rows], required[rows], points[rows], weights, distance_miles)
+    best, _ = top_n(scores, n)
+    for row, columns in zip(rows.tolist(), trucks.ids[best].tolist()):
+        results[row] = columns
+    return results
+
+
+def _blocks(iterable, size):
+    block = []
+    for item in iterable:
+        block.append(item)
+        if len(block) == size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def compute_recommendations(user_ids=None, block_size=DEFAULT_BLOCK_SIZE, using='default'):
+    """
+    Score website users and store their top trucks in ``UserRecommendations``.
+
+    Every profile is scored unless ``user_ids`` is given. Stored lists of
+    users who no longer give anything to rank by, or have no profile, are
+    removed. Returns ``(stored, cleared)`` user counts.
+    """
+    from .models import UserRecommendations, WebsiteUserProfile
+
+    weights, n, distance_miles = recommendation_settings()
+    vocabulary, trucks = load_trucks(using)
+    profiles = WebsiteUserProfile.objects.using(using).order_by('user_id')
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=user_ids)
+    rows = profiles.values_list(
+        'user_id', 'favorite_cuisine_types', 'dietary_preferences',
+        'home_city', 'home_latitude', 'home_longitude',
+    ).iterator(chunk_size=block_size)
+
+    stored = cleared = 0
+    computed_at = timezone.now()
+    recommendations = UserRecommendations.objects.using(using)
+    for block in _blocks(rows, block_size):
+        ranked = recommend_block(
+            vocabulary, trucks, [row[1:] for row in block], n, weights, distance_miles
+        )
+        keep = [
+            UserRecommendations(user_id=row[0], truck_ids=truck_ids, computed_at=computed_at)
+            for row, truck_ids in zip(block, ranked) if truck_ids is not None
+        ]
+        drop = [row[0] for row, truck_ids in zip(block, ranked) if truck_ids is None]
+        with transaction.atomic(using=using):
+            recommendations.bulk_create(
+                keep, update_conflicts=True, unique_fields=['user'],
+                update_fields=['truck_ids', 'computed_at'],
+            )
+            cleared += recommendations.filter(user_id__in=drop).delete()[0]
+        stored += len(keep)
+
+    orphans = recommendations.filter(user__website_user_profile__isnull=True)
+    if user_ids is not None:
+        orphans = orphans.filter(user_id__in=user_ids)
+    cleared += orphans.delete()[0]
+    return stored, cleared
+
+
+def recommended_trucks(user, limit=None):
+    """``user``'s stored recommendations as ``FoodTruck`` objects, best first."""
+    from .models import FoodTruck, UserRecommendations
+
+    if not user.is_authenticated:
+        return []
+    truck_ids = (
+        UserRecommendations.objects.filter(user=user)
+        .values_list('truck_ids', flat=True).first()
+    )
+    if not truck_ids:
+        return []
+    truck_ids = truck_ids[:limit]
+    trucks = FoodTruck.objects.only(
+        'id', 'name', 'city', 'cuisine', 'description', 'image', 'image_variants',
+    ).in_bulk(truck_ids)
+    # Trucks deleted since the last batch run are skipped.
+    return [trucks[pk] for pk in truck_ids if pk in trucks]
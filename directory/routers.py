@@ -0,0 +1,148 @@
+"""
+Primary/replica database routing.
+
+Writes always go to the primary (``default``). Reads go to one of
+``DIRECTORY_DATABASE_REPLICAS`` only while serving a request through
+``ReplicaRoutingMiddleware``, and only when nothing calls for fresh data:
+
+* requests with unsafe methods (POST, PUT...) read from the primary
+  throughout, so forms validate against what they are about to change;
+* once a request writes, the rest of it reads from the primary;
+* a visitor whose request wrote stays on the primary for
+  ``DIRECTORY_REPLICA_STICKY_SECONDS``, recorded in their session, so they
+  see their own changes while the replicas catch up;
+* sessions are always read from the primary.
+
+Code running outside a request (management commands, task workers) reads
+from the primary, since it usually reads what it has just written. Wrap a
+block in ``replica_reads()`` to send its reads to a replica instead.
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PRIMARY = 'default'
+PRIMARY_ONLY_APPS = frozenset({'sessions'})
+PINNED_UNTIL_SESSION_KEY = '_db_primary_until'
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+DEFAULT_STICKY_SECONDS = 10
+
+_routing = ContextVar('directory_db_routing', default=None)
+
+
+@dataclass
+class Routing:
+    """Where reads go for the current request (or ``replica_reads()`` block)."""
+
+    replica: str
+    pinned: bool = False
+    wrote: bool = False
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DIRECTORY_DATABASE_REPLICAS', []))
+
+
+def sticky_seconds():
+    return getattr(settings, 'DIRECTORY_REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+
+
+@contextmanager
+def replica_reads(pinned=False):
+    """
+    Route reads in the block to a replica, picked once so the block sees
+    one replica throughout. ``pinned`` starts it on the primary instead.
+    """
+    aliases = replica_aliases()
+    state = Routing(replica=random.choice(aliases) if aliases else PRIMARY, pinned=pinned)
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """``DATABASE_ROUTERS`` entry implementing the rules above."""
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or state.pinned or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return PRIMARY
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            # Read your writes: nothing later in the request may read a
+            # replica that has not seen this one yet.
+            state.pinned = state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the primary's rows, so objects read from any of
+        # them can be related to each other.
+        databases = {PRIMARY, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema by replication from the primary.
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route each request's reads, and pin visitors to the primary for a
+    while after a request of theirs writes. Must come after
+    ``SessionMiddleware``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def must_use_primary(self, request, pinned_until):
+        return request.method not in SAFE_METHODS or (pinned_until or 0) > time.time()
+
+    def has_session(self, request):
+        # Without a session cookie nobody can be pinned; not touching the
+        # session keeps "Vary: Cookie" off anonymous responses.
+        return settings.SESSION_COOKIE_NAME in request.COOKIES
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        pinned_until = (
+            request.session.get(PINNED_UNTIL_SESSION_KEY) if self.has_session(request) else None
+        )
+        with replica_reads(pinned=self.must_use_primary(request, pinned_until)) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            request.session[PINNED_UNTIL_SESSION_KEY] = time.time() + sticky_seconds()
+        return response
+
+    async def __acall__(self, request):
+        pinned_until = (
+            await request.session.aget(PINNED_UNTIL_SESSION_KEY)
+            if self.has_session(request) else None
+        )
+        with replica_reads(pinned=self.must_use_primary(request, pinned_until)) as state:
+            response = await self.get_response(request)
+        if state.wrote:
+            await request.session.aset(PINNED_UNTIL_SESSION_KEY, time.time() + sticky_seconds())
+        return response
@@ -0,0 +1,239 @@
+"""
+Ranked full-text search over ``FoodTruck`` name, cuisine and description.
+
+The backend is chosen from the database vendor (or the
+``DIRECTORY_SEARCH_BACKEND`` setting, a dotted path to a
+``SearchBackend`` subclass):
+
+* SQLite keeps a separate FTS5 table, ``directory_foodtruck_fts``, keyed by
+  the truck id and ranked with ``bm25()``.
+* Postgres ranks an indexed ``tsvector`` expression, so there is nothing to
+  maintain by hand.
+
+Both update incrementally from the model signals in ``directory.signals``
+and can be rebuilt in bulk with ``manage.py rebuild_search_index``.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils.module_loading import import_string
+
+from .models import FoodTruck
+
+
+FTS_TABLE = 'directory_foodtruck_fts'
+MAX_QUERY_TERMS = 8
+DEFAULT_LIMIT = 50
+
+# Column weights: a hit in the name matters more than one in the blurb.
+NAME_WEIGHT = 10.0
+CUISINE_WEIGHT = 5.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+def query_terms(query):
+    """Split free text into lower-case word tokens."""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_QUERY_TERMS]
+
+
+class SearchBackend:
+    """Interface shared by the search backends."""
+
+    def __init__(self, using='default'):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Return up to ``limit`` trucks ranked best-first."""
+        raise NotImplementedError
+
+    def index_trucks(self, trucks, replace=True):
+        """
+        Add or refresh the index entries for ``trucks``.
+
+        Pass ``replace=False`` when the trucks are known to be unindexed.
+        """
+
+    def remove_trucks(self, truck_ids):
+        """Drop the index entries for ``truck_ids``."""
+
+    def rebuild(self, batch_size=2000):
+        """Rebuild the index from scratch; returns the number of rows indexed."""
+        return 0
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """FTS5 virtual table maintained alongside ``directory_foodtruck``."""
+
+    @staticmethod
+    def create_table(schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"name, cuisine, description, "
+            f"tokenize = 'porter unicode61 remove_diacritics 2', prefix = '2 3 4')"
+        )
+        # Persist the column weights as the table's ``rank`` function so
+        # ``ORDER BY rank`` can use FTS5's optimised top-N path.
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES "
+            f"('rank', 'bm25({NAME_WEIGHT}, {CUISINE_WEIGHT}, {DESCRIPTION_WEIGHT})')"
+        )
+
+    @staticmethod
+    def drop_table(schema_editor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+    @staticmethod
+    def match_expression(query):
+        """
+        Turn user input into an FTS5 MATCH expression.
+
+        Every term is quoted (so FTS operators in the input are inert) and
+        prefix-matched, and terms are implicitly AND-ed.
+        """
+        return ' '.join(f'"{term}"*' for term in query_terms(query))
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        # Rank every match and cut to ``limit`` inside FTS5, so only the
+        # winners are joined back to the truck table. ``ORDER BY rank LIMIT``
+        # directly on the FTS table is FTS5's top-N path: it keeps the best
+        # ``limit`` rows while scanning instead of sorting all matches.
+        table = FoodTruck._meta.db_table
+        sql = (
+            f'SELECT t.*, hits.rank AS rank FROM ('
+            f'SELECT rowid, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY rank LIMIT %s'
+            f') hits JOIN {table} t ON t.id = hits.rowid ORDER BY hits.rank'
+        )
+        params = [expression, limit]
+        return list(FoodTruck.objects.using(self.using).raw(sql, params))
+
+    def index_trucks(self, trucks, replace=True):
+        rows = [
+            (truck.pk, truck.name, truck.cuisine, truck.description or '')
+            for truck in trucks
+        ]
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            if replace:
+                cursor.executemany(
+                    f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                    [(row[0],) for row in rows],
+                )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, cuisine, description) '
+                f'VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove_trucks(self, truck_ids):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(truck_id,) for truck_id in truck_ids],
+            )
+
+    @transaction.atomic
+    def rebuild(self, batch_size=2000):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        queryset = FoodTruck.objects.using(self.using).only(
+            'id', 'name', 'cuisine', 'description'
+        )
+        batch, total = [], 0
+        for truck in queryset.iterator(chunk_size=batch_size):
+            batch.append(truck)
+            if len(batch) >= batch_size:
+                self.index_trucks(batch, replace=False)
+                total += len(batch)
+                batch = []
+        self.index_trucks(batch, replace=False)
+        total += len(batch)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        return total
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Ranks against an expression GIN index on the weighted ``tsvector``.
+
+    The index (see migration ``0003``) is built from ``search_vector()`` so
+    Postgres keeps it current on every write; no signal work is needed.
+    """
+
+    CONFIG = 'english'
+    INDEX_NAME = 'foodtruck_search_vector_gin'
+
+    @classmethod
+    def search_vector(cls):
+        from django.contrib.postgres.search import SearchVector
+
+        return (
+            SearchVector('name', weight='A', config=cls.CONFIG)
+            + SearchVector('cuisine', weight='B', config=cls.CONFIG)
+            + SearchVector('description', weight='C', config=cls.CONFIG)
+        )
+
+    @classmethod
+    def gin_index(cls):
+        from django.contrib.postgres.indexes import GinIndex
+
+        return GinIndex(cls.search_vector(), name=cls.INDEX_NAME)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        if not query_terms(query):
+            return []
+        search_query = SearchQuery(query, search_type='websearch', config=self.CONFIG)
+        vector = self.search_vector()
+        return list(
+            FoodTruck.objects.using(self.using)
+            .alias(document=vector)
+            .filter(document=search_query)
+            .annotate(rank=SearchRank(vector, search_query))
+            .order_by('-rank', 'id')[:limit]
+        )
+
+    def rebuild(self, batch_size=2000):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {self.INDEX_NAME}')
+        return FoodTruck.objects.using(self.using).count()
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(using='default'):
+    """Return the configured search backend for the ``using`` database."""
+    path = getattr(settings, 'DIRECTORY_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)(using)
+    vendor = connections[using].vendor
+    try:
+        return VENDOR_BACKENDS[vendor](using)
+    except KeyError:
+        raise NotImplementedError(
+            f'No full-text search backend for the {vendor!r} database'
+        ) from None
+
+
+def search_trucks(query, limit=DEFAULT_LIMIT):
+    """
+    Search the database truck reads are routed to (a replica while serving
+    a GET request); see ``SearchBackend.search``.
+    """
+    return get_search_backend(router.db_for_read(FoodTruck)).search(query, limit)
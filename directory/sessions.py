@@ -0,0 +1,57 @@
+"""
+The default session engine: ``cached_db`` with a bounded cache lifetime.
+
+Django's ``cached_db`` engine reads sessions from the cache and writes
+them through to the database, caching each one until the session itself
+expires. With a per-process cache (the local-memory default) a logout in
+one process deletes its copy only, and the others would keep honouring
+the session for weeks. Here cached copies live at most
+``DIRECTORY_SESSION_CACHE_TIMEOUT`` seconds, after which the session is
+read from the database again; the cookie's own lifetime is unchanged.
+
+Select it, or another engine, with ``DJANGO_SESSION_ENGINE`` (see
+settings).
+"""
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+DEFAULT_CACHE_TIMEOUT = 60
+
+
+def session_cache_timeout():
+    return getattr(settings, 'DIRECTORY_SESSION_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT)
+
+
+class BoundedCache:
+    """A cache whose ``set``/``aset`` never keep a value longer than ``max_timeout``."""
+
+    def __init__(self, cache, max_timeout):
+        self.cache = cache
+        self.max_timeout = max_timeout
+
+    def _timeout(self, timeout):
+        return self.max_timeout if timeout is None else min(timeout, self.max_timeout)
+
+    def set(self, key, value, timeout=None):
+        self.cache.set(key, value, self._timeout(timeout))
+
+    async def aset(self, key, value, timeout=None):
+        await self.cache.aset(key, value, self._timeout(timeout))
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
+
+    def __str__(self):
+        return str(self.cache)
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = 'directory.sessions'
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._cache = BoundedCache(self._cache, session_cache_timeout())
@@ -0,0 +1,386 @@
+"""
+Model signal handlers that keep derived data in step with ``FoodTruck``.
+
+Connected from ``DirectoryConfig.ready()``.
+"""
+
+from collections import Counter
+
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .auth import forget_all_users, forget_user
+from .cache import HOME, bump, truck_scopes
+from .dedup import index_trucks as index_trucks_for_dedup
+from .dedup import rebuild_dedup_index
+from .facets import add_cells, apply_deltas, city_key, set_trucks_verified, tag_deltas, truck_cells
+from .geo import invalidate_geo_index
+from .hours import hours_rows
+from .images import needs_processing, schedule_image_processing
+from .models import (
+    CustomUser, DietaryTag, FacetCount, FoodTruck, FoodTruckOwnerProfile, NotificationEvent,
+    OperatingHours, WebsiteUserProfile,
+)
+from .notifications import enqueue_truck_event, enqueue_truck_events
+from .search import get_search_backend
+from .truck_pages import (
+    location_points, neighbour_ids, refresh_truck_pages, schedule_page_rebuild,
+    schedule_page_refresh,
+)
+
+
+@receiver(post_save, sender=FoodTruck, dispatch_uid='foodtruck_search_index_save')
+def index_truck_for_search(sender, instance, raw=False, using='default', **kwargs):
+    """Refresh the truck's full-text entry in the same transaction as the save."""
+    if raw:
+        return
+    get_search_backend(using).index_trucks([instance])
+
+
+@receiver(post_save, sender=FoodTruck, dispatch_uid='foodtruck_dedup_index_save')
+def index_truck_for_dedup(sender, instance, raw=False, using='default', **kwargs):
+    """Refresh the truck's duplicate-detection keys; a delete cascades to them."""
+    if raw:
+        return
+    index_trucks_for_dedup([instance], using)
+
+
+@receiver(post_delete, sender=FoodTruck, dispatch_uid='foodtruck_search_index_delete')
+def unindex_truck_for_search(sender, instance, using='default', **kwargs):
+    """Remove a deleted truck from the full-text index."""
+    get_search_backend(using).remove_trucks([instance.pk])
+
+
+@receiver(post_save, sender=FoodTruck, dispatch_uid='foodtruck_geo_index_save')
+@receiver(post_delete, sender=FoodTruck, dispatch_uid='foodtruck_geo_index_delete')
+def invalidate_truck_locations(sender, **kwargs):
+    """Make this process rebuild its spatial index on the next query."""
+    invalidate_geo_index()
+
+
+@receiver(pre_save, sender=FoodTruck, dispatch_uid='foodtruck_remember_scopes')
+def remember_truck_scopes(sender, instance, raw=False, **kwargs):
+    """
+    Note the stored city, cuisine and verification so a move invalidates
+    both pages and moves the truck's facet counts, what nearby trucks'
+    pages show of it, and its owner.
+    """
+    instance._previous_listing = instance._previous_facets = instance._previous_nearby = None
+    instance._previous_owner = None
+    if raw or instance.pk is None:
+        return
+    stored = (
+        FoodTruck.objects.filter(pk=instance.pk)
+        .values_list('city', 'cuisine', 'is_verified', 'name', 'latitude', 'longitude',
+                     'owner_id').first()
+    )
+    if stored:
+        instance._previous_listing = stored[:2]
+        instance._previous_facets = stored[:3]
+        instance._previous_nearby = nearby_listing(*stored[3:6], *stored[:2])
+        instance._previous_owner = stored[6]
+
+
+@receiver(post_save, sender=FoodTruck, dispatch_uid='foodtruck_cache_save')
+@receiver(post_delete, sender=FoodTruck, dispatch_uid='foodtruck_cache_delete')
+def invalidate_truck_pages(sender, instance, **kwargs):
+    """Bump the home, directory, city and cuisine scopes the truck touches."""
+    listings = [(instance.city, instance.cuisine)]
+    previous = getattr(instance, '_previous_listing', None)
+    if previous:
+        listings.append(previous)
+    bump(*truck_scopes(*listings))
+
+
+@receiver(post_save, sender=FoodTruck, dispatch_uid='foodtruck_facets_save')
+def count_truck_facets(sender, instance, created, raw=False, using='default', **kwargs):
+    """Move the truck's facet counts when its city, cuisine or verification changes."""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_facets', None)
+    current = (instance.city, instance.cuisine, instance.is_verified)
+    if previous and truck_cells(*previous) == truck_cells(*current):
+        return
+    # A new truck has no tags yet; m2m_changed counts them as they're added.
+    tag_ids = [] if created else list(instance.dietary_tags.values_list('pk', flat=True))
+    if previous:
+        add_cells(truck_cells(*previous, tag_ids), -1, using)
+    add_cells(truck_cells(*current, tag_ids), 1, using)
+
+
+@receiver(post_save, sender=FoodTruck, dispatch_uid='foodtruck_notify_save')
+def notify_truck_users(sender, instance, created, raw=False, using='default', **kwargs):
+    """
+    Queue emails about a new truck, or one that just became verified, in
+    the same transaction as the save.
+    """
+    if raw:
+        return
+    if created:
+        enqueue_truck_event(NotificationEvent.NEW_TRUCK, instance, using)
+        return
+    previous = getattr(instance, '_previous_facets', None)
+    if instance.is_verified and previous and not previous[2]:
+        enqueue_truck_event(NotificationEvent.TRUCK_VERIFIED, instance, using)
+
+
+@receiver(pre_delete, sender=FoodTruck, dispatch_uid='foodtruck_facets_delete')
+def uncount_truck_facets(sender, instance, using='default', **kwargs):
+    """Remove a truck from its facet counts while its tags are still linked."""
+    tag_ids = list(instance.dietary_tags.values_list('pk', flat=True))
+    add_cells(
+        truck_cells(instance.city, instance.cuisine, instance.is_verified, tag_ids), -1, using
+    )
+
+
+@receiver(m2m_changed, sender=FoodTruck.dietary_tags.through,
+          dispatch_uid='foodtruck_tags_facets')
+def count_tag_facets(sender, instance, action, reverse, pk_set, using='default', **kwargs):
+    """
+    Keep per-tag facet counts in step with ``truck.dietary_tags`` and
+    ``tag.trucks`` changes, from either side of the relation.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    sign = 1 if action == 'post_add' else -1
+    if reverse:
+        trucks = instance.trucks.all() if action == 'pre_clear' else (
+            FoodTruck.objects.filter(pk__in=pk_set)
+        )
+        apply_deltas(tag_deltas(instance.pk, trucks, sign), using)
+        bump(*truck_scopes())
+        return
+    tag_ids = instance.dietary_tags.values_list('pk', flat=True) if action == 'pre_clear' \
+        else pk_set
+    base = (city_key(instance.city), instance.cuisine, instance.is_verified)
+    apply_deltas(Counter({(tag_id, *base): sign for tag_id in tag_ids}), using)
+    bump(*truck_scopes((instance.city, instance.cuisine)))
+
+
+@receiver(pre_delete, sender=DietaryTag, dispatch_uid='dietarytag_facets_delete')
+def drop_tag_facets(sender, instance, using='default', **kwargs):
+    """Tag links are cascade-deleted without m2m_changed; drop the tag's cells."""
+    FacetCount.objects.using(using).filter(tag_id=instance.pk).delete()
+    bump(*truck_scopes())
+
+
+@receiver(pre_save, sender=FoodTruckOwnerProfile, dispatch_uid='ownerprofile_remember_verified')
+def remember_owner_verified(sender, instance, raw=False, **kwargs):
+    instance._previous_verified = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_verified = (
+        FoodTruckOwnerProfile.objects.filter(pk=instance.pk)
+        .values_list('is_verified', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=FoodTruckOwnerProfile, dispatch_uid='ownerprofile_sync_verified')
+def sync_truck_verification(sender, instance, created, raw=False, using='default', **kwargs):
+    """
+    Copy a verification change onto the owner's trucks and their facet
+    counts, and queue emails about the trucks that became verified.
+    """
+    previous = getattr(instance, '_previous_verified', None)
+    if raw or created or previous is None or previous == instance.is_verified:
+        return
+    newly_verified = list(instance.trucks.filter(is_verified=False)) if instance.is_verified else []
+    set_trucks_verified(instance.trucks.all(), instance.is_verified, using)
+    enqueue_truck_events(NotificationEvent.TRUCK_VERIFIED, newly_verified, using)
+
+
+@receiver(pre_delete, sender=FoodTruckOwnerProfile, dispatch_uid='ownerprofile_unverify_trucks')
+def unverify_owner_trucks(sender, instance, using='default', **kwargs):
+    """The owner's trucks lose their owner, and with it their verification."""
+    set_trucks_verified(instance.trucks.all(), False, using)
+
+
+@receiver(post_save, sender=FoodTruckOwnerProfile, dispatch_uid='ownerprofile_cache_save')
+@receiver(pre_delete, sender=FoodTruckOwnerProfile, dispatch_uid='ownerprofile_cache_delete')
+def invalidate_owner_pages(sender, instance, **kwargs):
+    """
+    Owner details show up on their trucks' pages.
+
+    Runs before a delete, while the profile's trucks are still linked.
+    """
+    listings = instance.trucks.values_list('city', 'cuisine') if instance.pk else []
+    bump(HOME, *truck_scopes(*listings))
+
+
+@receiver(post_save, sender=FoodTruck, dispatch_uid='foodtruck_image_variants')
+def build_image_variants(sender, instance, raw=False, **kwargs):
+    """Queue thumbnail/WebP generation when a new image is uploaded."""
+    if raw or not needs_processing(instance):
+        return
+    schedule_image_processing(instance)
+
+
+def nearby_listing(name, latitude, longitude, city, cuisine):
+    """What other trucks' pages show of a truck in their "nearby" lists."""
+    return (name, latitude, longitude, city, cuisine)
+
+
+@receiver(post_save, sender=FoodTruck, dispatch_uid='foodtruck_owner_hours')
+def adopt_owner_hours(sender, instance, raw=False, using='default', **kwargs):
+    """
+    Parse the owner profile's free-text hours onto a truck newly linked to
+    it that has no hours of its own (migration 0006 had no links to go on).
+    Runs before the page refresh below, so the page shows them.
+    """
+    if raw or not instance.owner_id:
+        return
+    if instance.owner_id == getattr(instance, '_previous_owner', None):
+        return
+    if OperatingHours.objects.using(using).filter(truck=instance).exists():
+        return
+    text = FoodTruckOwnerProfile.objects.using(using).filter(pk=instance.owner_id).values_list(
+        'operating_hours', flat=True
+    ).first()
+    OperatingHours.objects.using(using).bulk_create(hours_rows(OperatingHours, instance.pk, text))
+
+
+@receiver(post_save, sender=FoodTruck, dispatch_uid='foodtruck_page_save')
+def refresh_truck_page(sender, instance, raw=False, using='default', **kwargs):
+    """
+    Rebuild the truck's detail page in the same transaction as the save,
+    and queue its neighbours' pages if it appeared, moved or was renamed.
+    """
+    if raw:
+        return
+    refresh_truck_pages([instance.pk], using=using)
+    current = nearby_listing(instance.name, instance.latitude, instance.longitude,
+                             instance.city, instance.cuisine)
+    previous = getattr(instance, '_previous_nearby', None)
+    if previous == current:
+        return
+    points = [current[1:3]] + ([previous[1:3]] if previous else [])
+    points = [point for point in points if None not in point]
+    schedule_page_refresh(neighbour_ids(points, exclude=[instance.pk], using=using), using)
+
+
+@receiver(post_delete, sender=FoodTruck, dispatch_uid='foodtruck_page_delete')
+def refresh_neighbour_pages(sender, instance, using='default', **kwargs):
+    """A deleted truck's page goes with it; its neighbours' lists need rebuilding."""
+    schedule_page_refresh(neighbour_ids(location_points([instance]), using=using), using)
+
+
+@receiver(post_save, sender=OperatingHours, dispatch_uid='hours_page_save')
+@receiver(post_delete, sender=OperatingHours, dispatch_uid='hours_page_delete')
+def refresh_hours_page(sender, instance, raw=False, using='default', **kwargs):
+    if raw:
+        return
+    refresh_truck_pages([instance.truck_id], using=using)
+
+
+@receiver(m2m_changed, sender=FoodTruck.dietary_tags.through, dispatch_uid='foodtruck_tags_page')
+def refresh_tag_pages(sender, instance, action, reverse, pk_set, using='default', **kwargs):
+    """
+    Rebuild pages whose dietary tags changed: the truck's own page at once,
+    a tag's trucks (possibly many) on the task queue.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_truck_pages([instance.pk], using=using)
+        return
+    if action in ('post_add', 'post_remove'):
+        schedule_page_refresh(pk_set, using)
+    elif action == 'pre_clear':
+        schedule_page_refresh(instance.trucks.values_list('pk', flat=True), using)
+
+
+@receiver(post_save, sender=DietaryTag, dispatch_uid='dietarytag_page_save')
+@receiver(pre_delete, sender=DietaryTag, dispatch_uid='dietarytag_page_delete')
+def refresh_tagged_pages(sender, instance, raw=False, using='default', **kwargs):
+    """Renamed or deleted tags show up on every page listing them."""
+    if raw or instance.pk is None:
+        return
+    schedule_page_refresh(instance.trucks.values_list('pk', flat=True), using)
+
+
+@receiver(post_save, sender=FoodTruckOwnerProfile, dispatch_uid='ownerprofile_page_save')
+def refresh_owner_pages(sender, instance, created, raw=False, using='default', **kwargs):
+    """Owner business details show up on their trucks' pages."""
+    if raw or created:
+        return
+    refresh_truck_pages(instance.trucks.values_list('pk', flat=True), using=using)
+
+
+@receiver(pre_delete, sender=FoodTruckOwnerProfile, dispatch_uid='ownerprofile_page_delete')
+def refresh_orphaned_pages(sender, instance, using='default', **kwargs):
+    """The owner's trucks lose their owner once the delete commits."""
+    schedule_page_refresh(instance.trucks.values_list('pk', flat=True), using)
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid='user_auth_cache_save')
+@receiver(post_delete, sender=CustomUser, dispatch_uid='user_auth_cache_delete')
+def forget_cached_user(sender, instance, **kwargs):
+    """Signed-in requests read the user, profiles included, from the cache."""
+    forget_user(instance.pk)
+
+
+@receiver(post_save, sender=FoodTruckOwnerProfile, dispatch_uid='ownerprofile_auth_cache_save')
+@receiver(post_delete, sender=FoodTruckOwnerProfile, dispatch_uid='ownerprofile_auth_cache_delete')
+@receiver(post_save, sender=WebsiteUserProfile, dispatch_uid='userprofile_auth_cache_save')
+@receiver(post_delete, sender=WebsiteUserProfile, dispatch_uid='userprofile_auth_cache_delete')
+def forget_profile_user(sender, instance, **kwargs):
+    forget_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through, dispatch_uid='user_groups_auth_cache')
+@receiver(m2m_changed, sender=CustomUser.user_permissions.through,
+          dispatch_uid='user_permissions_auth_cache')
+@receiver(m2m_changed, sender=Group.permissions.through,
+          dispatch_uid='group_permissions_auth_cache')
+def forget_users_on_grant(sender, action, **kwargs):
+    """
+    Cached users carry their resolved permissions. Grants change rarely, and
+    from either side of the relation, so every cached user is dropped.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        forget_all_users()
+
+
+@receiver(post_delete, sender=Group, dispatch_uid='group_auth_cache_delete')
+@receiver(post_delete, sender=Permission, dispatch_uid='permission_auth_cache_delete')
+def forget_users_on_revoke(sender, **kwargs):
+    """Deleting a group or permission removes its grants without ``m2m_changed``."""
+    forget_all_users()
+
+
+def refresh_bulk_trucks(trucks, previous_listings=(), using='default'):
+    """
+    Do the handlers' work for trucks written with ``bulk_create``/``update``,
+    which send no model signals. Facet counts are not adjusted; call
+    ``facets.rebuild_facet_counts()`` once the bulk write is done. Bulk
+    writes queue no notification emails.
+
+    ``previous_listings`` are ``(city, cuisine)`` pairs the trucks had before
+    the write, so pages they moved away from are invalidated too.
+    """
+    trucks = list(trucks)
+    get_search_backend(using).index_trucks(trucks)
+    index_trucks_for_dedup(trucks, using)
+    invalidate_geo_index()
+    listings = list(previous_listings) + [(truck.city, truck.cuisine) for truck in trucks]
+    bump(*truck_scopes(*listings))
+    # The trucks' pages, and their neighbours' "nearby" lists: one rebuild
+    # that every batch of an import shares, rather than a neighbour search
+    # per batch (until it runs, a new truck's page is built on first view).
+    schedule_page_rebuild(using)
+
+
+def refresh_all_trucks(previous_listings=(), using='default'):
+    """
+    ``refresh_bulk_trucks`` for the whole table in one pass: the search and
+    duplicate indexes are rebuilt rather than patched, for after a bulk
+    write large enough that per-batch refreshes would dominate it.
+
+    Every current listing's pages are invalidated, plus ``previous_listings``.
+    """
+    get_search_backend(using).rebuild()
+    rebuild_dedup_index(using=using)
+    invalidate_geo_index()
+    listings = FoodTruck.objects.using(using).values_list('city', 'cuisine').distinct()
+    bump(*truck_scopes(*previous_listings, *listings))
+    schedule_page_rebuild(using)
@@ -0,0 +1,163 @@
+"""
+Static files in production.
+
+``collectstatic`` with ``CompressedManifestStaticFilesStorage`` stores each
+file under a content-hashed name as well (``main.3f2a1c9b8d7e.css``),
+rewrites ``url()`` references in CSS to the hashed names, and writes
+``.gz`` siblings of text assets (and ``.br`` ones when the ``brotli``
+package is installed), so compression is paid once per deploy rather than
+once per request.
+
+``serve_static`` serves ``STATIC_ROOT`` when ``DEBUG`` is off and nothing
+in front of Django does: the best precompressed variant the client
+accepts, cached for a year as ``immutable`` when the name is hashed (a
+changed file gets a new name), and revalidated with ``ETag`` and
+``Last-Modified`` otherwise.
+"""
+
+import gzip
+import mimetypes
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+from django.middleware.gzip import GZipMiddleware
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip alone covers every browser.
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.xml', '.html', '.ico',
+    '.webmanifest',
+}
+# Smaller files gain less than the extra response headers cost.
+MIN_COMPRESS_SIZE = 256
+# Encodings in order of preference, with the suffix of their files.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+REVALIDATE_MAX_AGE = 60
+# ManifestStaticFilesStorage inserts the first 12 hex digits of the MD5.
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}(?:\.[^./]+)?$')
+
+
+def is_compressible(name):
+    return Path(name).suffix.lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def compressed_variants(content):
+    """``{suffix: bytes}`` for the encodings that make ``content`` smaller."""
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    return {suffix: data for suffix, data in variants.items() if len(data) < len(content)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """``ManifestStaticFilesStorage`` that also writes precompressed copies."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(paths) | set(self.hashed_files.values())):
+            if is_compressible(name):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        variants = compressed_variants(content) if len(content) >= MIN_COMPRESS_SIZE else {}
+        for _, suffix in ENCODINGS:
+            # Drop stale variants too, so a file that stopped compressing
+            # well is never served from an old copy.
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            if suffix in variants:
+                self._save(name + suffix, ContentFile(variants[suffix]))
+
+
+def accepted_encodings(header):
+    """Content codings ``header`` (an ``Accept-Encoding`` value) allows."""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def static_cache_control(name):
+    if HASHED_NAME.search(name):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={REVALIDATE_MAX_AGE}'
+
+
+@require_safe
+def serve_static(request, path):
+    """Serve a collected static file, precompressed where possible."""
+    try:
+        original = Path(safe_join(settings.STATIC_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404('Static file not found')
+    if not path or not original.is_file():
+        raise Http404('Static file not found')
+
+    served, encoding = original, None
+    if is_compressible(path):
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        for coding, suffix in ENCODINGS:
+            variant = original.with_name(original.name + suffix)
+            if (coding in accepted or '*' in accepted) and variant.is_file():
+                served, encoding = variant, coding
+                break
+
+    stat = served.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        content_type, _ = mimetypes.guess_type(original.name)
+        response = FileResponse(served.open('rb'), filename=original.name,
+                                content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = static_cache_control(path)
+    if is_compressible(path):
+        patch_vary_headers(response, ['Accept-Encoding'])
+    response.static_file = True
+    return response
+
+
+class StaticAwareGZipMiddleware(GZipMiddleware):
+    """
+    ``GZipMiddleware`` that leaves ``serve_static`` responses alone: text
+    assets are already compressed at their best level, and images and
+    fonts don't shrink.
+    """
+
+    def process_response(self, request, response):
+        if getattr(response, 'static_file', False):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,350 @@
+"""
+A small task queue kept in the ``Task`` table, so slow work (image
+variants, notification fan-out and delivery, imports) leaves the request
+thread without needing a broker.
+
+Tasks are plain functions registered by name with ``@task``; apps declare
+theirs in a ``tasks`` module, which workers import with Django's module
+autodiscovery. ``enqueue()`` writes a row, in the caller's transaction, so
+a task enqueued by a save that rolls back never runs.
+
+Workers (``manage.py run_workers``) claim due rows in batches:
+
+* on databases with ``SELECT ... FOR UPDATE SKIP LOCKED`` (PostgreSQL,
+  MySQL 8, Oracle) concurrent workers skip each other's rows;
+* elsewhere (SQLite, which serialises writers anyway) the rows are picked
+  and claimed by a single ``UPDATE ... WHERE id IN (SELECT ... LIMIT n)``.
+
+A claimed task is leased until ``locked_until``; rows whose worker died are
+put back in the queue once the lease lapses. A task that raises is retried
+with exponential backoff up to its ``max_attempts`` and then marked failed,
+so every task runs at least once and handlers should be idempotent.
+
+Tasks sharing a ``unique_key`` are coalesced while one is still queued. A
+keyed task may be queued again while its twin runs; if the running one then
+has to go back in the queue (a retry, a lapsed lease, a release), it is
+marked done instead and the queued twin does its work.
+"""
+
+import logging
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Count, Exists, F, OuterRef
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_LEASE = timedelta(minutes=10)
+DEFAULT_RETENTION = timedelta(days=7)
+
+
+@dataclass(frozen=True)
+class TaskType:
+    name: str
+    func: object
+    max_attempts: int = 5
+    backoff_seconds: float = 30
+    timeout: timedelta = DEFAULT_LEASE
+
+    def retry_delay(self, attempts):
+        return timedelta(seconds=self.backoff_seconds * 2 ** (attempts - 1))
+
+
+registry = {}
+
+
+def task(name, **options):
+    """
+    Register the decorated function as task ``name``. It is called with
+    the keyword arguments given to ``enqueue()``, which must be JSON
+    serialisable. ``options`` are ``TaskType`` fields.
+    """
+    def decorator(func):
+        registry[name] = TaskType(name, func, **options)
+        return func
+    return decorator
+
+
+def autodiscover():
+    """Import every installed app's ``tasks`` module."""
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, kwargs=None, *, delay=None, run_at=None, unique_key=None, using='default'):
+    """
+    Queue ``name(**kwargs)`` to run after ``delay``, or at ``run_at``.
+
+    With a ``unique_key``, nothing new is queued while a task with the same
+    key is waiting; the waiting task is brought forward instead if it was
+    due later.
+    """
+    from .models import Task
+
+    if run_at is None:
+        run_at = timezone.now() + (delay or timedelta())
+    row = Task(name=name, kwargs=kwargs or {}, run_at=run_at, unique_key=unique_key)
+    tasks = Task.objects.using(using)
+    if unique_key is None:
+        row.save(using=using)
+        return
+    tasks.bulk_create([row], ignore_conflicts=True)
+    tasks.filter(unique_key=unique_key, status=Task.QUEUED, run_at__gt=run_at).update(
+        run_at=run_at
+    )
+
+
+def lease_duration():
+    """How long a claimed task stays with its worker before it is requeued."""
+    return timedelta(seconds=getattr(settings, 'DIRECTORY_TASK_LEASE_SECONDS',
+                                     DEFAULT_LEASE.total_seconds()))
+
+
+def claim(batch_size=DEFAULT_BATCH_SIZE, using='default'):
+    """Claim up to ``batch_size`` due tasks; returns them, oldest first."""
+    from .models import Task
+
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    tasks = Task.objects.using(using)
+    due = tasks.filter(status=Task.QUEUED, run_at__lte=now).order_by('run_at', 'id')
+    changes = {
+        'status': Task.RUNNING,
+        'claim_token': token,
+        'locked_until': now + lease_duration(),
+        'started_at': now,
+        'attempts': F('attempts') + 1,
+    }
+    if connections[using].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=using):
+            ids = list(due.select_for_update(skip_locked=True)
+                       .values_list('id', flat=True)[:batch_size])
+            tasks.filter(pk__in=ids).update(**changes)
+        if not ids:
+            return []
+    else:
+        # One statement, so picking the rows and claiming them cannot
+        # interleave with another worker doing the same.
+        picked = due.values('id')[:batch_size]
+        if not tasks.filter(pk__in=picked, status=Task.QUEUED).update(**changes):
+            return []
+    return list(tasks.filter(status=Task.RUNNING, claim_token=token).order_by('run_at', 'id'))
+
+
+def merge_queued_twins(rows, using='default', **changes):
+    """
+    Finish those of ``rows`` (a ``Task`` queryset) whose ``unique_key``
+    already has a queued task, which will do the same work; returns how
+    many. Putting them back in the queue would break the key's constraint.
+    """
+    from .models import Task
+
+    twin = Task.objects.using(using).filter(status=Task.QUEUED, unique_key=OuterRef('unique_key'))
+    return rows.filter(Exists(twin)).update(
+        status=Task.DONE, finished_at=timezone.now(), claim_token='', locked_until=None,
+        **changes
+    )
+
+
+def requeue_expired(using='default'):
+    """Put tasks whose worker's lease lapsed back in the queue."""
+    from .models import Task
+
+    expired = Task.objects.using(using).filter(
+        status=Task.RUNNING, locked_until__lt=timezone.now()
+    )
+    with transaction.atomic(using=using):
+        merged = merge_queued_twins(expired, using)
+        # Of expired twins that both ran, only the newest is requeued.
+        keyed = expired.exclude(unique_key=None)
+        newest = dict(keyed.order_by('id').values_list('unique_key', 'id'))
+        merged += keyed.exclude(pk__in=list(newest.values())).update(
+            status=Task.DONE, finished_at=timezone.now(), claim_token='', locked_until=None
+        )
+        return merged + expired.update(status=Task.QUEUED, claim_token='', locked_until=None)
+
+
+def release(rows, using='default'):
+    """Hand claimed tasks that were never started back to the queue."""
+    from .models import Task
+
+    for row in rows:
+        mine = Task.objects.using(using).filter(pk=row.pk, claim_token=row.claim_token)
+        if not merge_queued_twins(mine, using):
+            mine.update(status=Task.QUEUED, claim_token='', locked_until=None,
+                        attempts=F('attempts') - 1)
+
+
+def execute(row, using='default'):
+    """
+    Run one claimed task and record the outcome; returns the new status.
+
+    Only the worker holding the claim can record it, so a task that
+    outlived its lease and was picked up elsewhere cannot overwrite the
+    other run.
+    """
+    from .models import Task
+
+    mine = Task.objects.using(using).filter(pk=row.pk, claim_token=row.claim_token)
+    task_type = registry.get(row.name)
+    if task_type is None:
+        mine.update(status=Task.FAILED, finished_at=timezone.now(),
+                    last_error=f'Unknown task {row.name!r}')
+        return Task.FAILED
+    if task_type.timeout > lease_duration():
+        mine.update(locked_until=timezone.now() + task_type.timeout)
+    try:
+        task_type.func(**row.kwargs)
+    except Exception as exc:
+        logger.exception('Task %s (%s) failed on attempt %s', row.pk, row.name, row.attempts)
+        now = timezone.now()
+        error = f'{type(exc).__name__}: {exc}'[:2000]
+        if row.attempts >= task_type.max_attempts:
+            changes = {'status': Task.FAILED, 'finished_at': now}
+        elif merge_queued_twins(mine, using, last_error=error):
+            return Task.DONE
+        else:
+            changes = {'status': Task.QUEUED, 'run_at': now + task_type.retry_delay(row.attempts)}
+        mine.update(last_error=error, claim_token='', locked_until=None, **changes)
+        return changes['status']
+    mine.update(status=Task.DONE, finished_at=timezone.now(), locked_until=None)
+    return Task.DONE
+
+
+def run_pending(limit=None, using='default'):
+    """
+    Run due tasks in this thread until none are left (or ``limit`` ran);
+    returns the number run. Handy in tests and one-off scripts.
+    """
+    ran = 0
+    while limit is None or ran < limit:
+        batch = claim(1, using)
+        if not batch:
+            return ran
+        execute(batch[0], using)
+        ran += 1
+    return ran
+
+
+class Worker:
+    """
+    Claims and runs tasks in a loop until ``stop`` is set, or, with
+    ``once``, until nothing is due.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, idle_sleep=1.0, once=False,
+                 stop=None, using='default'):
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+        self.once = once
+        self.stop = stop or threading.Event()
+        self.using = using
+        self.processed = 0
+
+    def run(self):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    batch = claim(self.batch_size, self.using)
+                except Exception:
+                    # Typically a lock timeout while another worker writes.
+                    logger.exception('Could not claim tasks')
+                    batch = []
+                if not batch:
+                    try:
+                        requeued = requeue_expired(self.using)
+                    except Exception:
+                        logger.exception('Could not requeue expired tasks')
+                        requeued = 0
+                    if requeued:
+                        continue
+                    if self.once:
+                        return
+                    self.stop.wait(self.idle_sleep)
+                    continue
+                for index, row in enumerate(batch):
+                    if self.stop.is_set():
+                        release(batch[index:], self.using)
+                        break
+                    try:
+                        execute(row, self.using)
+                    except Exception:
+                        # Recording the outcome failed; the lease will lapse
+                        # and the task run again.
+                        logger.exception('Could not record task %s', row.pk)
+                    self.processed += 1
+        finally:
+            connections.close_all()
+
+
+def run_threads(threads=1, batch_size=DEFAULT_BATCH_SIZE, idle_sleep=1.0, once=False,
+                stop=None, using='default'):
+    """Run ``threads`` workers in this process; returns the tasks processed."""
+    stop = stop or threading.Event()
+    workers = [Worker(batch_size, idle_sleep, once, stop, using) for _ in range(threads)]
+    pool = [threading.Thread(target=worker.run, name=f'task-worker-{i}', daemon=True)
+            for i, worker in enumerate(workers)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sum(worker.processed for worker in workers)
+
+
+def queue_stats(window=timedelta(minutes=15), using='default'):
+    """
+    Queue depth and latency, for the worker log and monitoring.
+
+    ``queued`` counts tasks waiting to run and ``due`` those already
+    overdue; ``oldest_due_seconds`` is how long the oldest has waited.
+    Wait (due to started) and run (started to finished) latencies are
+    p50/p95 seconds over tasks finished within ``window``.
+    """
+    from .models import Task
+
+    now = timezone.now()
+    tasks = Task.objects.using(using)
+    counts = dict.fromkeys((Task.QUEUED, Task.RUNNING, Task.DONE, Task.FAILED), 0)
+    for status, count in tasks.values_list('status').annotate(n=Count('id')).order_by():
+        counts[status] = count
+    due = tasks.filter(status=Task.QUEUED, run_at__lte=now)
+    oldest = due.order_by('run_at').values_list('run_at', flat=True).first()
+    finished = list(
+        tasks.filter(finished_at__gte=now - window, status=Task.DONE)
+        .values_list('run_at', 'started_at', 'finished_at')
+    )
+    waits = sorted(max(0.0, (started - run_at).total_seconds())
+                   for run_at, started, _ in finished)
+    runs = sorted((done - started).total_seconds() for _, started, done in finished)
+    return {
+        **counts,
+        'due': due.count(),
+        'oldest_due_seconds': (now - oldest).total_seconds() if oldest else 0.0,
+        'finished_in_window': len(finished),
+        'wait_p50': quantile(waits, 0.5),
+        'wait_p95': quantile(waits, 0.95),
+        'run_p50': quantile(runs, 0.5),
+        'run_p95': quantile(runs, 0.95),
+    }
+
+
+def quantile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def purge_finished(older_than=DEFAULT_RETENTION, using='default'):
+    """Delete done and failed tasks that finished more than ``older_than`` ago."""
+    from .models import Task
+
+    return Task.objects.using(using).filter(
+        status__in=[Task.DONE, Task.FAILED], finished_at__lt=timezone.now() - older_than
+    ).delete()[0]
@@ -0,0 +1,89 @@
+"""
+Background tasks run by ``manage.py run_workers``; see
+``directory.taskqueue``.
+"""
+
+from datetime import timedelta
+
+from django.core.management import call_command
+
+from .analytics import flush_events, rollup_page_views
+from .home_snapshot import refresh_snapshot, snapshot_settings
+from .images import process_truck_image
+from .notifications import (
+    RateLimiter, deliver_batch, fan_out_pending, next_delivery, notification_settings,
+)
+from .taskqueue import enqueue, task
+from .truck_pages import rebuild_truck_pages, refresh_truck_pages
+
+# How often analytics.rollup refreshes the owner dashboard's daily counts.
+ANALYTICS_ROLLUP_INTERVAL = timedelta(minutes=10)
+
+# Delivery batches per task run; the task requeues itself for the rest, so
+# a long send never outlives its lease.
+DELIVERY_BATCHES_PER_TASK = 20
+
+_limiter = None
+
+
+def notification_limiter():
+    """One token bucket per process, shared by its worker threads."""
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(notification_settings()['rate'])
+    return _limiter
+
+
+@task('images.process', max_attempts=3)
+def process_image(truck_id):
+    process_truck_image(truck_id)
+
+
+@task('notifications.fan_out', timeout=timedelta(hours=1))
+def fan_out_notifications():
+    fan_out_pending(notification_settings()['batch_size'])
+    enqueue('notifications.deliver', unique_key='notifications.deliver')
+
+
+@task('notifications.deliver')
+def deliver_notifications():
+    batch_size = notification_settings()['batch_size']
+    for _ in range(DELIVERY_BATCHES_PER_TASK):
+        if deliver_batch(batch_size, notification_limiter()) == (0, 0, 0):
+            break
+    # Come back for the rest, or for retries once they are due.
+    due = next_delivery()
+    if due is not None:
+        enqueue('notifications.deliver', run_at=due, unique_key='notifications.deliver')
+
+
+@task('truck_pages.refresh')
+def refresh_pages(truck_ids):
+    refresh_truck_pages(truck_ids)
+
+
+@task('truck_pages.rebuild', timeout=timedelta(hours=1))
+def rebuild_pages():
+    rebuild_truck_pages()
+
+
+@task('import_trucks', max_attempts=3, timeout=timedelta(hours=6))
+def import_trucks(path, **options):
+    """Retries resume from the import's checkpoint file."""
+    call_command('import_trucks', path, **options)
+
+
+@task('analytics.rollup')
+def rollup_analytics():
+    """Enqueue once; it reschedules itself every ANALYTICS_ROLLUP_INTERVAL."""
+    flush_events()
+    rollup_page_views()
+    enqueue('analytics.rollup', delay=ANALYTICS_ROLLUP_INTERVAL, unique_key='analytics.rollup')
+
+
+@task('home.snapshot')
+def refresh_home_snapshot():
+    """Enqueue once; it reschedules itself every DIRECTORY_HOME_SNAPSHOT_REFRESH seconds."""
+    refresh_snapshot()
+    enqueue('home.snapshot', delay=timedelta(seconds=snapshot_settings()['refresh']),
+            unique_key='home.snapshot')
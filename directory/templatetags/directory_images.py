@@ -0,0 +1,20 @@
+from django import template
+
+from directory.images import picture_sources
+
+register = template.Library()
+
+
+@register.inclusion_tag('directory/_truck_picture.html')
+def truck_picture(truck, sizes='(min-width: 768px) 33vw, 100vw', css_class=''):
+    """
+    Render a ``<picture>`` for the truck's image with WebP and JPEG srcsets.
+
+    Falls back to the original upload until variants have been generated.
+    """
+    return {
+        'truck': truck,
+        **picture_sources(truck),
+        'sizes': sizes,
+        'css_class': css_class,
+    }
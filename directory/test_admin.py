@@ -0,0 +1,139 @@
+from unittest import skipUnless
+
+from django.contrib.admin import site
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .admin import prefix_range
+from .models import CustomUser, FoodTruck, FoodTruckOwnerProfile, WebsiteUserProfile
+from .pagination import EstimatedCountPaginator
+
+
+class AdminChangeListTest(TestCase):
+    """Test cases for the scalable admin changelists."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a superuser plus a handful of owners, eaters and trucks."""
+        cls.admin = CustomUser.objects.create_superuser(
+            username='root', email='root@example.com', password='pw'
+        )
+        cls.add_rows(3)
+
+    @classmethod
+    def add_rows(cls, count):
+        start = FoodTruck.objects.count()
+        for i in range(start, start + count):
+            owner = CustomUser.objects.create_user(
+                username=f'Owner{i}', email=f'owner{i}@example.com', role='food_truck_owner'
+            )
+            profile = FoodTruckOwnerProfile.objects.create(user=owner, business_name=f'Biz {i}')
+            FoodTruck.objects.create(name=f'Truck {i}', city='Cary', cuisine='BBQ', owner=profile)
+            eater = CustomUser.objects.create_user(username=f'eater{i}')
+            WebsiteUserProfile.objects.create(user=eater)
+
+    def changelist_queries(self, model_name):
+        url = reverse(f'admin:directory_{model_name}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        # Cache the signed-in user, so every changelist counts the same way.
+        self.client.get(reverse('admin:index'))
+
+    def test_changelist_query_count_is_flat(self):
+        """Test that changelists do not issue a query per row."""
+        models = ['customuser', 'foodtruckownerprofile', 'websiteuserprofile', 'foodtruck']
+        before = {name: self.changelist_queries(name) for name in models}
+        self.add_rows(10)
+        for name in models:
+            self.assertEqual(self.changelist_queries(name), before[name], name)
+
+    def test_prefix_search_is_case_insensitive(self):
+        """Test that search matches the start of a field, ignoring case."""
+        url = reverse('admin:directory_customuser_changelist')
+        response = self.client.get(url, {'q': 'owner1'})
+        self.assertEqual(
+            [user.username for user in response.context['cl'].result_list], ['Owner1']
+        )
+        response = self.client.get(url, {'q': 'wner1'})
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+
+    def test_search_through_relation(self):
+        """Test that profile search follows user__username."""
+        url = reverse('admin:directory_foodtruckownerprofile_changelist')
+        response = self.client.get(url, {'q': 'OWNER2'})
+        self.assertEqual(
+            [profile.business_name for profile in response.context['cl'].result_list],
+            ['Biz 2'],
+        )
+
+    @skipUnless(connection.vendor == 'sqlite', 'checks the SQLite query plan')
+    def test_prefix_search_uses_index(self):
+        """Test that the prefix range is answered from the Lower() index."""
+        model_admin = site._registry[CustomUser]
+        queryset, _ = model_admin.get_search_results(
+            None, CustomUser.objects.all(), 'owner1'
+        )
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('customuser_lusername', plan)
+        self.assertNotIn('SCAN', plan)
+
+    def test_autocomplete_for_user_relation(self):
+        """Test that the user autocomplete endpoint serves profile forms."""
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'directory',
+            'model_name': 'websiteuserprofile',
+            'field_name': 'user',
+            'term': 'eater',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 3)
+
+    def test_prefix_range(self):
+        """Test the range bounds for a prefix."""
+        self.assertEqual(prefix_range('abc'), ('abc', 'abd'))
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    """Test cases for the estimated-count paginator."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a few trucks."""
+        FoodTruck.objects.bulk_create(
+            FoodTruck(name=f'Truck {i}', city='Cary', cuisine='BBQ') for i in range(12)
+        )
+
+    def test_exact_below_limit(self):
+        """Test that small results are counted exactly."""
+        paginator = EstimatedCountPaginator(FoodTruck.objects.order_by('pk'), 5)
+        self.assertEqual(paginator.count, 12)
+
+    @override_settings(DIRECTORY_EXACT_COUNT_LIMIT=5)
+    def test_estimates_large_table(self):
+        """Test that an unfiltered count above the limit avoids COUNT(*) on the table."""
+        FoodTruck.objects.filter(name='Truck 0').delete()
+        paginator = EstimatedCountPaginator(FoodTruck.objects.order_by('pk'), 5)
+        with CaptureQueriesContext(connection) as queries:
+            count = paginator.count
+        # MAX(pk) still counts the deleted row.
+        self.assertEqual(count, FoodTruck.objects.order_by('-pk')[0].pk)
+        self.assertFalse(any(
+            'COUNT(*)' in query['sql'] and 'LIMIT' not in query['sql']
+            for query in queries
+        ))
+
+    @override_settings(DIRECTORY_EXACT_COUNT_LIMIT=5)
+    def test_filtered_count_is_bounded(self):
+        """Test that a large filtered result stops counting at the limit."""
+        paginator = EstimatedCountPaginator(FoodTruck.objects.filter(city='Cary').order_by('pk'), 5)
+        self.assertEqual(paginator.count, 6)
@@ -0,0 +1,229 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import analytics, tasks  # noqa: F401  (registers truck_pages.refresh)
+from .analytics import EventBuffer, flush_events, rollup_page_views
+from .models import (
+    CustomUser, FoodTruck, FoodTruckOwnerProfile, PageDailyStats, PageViewEvent,
+    TruckDailyStats,
+)
+from .taskqueue import run_pending
+
+NOW = datetime(2026, 5, 14, 15, 30, tzinfo=dt_timezone.utc)
+
+
+def event(kind, page, at, truck=None, city=''):
+    return PageViewEvent(kind=kind, page=page, truck=truck, city=city, occurred_at=at)
+
+
+class PageViewCaptureTest(TestCase):
+    """Test cases for recording page views and listing clicks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a truck with a page."""
+        cls.truck = FoodTruck.objects.create(name='Smokin Joes', city='Chapel Hill',
+                                             cuisine='BBQ')
+        run_pending()
+
+    def setUp(self):
+        cache.clear()
+        analytics.buffer.drain()
+
+    def buffered(self):
+        return [event[:4] for event in analytics.buffer.drain()]
+
+    def test_cached_city_pages_count(self):
+        """Test that city page views are recorded even when served from the cache."""
+        url = reverse('trucks_by_city', args=['chapel-hill'])
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(self.buffered(), [('view', 'city', None, 'chapel hill')] * 2)
+
+    def test_listing_links_record_clicks(self):
+        """Test that truck pages reached from a city page or search count a click too."""
+        city_page = self.client.get(reverse('trucks_by_city', args=['chapel-hill']))
+        detail = reverse('truck_detail', args=[self.truck.pk])
+        self.assertContains(city_page, detail + '?ref=city:chapel-hill')
+        self.assertContains(self.client.get(reverse('search') + '?q=smokin'),
+                            detail + '?ref=search')
+        analytics.buffer.drain()
+
+        self.client.get(detail + '?ref=city:chapel-hill')
+        self.client.get(detail + '?ref=search')
+        self.client.get(detail + '?ref=elsewhere')
+        pk = self.truck.pk
+        self.assertEqual(self.buffered(), [
+            ('view', 'truck', pk, ''), ('click', 'city', pk, 'chapel hill'),
+            ('view', 'truck', pk, ''), ('click', 'search', pk, ''),
+            ('view', 'truck', pk, ''),
+        ])
+
+    async def test_async_views_record(self):
+        """Test that the async truck page records views and clicks the same way."""
+        url = reverse('async_truck_detail', args=[self.truck.pk]) + '?ref=search'
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.buffered(), [('view', 'truck', self.truck.pk, ''),
+                                           ('click', 'search', self.truck.pk, '')])
+
+    def test_only_successful_gets_count(self):
+        """Test that missing trucks, posts and disabled analytics record nothing."""
+        self.client.get(reverse('truck_detail', args=[self.truck.pk + 100]))
+        self.client.post(reverse('search'), {'q': 'bbq'})
+        with override_settings(DIRECTORY_ANALYTICS_ENABLED=False):
+            self.client.get(reverse('truck_detail', args=[self.truck.pk]))
+        self.assertEqual(self.buffered(), [])
+
+    def test_requests_never_write(self):
+        """Test that recording stays in memory until a flush writes it in one insert."""
+        url = reverse('truck_detail', args=[self.truck.pk]) + '?ref=search'
+        with CaptureQueriesContext(connections['default']) as queries:
+            for _ in range(3):
+                self.client.get(url)
+        self.assertFalse(any(query['sql'].startswith('INSERT') for query in queries))
+        with self.assertNumQueries(1):
+            self.assertEqual(flush_events(), 6)
+        self.assertEqual(PageViewEvent.objects.filter(kind='click').count(), 3)
+        self.assertEqual(flush_events(), 0)
+
+    def test_buffer_is_bounded(self):
+        """Test that a full buffer drops its oldest events and counts them."""
+        events = EventBuffer(3)
+        for value in range(5):
+            events.add(value)
+        self.assertEqual(events.dropped, 2)
+        self.assertEqual(events.drain(), [2, 3, 4])
+        self.assertEqual(len(events), 0)
+
+
+class RollupTest(TestCase):
+    """Test cases for folding raw events into daily counts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create two trucks and a few days of events."""
+        cls.truck = FoodTruck.objects.create(name='Smokin Joes', city='Raleigh', cuisine='BBQ')
+        cls.gone = FoodTruck.objects.create(name='Taco Bus', city='Durham', cuisine='Mexican')
+        yesterday = NOW - timedelta(days=1)
+        PageViewEvent.objects.bulk_create([
+            event('view', 'truck', NOW, cls.truck),
+            event('view', 'truck', NOW, cls.truck),
+            event('click', 'city', NOW, cls.truck, 'raleigh'),
+            event('view', 'truck', yesterday, cls.truck),
+            event('view', 'truck', NOW, cls.gone),
+            event('view', 'city', NOW, city='raleigh'),
+            event('view', 'search', yesterday),
+            event('view', 'truck', NOW - timedelta(days=10), cls.truck),
+        ])
+
+    def test_rollup_counts_days(self):
+        """Test that events are counted per truck, day, kind and listing."""
+        self.gone.delete()
+        self.assertEqual(rollup_page_views(now=NOW), (6, 5, 1))
+        self.assertEqual(
+            set(TruckDailyStats.objects.values_list('day', 'kind', 'page', 'city', 'count')),
+            {(date(2026, 5, 14), 'view', 'truck', '', 2),
+             (date(2026, 5, 14), 'click', 'city', 'raleigh', 1),
+             (date(2026, 5, 13), 'view', 'truck', '', 1)},
+        )
+        self.assertEqual(
+            set(PageDailyStats.objects.values_list('day', 'page', 'city', 'views')),
+            {(date(2026, 5, 14), 'city', 'raleigh', 1), (date(2026, 5, 13), 'search', '', 1)},
+        )
+
+    def test_rollup_is_idempotent(self):
+        """Test that rerunning recounts rather than adding to yesterday's rows."""
+        rollup_page_views(now=NOW)
+        PageViewEvent.objects.create(kind='view', page='truck', truck=self.truck, occurred_at=NOW)
+        rollup_page_views(now=NOW)
+        today = TruckDailyStats.objects.get(truck=self.truck, day=date(2026, 5, 14), kind='view')
+        self.assertEqual(today.count, 3)
+        self.assertEqual(TruckDailyStats.objects.filter(truck=self.truck).count(), 3)
+
+    def test_rollup_prunes_past_retention(self):
+        """Test that raw events older than the retention window are deleted."""
+        with override_settings(DIRECTORY_ANALYTICS_RETENTION_DAYS=1):
+            rollup_page_views(now=NOW)
+        # Retention never drops events the rollup window still recounts.
+        self.assertEqual(PageViewEvent.objects.filter(occurred_at__lt=NOW.replace(hour=0)).count(),
+                         2)
+        self.assertEqual(PageViewEvent.objects.count(), 7)
+
+    def test_command_and_task(self):
+        """Test that the command flushes first, and the task reschedules itself."""
+        analytics.buffer.drain()
+        analytics.record('view', 'search')
+        call_command('rollup_analytics', stdout=StringIO())
+        self.assertEqual(analytics.buffer.drain(), [])
+        self.assertTrue(PageDailyStats.objects.filter(page='search').exists())
+
+        run_pending()
+        call_command('rollup_analytics', '--schedule', stdout=StringIO())
+        self.assertEqual(run_pending(), 1)
+        # The next run is queued for later, so nothing more is due now.
+        self.assertEqual(run_pending(), 0)
+
+
+class OwnerDashboardTest(TestCase):
+    """Test cases for the owner dashboard."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create two owners with a truck each and roll up some events."""
+        cls.owner = CustomUser.objects.create(username='owner', role='food_truck_owner')
+        cls.profile = FoodTruckOwnerProfile.objects.create(user=cls.owner, business_name='Oak')
+        cls.truck = FoodTruck.objects.create(name='Smokin Joes', city='Raleigh', cuisine='BBQ',
+                                             owner=cls.profile)
+        rival = CustomUser.objects.create(username='rival', role='food_truck_owner')
+        rival_profile = FoodTruckOwnerProfile.objects.create(user=rival, business_name='Elm')
+        cls.rival_truck = FoodTruck.objects.create(name='Taco Bus', city='Durham',
+                                                   cuisine='Mexican', owner=rival_profile)
+        now = datetime.now(dt_timezone.utc)
+        PageViewEvent.objects.bulk_create(
+            [event('view', 'truck', now, cls.truck) for _ in range(4)]
+            + [event('click', 'city', now, cls.truck, 'raleigh') for _ in range(3)]
+            + [event('view', 'city', now, city='raleigh') for _ in range(9)]
+            + [event('view', 'truck', now, cls.rival_truck) for _ in range(50)]
+        )
+        rollup_page_views(now=now)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_owner_sees_only_their_trucks(self):
+        """Test that the dashboard totals, lists and attributes only the owner's trucks."""
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('owner_dashboard'))
+        self.assertContains(response, 'Smokin Joes')
+        self.assertNotContains(response, 'Taco Bus')
+        self.assertEqual(response.context['total_views'], 4)
+        self.assertEqual(response.context['total_clicks'], 3)
+        self.assertEqual(response.context['sources'],
+                         [{'page': 'city', 'city': 'raleigh', 'clicks': 3, 'page_views': 9}])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_owners_only(self):
+        """Test that other users are turned away and anonymous visitors sign in."""
+        url = reverse('owner_dashboard')
+        self.assertRedirects(self.client.get(url), reverse('login') + '?next=' + url)
+        self.client.force_login(CustomUser.objects.create(username='eater'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_dashboard_reads_rollups(self):
+        """Test that the dashboard reads a fixed handful of daily-table queries."""
+        self.client.force_login(self.owner)
+        url = reverse('owner_dashboard')
+        self.client.get(url)
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.client.get(url)
+        sql = [query['sql'] for query in queries]
+        self.assertLessEqual(len(sql), 5)
+        self.assertFalse(any('directory_pageviewevent' in query for query in sql))
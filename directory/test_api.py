@@ -0,0 +1,144 @@
+import json
+from unittest import mock
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import api, pagination
+from .models import CustomUser, DietaryTag, FoodTruck, FoodTruckOwnerProfile, WebsiteUserProfile
+
+
+class TruckAPITest(TestCase):
+    """Test cases for the /api/v1/ truck endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create trucks in two cities, one owned and tagged."""
+        owner = CustomUser.objects.create(username='owner')
+        profile = FoodTruckOwnerProfile.objects.create(user=owner, business_name='Oak City LLC')
+        cls.bbq = FoodTruck.objects.create(
+            name='Smokin Joes', city='Raleigh', cuisine='BBQ', owner=profile,
+            description='Brisket', latitude=35.78, longitude=-78.64,
+        )
+        cls.bbq.dietary_tags.add(DietaryTag.objects.get(slug='gluten-free'))
+        cls.taco = FoodTruck.objects.create(name='Taco Bus', city='Raleigh', cuisine='Mexican',
+                                            latitude=35.79, longitude=-78.65)
+        cls.curry = FoodTruck.objects.create(name='Curry Cart', city='Durham', cuisine='Indian',
+                                             latitude=35.99, longitude=-78.9)
+
+    def get_json(self, name, args=(), status=200, **params):
+        response = self.client.get(reverse(name, args=args), params)
+        self.assertEqual(response.status_code, status, response.content)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(response.content)
+
+    def test_list_paginates_with_cursor(self):
+        """Test that the list follows ``next`` links through every truck in name order."""
+        with self.assertNumQueries(1):
+            data = self.get_json('api_truck_list', page_size=2)
+        self.assertEqual([row['name'] for row in data['results']], ['Curry Cart', 'Smokin Joes'])
+        self.assertEqual(set(data['results'][0]), set(api.LIST_FIELDS))
+        data = json.loads(self.client.get(data['next']).content)
+        self.assertEqual([row['name'] for row in data['results']], ['Taco Bus'])
+        self.assertIsNone(data['next'])
+
+        data = self.get_json('api_truck_list', city='raleigh', tag='gluten-free')
+        self.assertEqual([row['id'] for row in data['results']], [self.bbq.pk])
+        self.get_json('api_truck_list', status=400, cursor='nope')
+        error = self.get_json('api_truck_list', status=400,
+                              cursor=pagination.encode_cursor(['Taco Bus', 'x']))
+        self.assertEqual(error, {'error': 'Invalid cursor'})
+
+    def test_sparse_fieldsets(self):
+        """Test that ``fields`` limits the keys and selected columns."""
+        data = self.get_json('api_truck_list', fields='name,city,cuisine')
+        self.assertEqual(data['results'][0], {'name': 'Curry Cart', 'city': 'Durham',
+                                              'cuisine': 'Indian'})
+        with CaptureQueriesContext(connection) as queries:
+            self.get_json('api_truck_list', fields='name,city')
+        self.assertNotIn('description', queries[0]['sql'])
+        error = self.get_json('api_truck_list', status=400, fields='name,password')
+        self.assertIn('password', error['error'])
+
+    def test_detail(self):
+        """Test that the detail has owner and tags, and unknown ids 404 as JSON."""
+        with self.assertNumQueries(2):
+            data = self.get_json('api_truck_detail', args=[self.bbq.pk])
+        self.assertEqual(data['owner_name'], 'Oak City LLC')
+        self.assertEqual(data['dietary_tags'], ['Gluten-Free'])
+        self.assertIsNone(data['image'])
+        self.assertEqual(self.get_json('api_truck_detail', args=[999], status=404),
+                         {'error': 'Truck not found'})
+        sparse = self.get_json('api_truck_detail', args=[self.bbq.pk], fields='dietary_tags')
+        self.assertEqual(sparse, {'dietary_tags': ['Gluten-Free']})
+
+    def test_search_and_near(self):
+        """Test that search ranks matches and near adds distances, nearest first."""
+        data = self.get_json('api_truck_search', q='taco', fields='name')
+        self.assertEqual(data['results'], [{'name': 'Taco Bus'}])
+        self.assertEqual(self.get_json('api_truck_search')['results'], [])
+
+        data = self.get_json('api_trucks_near', lat=35.78, lon=-78.64, radius=5, fields='name')
+        self.assertEqual([row['name'] for row in data['results']], ['Smokin Joes', 'Taco Bus'])
+        self.assertEqual(data['results'][0]['distance_miles'], 0.0)
+        data = self.get_json('api_trucks_near', lat=35.78, lon=-78.64, k=1, fields='id')
+        self.assertEqual(data['results'], [{'id': self.bbq.pk, 'distance_miles': 0.0}])
+        self.get_json('api_trucks_near', status=400, lat='north', lon=-78.64)
+
+    def test_batch_resolves_ids_in_one_query(self):
+        """Test that a batch keeps the requested order and reports missing ids."""
+        ids = f'{self.taco.pk},999,{self.bbq.pk}'
+        with self.assertNumQueries(1):
+            data = self.get_json('api_truck_batch', ids=ids, fields='id,name')
+        self.assertEqual(data['results'], [{'id': self.taco.pk, 'name': 'Taco Bus'},
+                                           {'id': self.bbq.pk, 'name': 'Smokin Joes'}])
+        self.assertEqual(data['missing'], [999])
+
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(reverse('api_truck_batch') + '?fields=name',
+                               json.dumps({'ids': [self.curry.pk]}),
+                               content_type='application/json')
+        self.assertEqual(json.loads(response.content)['results'], [{'name': 'Curry Cart'}])
+        self.get_json('api_truck_batch', status=400, ids='1,two')
+        self.get_json('api_truck_batch', status=400, ids='1,1.7')
+        for bad in ([1.7], [True], [None], [[1]]):
+            response = client.post(reverse('api_truck_batch'), json.dumps({'ids': bad}),
+                                   content_type='application/json')
+            self.assertEqual(response.status_code, 400, bad)
+        self.get_json('api_truck_batch', status=400,
+                      ids=','.join(str(i) for i in range(api.MAX_BATCH_IDS + 1)))
+
+    def test_stdlib_encoder_matches_orjson(self):
+        """Test that the fallback encoder produces the same document."""
+        rows = self.get_json('api_truck_list')
+        with mock.patch.object(api, 'orjson', None):
+            fallback = self.get_json('api_truck_list')
+        self.assertEqual(fallback, rows)
+
+
+class MeAPITest(TestCase):
+    """Test cases for /api/v1/me/."""
+
+    def test_requires_sign_in(self):
+        """Test that anonymous requests get a JSON 401."""
+        response = self.client.get(reverse('api_me'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(json.loads(response.content), {'error': 'Authentication required'})
+
+    def test_user_with_profiles(self):
+        """Test that the user and both profiles come back nested."""
+        user = CustomUser.objects.create(username='sam', email='sam@example.com',
+                                         role='food_truck_owner')
+        FoodTruckOwnerProfile.objects.create(user=user, business_name='Sam Eats')
+        self.client.force_login(user)
+        data = json.loads(self.client.get(reverse('api_me')).content)
+        self.assertEqual(data['username'], 'sam')
+        self.assertEqual(data['owner_profile']['business_name'], 'Sam Eats')
+        self.assertIsNone(data['preferences'])
+
+        WebsiteUserProfile.objects.create(user=user, home_city='Cary')
+        data = json.loads(self.client.get(reverse('api_me')).content)
+        self.assertEqual(data['preferences']['home_city'], 'Cary')
+        self.assertNotIn('password', data)
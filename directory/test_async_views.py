@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .cache import DIRECTORY, bump
+from .models import CustomUser, FoodTruck
+from .pagination import encode_cursor
+
+
+class AsyncViewsTest(TestCase):
+    """Test cases for the async listing and search views."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create trucks through the ORM so facets and search are indexed."""
+        for i in range(30):
+            FoodTruck.objects.create(
+                name=f'Raleigh Truck {i:02d}', city='Raleigh',
+                cuisine='BBQ' if i % 2 else 'Mexican',
+                description='smoked brisket' if i % 2 else 'street tacos',
+            )
+        FoodTruck.objects.create(name='Durham Dogs', city='Durham', cuisine='American')
+
+    def setUp(self):
+        """Start every test with an empty page cache."""
+        cache.clear()
+
+    async def test_directory_matches_sync_view(self):
+        """Test that the async directory renders the same listing."""
+        response = await self.async_client.get(reverse('async_directory'), {'city': 'raleigh'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Raleigh Truck 00')
+        self.assertNotContains(response, 'Durham Dogs')
+        self.assertContains(response, '30 trucks')
+        sync = await self.async_client.get(reverse('directory'), {'city': 'raleigh'})
+        self.assertEqual(response.context['facets'], sync.context['facets'])
+
+    async def test_city_listing_pages(self):
+        """Test that the async city listing paginates with keyset cursors."""
+        url = reverse('async_trucks_by_city', args=['raleigh'])
+        first = await self.async_client.get(url, {'cuisine': 'BBQ', 'page_size': 10})
+        self.assertContains(first, 'Raleigh Truck 01')
+        self.assertTrue(first.context['page'].has_next)
+        second = await self.async_client.get(
+            url, {'cuisine': 'BBQ', 'page_size': 10, 'cursor': first.context['page'].next_cursor}
+        )
+        self.assertEqual(len(second.context['page']), 5)
+        self.assertFalse(second.context['page'].has_next)
+
+    async def test_invalid_input(self):
+        """Test that bad cursors and open times are rejected."""
+        url = reverse('async_trucks_by_city', args=['raleigh'])
+        self.assertEqual((await self.async_client.get(url, {'cursor': 'nope'})).status_code, 400)
+        self.assertEqual((await self.async_client.get(url, {'open': 'soon'})).status_code, 400)
+        bad = encode_cursor(['a'])
+        response = await self.async_client.get(reverse('async_directory'), {'cursor': bad})
+        self.assertEqual(response.status_code, 400)
+        bad = encode_cursor([None, 1])
+        self.assertEqual((await self.async_client.get(url, {'cursor': bad})).status_code, 400)
+
+    async def test_search(self):
+        """Test that async search ranks full-text matches."""
+        response = await self.async_client.get(reverse('async_search'), {'q': 'brisket'})
+        self.assertContains(response, 'Raleigh Truck 01')
+        self.assertNotContains(response, 'Raleigh Truck 00')
+
+    async def test_anonymous_pages_are_cached(self):
+        """Test that async pages are served from the versioned cache."""
+        url = reverse('async_trucks_by_city', args=['durham'])
+        await self.async_client.get(url)
+        await FoodTruck.objects.filter(name='Durham Dogs').aupdate(name='Durham Hounds')
+        self.assertContains(await self.async_client.get(url), 'Durham Dogs')
+        bump('city:durham')
+        self.assertContains(await self.async_client.get(url), 'Durham Hounds')
+
+        await self.async_client.get(reverse('async_directory'))
+        await FoodTruck.objects.filter(name='Durham Hounds').aupdate(name='Durham Pups')
+        self.assertNotContains(await self.async_client.get(reverse('async_directory')), 'Pups')
+        bump(DIRECTORY)
+        self.assertContains(await self.async_client.get(reverse('async_directory')), 'Pups')
+
+    async def test_signed_in_user_renders(self):
+        """Test that templates see the user resolved through auser()."""
+        user = await CustomUser.objects.acreate(username='mobile')
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse('async_search'), {'q': 'tacos'})
+        self.assertContains(response, 'Logout')
@@ -58,11 +58,10 @@ class AuthenticationNavigationTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'This is a placeholder registration page')
 
-    def test_profile_url_resolves(self):
-        """Test that profile URL resolves correctly."""
+    def test_profile_requires_login(self):
+        """Test that the profile page sends anonymous visitors to the login page."""
         response = self.client.get(reverse('profile'))
-        self.assertEqual(response.status_code, 200)
-        self.assertContains(response, 'User Profile')
+        self.assertRedirects(response, reverse('login') + '?next=' + reverse('profile'))
 
     def test_profile_shows_user_info_when_authenticated(self):
         """Test that profile page shows user information when authenticated."""
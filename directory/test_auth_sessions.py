@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import tasks  # noqa: F401  (registers truck_pages.refresh)
+from .auth import CachedModelBackend
+from .models import CustomUser, FoodTruck, FoodTruckOwnerProfile, WebsiteUserProfile
+from .taskqueue import run_pending
+
+SESSION_AND_AUTH_TABLES = ('django_session', 'directory_customuser', 'auth_')
+
+
+class SessionAuthQueriesTest(TestCase):
+    """Test cases for the session and user lookups made while serving pages."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a truck with a page, and an owner to sign in as."""
+        cls.user = CustomUser.objects.create(username='owner', role='food_truck_owner')
+        cls.profile = FoodTruckOwnerProfile.objects.create(user=cls.user, business_name='Oak LLC')
+        cls.truck = FoodTruck.objects.create(name='Smokin Joes', city='Raleigh', cuisine='BBQ',
+                                             owner=cls.profile)
+        run_pending()
+
+    def setUp(self):
+        cache.clear()
+
+    def assertSignedOut(self):
+        response = self.client.get(reverse('profile'))
+        self.assertRedirects(response, reverse('login') + '?next=' + reverse('profile'))
+
+    def session_and_auth_queries(self, queries):
+        return [query['sql'] for query in queries
+                if any(table in query['sql'] for table in SESSION_AND_AUTH_TABLES)]
+
+    def test_anonymous_pages_skip_session_and_auth(self):
+        """Test that anonymous directory pages query no session or user and set no cookie."""
+        urls = [reverse('home'), reverse('directory'), reverse('trucks_by_city', args=['raleigh']),
+                reverse('truck_detail', args=[self.truck.pk]), reverse('search') + '?q=bbq']
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(self.session_and_auth_queries(queries), [], url)
+            self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies, url)
+
+    def test_signed_in_repeat_visit_uses_cache(self):
+        """Test that a warm signed-in request reads neither the session nor the user."""
+        self.client.force_login(self.user)
+        url = reverse('truck_detail', args=[self.truck.pk])
+        self.assertContains(self.client.get(url), 'Logout')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(self.session_and_auth_queries(queries), [])
+        self.assertContains(response, 'Food Truck Owner')
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions(self):
+        """Test that signed-cookie sessions sign in with no session table at all."""
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertContains(self.client.get(reverse('profile')), 'Welcome, owner!')
+        self.assertFalse(any('django_session' in query['sql'] for query in queries))
+        self.client.get(reverse('logout'))
+        self.assertSignedOut()
+
+    def test_logout_ends_cached_session(self):
+        """Test that logging out stops the cached session from signing requests in."""
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('profile')), 'Welcome, owner!')
+        self.client.get(reverse('logout'))
+        self.assertSignedOut()
+
+    def test_password_change_signs_out_other_sessions(self):
+        """Test that saving a new password drops the cached user, and with it the session."""
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('profile')), 'Welcome, owner!')
+        self.user.set_password('a new passphrase')
+        self.user.save()
+        self.assertSignedOut()
+
+
+class CachedModelBackendTest(TestCase):
+    """Test cases for CachedModelBackend.get_user()."""
+
+    def setUp(self):
+        cache.clear()
+        self.backend = CachedModelBackend()
+        self.user = CustomUser.objects.create(username='sam')
+
+    def test_user_and_profiles_cached(self):
+        """Test that the second lookup, profiles included, makes no queries."""
+        # The user with both profiles, and their permissions.
+        with self.assertNumQueries(2):
+            self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual(user.username, 'sam')
+            self.assertFalse(hasattr(user, 'food_truck_profile'))
+            self.assertFalse(hasattr(user, 'website_user_profile'))
+        self.assertIsNone(self.backend.get_user(999))
+
+    def test_changes_invalidate(self):
+        """Test that saving the user or a profile refreshes the cached copy."""
+        self.backend.get_user(self.user.pk)
+        WebsiteUserProfile.objects.create(user=self.user, home_city='Cary')
+        self.assertEqual(self.backend.get_user(self.user.pk).website_user_profile.home_city, 'Cary')
+
+        CustomUser.objects.filter(pk=self.user.pk).update(role='admin')
+        self.assertEqual(self.backend.get_user(self.user.pk).role, 'website_user')
+        self.user.role = 'admin'
+        self.user.save()
+        self.assertEqual(self.backend.get_user(self.user.pk).role, 'admin')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_login_records_backend(self):
+        """Test that sessions name the cached backend, so later requests use it."""
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY],
+                         'directory.auth.CachedModelBackend')
@@ -0,0 +1,115 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .cache import bump, city_scope, get_versions, version_token
+from .models import CustomUser, FoodTruck, FoodTruckOwnerProfile
+
+
+class CacheVersionTest(TestCase):
+    """Test cases for versioned cache scopes."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_changes_only_that_scope(self):
+        """Test bumping one scope leaves the others alone."""
+        before = get_versions(['home', 'city:raleigh'])
+        bump('city:raleigh')
+        after = get_versions(['home', 'city:raleigh'])
+        self.assertEqual(before['home'], after['home'])
+        self.assertNotEqual(before['city:raleigh'], after['city:raleigh'])
+
+    def test_bump_missing_scope(self):
+        """Test bumping a scope that was never read still creates it."""
+        bump('cuisine:thai')
+        self.assertTrue(version_token(['cuisine:thai']))
+
+    def test_city_scope_normalizes(self):
+        """Test URL segments and stored names share a scope."""
+        self.assertEqual(city_scope('Chapel Hill'), city_scope('chapel-hill'))
+
+
+class CachedPagesTest(TestCase):
+    """Test cases for cached pages and model-driven invalidation."""
+
+    def setUp(self):
+        cache.clear()
+        self.raleigh = FoodTruck.objects.create(name='Oak City Tacos', city='Raleigh', cuisine='Mexican')
+        self.durham = FoodTruck.objects.create(name='Bull City BBQ', city='Durham', cuisine='BBQ')
+
+    def test_cached_city_page_makes_no_queries(self):
+        """Test a repeat anonymous hit is served without touching the DB."""
+        url = reverse('trucks_by_city', args=['raleigh'])
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+        self.assertContains(second, 'Oak City Tacos')
+
+    def test_cached_home_page_makes_no_queries(self):
+        """Test the home page and its city list come from the cache."""
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Raleigh')
+
+    def test_save_invalidates_only_affected_city(self):
+        """Test a Raleigh change refreshes Raleigh but not Durham."""
+        raleigh_url = reverse('trucks_by_city', args=['raleigh'])
+        durham_url = reverse('trucks_by_city', args=['durham'])
+        self.client.get(raleigh_url)
+        self.client.get(durham_url)
+
+        self.raleigh.name = 'Oak City Tamales'
+        self.raleigh.save()
+
+        self.assertContains(self.client.get(raleigh_url), 'Oak City Tamales')
+        with self.assertNumQueries(0):
+            self.client.get(durham_url)
+
+    def test_moving_city_invalidates_both_cities(self):
+        """Test a truck moving cities drops off the old city's page."""
+        durham_url = reverse('trucks_by_city', args=['durham'])
+        self.client.get(durham_url)
+        self.durham.city = 'Raleigh'
+        self.durham.save()
+        self.assertNotContains(self.client.get(durham_url), 'Bull City BBQ')
+
+    def test_delete_invalidates_city(self):
+        """Test deleting a truck removes it from the cached page."""
+        url = reverse('trucks_by_city', args=['raleigh'])
+        self.client.get(url)
+        self.raleigh.delete()
+        self.assertNotContains(self.client.get(url), 'Oak City Tacos')
+
+    def test_owner_profile_change_invalidates_truck_city(self):
+        """Test owner profile saves bump their trucks' cities."""
+        user = CustomUser.objects.create_user(username='owner', password='pass12345')
+        profile = FoodTruckOwnerProfile.objects.create(user=user, business_name='Oak City')
+        FoodTruck.objects.filter(pk=self.raleigh.pk).update(owner=profile)
+        before = version_token([city_scope('raleigh')])
+        profile.is_verified = True
+        profile.save()
+        self.assertNotEqual(version_token([city_scope('raleigh')]), before)
+
+    def test_open_now_pages_are_not_cached(self):
+        """Test time-dependent listings always hit the database."""
+        url = reverse('trucks_by_city', args=['raleigh'])
+        self.client.get(url, {'open': 'now'})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'open': 'now'})
+        self.assertGreater(len(queries), 0)
+
+    def test_logged_in_users_get_cached_fragments(self):
+        """Test signed-in users skip the listing query via the fragment cache."""
+        CustomUser.objects.create_user(username='eater', password='pass12345')
+        self.client.login(username='eater', password='pass12345')
+        url = reverse('trucks_by_city', args=['raleigh'])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, 'Oak City Tacos')
+        self.assertFalse(any('directory_foodtruck' in q['sql'] for q in queries))
@@ -0,0 +1,134 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .exports import export_stream
+from .models import CustomUser, FoodTruck, FoodTruckOwnerProfile, WebsiteUserProfile
+
+
+def read_stream(response):
+    return b''.join(response.streaming_content)
+
+
+class ExportTest(TestCase):
+    """Test cases for the streaming truck and user exports."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create an owner with a truck, a website user and a staff account."""
+        owner = CustomUser.objects.create_user(
+            username='owner', password='pw', role='food_truck_owner'
+        )
+        cls.profile = FoodTruckOwnerProfile.objects.create(
+            user=owner, business_name='Oak City Tacos', is_verified=True
+        )
+        cls.truck = FoodTruck.objects.create(
+            name='Oak City Tacos', city='Raleigh', cuisine='Mexican', owner=cls.profile,
+            social_links={'instagram': 'https://instagram.com/oakcity'},
+        )
+        eater = CustomUser.objects.create_user(username='eater', password='pw')
+        WebsiteUserProfile.objects.create(user=eater, dietary_preferences='vegan')
+        cls.staff = CustomUser.objects.create_user(
+            username='staff', password='pw', role='admin', is_staff=True
+        )
+
+    def add_rows(self, count):
+        for i in range(count):
+            user = CustomUser.objects.create_user(username=f'bulk{i}', role='food_truck_owner')
+            profile = FoodTruckOwnerProfile.objects.create(user=user, business_name=f'Biz {i}')
+            FoodTruck.objects.create(name=f'Truck {i}', city='Cary', cuisine='BBQ', owner=profile)
+
+    def count_export_queries(self, dataset):
+        with CaptureQueriesContext(connection) as queries:
+            b''.join(export_stream(dataset, 'ndjson'))
+        return len(queries)
+
+    def test_truck_csv_export(self):
+        """Test that staff can stream the directory as CSV."""
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('export_trucks', args=['csv']))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(io.StringIO(read_stream(response).decode())))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['name'], 'Oak City Tacos')
+        self.assertEqual(rows[0]['owner'], 'Oak City Tacos')
+        self.assertEqual(json.loads(rows[0]['social_links']),
+                         {'instagram': 'https://instagram.com/oakcity'})
+
+    def test_user_ndjson_export_includes_profiles(self):
+        """Test that user rows carry fields from either profile type."""
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('export_users', args=['ndjson']))
+        rows = {row['username']: row for row in map(json.loads, read_stream(response).splitlines())}
+        self.assertEqual(rows['owner']['business_name'], 'Oak City Tacos')
+        self.assertTrue(rows['owner']['is_verified'])
+        self.assertEqual(rows['eater']['dietary_preferences'], 'vegan')
+        self.assertIsNone(rows['staff']['business_name'])
+        self.assertNotIn('password', rows['owner'])
+
+    def test_user_export_filters_by_role(self):
+        """Test that ?role= limits the export to one role."""
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('export_users', args=['ndjson']),
+                                   {'role': 'food_truck_owner'})
+        usernames = [json.loads(line)['username'] for line in read_stream(response).splitlines()]
+        self.assertEqual(usernames, ['owner'])
+        self.assertIn('food_truck_owner-users.ndjson', response['Content-Disposition'])
+
+    def test_gzip_when_accepted(self):
+        """Test that the export is compressed on the fly for gzip clients."""
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('export_trucks', args=['ndjson']),
+                                   HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        row = json.loads(gzip.decompress(read_stream(response)))
+        self.assertEqual(row['name'], 'Oak City Tacos')
+
+    @override_settings(DIRECTORY_EXPORT_TOKEN='s3cret')
+    def test_export_access(self):
+        """Test that exports need staff, and the partner token only opens trucks."""
+        trucks_url = reverse('export_trucks', args=['csv'])
+        users_url = reverse('export_users', args=['csv'])
+        self.assertEqual(self.client.get(trucks_url).status_code, 403)
+        self.assertEqual(
+            self.client.get(trucks_url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403
+        )
+        self.assertEqual(
+            self.client.get(trucks_url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200
+        )
+        self.assertEqual(
+            self.client.get(users_url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 403
+        )
+
+    def test_unknown_format_is_404(self):
+        """Test that only csv and ndjson are served."""
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('export_trucks', args=['xml']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_query_count_is_flat(self):
+        """Test that exporting more rows does not add per-row queries."""
+        baseline = {dataset: self.count_export_queries(dataset) for dataset in ('trucks', 'users')}
+        self.add_rows(25)
+        for dataset, queries in baseline.items():
+            self.assertEqual(self.count_export_queries(dataset), queries)
+
+    def test_management_command_writes_gzip_file(self):
+        """Test that export_directory writes a gzip file of the chosen dataset."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'trucks.csv.gz')
+            call_command('export_directory', 'trucks', output=path, gzip=True,
+                         stderr=io.StringIO())
+            with gzip.open(path, 'rt') as handle:
+                rows = list(csv.DictReader(handle))
+        self.assertEqual([row['name'] for row in rows], ['Oak City Tacos'])
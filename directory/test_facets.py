@@ -0,0 +1,158 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .facets import facet_counts, parse_filters, rebuild_facet_counts
+from .models import CustomUser, DietaryTag, FacetCount, FoodTruck, FoodTruckOwnerProfile
+
+
+def stored_cells():
+    return {
+        (cell.tag_id, cell.city, cell.cuisine, cell.is_verified): cell.count
+        for cell in FacetCount.objects.filter(count__gt=0)
+    }
+
+
+class FacetCountMaintenanceTest(TestCase):
+    """Test cases for incrementally maintained facet counts."""
+
+    def setUp(self):
+        """Create two tags and an owner profile."""
+        self.vegan = DietaryTag.objects.create(slug='vegan-test', name='Vegan Test')
+        self.halal = DietaryTag.objects.create(slug='halal-test', name='Halal Test')
+        user = CustomUser.objects.create_user(username='owner')
+        self.owner = FoodTruckOwnerProfile.objects.create(user=user, business_name='Biz')
+
+    def assertCountsMatchRebuild(self):
+        incremental = stored_cells()
+        rebuild_facet_counts()
+        self.assertEqual(incremental, stored_cells())
+
+    def test_create_update_delete(self):
+        """Test that saves and deletes keep the counts equal to a rebuild."""
+        tacos = FoodTruck.objects.create(name='Tacos', city='Raleigh', cuisine='Mexican')
+        FoodTruck.objects.create(name='Smoke', city='raleigh ', cuisine='BBQ')
+        self.assertEqual(stored_cells()[(0, 'raleigh', 'Mexican', False)], 1)
+        tacos.city = 'Durham'
+        tacos.save()
+        self.assertCountsMatchRebuild()
+        tacos.delete()
+        self.assertCountsMatchRebuild()
+        self.assertEqual(stored_cells(), {(0, 'raleigh', 'BBQ', False): 1})
+
+    def test_tag_changes_from_both_sides(self):
+        """Test that adding, removing and clearing tags moves per-tag counts."""
+        bowls = FoodTruck.objects.create(name='Bowls', city='Cary', cuisine='Vegan')
+        falafel = FoodTruck.objects.create(name='Falafel', city='Cary', cuisine='Greek')
+        bowls.dietary_tags.add(self.vegan, self.halal)
+        self.halal.trucks.add(falafel)
+        self.assertEqual(stored_cells()[(self.halal.pk, 'cary', 'Vegan', False)], 1)
+        self.assertCountsMatchRebuild()
+        bowls.dietary_tags.remove(self.halal)
+        self.assertCountsMatchRebuild()
+        self.halal.trucks.clear()
+        bowls.dietary_tags.clear()
+        self.assertCountsMatchRebuild()
+        bowls.dietary_tags.add(self.vegan)
+        bowls.delete()
+        self.assertCountsMatchRebuild()
+
+    def test_owner_verification_moves_trucks(self):
+        """Test that verifying an owner marks and recounts their trucks."""
+        truck = FoodTruck.objects.create(name='Tacos', city='Apex', cuisine='Mexican',
+                                         owner=self.owner)
+        truck.dietary_tags.add(self.vegan)
+        self.owner.is_verified = True
+        self.owner.save()
+        truck.refresh_from_db()
+        self.assertTrue(truck.is_verified)
+        self.assertEqual(stored_cells()[(self.vegan.pk, 'apex', 'Mexican', True)], 1)
+        self.assertCountsMatchRebuild()
+        self.owner.user.delete()
+        truck.refresh_from_db()
+        self.assertFalse(truck.is_verified)
+        self.assertCountsMatchRebuild()
+
+    def test_deleting_tag_drops_its_cells(self):
+        """Test that a deleted tag no longer has facet counts."""
+        truck = FoodTruck.objects.create(name='Tacos', city='Apex', cuisine='Mexican')
+        truck.dietary_tags.add(self.vegan)
+        self.vegan.delete()
+        self.assertCountsMatchRebuild()
+
+    def test_rebuild_command(self):
+        """Test that the rebuild command repairs drifted counts and verification."""
+        self.owner.is_verified = True
+        self.owner.save()
+        truck = FoodTruck.objects.create(name='Tacos', city='Apex', cuisine='Mexican')
+        FoodTruck.objects.filter(pk=truck.pk).update(owner=self.owner, city='Cary')
+        call_command('rebuild_facet_counts', stdout=StringIO())
+        self.assertEqual(stored_cells(), {(0, 'cary', 'Mexican', True): 1})
+
+
+class DirectoryFacetsTest(TestCase):
+    """Test cases for faceted browsing on the directory page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create trucks across two cities, cuisines and a tag."""
+        cls.vegan = DietaryTag.objects.create(slug='plant-based', name='Plant-Based')
+        user = CustomUser.objects.create_user(username='owner')
+        owner = FoodTruckOwnerProfile.objects.create(user=user, business_name='Biz',
+                                                     is_verified=True)
+        cls.tacos = FoodTruck.objects.create(name='Tacos', city='Raleigh', cuisine='Mexican',
+                                             owner=owner)
+        cls.bbq = FoodTruck.objects.create(name='Smoke', city='Raleigh', cuisine='BBQ')
+        cls.bowls = FoodTruck.objects.create(name='Bowls', city='Durham', cuisine='Mexican')
+        cls.bowls.dietary_tags.add(cls.vegan)
+
+    def setUp(self):
+        cache.clear()
+
+    def options(self, facets, facet):
+        return {option['value']: option['count'] for option in facets[facet]}
+
+    def test_counts_ignore_their_own_filter(self):
+        """Test that each facet is counted under the other facets' filters."""
+        facets = facet_counts(parse_filters({'city': 'Raleigh'}))
+        self.assertEqual(self.options(facets, 'city'), {'raleigh': 2, 'durham': 1})
+        self.assertEqual(self.options(facets, 'cuisine'), {'Mexican': 1, 'BBQ': 1})
+        self.assertEqual(self.options(facets, 'verified'), {'1': 1})
+        self.assertEqual(facets['total'], 2)
+
+    def test_tag_filter(self):
+        """Test that the dietary tag narrows the other facets."""
+        facets = facet_counts(parse_filters({'tag': 'plant-based'}), self.vegan)
+        self.assertEqual(self.options(facets, 'city'), {'durham': 1})
+        self.assertEqual(self.options(facets, 'tag'), {'plant-based': 1})
+        self.assertEqual(facets['total'], 1)
+
+    def test_directory_page_filters_and_counts(self):
+        """Test that the directory lists matching trucks with facet links."""
+        response = self.client.get(reverse('directory'), {'cuisine': 'Mexican', 'verified': '1'})
+        self.assertEqual([truck.name for truck in response.context['page']], ['Tacos'])
+        self.assertContains(response, 'href="?cuisine=Mexican&amp;verified=1&amp;city=raleigh"')
+        self.assertContains(response, 'href="?cuisine=Mexican"')
+        response = self.client.get(reverse('directory'), {'tag': 'unknown'})
+        self.assertEqual(len(response.context['page']), 0)
+        self.assertEqual(response.status_code, 200)
+
+    def test_page_does_not_group_over_trucks(self):
+        """Test that facet counts never aggregate the truck table."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('directory'), {'city': 'raleigh', 'tag': 'plant-based'})
+        grouped = [q['sql'] for q in queries if 'GROUP BY' in q['sql']]
+        self.assertTrue(grouped)
+        self.assertFalse(any('directory_foodtruck' in sql for sql in grouped))
+
+    def test_tag_change_invalidates_cached_page(self):
+        """Test that tagging a truck refreshes the cached directory page."""
+        self.client.get(reverse('directory'))
+        self.tacos.dietary_tags.add(self.vegan)
+        response = self.client.get(reverse('directory'), {'tag': 'plant-based'})
+        self.assertEqual(response.context['facets']['total'], 2)
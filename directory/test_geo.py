@@ -0,0 +1,125 @@
+import math
+import random
+
+import numpy as np
+from django.test import TestCase
+from django.urls import reverse
+
+from .geo import GeoIndex, get_geo_index, haversine_miles, invalidate_geo_index
+from .models import FoodTruck
+
+# Downtown reference points.
+RALEIGH = (35.7796, -78.6382)
+DURHAM = (35.9940, -78.8986)
+
+
+def brute_force(points, latitude, longitude, radius):
+    """Reference implementation: distance to every point."""
+    hits = []
+    for truck_id, lat, lon in points:
+        distance = float(haversine_miles(
+            math.radians(latitude), math.radians(longitude),
+            np.radians([lat]), np.radians([lon]),
+        )[0])
+        if distance <= radius:
+            hits.append((truck_id, distance))
+    return sorted(hits, key=lambda hit: hit[1])
+
+
+class GeoIndexTest(TestCase):
+    """Test cases for the grid-cell spatial index."""
+
+    def setUp(self):
+        """Scatter points around the Triangle."""
+        rng = random.Random(3)
+        self.points = [
+            (i, 35.5 + rng.random() * 0.8, -79.3 + rng.random() * 1.0)
+            for i in range(2000)
+        ]
+        self.index = GeoIndex.from_points(self.points)
+
+    def test_haversine_known_distance(self):
+        """Test Raleigh to Durham is about 21 miles."""
+        distance = haversine_miles(
+            math.radians(RALEIGH[0]), math.radians(RALEIGH[1]),
+            np.radians([DURHAM[0]]), np.radians([DURHAM[1]]),
+        )[0]
+        self.assertAlmostEqual(distance, 20.9, delta=0.5)
+
+    def test_within_matches_brute_force(self):
+        """Test radius queries return exactly the brute-force answer."""
+        for radius in (0.5, 2, 10):
+            expected = brute_force(self.points, *RALEIGH, radius)
+            actual = self.index.within(*RALEIGH, radius)
+            self.assertEqual([i for i, _ in actual], [i for i, _ in expected])
+
+    def test_nearest_matches_brute_force(self):
+        """Test k-nearest returns the k closest points in order."""
+        expected = brute_force(self.points, *DURHAM, 10_000)[:15]
+        actual = self.index.nearest(*DURHAM, 15)
+        self.assertEqual([i for i, _ in actual], [i for i, _ in expected])
+
+    def test_nearest_with_fewer_points_than_k(self):
+        """Test k larger than the index returns every point."""
+        index = GeoIndex.from_points(self.points[:3])
+        self.assertEqual(len(index.nearest(*RALEIGH, 10)), 3)
+
+    def test_antimeridian_wraps(self):
+        """Test circles crossing 180 degrees find points on both sides."""
+        index = GeoIndex.from_points([(1, 0.0, 179.99), (2, 0.0, -179.99)])
+        hits = index.within(0.0, 179.995, 5)
+        self.assertEqual(sorted(i for i, _ in hits), [1, 2])
+
+    def test_empty_index(self):
+        """Test queries against an empty index."""
+        index = GeoIndex.from_points([])
+        self.assertEqual(index.within(*RALEIGH, 2), [])
+        self.assertEqual(index.nearest(*RALEIGH, 3), [])
+
+
+class TrucksNearViewTest(TestCase):
+    """Test cases for the trucks near me view."""
+
+    def setUp(self):
+        """Create trucks downtown, in Durham and without a location."""
+        invalidate_geo_index()
+        self.downtown = FoodTruck.objects.create(
+            name='Downtown Dogs', city='Raleigh', cuisine='American',
+            latitude=35.7800, longitude=-78.6400,
+        )
+        self.durham = FoodTruck.objects.create(
+            name='Bull City Bites', city='Durham', cuisine='BBQ',
+            latitude=DURHAM[0], longitude=DURHAM[1],
+        )
+        FoodTruck.objects.create(name='Nomad', city='Raleigh', cuisine='Thai')
+
+    def test_radius_query(self):
+        """Test only trucks inside the radius are listed."""
+        response = self.client.get(
+            reverse('trucks_near'), {'lat': RALEIGH[0], 'lon': RALEIGH[1]}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t for t, _ in response.context['results']], [self.downtown])
+
+    def test_k_nearest_query(self):
+        """Test k-nearest lists trucks by distance regardless of radius."""
+        response = self.client.get(
+            reverse('trucks_near'), {'lat': RALEIGH[0], 'lon': RALEIGH[1], 'k': 5}
+        )
+        self.assertEqual(
+            [t for t, _ in response.context['results']], [self.downtown, self.durham]
+        )
+
+    def test_missing_coordinates_rejected(self):
+        """Test that lat and lon are required and validated."""
+        self.assertEqual(self.client.get(reverse('trucks_near')).status_code, 400)
+        response = self.client.get(reverse('trucks_near'), {'lat': 95, 'lon': 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_moved_truck_reindexed(self):
+        """Test that saving new coordinates invalidates the index."""
+        self.assertEqual(len(get_geo_index()), 2)
+        self.durham.latitude, self.durham.longitude = 35.7790, -78.6390
+        self.durham.save()
+        hits = get_geo_index().within(*RALEIGH, 2)
+        self.assertEqual({i for i, _ in hits}, {self.downtown.pk, self.durham.pk})
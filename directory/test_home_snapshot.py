@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import tasks  # noqa: F401  (registers home.snapshot)
+from .home_snapshot import (
+    EMPTY, SNAPSHOT_KEY, build_snapshot, current_snapshot, publish_snapshot,
+)
+from .models import CustomUser, FoodTruck, FoodTruckOwnerProfile, TruckDailyStats
+from .taskqueue import run_pending
+
+# Long enough ago for any snapshot built then to be stale.
+LAST_YEAR = datetime(2025, 5, 14, 15, 30, tzinfo=dt_timezone.utc)
+
+
+class HomeSnapshotTest(TestCase):
+    """Test cases for the precomputed featured and trending lists."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create verified and unverified trucks with a week of views."""
+        owner = CustomUser.objects.create(username='owner', role='food_truck_owner')
+        profile = FoodTruckOwnerProfile.objects.create(user=owner, business_name='Oak',
+                                                       is_verified=True)
+        cls.verified = FoodTruck.objects.create(name='Smokin Joes', city='Raleigh',
+                                                cuisine='BBQ', owner=profile)
+        cls.popular = FoodTruck.objects.create(name='Taco Bus', city='Durham', cuisine='Mexican')
+        cls.quiet = FoodTruck.objects.create(name='Crepe Cart', city='Cary', cuisine='French')
+        today = timezone.localdate()
+        TruckDailyStats.objects.bulk_create([
+            TruckDailyStats(truck=cls.popular, day=today, kind='view', page='truck', count=40),
+            TruckDailyStats(truck=cls.verified, day=today - timedelta(days=3), kind='view',
+                            page='truck', count=5),
+            TruckDailyStats(truck=cls.verified, day=today, kind='click', page='search', count=90),
+            # Outside the trending window.
+            TruckDailyStats(truck=cls.quiet, day=today - timedelta(days=30), kind='view',
+                            page='truck', count=500),
+        ])
+        run_pending()
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, entries):
+        return [entry['name'] for entry in entries]
+
+    def test_build_ranks_lists(self):
+        """Test that featured needs a verified owner and trending ranks recent views."""
+        snapshot = build_snapshot()
+        self.assertEqual(self.names(snapshot['featured']), ['Smokin Joes'])
+        self.assertEqual(self.names(snapshot['trending']), ['Taco Bus', 'Smokin Joes'])
+        self.assertEqual(snapshot['trending'][0]['views'], 40)
+        self.assertEqual(snapshot['top_cities'][0], {'city': 'Cary', 'truck_count': 1})
+        self.assertEqual(len(snapshot['top_cities']), 3)
+        # Once the views age out of the window nothing trends.
+        later = build_snapshot(now=timezone.now() + timedelta(days=10))
+        self.assertEqual(later['trending'], [])
+        self.assertEqual(self.names(later['featured']), ['Smokin Joes'])
+
+    def test_home_page_makes_no_ranking_queries(self):
+        """Test that the home page shows the published lists without ranking or counting trucks."""
+        publish_snapshot(build_snapshot())
+        self.client.force_login(CustomUser.objects.create(username='eater'))
+        self.client.get(reverse('home'))
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Featured Trucks')
+        self.assertContains(response, reverse('truck_detail', args=[self.popular.pk]))
+        self.assertFalse(any('directory_truckdailystats' in query['sql'] for query in queries))
+        self.assertFalse(any('GROUP BY' in query['sql'] for query in queries))
+        self.assertContains(response, reverse('trucks_by_city', args=['durham']))
+
+    def test_publish_refreshes_cached_home_page(self):
+        """Test that a new snapshot replaces the cached anonymous home page."""
+        self.assertNotContains(self.client.get(reverse('home')), 'Trending This Week')
+        publish_snapshot(build_snapshot())
+        self.assertContains(self.client.get(reverse('home')), 'Trending This Week')
+
+    def test_stale_snapshot_is_not_shown(self):
+        """Test that a snapshot older than the maximum age is ignored."""
+        publish_snapshot(build_snapshot(now=LAST_YEAR))
+        self.assertEqual(current_snapshot(), EMPTY)
+        with override_settings(DIRECTORY_HOME_SNAPSHOT_MAX_AGE=10 ** 10):
+            self.assertEqual(self.names(current_snapshot()['featured']), ['Smokin Joes'])
+
+    def test_snapshot_file(self):
+        """Test that the file is replaced whole and read back when the cache is empty."""
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertFileRoundTrip(directory)
+
+    def assertFileRoundTrip(self, directory):
+        path = os.path.join(directory, 'home.json')
+        with override_settings(DIRECTORY_HOME_SNAPSHOT_PATH=path):
+            publish_snapshot(build_snapshot())
+            self.assertEqual(os.listdir(directory), ['home.json'])
+            with open(path, 'rb') as snapshot_file:
+                self.assertEqual(self.names(json.load(snapshot_file)['featured']),
+                                 ['Smokin Joes'])
+            cache.delete(SNAPSHOT_KEY)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.names(current_snapshot()['trending']),
+                                 ['Taco Bus', 'Smokin Joes'])
+            self.assertIsNotNone(cache.get(SNAPSHOT_KEY))
+
+    def test_command_and_task(self):
+        """Test that the command publishes, and the task reschedules itself."""
+        out = StringIO()
+        call_command('build_home_snapshot', stdout=out)
+        self.assertIn('1 featured and 2 trending', out.getvalue())
+        cache.clear()
+        call_command('build_home_snapshot', '--schedule', stdout=StringIO())
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(self.names(current_snapshot()['featured']), ['Smokin Joes'])
+        self.assertEqual(run_pending(), 0)
@@ -0,0 +1,216 @@
+import importlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .geo import invalidate_geo_index
+from .hours import (
+    MINUTES_PER_WEEK, interval_minutes, open_at, parse_operating_hours, parse_time_range,
+)
+from .models import CustomUser, EventSlot, FoodTruck, FoodTruckOwnerProfile, OperatingHours
+
+
+def local(year, month, day, hour, minute=0):
+    """Aware datetime in the project time zone."""
+    return timezone.make_aware(datetime(year, month, day, hour, minute))
+
+
+# 2025-06-02 is a Monday.
+MONDAY = (2025, 6, 2)
+
+
+class ParseOperatingHoursTest(TestCase):
+    """Test cases for the free-text hours parser."""
+
+    def test_weekday_range(self):
+        """Test a simple day range with one time range."""
+        intervals = parse_operating_hours('Mon-Fri 11AM-3PM')
+        self.assertEqual([day for day, _, _ in intervals], [0, 1, 2, 3, 4])
+        self.assertEqual(intervals[0][1:], (time(11), time(15)))
+
+    def test_multiple_groups(self):
+        """Test several day groups separated by commas and semicolons."""
+        intervals = parse_operating_hours('Mon-Fri 11AM-3PM, Sat 10:30am-2pm; Sun noon-4')
+        self.assertIn((5, time(10, 30), time(14)), intervals)
+        self.assertIn((6, time(12), time(16)), intervals)
+        self.assertEqual(len(intervals), 7)
+
+    def test_day_list_with_split_shift(self):
+        """Test a list of days followed by two time ranges."""
+        intervals = parse_operating_hours('Tues & Thurs 11-2pm, 5-9pm')
+        self.assertEqual(sorted(intervals), [
+            (1, time(11), time(14)), (1, time(17), time(21)),
+            (3, time(11), time(14)), (3, time(17), time(21)),
+        ])
+
+    def test_wrapping_day_range_and_midnight(self):
+        """Test day ranges that wrap the week and closing at midnight."""
+        intervals = parse_operating_hours('Fri-Mon 6pm to midnight')
+        self.assertEqual([day for day, _, _ in intervals], [4, 5, 6, 0])
+        self.assertEqual(intervals[0][2], time(0))
+
+    def test_times_without_days_apply_daily(self):
+        """Test that bare time ranges mean every day."""
+        self.assertEqual(len(parse_operating_hours('17:00-21:00')), 7)
+
+    def test_unparseable_text(self):
+        """Test that prose without hours yields nothing."""
+        self.assertEqual(parse_operating_hours('Call for a saturated schedule'), [])
+        self.assertEqual(parse_operating_hours(None), [])
+
+    def test_meridiem_inference(self):
+        """Test that a missing am/pm is inferred from the other end."""
+        self.assertEqual(parse_time_range('11-3pm'), (time(11), time(15)))
+        self.assertEqual(parse_time_range('5pm-2'), (time(17), time(2)))
+
+
+class OpenAtTest(TestCase):
+    """Test cases for the open now filter."""
+
+    def setUp(self):
+        """Create a lunch truck, a late-night truck and an event-only truck."""
+        invalidate_geo_index()
+        self.lunch = FoodTruck.objects.create(
+            name='Lunch', city='Raleigh', cuisine='Deli', latitude=35.78, longitude=-78.64
+        )
+        self.late = FoodTruck.objects.create(
+            name='Late', city='Raleigh', cuisine='Pizza', latitude=35.77, longitude=-78.63
+        )
+        self.festival = FoodTruck.objects.create(name='Fest', city='Raleigh', cuisine='Crepes')
+        OperatingHours.objects.create(truck=self.lunch, weekday=0, opens_at=time(11), closes_at=time(14))
+        # Sunday 10pm until Monday 2am wraps past the end of the week.
+        OperatingHours.objects.create(truck=self.late, weekday=6, opens_at=time(22), closes_at=time(2))
+        EventSlot.objects.create(
+            truck=self.festival, location='Dix Park',
+            starts_at=local(*MONDAY, 17), ends_at=local(*MONDAY, 21),
+        )
+
+    def open_trucks(self, at):
+        return set(FoodTruck.objects.filter(open_at(at)).values_list('name', flat=True))
+
+    def test_minutes_are_precomputed(self):
+        """Test that saving derives the minute-of-week columns."""
+        late_hours = self.late.hours.get()
+        self.assertEqual(late_hours.start_minute, 6 * 1440 + 22 * 60)
+        self.assertGreater(late_hours.end_minute, MINUTES_PER_WEEK)
+
+    def test_weekly_interval(self):
+        """Test open inside the interval, closed at the closing minute."""
+        self.assertEqual(self.open_trucks(local(*MONDAY, 12)), {'Lunch'})
+        self.assertEqual(self.open_trucks(local(*MONDAY, 14)), set())
+
+    def test_open_now_uses_local_wall_clock(self):
+        """Test that "now" is read on the Triangle's clock, not UTC."""
+        # 16:30 UTC is 12:30 in Raleigh (EDT): lunch is being served.
+        lunchtime = datetime(*MONDAY, 16, 30, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=lunchtime):
+            self.assertEqual(self.open_trucks(None), {'Lunch'})
+        # 12:30 UTC is 08:30 in Raleigh: too early, although it is 12:30 in UTC.
+        breakfast = datetime(*MONDAY, 12, 30, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=breakfast):
+            self.assertEqual(self.open_trucks(None), set())
+
+    def test_interval_wrapping_past_sunday(self):
+        """Test an overnight Sunday interval is open early Monday."""
+        self.assertEqual(self.open_trucks(local(*MONDAY, 1, 30)), {'Late'})
+        self.assertEqual(self.open_trucks(local(*MONDAY, 0) - timedelta(hours=1)), {'Late'})
+
+    def test_event_slot(self):
+        """Test one-off events open a truck outside its weekly hours."""
+        self.assertEqual(self.open_trucks(local(*MONDAY, 18)), {'Fest'})
+        self.assertEqual(self.open_trucks(local(*MONDAY, 22)), set())
+
+    def test_interval_minutes_overnight(self):
+        """Test closing before opening rolls into the next day."""
+        self.assertEqual(interval_minutes(2, time(20), time(1)), (2 * 1440 + 1200, 3 * 1440 + 60))
+
+    def test_city_view_open_filter(self):
+        """Test the city listing honours the open parameter."""
+        response = self.client.get(
+            reverse('trucks_by_city', args=['raleigh']),
+            {'open': local(*MONDAY, 12).isoformat()},
+        )
+        self.assertEqual([truck.name for truck in response.context['page']], ['Lunch'])
+        response = self.client.get(reverse('trucks_by_city', args=['raleigh']), {'open': 'soon'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_nearest_open_trucks(self):
+        """Test k-nearest skips trucks that are closed at the given time."""
+        response = self.client.get(reverse('trucks_near'), {
+            'lat': 35.7796, 'lon': -78.6382, 'k': 5,
+            'open': local(*MONDAY, 1).isoformat(),
+        })
+        self.assertEqual([truck.name for truck, _ in response.context['results']], ['Late'])
+
+    def test_radius_open_filter_in_chunks(self):
+        """Test the radius query filters open trucks a chunk at a time, nearest first."""
+        for i in range(5):
+            truck = FoodTruck.objects.create(name=f'Open {i}', city='Raleigh', cuisine='Deli',
+                                             latitude=35.78 + i / 100, longitude=-78.64)
+            OperatingHours.objects.create(truck=truck, weekday=0, opens_at=time(11),
+                                          closes_at=time(14))
+        invalidate_geo_index()
+        with mock.patch('directory.views.OPEN_FILTER_CHUNK', 2):
+            response = self.client.get(reverse('trucks_near'), {
+                'lat': 35.78, 'lon': -78.64, 'radius': 50,
+                'open': local(*MONDAY, 12).isoformat(),
+            })
+        self.assertEqual(
+            [truck.name for truck, _ in response.context['results']],
+            ['Lunch', 'Open 0', 'Open 1', 'Open 2', 'Open 3', 'Open 4'],
+        )
+
+
+class ParseHoursMigrationTest(TestCase):
+    """Test cases for the free-text hours data migration."""
+
+    def run_migration(self):
+        migration = importlib.import_module('directory.migrations.0006_parse_operating_hours')
+        migration.parse_free_text_hours(apps, SimpleNamespace(connection=connection))
+
+    def test_unlinked_trucks_take_hours_when_linked(self):
+        """Test that an unowned truck gets no hours until an admin links it to the profile."""
+        user = CustomUser.objects.create_user(username='owner', password='pass12345')
+        profile = FoodTruckOwnerProfile.objects.create(
+            user=user, business_name='Best Tacos Ever', operating_hours='Sat-Sun 10am-2pm'
+        )
+        truck = FoodTruck.objects.create(name='Best Tacos Ever', city='Durham',
+                                         cuisine='Mexican')
+
+        self.run_migration()
+        truck.refresh_from_db()
+        self.assertIsNone(truck.owner)
+        self.assertFalse(truck.hours.exists())
+
+        truck.owner = profile
+        truck.save()
+        self.assertEqual(
+            list(truck.hours.values_list('weekday', 'opens_at', 'closes_at')),
+            [(5, time(10), time(14)), (6, time(10), time(14))],
+        )
+        # Later saves leave hours the owner has edited alone.
+        truck.hours.filter(weekday=6).delete()
+        truck.save()
+        self.assertEqual(truck.hours.count(), 1)
+
+    def test_linked_trucks_are_converted(self):
+        """Test that a truck already linked when the migration runs gets its owner's hours."""
+        user = CustomUser.objects.create_user(username='owner', password='pass12345')
+        profile = FoodTruckOwnerProfile.objects.create(
+            user=user, business_name='Best Tacos Ever', operating_hours='Mon 11am-3pm'
+        )
+        truck = FoodTruck.objects.create(name='Taco Van', city='Durham', cuisine='Mexican',
+                                         owner=profile)
+        truck.hours.all().delete()
+
+        self.run_migration()
+        self.assertEqual(
+            list(truck.hours.values_list('weekday', 'opens_at', 'closes_at')),
+            [(0, time(11), time(15))],
+        )
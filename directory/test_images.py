@@ -0,0 +1,150 @@
+import io
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from . import tasks  # noqa: F401  (registers images.process)
+from .images import render_variants, target_widths
+from .models import FoodTruck, Task
+from .taskqueue import run_pending
+
+ORIENTATION = 0x0112
+MAKE = 0x010F
+
+
+def jpeg_with_exif(width=1200, height=800):
+    """JPEG bytes carrying a camera make and a rotate-90 orientation tag."""
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    exif[MAKE] = 'SpyCam'
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 80, 20)).save(buffer, 'JPEG', exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+class RenderVariantsTest(TestCase):
+    """Test cases for the pure image rendering step."""
+
+    def test_widths_never_upscale(self):
+        """Test small originals keep their size and large ones get every width."""
+        self.assertEqual(target_widths(200, (320, 640)), [200])
+        self.assertEqual(target_widths(500, (320, 640)), [320, 500])
+        self.assertEqual(target_widths(2000, (320, 640)), [320, 640])
+
+    def test_variants_strip_exif_and_apply_orientation(self):
+        """Test every variant is re-encoded without metadata, upright."""
+        variants = render_variants(jpeg_with_exif(), widths=(320, 640))
+        self.assertEqual(
+            sorted((w, fmt) for w, _, fmt, _ in variants),
+            [(320, 'jpeg'), (320, 'webp'), (640, 'jpeg'), (640, 'webp')],
+        )
+        for width, height, fmt, data in variants:
+            with Image.open(io.BytesIO(data)) as image:
+                self.assertEqual(image.format, fmt.upper())
+                self.assertEqual(image.size, (width, height))
+                self.assertEqual(dict(image.getexif()), {})
+            # Portrait after applying the orientation tag.
+            self.assertGreater(height, width)
+
+    def test_transparent_png_flattened_for_jpeg(self):
+        """Test alpha survives in WebP and is flattened for JPEG."""
+        buffer = io.BytesIO()
+        Image.new('RGBA', (400, 300), (0, 0, 0, 0)).save(buffer, 'PNG')
+        variants = {fmt: data for _, _, fmt, data in render_variants(buffer.getvalue(), (320,))}
+        with Image.open(io.BytesIO(variants['webp'])) as webp:
+            self.assertEqual(webp.mode, 'RGBA')
+        with Image.open(io.BytesIO(variants['jpeg'])) as jpeg:
+            self.assertEqual(jpeg.mode, 'RGB')
+
+
+class TruckImagePipelineTest(TestCase):
+    """Test cases for upload processing, srcset output and the backfill."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media_root,
+            DIRECTORY_IMAGE_PROCESSING='sync',
+            DIRECTORY_IMAGE_WIDTHS=(320, 640),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def create_truck(self, **kwargs):
+        return FoodTruck.objects.create(
+            name='Picture Perfect', city='Raleigh', cuisine='Crepes',
+            image=SimpleUploadedFile('truck.jpg', jpeg_with_exif(), 'image/jpeg'),
+            **kwargs,
+        )
+
+    def test_upload_builds_variants(self):
+        """Test saving a truck with an image records its variants."""
+        truck = self.create_truck()
+        truck.refresh_from_db()
+        self.assertEqual(truck.image_variants['source'], truck.image.name)
+        self.assertEqual(len(truck.image_variants['variants']), 4)
+        for variant in truck.image_variants['variants']:
+            self.assertTrue(default_storage.exists(variant['name']))
+
+    def test_unchanged_image_is_not_reprocessed(self):
+        """Test saving other fields leaves the existing variants alone."""
+        truck = self.create_truck()
+        truck.refresh_from_db()
+        names = [v['name'] for v in truck.image_variants['variants']]
+        truck.description = 'Now with more crepes'
+        truck.save()
+        truck.refresh_from_db()
+        self.assertEqual([v['name'] for v in truck.image_variants['variants']], names)
+
+    def test_upload_queues_variants_for_workers(self):
+        """Test that, by default, uploads are rendered by a queued task."""
+        with override_settings(DIRECTORY_IMAGE_PROCESSING='queue'):
+            truck = self.create_truck()
+        self.assertEqual(
+            list(Task.objects.filter(name='images.process').values_list('kwargs', flat=True)),
+            [{'truck_id': truck.pk}],
+        )
+        truck.refresh_from_db()
+        self.assertFalse(truck.image_variants)
+        run_pending()
+        truck.refresh_from_db()
+        self.assertEqual(truck.image_variants['source'], truck.image.name)
+
+    def test_picture_tag_emits_srcsets(self):
+        """Test the template tag renders WebP and JPEG srcsets."""
+        truck = self.create_truck()
+        truck.refresh_from_db()
+        html = Template(
+            '{% load directory_images %}{% truck_picture truck %}'
+        ).render(Context({'truck': truck}))
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('-320w.webp 320w', html)
+        self.assertIn('-640w.jpg 640w', html)
+
+    def test_backfill_command(self):
+        """Test the backfill processes trucks that are missing variants."""
+        truck = self.create_truck()
+        FoodTruck.objects.filter(pk=truck.pk).update(image_variants=None)
+
+        out = StringIO()
+        call_command('process_images', workers=1, stdout=out)
+        self.assertIn('Processed 1 images (0 failed)', out.getvalue())
+        self.assertIn('images/s', out.getvalue())
+        truck.refresh_from_db()
+        self.assertEqual(len(truck.image_variants['variants']), 4)
+
+        out = StringIO()
+        call_command('process_images', workers=2, stdout=out)
+        self.assertIn('Processed 0 images', out.getvalue())
+
+        out = StringIO()
+        call_command('process_images', workers=2, force=True, stdout=out)
+        self.assertIn('Processed 1 images (0 failed)', out.getvalue())
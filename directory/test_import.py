@@ -0,0 +1,199 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase
+
+from .dedup import find_duplicates
+from .importer import Checkpoint, ImportStats, TruckImporter, clean_record, iter_records
+from .models import FoodTruck
+from .search import search_trucks
+
+
+class ImportTrucksTest(TestCase):
+    """Test cases for the import_trucks management command."""
+
+    def setUp(self):
+        """Create a scratch directory for input, checkpoint and error files."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def write_csv(self, rows, name='trucks.csv'):
+        path = os.path.join(self.tmpdir, name)
+        fieldnames = sorted({key for row in rows for key in row})
+        with open(path, 'w', newline='') as handle:
+            writer = csv.DictWriter(handle, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def write_ndjson(self, lines, name='trucks.ndjson'):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w') as handle:
+            for line in lines:
+                handle.write((line if isinstance(line, str) else json.dumps(line)) + '\n')
+        return path
+
+    def import_file(self, path, **options):
+        out = StringIO()
+        call_command('import_trucks', path, stdout=out, **options)
+        return out.getvalue()
+
+    def read_errors(self, path):
+        with open(path + '.errors.csv', newline='') as handle:
+            return list(csv.DictReader(handle))
+
+    def test_imports_csv_with_social_columns(self):
+        """Test that CSV rows are created, including social_<platform> columns."""
+        path = self.write_csv([
+            {'external_id': 'a1', 'name': 'Taco Loco', 'city': 'Raleigh', 'cuisine': 'Mexican',
+             'website': 'https://tacoloco.example', 'latitude': '35.78',
+             'longitude': '-78.64', 'social_instagram': 'https://instagram.com/tacoloco'},
+            {'external_id': '', 'name': 'Bao Down', 'city': 'Durham', 'cuisine': 'Asian',
+             'website': '', 'latitude': '', 'longitude': '', 'social_instagram': ''},
+        ])
+        output = self.import_file(path)
+        self.assertIn('Imported 2 of 2 rows', output)
+        taco = FoodTruck.objects.get(external_id='a1')
+        self.assertEqual(taco.latitude, 35.78)
+        self.assertEqual(taco.social_links, {'instagram': 'https://instagram.com/tacoloco'})
+        bao = FoodTruck.objects.get(name='Bao Down')
+        self.assertIsNone(bao.external_id)
+        self.assertIsNone(bao.social_links)
+
+    def test_imports_ndjson(self):
+        """Test that NDJSON objects are created, with social_links as an object."""
+        path = self.write_ndjson([
+            {'external_id': 'n1', 'name': 'Smoke Stack', 'city': 'Durham', 'cuisine': 'BBQ',
+             'social_links': {'facebook': 'https://facebook.com/smokestack'}},
+        ])
+        self.import_file(path)
+        truck = FoodTruck.objects.get(external_id='n1')
+        self.assertEqual(truck.social_links, {'facebook': 'https://facebook.com/smokestack'})
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        """Test that rows breaking field constraints land in the error report."""
+        path = self.write_ndjson([
+            {'name': 'x' * 101, 'city': 'Raleigh', 'cuisine': 'BBQ'},
+            {'name': 'Bad Site', 'city': 'Raleigh', 'cuisine': 'BBQ', 'website': 'not a url'},
+            {'name': 'Bad Links', 'city': 'Raleigh', 'cuisine': 'BBQ', 'social_links': ['x']},
+            'not json',
+            {'name': 'Good', 'city': 'Raleigh', 'cuisine': 'BBQ'},
+        ])
+        output = self.import_file(path)
+        self.assertIn('Imported 1 of 5 rows (4 rejected)', output)
+        errors = self.read_errors(path)
+        self.assertEqual(
+            [(row['line'], row['field']) for row in errors],
+            [('1', 'name'), ('2', 'website'), ('3', 'social_links'), ('4', '__all__')],
+        )
+        self.assertEqual(list(FoodTruck.objects.values_list('name', flat=True)), ['Good'])
+
+    def test_external_id_upserts_existing_truck(self):
+        """Test that re-importing an external_id updates the row in place."""
+        truck = FoodTruck.objects.create(
+            external_id='u1', name='Old Name', city='Cary', cuisine='BBQ'
+        )
+        path = self.write_ndjson([
+            {'external_id': 'u1', 'name': 'New Name', 'city': 'Apex', 'cuisine': 'Pizza'},
+        ])
+        self.import_file(path)
+        truck.refresh_from_db()
+        self.assertEqual((truck.name, truck.city, truck.cuisine), ('New Name', 'Apex', 'Pizza'))
+        self.assertEqual(FoodTruck.objects.count(), 1)
+
+    def test_imported_trucks_are_searchable(self):
+        """Test that bulk-written trucks are added to the search index."""
+        path = self.write_ndjson([
+            {'external_id': 's1', 'name': 'Dumpling Dynasty', 'city': 'Cary', 'cuisine': 'Chinese'},
+        ])
+        self.import_file(path)
+        self.assertEqual(
+            [truck.external_id for truck in search_trucks('dumpling')], ['s1']
+        )
+
+    def test_defer_refresh_indexes_once_after_import(self):
+        """Test that --defer-refresh leaves the trucks searchable and deduplicated."""
+        path = self.write_ndjson([
+            {'external_id': f'd{i}', 'name': f'Dumpling Dynasty {i}', 'city': 'Cary',
+             'cuisine': 'Chinese'}
+            for i in range(3)
+        ])
+        self.import_file(path, defer_refresh=True, batch_size=1)
+        self.assertEqual(
+            sorted(truck.external_id for truck in search_trucks('dumpling')), ['d0', 'd1', 'd2']
+        )
+        self.assertEqual(
+            {match.truck_id for match in find_duplicates('Dumpling Dynasty 1')},
+            set(FoodTruck.objects.values_list('pk', flat=True)),
+        )
+
+    def test_dry_run_writes_nothing(self):
+        """Test that --dry-run validates without creating trucks."""
+        path = self.write_ndjson([{'name': 'Ghost', 'city': 'Cary', 'cuisine': 'BBQ'}])
+        output = self.import_file(path, dry_run=True)
+        self.assertIn('Validated 1 of 1 rows', output)
+        self.assertFalse(FoodTruck.objects.exists())
+
+    def test_resumes_from_checkpoint(self):
+        """Test that an interrupted import skips lines already committed."""
+        path = self.write_ndjson([
+            {'external_id': f'r{i}', 'name': f'Truck {i}', 'city': 'Cary', 'cuisine': 'BBQ'}
+            for i in range(1, 6)
+        ])
+        checkpoint = Checkpoint(path + '.checkpoint.json')
+
+        class Interrupted(Exception):
+            pass
+
+        def failing_records():
+            with open(path) as stream:
+                for line_number, record in iter_records(stream, 'ndjson'):
+                    if line_number == 4:
+                        raise Interrupted
+                    yield line_number, record
+
+        importer = TruckImporter(batch_size=2, checkpoint=checkpoint,
+                                 source=os.path.abspath(path))
+        with self.assertRaises(Interrupted):
+            importer.run(failing_records())
+        self.assertEqual(FoodTruck.objects.count(), 2)
+        self.assertEqual(checkpoint.load(os.path.abspath(path)), 2)
+
+        output = self.import_file(path, batch_size=2)
+        self.assertIn('skipped 2 rows', output)
+        self.assertIn('Imported 3 of 3 rows', output)
+        self.assertEqual(FoodTruck.objects.count(), 5)
+        self.assertFalse(os.path.exists(checkpoint.path))
+
+    def test_dry_run_ignores_checkpoint(self):
+        """Test that --dry-run validates every line and leaves the checkpoint as it was."""
+        path = self.write_ndjson([
+            {'external_id': f'd{i}', 'name': f'Truck {i}', 'city': 'Cary', 'cuisine': 'BBQ'}
+            for i in range(1, 4)
+        ])
+        checkpoint = Checkpoint(path + '.checkpoint.json')
+        source = os.path.abspath(path)
+        checkpoint.save(source, ImportStats(last_line=2))
+        output = self.import_file(path, dry_run=True, batch_size=1)
+        self.assertIn('Validated 3 of 3 rows', output)
+        self.assertNotIn('skipped', output)
+        self.assertEqual(checkpoint.load(source), 2)
+
+        self.import_file(path, dry_run=True, restart=True)
+        self.assertEqual(checkpoint.load(source), 2)
+        os.remove(checkpoint.path)
+        self.import_file(path, dry_run=True)
+        self.assertFalse(os.path.exists(checkpoint.path))
+        self.assertFalse(FoodTruck.objects.exists())
+
+    def test_clean_record_rejects_bad_coordinates(self):
+        """Test that coordinates outside their valid range are rejected."""
+        with self.assertRaises(ValidationError) as raised:
+            clean_record({'name': 'N', 'city': 'C', 'cuisine': 'X', 'latitude': '123'})
+        self.assertIn('latitude', raised.exception.message_dict)
@@ -0,0 +1,199 @@
+import sys
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .linkcheck import check_links, interleave_by_host
+from .models import FoodTruck, LinkCheck
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Canned answers for the link checker, counting what it was asked."""
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, status, body=b'', **headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name.replace('_', '-'), value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get('If-None-Match')))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            self.answer()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def answer(self):
+        path = self.path.split('?')[0]
+        if path == '/ok':
+            if self.headers.get('If-None-Match') == '"v1"':
+                self.send(304, ETag='"v1"')
+            else:
+                self.send(200, b'<h1>Tacos</h1>', ETag='"v1"')
+        elif path == '/moved':
+            self.send(301, Location='/ok')
+        elif path == '/loop':
+            self.send(302, Location='/loop')
+        elif path == '/forbidden':
+            self.send(403, b'no bots')
+        elif path == '/slow':
+            time.sleep(1)
+            self.send(200, b'late')
+        elif path == '/busy':
+            time.sleep(0.05)
+            self.send(200, b'done')
+        elif path == '/chunked':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            self.wfile.write(b'5\r\nhello\r\n0\r\n\r\n')
+        else:
+            self.send(404, b'gone')
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # The checker hangs up on slow answers by design; the write that
+        # then fails is expected, anything else still gets reported.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class LinkCheckTest(TestCase):
+    """Test cases for check_links against a local stub server."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StubServer(('127.0.0.1', 0), StubHandler)
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.connections = 0
+        self.server.in_flight = self.server.max_in_flight = 0
+
+    def truck(self, name, website=None, **social_links):
+        return FoodTruck.objects.create(name=name, city='Raleigh', cuisine='BBQ',
+                                        website=website, social_links=social_links or None)
+
+    def result(self, truck, path):
+        return LinkCheck.objects.get(truck=truck, url=self.base + path)
+
+    def test_results_stored_per_truck(self):
+        """Test that each truck link gets a row with its outcome and validators."""
+        joes = self.truck('Smokin Joes', self.base + '/ok',
+                          instagram=self.base + '/missing', facebook=self.base + '/moved')
+        bus = self.truck('Taco Bus', self.base + '/forbidden', site=self.base + '/chunked',
+                         myspace='ftp://example.com/')
+        summary = check_links(timeout=2)
+        self.assertEqual(summary['urls'], 6)
+
+        ok = self.result(joes, '/ok')
+        self.assertEqual((ok.source, ok.outcome, ok.status_code, ok.etag),
+                         ('website', 'ok', 200, '"v1"'))
+        self.assertEqual(self.result(joes, '/missing').outcome, LinkCheck.BROKEN)
+        self.assertIsNotNone(self.result(joes, '/missing').failing_since)
+        moved = self.result(joes, '/moved')
+        self.assertEqual((moved.outcome, moved.final_url), ('ok', self.base + '/ok'))
+        self.assertEqual(self.result(bus, '/forbidden').outcome, LinkCheck.BLOCKED)
+        self.assertEqual(self.result(bus, '/chunked').outcome, LinkCheck.OK)
+        ftp = LinkCheck.objects.get(truck=bus, source='myspace')
+        self.assertEqual(ftp.outcome, LinkCheck.ERROR)
+        self.assertIn('Not an http(s) URL', ftp.error)
+
+    def test_reruns_are_conditional(self):
+        """Test that a rerun sends the stored ETag and records the 304 as OK."""
+        truck = self.truck('Smokin Joes', self.base + '/ok', instagram=self.base + '/missing')
+        check_links(timeout=2)
+        first_failure = self.result(truck, '/missing').failing_since
+        self.server.requests = []
+        check_links(timeout=2)
+        self.assertIn(('/ok', '"v1"'), self.server.requests)
+        ok = self.result(truck, '/ok')
+        self.assertEqual((ok.outcome, ok.status_code, ok.etag), ('ok', 304, '"v1"'))
+        self.assertEqual(self.result(truck, '/missing').failing_since, first_failure)
+
+    def test_host_limit_and_connection_reuse(self):
+        """Test that per-host concurrency is capped and connections are kept alive."""
+        for i in range(12):
+            self.truck(f'Truck {i}', f'{self.base}/busy?truck={i}')
+        summary = check_links(concurrency=10, per_host=2, timeout=2)
+        self.assertEqual(summary['ok'], 12)
+        self.assertLessEqual(self.server.max_in_flight, 2)
+        self.assertLessEqual(self.server.connections, 2)
+        self.assertEqual(summary['connections'], self.server.connections)
+
+    def test_timeouts_and_redirect_loops(self):
+        """Test that slow hosts and redirect loops are errors, not hangs."""
+        truck = self.truck('Smokin Joes', self.base + '/slow', twitter=self.base + '/loop')
+        check_links(timeout=0.2)
+        self.assertEqual(self.result(truck, '/slow').error, 'Timed out')
+        self.assertIn('Too many redirects', self.result(truck, '/loop').error)
+
+    def test_shared_and_removed_links(self):
+        """Test that shared URLs are fetched once and dropped links lose their rows."""
+        joes = self.truck('Smokin Joes', self.base + '/ok', instagram=self.base + '/missing')
+        bus = self.truck('Taco Bus', self.base + '/ok')
+        check_links(timeout=2)
+        self.assertEqual([path for path, _ in self.server.requests].count('/ok'), 1)
+        self.assertEqual(LinkCheck.objects.filter(url=self.base + '/ok').count(), 2)
+
+        joes.social_links = None
+        joes.save()
+        check_links(truck_ids=[joes.pk], timeout=2)
+        self.assertFalse(LinkCheck.objects.filter(truck=joes, source='instagram').exists())
+        self.assertTrue(LinkCheck.objects.filter(truck=bus).exists())
+
+    def test_command_skips_recent_checks(self):
+        """Test that --recheck-after leaves recently checked links alone."""
+        self.truck('Smokin Joes', self.base + '/ok')
+        out = StringIO()
+        call_command('check_links', '--timeout', '2', stdout=out)
+        self.assertIn('Checked 1 URLs (1 ok', out.getvalue())
+        self.server.requests = []
+        call_command('check_links', '--recheck-after', '1', stdout=out)
+        self.assertEqual(self.server.requests, [])
+        self.assertIn('skipped 1', out.getvalue())
+        LinkCheck.objects.update(checked_at=LinkCheck.objects.get().checked_at - timedelta(hours=2))
+        call_command('check_links', '--recheck-after', '1', stdout=out)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_interleave_by_host(self):
+        """Test that URLs are queued round-robin across hosts."""
+        urls = ['https://a.com/1', 'https://a.com/2', 'https://a.com/3', 'https://b.com/1']
+        self.assertEqual(list(interleave_by_host(urls)),
+                         ['https://a.com/1', 'https://b.com/1', 'https://a.com/2',
+                          'https://a.com/3'])
@@ -0,0 +1,241 @@
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import (
+    CustomUser, FoodTruck, FoodTruckOwnerProfile, Notification, NotificationEvent,
+    WebsiteUserProfile,
+)
+from .notifications import (
+    LEASE, MAX_ATTEMPTS, RateLimiter, claim_event, claim_notifications, deliver_batch, fan_out_batch,
+    fan_out_event, run_worker,
+)
+
+
+def make_user(username, city='Raleigh', favorites='', opted_in=True, email=None, active=True):
+    user = CustomUser.objects.create(
+        username=username, email=f'{username}@example.com' if email is None else email,
+        is_active=active,
+    )
+    WebsiteUserProfile.objects.create(
+        user=user, home_city=city, favorite_cuisine_types=favorites,
+        notification_preferences=opted_in,
+    )
+    return user
+
+
+class EnqueueTest(TestCase):
+    """Test cases for recording notification events."""
+
+    def test_new_truck_enqueues_once(self):
+        """Test that creating a truck enqueues one event, however often it is saved."""
+        truck = FoodTruck.objects.create(name='Taco Bus', city='Raleigh', cuisine='Mexican')
+        truck.description = 'Tacos'
+        truck.save()
+        events = NotificationEvent.objects.all()
+        self.assertEqual([(e.kind, e.truck_id) for e in events], [('new_truck', truck.pk)])
+        self.assertEqual(events[0].idempotency_key, f'new_truck:{truck.pk}')
+
+    def test_trucks_without_city_and_bulk_writes_are_ignored(self):
+        """Test that cityless trucks and bulk-created trucks queue nothing."""
+        FoodTruck.objects.create(name='Nowhere', city='')
+        FoodTruck.objects.bulk_create([FoodTruck(name='Imported', city='Durham')])
+        self.assertFalse(NotificationEvent.objects.exists())
+
+    def test_owner_verification_enqueues_for_their_trucks(self):
+        """Test that verifying an owner queues a verified event per truck."""
+        owner = FoodTruckOwnerProfile.objects.create(
+            user=CustomUser.objects.create(username='owner'), business_name='Biz'
+        )
+        first = FoodTruck.objects.create(name='One', city='Raleigh', owner=owner)
+        second = FoodTruck.objects.create(name='Two', city='Durham', owner=owner)
+        owner.is_verified = True
+        owner.save()
+        owner.save()
+        verified = NotificationEvent.objects.filter(kind=NotificationEvent.TRUCK_VERIFIED)
+        self.assertEqual(
+            sorted(verified.values_list('truck_id', flat=True)), [first.pk, second.pk]
+        )
+
+    def test_truck_joining_verified_owner(self):
+        """Test that a truck moved to a verified owner queues a verified event."""
+        owner = FoodTruckOwnerProfile.objects.create(
+            user=CustomUser.objects.create(username='owner'), business_name='Biz',
+            is_verified=True,
+        )
+        truck = FoodTruck.objects.create(name='Stray', city='Raleigh')
+        truck.owner = owner
+        truck.save()
+        self.assertTrue(
+            NotificationEvent.objects.filter(kind='truck_verified', truck=truck).exists()
+        )
+
+
+class FanOutTest(TestCase):
+    """Test cases for turning events into per-user notifications."""
+
+    def setUp(self):
+        """Create users with a spread of cities, cuisines and opt-ins."""
+        self.anything = make_user('anything')
+        self.bbq = make_user('bbq', favorites='BBQ, soul food')
+        self.mexican = make_user('mexican', favorites='Mexican')
+        self.upper = make_user('upper', city='RALEIGH', favorites='bbq')
+        make_user('durham', city='Durham')
+        make_user('opted_out', opted_in=False)
+        make_user('no_email', email='')
+        make_user('inactive', active=False)
+        self.truck = FoodTruck.objects.create(name='Smoke', city='Raleigh', cuisine='BBQ')
+
+    def test_audience(self):
+        """Test that only opted-in, reachable users in the city who like the cuisine match."""
+        event, lease = claim_event()
+        fan_out_event(event, lease)
+        recipients = set(Notification.objects.values_list('user_id', flat=True))
+        self.assertEqual(recipients, {self.anything.pk, self.bbq.pk, self.upper.pk})
+        event.refresh_from_db()
+        self.assertIsNotNone(event.fanned_out_at)
+        self.assertIsNone(claim_event()[0])
+
+    def test_batches_resume_from_cursor(self):
+        """Test that fan-out walks users in batches and a new lease picks up after the cursor."""
+        event, lease = claim_event()
+        queued, lease = fan_out_batch(event, lease, batch_size=2)
+        self.assertEqual(queued, 2)
+        self.assertEqual(event.fanout_cursor, self.bbq.pk)
+        # The worker dies; once its lease lapses another takes over.
+        self.assertIsNone(claim_event()[0])
+        NotificationEvent.objects.update(leased_until=timezone.now() - timedelta(seconds=1))
+        event, lease = claim_event()
+        self.assertEqual(event.fanout_cursor, self.bbq.pk)
+        fan_out_event(event, lease, batch_size=2)
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_stale_lease_is_refused(self):
+        """Test that a worker whose lease was taken over writes nothing."""
+        event, lease = claim_event()
+        NotificationEvent.objects.update(leased_until=timezone.now() - timedelta(seconds=1))
+        claim_event()
+        self.assertEqual(fan_out_batch(event, lease), (0, None))
+        self.assertFalse(Notification.objects.exists())
+
+
+class DeliveryTest(TestCase):
+    """Test cases for claiming and emailing notifications."""
+
+    def setUp(self):
+        """Fan one new-truck event out to two users."""
+        self.first = make_user('first')
+        self.second = make_user('second')
+        FoodTruck.objects.create(
+            name='Taco Bus', city='Raleigh', cuisine='Mexican', description='Street tacos'
+        )
+        fan_out_event(*claim_event())
+
+    def test_sends_each_notification_once(self):
+        """Test that emails go out through the email backend and are marked sent."""
+        self.assertEqual(deliver_batch(), (2, 0, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ['first@example.com'])
+        self.assertIn('Taco Bus', message.subject)
+        self.assertIn('Street tacos', message.body)
+        self.assertIn('/trucks/raleigh/', message.body)
+        notification = Notification.objects.get(user=self.first)
+        self.assertEqual(message.extra_headers['Message-ID'],
+                         f'<notification-{notification.pk}@localhost>')
+        self.assertEqual(notification.status, Notification.SENT)
+        self.assertEqual(deliver_batch(), (0, 0, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_users_who_opted_out_are_skipped(self):
+        """Test that opting out after the fan-out stops the email."""
+        WebsiteUserProfile.objects.filter(user=self.second).update(notification_preferences=False)
+        self.assertEqual(deliver_batch(), (1, 1, 0))
+        self.assertEqual(Notification.objects.get(user=self.second).status, Notification.SKIPPED)
+
+    def test_claims_do_not_overlap(self):
+        """Test that concurrent claims split rows, and expired leases are reclaimed."""
+        first = claim_notifications(batch_size=1)
+        second = claim_notifications(batch_size=5)
+        self.assertEqual(Notification.objects.filter(claim_token=first).count(), 1)
+        self.assertEqual(Notification.objects.filter(claim_token=second).count(), 1)
+        self.assertEqual(deliver_batch(), (0, 0, 0))
+        # Both workers die; their rows come back after the lease.
+        Notification.objects.update(available_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(deliver_batch(), (2, 0, 0))
+        self.assertEqual(set(Notification.objects.values_list('attempts', flat=True)), {2})
+
+    def test_slow_batch_keeps_its_lease(self):
+        """Test that a batch sent slower than the lease renews its claim as it goes."""
+        now = [timezone.now()]
+        expired = []
+
+        class SlowLimiter:
+            def wait(self):
+                due = Notification.objects.filter(status=Notification.SENDING,
+                                                  available_at__lte=now[0])
+                expired.append(due.exists())
+                now[0] += LEASE * 1.1
+
+        with mock.patch('django.utils.timezone.now', lambda: now[0]):
+            self.assertEqual(deliver_batch(limiter=SlowLimiter()), (2, 0, 0))
+        self.assertEqual(expired, [False, False])
+
+    def test_failures_back_off_then_give_up(self):
+        """Test that failed sends are retried later and eventually marked failed."""
+        with mock.patch('directory.notifications.EmailMessage.send',
+                        side_effect=SMTPException('mailbox unavailable')):
+            self.assertEqual(deliver_batch(), (0, 0, 2))
+            notification = Notification.objects.get(user=self.first)
+            self.assertEqual(notification.status, Notification.PENDING)
+            self.assertGreater(notification.available_at, timezone.now())
+            self.assertIn('mailbox unavailable', notification.last_error)
+            for _ in range(MAX_ATTEMPTS - 1):
+                Notification.objects.update(available_at=timezone.now())
+                deliver_batch()
+        self.assertEqual(
+            set(Notification.objects.values_list('status', flat=True)), {Notification.FAILED}
+        )
+        self.assertEqual(mail.outbox, [])
+
+    def test_worker_command(self):
+        """Test that send_notifications --once drains the queue."""
+        FoodTruck.objects.create(name='Second Truck', city='Raleigh', cuisine='Thai')
+        out = StringIO()
+        call_command('send_notifications', '--once', '--rate', '0', stdout=out)
+        self.assertIn('sent 4', out.getvalue())
+        self.assertEqual(len(mail.outbox), 4)
+
+
+class RateLimiterTest(TestCase):
+    """Test cases for the token bucket."""
+
+    def test_waits_once_burst_is_spent(self):
+        """Test that the limiter sleeps just long enough to hold the rate."""
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        limiter = RateLimiter(2, burst=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            limiter.wait()
+        self.assertEqual(sleeps, [0.5, 0.5])
+        now[0] += 10
+        limiter.wait()
+        self.assertEqual(len(sleeps), 2)
+
+    def test_run_worker_totals(self):
+        """Test that run_worker returns when there is nothing to do."""
+        self.assertEqual(
+            run_worker(once=True, rate=0),
+            {'queued': 0, 'sent': 0, 'skipped': 0, 'failed': 0},
+        )
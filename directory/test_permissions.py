@@ -0,0 +1,175 @@
+from django.contrib.auth.models import AnonymousUser, Group, Permission
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import tasks  # noqa: F401  (registers truck_pages.refresh)
+from .auth import CachedModelBackend
+from .models import CustomUser, FoodTruck, FoodTruckOwnerProfile
+from .permissions import role_required
+
+AUTH_TABLES = ('directory_customuser', 'auth_', 'django_content_type')
+
+
+class PermissionResolutionTest(TestCase):
+    """Test cases for role and ownership permissions on cached users."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create two owners with a truck each, an eater and a site admin."""
+        cls.owner = CustomUser.objects.create(username='owner', role='food_truck_owner')
+        cls.profile = FoodTruckOwnerProfile.objects.create(user=cls.owner, business_name='Oak')
+        cls.truck = FoodTruck.objects.create(name='Smokin Joes', city='Raleigh', cuisine='BBQ',
+                                             owner=cls.profile)
+        rival = CustomUser.objects.create(username='rival', role='food_truck_owner')
+        cls.rival_profile = FoodTruckOwnerProfile.objects.create(user=rival, business_name='Elm')
+        cls.rival_truck = FoodTruck.objects.create(name='Taco Bus', city='Durham',
+                                                   cuisine='Mexican', owner=cls.rival_profile)
+        cls.eater = CustomUser.objects.create(username='eater')
+        cls.moderator = CustomUser.objects.create(username='moderator', role='admin')
+
+    def setUp(self):
+        cache.clear()
+        self.backend = CachedModelBackend()
+
+    def load(self, user):
+        """The user as a request sees them: through the backend, cache warm."""
+        self.backend.get_user(user.pk)
+        return self.backend.get_user(user.pk)
+
+    def test_role_permissions(self):
+        """Test that each role gets its fixed permissions and no others."""
+        eater, moderator = self.load(self.eater), self.load(self.moderator)
+        self.assertTrue(eater.has_perm('directory.add_trucksubmission'))
+        self.assertFalse(eater.has_perm('directory.change_foodtruck'))
+        self.assertFalse(eater.has_perm('directory.change_foodtruck', self.truck))
+        self.assertTrue(moderator.has_perm('directory.change_trucksubmission'))
+        self.assertTrue(moderator.has_perm('directory.change_foodtruck', self.rival_truck))
+        self.assertFalse(AnonymousUser().has_perm('directory.add_trucksubmission'))
+
+    def test_owners_change_only_their_own(self):
+        """Test that an owner may change their own truck and profile only."""
+        owner = self.load(self.owner)
+        self.assertFalse(owner.has_perm('directory.change_foodtruck'))
+        self.assertTrue(owner.has_perm('directory.change_foodtruck', self.truck))
+        self.assertFalse(owner.has_perm('directory.change_foodtruck', self.rival_truck))
+        self.assertTrue(owner.has_perm('directory.change_foodtruckownerprofile', self.profile))
+        self.assertFalse(owner.has_perm('directory.change_foodtruckownerprofile',
+                                        self.rival_profile))
+        self.assertFalse(owner.has_perm('directory.delete_foodtruck', self.truck))
+
+    def test_checks_make_no_queries(self):
+        """Test that role, admin-granted and object checks are answered from the cache."""
+        self.owner.user_permissions.add(Permission.objects.get(codename='view_dietarytag'))
+        owner = self.load(self.owner)
+        with self.assertNumQueries(0):
+            self.assertTrue(owner.has_perm('directory.view_dietarytag'))
+            self.assertTrue(owner.has_perm('directory.add_trucksubmission'))
+            self.assertTrue(owner.has_perm('directory.change_foodtruck', self.truck))
+            self.assertTrue(owner.has_module_perms('directory'))
+
+    def test_role_change_invalidates(self):
+        """Test that saving a new role changes the cached permissions."""
+        self.assertFalse(self.load(self.eater).has_perm('directory.change_foodtruck'))
+        self.eater.role = 'admin'
+        self.eater.save()
+        self.assertTrue(self.load(self.eater).has_perm('directory.change_foodtruck'))
+
+    def test_group_grants_invalidate(self):
+        """Test that group membership and group permission changes reach cached users."""
+        group = Group.objects.create(name='Tag editors')
+        self.assertFalse(self.load(self.eater).has_perm('directory.change_dietarytag'))
+        self.eater.groups.add(group)
+        group.permissions.add(Permission.objects.get(codename='change_dietarytag'))
+        self.assertTrue(self.load(self.eater).has_perm('directory.change_dietarytag'))
+        group.delete()
+        self.assertFalse(self.load(self.eater).has_perm('directory.change_dietarytag'))
+
+    def test_role_required(self):
+        """Test that role_required admits listed roles and turns others away."""
+        view = role_required('food_truck_owner')(lambda request: HttpResponse('ok'))
+        request = RequestFactory().get('/owners/')
+        request.user = self.load(self.owner)
+        self.assertEqual(view(request).status_code, 200)
+        request.user = self.load(self.eater)
+        with self.assertRaises(PermissionDenied):
+            view(request)
+        request.user = AnonymousUser()
+        self.assertEqual(view(request).status_code, 302)
+
+
+class OwnerEditViewsTest(TestCase):
+    """Test cases for the truck and business profile edit pages."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create an owner with a truck, and a truck nobody owns."""
+        cls.owner = CustomUser.objects.create(username='owner', role='food_truck_owner')
+        cls.profile = FoodTruckOwnerProfile.objects.create(user=cls.owner, business_name='Oak')
+        cls.truck = FoodTruck.objects.create(name='Smokin Joes', city='Raleigh', cuisine='BBQ',
+                                             owner=cls.profile)
+        cls.other = FoodTruck.objects.create(name='Taco Bus', city='Durham', cuisine='Mexican')
+
+    def setUp(self):
+        cache.clear()
+
+    def truck_data(self, **overrides):
+        data = {'name': 'Smokin Joes BBQ', 'city': 'Raleigh', 'cuisine': 'BBQ',
+                'description': 'Brisket', 'website': '', 'latitude': '', 'longitude': ''}
+        data.update(overrides)
+        return data
+
+    def test_owner_edits_own_truck(self):
+        """Test that an owner can edit their truck and not anyone else's."""
+        self.client.force_login(self.owner)
+        response = self.client.post(reverse('truck_edit', args=[self.truck.pk]), self.truck_data())
+        self.assertRedirects(response, reverse('truck_detail', args=[self.truck.pk]),
+                             fetch_redirect_response=False)
+        self.truck.refresh_from_db()
+        self.assertEqual(self.truck.name, 'Smokin Joes BBQ')
+        self.assertEqual(self.truck.owner, self.profile)
+
+        response = self.client.post(reverse('truck_edit', args=[self.other.pk]),
+                                    self.truck_data(name='Mine Now'))
+        self.assertEqual(response.status_code, 403)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.name, 'Taco Bus')
+
+    def test_edit_pages_need_the_permission(self):
+        """Test that anonymous visitors sign in first and other users get a 403."""
+        url = reverse('truck_edit', args=[self.truck.pk])
+        self.assertRedirects(self.client.get(url), reverse('login') + '?next=' + url)
+        self.client.force_login(CustomUser.objects.create(username='eater'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        profile_url = reverse('owner_profile_edit', args=[self.profile.pk])
+        self.assertEqual(self.client.get(profile_url).status_code, 403)
+        self.client.force_login(CustomUser.objects.create(username='moderator', role='admin'))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_owner_edits_business_profile(self):
+        """Test that the profile page links an owner's trucks and business profile edits."""
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('profile'))
+        self.assertContains(response, reverse('truck_edit', args=[self.truck.pk]))
+        self.assertNotContains(response, reverse('truck_edit', args=[self.other.pk]))
+        response = self.client.post(reverse('owner_profile_edit', args=[self.profile.pk]),
+                                    {'business_name': 'Oak City Eats'})
+        self.assertRedirects(response, reverse('profile'))
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.business_name, 'Oak City Eats')
+        self.assertFalse(self.profile.is_verified)
+
+    def test_authorization_adds_no_queries(self):
+        """Test that a warm signed-in edit page reads no user, permission or session rows."""
+        self.client.force_login(self.owner)
+        url = reverse('truck_edit', args=[self.truck.pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        tables = AUTH_TABLES + ('django_session',)
+        self.assertEqual([query['sql'] for query in queries
+                          if any(table in query['sql'] for table in tables)], [])
@@ -0,0 +1,115 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .models import CustomUser, FoodTruck, FoodTruckOwnerProfile
+from .profiling import RequestSample, samples, sql_shape, summarize
+
+
+@override_settings(DIRECTORY_PROFILING_ENABLED=True, DIRECTORY_PROFILING_SAMPLE_RATE=1.0,
+                   DIRECTORY_PROFILING_N_PLUS_ONE_THRESHOLD=3)
+class ProfilingMiddlewareTest(TestCase):
+    """Test cases for the request profiling middleware and dashboard."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a staff user and a couple of trucks."""
+        cls.staff = CustomUser.objects.create_user(
+            username='staff', password='pw', is_staff=True
+        )
+        FoodTruck.objects.create(name='Oak City Tacos', city='Raleigh', cuisine='Mexican')
+        FoodTruck.objects.create(name='Smoke Stack', city='Raleigh', cuisine='BBQ')
+
+    def setUp(self):
+        samples.clear()
+
+    def test_records_queries_templates_and_latency(self):
+        """Test that a sampled request records its costs under the view name."""
+        self.client.get(reverse('search'), {'q': 'tacos'})
+        [sample] = samples.snapshot()
+        self.assertEqual(sample.view, 'search')
+        self.assertEqual(sample.status, 200)
+        self.assertGreater(sample.queries, 0)
+        self.assertGreater(sample.template_ms, 0)
+        self.assertGreaterEqual(sample.total_ms, sample.db_ms)
+
+    async def test_records_async_views(self):
+        """Test that async views are measured, queries from the async ORM included."""
+        response = await self.async_client.get(reverse('async_search'), {'q': 'tacos'})
+        self.assertEqual(response.status_code, 200)
+        [sample] = samples.snapshot()
+        self.assertEqual(sample.view, 'async_search')
+        self.assertGreater(sample.queries, 0)
+        self.assertGreater(sample.template_ms, 0)
+
+    @override_settings(DIRECTORY_PROFILING_SAMPLE_RATE=0.0)
+    def test_sample_rate_zero_records_nothing(self):
+        """Test that unsampled requests are not recorded."""
+        self.client.get(reverse('search'), {'q': 'tacos'})
+        self.assertEqual(samples.snapshot(), [])
+
+    @override_settings(DIRECTORY_PROFILING_BUFFER_SIZE=2)
+    def test_buffer_is_bounded(self):
+        """Test that the ring buffer keeps only the newest samples."""
+        for query in ('a', 'b', 'c'):
+            self.client.get(reverse('search'), {'q': query})
+        self.assertEqual(len(samples.snapshot()), 2)
+
+    def test_flags_repeated_query_shapes(self):
+        """Test that a query repeated per row is reported as a possible N+1."""
+        owners = []
+        for i in range(4):
+            user = CustomUser.objects.create_user(username=f'owner{i}')
+            owners.append(FoodTruckOwnerProfile.objects.create(user=user, business_name=f'B{i}'))
+        sample = RequestSample(view='test', method='GET', path='/')
+        with connection.execute_wrapper(sample):
+            for owner in FoodTruckOwnerProfile.objects.all():
+                owner.user.username
+        sample.finish(threshold=3)
+        self.assertEqual(len(sample.repeated), 1)
+        self.assertEqual(sample.repeated[0]['count'], 4)
+        self.assertIn('directory_customuser', sample.repeated[0]['sql'])
+
+    def test_json_endpoint_is_staff_only(self):
+        """Test that the JSON summary needs a staff login."""
+        self.client.get(reverse('search'), {'q': 'tacos'})
+        self.assertEqual(self.client.get(reverse('profiling_data')).status_code, 403)
+        self.client.force_login(self.staff)
+        data = self.client.get(reverse('profiling_data')).json()
+        views = {entry['view']: entry for entry in data['views']}
+        self.assertEqual(views['search']['requests'], 1)
+        self.assertNotIn('profiling_data', views)
+
+    def test_dashboard_renders_for_staff(self):
+        """Test that the dashboard lists recorded views."""
+        self.client.get(reverse('search'), {'q': 'tacos'})
+        response = self.client.get(reverse('profiling_dashboard'))
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('profiling_dashboard'))
+        self.assertContains(response, '<code>search</code>', html=True)
+
+
+class ProfilingHelpersTest(TestCase):
+    """Test cases for SQL shapes and summaries."""
+
+    def test_sql_shape_collapses_parameters(self):
+        """Test that literals and IN lists do not change a query's shape."""
+        self.assertEqual(
+            sql_shape('SELECT * FROM t WHERE id IN (%s, %s, %s) AND n = 5'),
+            sql_shape("SELECT * FROM t WHERE id IN (%s) AND n = 7"),
+        )
+        self.assertEqual(sql_shape("WHERE name = 'x'"), 'WHERE name = ?')
+
+    def test_summarize_percentiles(self):
+        """Test that the summary reports per-view percentiles, slowest first."""
+        recorded = [RequestSample(view='fast', method='GET', path='/', total_ms=1)]
+        recorded += [
+            RequestSample(view='slow', method='GET', path='/', total_ms=ms, queries=2)
+            for ms in range(1, 101)
+        ]
+        summary = summarize(recorded)
+        self.assertEqual([entry['view'] for entry in summary], ['slow', 'fast'])
+        self.assertEqual(summary[0]['p50_ms'], 50)
+        self.assertEqual(summary[0]['p99_ms'], 99)
+        self.assertEqual(summary[0]['queries_mean'], 2)
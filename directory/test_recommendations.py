@@ -0,0 +1,139 @@
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .models import (
+    CustomUser, DietaryTag, FoodTruck, UserRecommendations, WebsiteUserProfile,
+)
+from .recommendations import (
+    Vocabulary, compute_recommendations, recommended_trucks, split_terms, top_n,
+)
+
+RALEIGH = (35.7796, -78.6382)
+DURHAM = (35.9940, -78.8986)
+
+
+class PreferenceParsingTest(TestCase):
+    """Test cases for turning free-text preferences into vectors."""
+
+    def setUp(self):
+        """Build a vocabulary with a few cuisines and tags."""
+        self.vocabulary = Vocabulary(
+            ['Asian Fusion', 'BBQ', 'Mexican', 'Soul Food', 'Vegan'],
+            [(1, 'vegan', 'Vegan'), (2, 'gluten-free', 'Gluten-free'), (3, 'halal', 'Halal')],
+        )
+
+    def test_split_terms(self):
+        """Test that separators, case and filler words are normalized."""
+        self.assertEqual(
+            split_terms('Mexican food, BBQ and soul-food; Mexican'),
+            ['mexican', 'bbq', 'soul'],
+        )
+        self.assertEqual(split_terms(None), [])
+
+    def test_cuisine_matching(self):
+        """Test that terms match whole cuisines or their words."""
+        cuisines = self.vocabulary.cuisines
+        matched = self.vocabulary.cuisine_indices('asian, Soul Food, sushi')
+        self.assertEqual([cuisines[i] for i in matched], ['Asian Fusion', 'Soul Food'])
+
+    def test_dietary_synonyms(self):
+        """Test that common phrasings map onto the tag vocabulary."""
+        self.assertEqual(self.vocabulary.tag_indices('plant-based, celiac'), [0, 1])
+        self.assertEqual(self.vocabulary.tag_indices('no preference'), [])
+        # The "Vegan" cuisine implies the vegan tag.
+        self.assertEqual(self.vocabulary.cuisine_tags, [None, None, None, None, 0])
+
+    def test_top_n(self):
+        """Test that rows keep their best entries in descending order."""
+        scores = np.array([[0.1, 0.9, 0.5, 0.7], [0.3, 0.2, 0.8, 0.1]], dtype=np.float32)
+        best, best_scores = top_n(scores, 2)
+        self.assertEqual(best.tolist(), [[1, 3], [2, 0]])
+        self.assertTrue(np.allclose(best_scores, [[0.9, 0.7], [0.8, 0.3]]))
+        best, _ = top_n(scores, 10)
+        self.assertEqual(best.tolist(), [[1, 3, 2, 0], [2, 0, 1, 3]])
+
+
+class RecommendationJobTest(TestCase):
+    """Test cases for the batch job and stored recommendations."""
+
+    def setUp(self):
+        """Create trucks in two cities and one website user."""
+        self.vegan = DietaryTag.objects.create(slug='vegan-rec', name='Vegan Rec')
+        self.durham_bbq = FoodTruck.objects.create(
+            name='Durham Smoke', city='Durham', cuisine='BBQ',
+            latitude=DURHAM[0], longitude=DURHAM[1],
+        )
+        self.raleigh_bbq = FoodTruck.objects.create(
+            name='Raleigh Smoke', city='Raleigh', cuisine='BBQ',
+            latitude=RALEIGH[0], longitude=RALEIGH[1],
+        )
+        self.raleigh_bowls = FoodTruck.objects.create(
+            name='Raleigh Bowls', city='Raleigh', cuisine='Thai',
+            latitude=RALEIGH[0], longitude=RALEIGH[1],
+        )
+        self.raleigh_bowls.dietary_tags.add(self.vegan)
+        self.far_tacos = FoodTruck.objects.create(
+            name='Coast Tacos', city='Wilmington', cuisine='Mexican',
+            latitude=34.2257, longitude=-77.9447,
+        )
+        self.user = CustomUser.objects.create_user(username='eater', password='pw12345!')
+        self.profile = WebsiteUserProfile.objects.create(
+            user=self.user, favorite_cuisine_types='bbq', home_city='Raleigh',
+        )
+
+    def stored(self, user=None):
+        return UserRecommendations.objects.get(user=user or self.user).truck_ids
+
+    def test_ranks_cuisine_then_proximity(self):
+        """Test that favorite cuisine wins and nearer trucks break ties."""
+        self.assertEqual(compute_recommendations(), (1, 0))
+        self.assertEqual(self.stored()[:2], [self.raleigh_bbq.pk, self.durham_bbq.pk])
+        self.assertEqual(self.stored()[-1], self.far_tacos.pk)
+
+    def test_dietary_fit(self):
+        """Test that dietary requirements favor trucks carrying the tag."""
+        self.profile.favorite_cuisine_types = ''
+        self.profile.dietary_preferences = 'Vegan Rec'
+        self.profile.save()
+        compute_recommendations()
+        self.assertEqual(self.stored()[0], self.raleigh_bowls.pk)
+
+    def test_users_without_preferences_are_cleared(self):
+        """Test that users with nothing to rank by get no stored list."""
+        compute_recommendations()
+        self.profile.favorite_cuisine_types = 'nothing we serve'
+        self.profile.home_city = ''
+        self.profile.save()
+        self.assertEqual(compute_recommendations(), (0, 1))
+        self.assertFalse(UserRecommendations.objects.exists())
+
+    def test_command_limits_users_and_top_n(self):
+        """Test that the command honors --user and the top-N setting."""
+        other = CustomUser.objects.create_user(username='other')
+        WebsiteUserProfile.objects.create(user=other, favorite_cuisine_types='Mexican')
+        out = StringIO()
+        with self.settings(DIRECTORY_RECOMMENDATION_TOP_N=2):
+            call_command('compute_recommendations', '--user', str(other.pk), stdout=out)
+        self.assertIn('Stored recommendations for 1 users', out.getvalue())
+        self.assertEqual(len(self.stored(other)), 2)
+        self.assertEqual(self.stored(other)[0], self.far_tacos.pk)
+        self.assertFalse(UserRecommendations.objects.filter(user=self.user).exists())
+
+    def test_home_page_reads_stored_list(self):
+        """Test that the home page shows stored picks without scoring."""
+        compute_recommendations()
+        self.durham_bbq.delete()
+        self.assertEqual(
+            [truck.pk for truck in recommended_trucks(self.user, limit=2)],
+            [self.raleigh_bbq.pk],
+        )
+        self.client.login(username='eater', password='pw12345!')
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Recommended for You')
+        self.assertContains(response, 'Raleigh Smoke')
+        self.client.logout()
+        self.assertNotContains(self.client.get(reverse('home')), 'Recommended for You')
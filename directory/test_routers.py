@@ -0,0 +1,167 @@
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .models import CustomUser, FoodTruck
+from .routers import PINNED_UNTIL_SESSION_KEY, PrimaryReplicaRouter, replica_reads
+
+
+@contextmanager
+def queries_by_database():
+    """Collect the SQL run in the block, by database alias."""
+    seen = {'default': [], 'replica': []}
+
+    def record(execute, sql, params, many, context):
+        seen[context['connection'].alias].append(sql)
+        return execute(sql, params, many, context)
+
+    with ExitStack() as stack:
+        for alias in seen:
+            stack.enter_context(connections[alias].execute_wrapper(record))
+        yield seen
+
+
+@override_settings(DIRECTORY_DATABASE_REPLICAS=['replica'])
+class PrimaryReplicaRouterTest(TransactionTestCase):
+    """Test cases for where the router sends reads and writes."""
+
+    databases = {'default', 'replica'}
+
+    def test_reads_outside_requests_use_primary(self):
+        """Test that commands and workers read from the primary by default."""
+        self.assertEqual(FoodTruck.objects.all().db, 'default')
+        with replica_reads():
+            self.assertEqual(FoodTruck.objects.all().db, 'replica')
+            self.assertEqual(CustomUser.objects.all().db, 'replica')
+        with replica_reads(pinned=True):
+            self.assertEqual(FoodTruck.objects.all().db, 'default')
+
+    def test_write_pins_rest_of_block(self):
+        """Test that reads after a write go to the primary."""
+        with replica_reads() as state:
+            self.assertEqual(FoodTruck.objects.all().db, 'replica')
+            truck = FoodTruck.objects.create(name='Pinned', city='Cary', cuisine='BBQ')
+            self.assertTrue(state.wrote)
+            self.assertEqual(FoodTruck.objects.all().db, 'default')
+        self.assertEqual(truck._state.db, 'default')
+
+    def test_sessions_and_relations(self):
+        """Test that sessions stay on the primary and replica objects relate to primary ones."""
+        from django.contrib.sessions.models import Session
+
+        router = PrimaryReplicaRouter()
+        with replica_reads():
+            self.assertEqual(Session.objects.all().db, 'default')
+        user = CustomUser.objects.create(username='owner')
+        with replica_reads():
+            truck = FoodTruck.objects.get(pk=FoodTruck.objects.create(
+                name='Related', city='Cary', cuisine='BBQ').pk)
+        truck._state.db = 'replica'
+        self.assertTrue(router.allow_relation(truck, user))
+        self.assertFalse(router.allow_migrate('replica', 'directory'))
+        self.assertIsNone(router.allow_migrate('default', 'directory'))
+
+
+@override_settings(DIRECTORY_DATABASE_REPLICAS=['replica'])
+class ViewRoutingTest(TransactionTestCase):
+    """Test cases for the database each query in directory.views goes to."""
+
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        """Create a truck and a staff user; start with an empty page cache."""
+        self.truck = FoodTruck.objects.create(
+            name='Taco Bus', city='Durham', cuisine='Mexican', latitude=35.99, longitude=-78.9,
+        )
+        self.staff = CustomUser.objects.create(username='staff', is_staff=True)
+        cache.clear()
+
+    def routed(self, method, url, data=None, consume=False):
+        """Request ``url``; returns the response and the SQL run on each database."""
+        with queries_by_database() as seen:
+            response = getattr(self.client, method)(url, data or {})
+            if consume:
+                b''.join(response.streaming_content)
+        return response, seen['default'], seen['replica']
+
+    def assertReadsFromReplica(self, url, data=None, consume=False):
+        response, primary, replica = self.routed('get', url, data, consume)
+        self.assertLess(response.status_code, 400, url)
+        self.assertEqual([sql for sql in primary if 'django_session' not in sql], [], url)
+        self.assertTrue(replica, url)
+        return response
+
+    def test_public_pages_read_from_replica(self):
+        """Test that every public GET view runs all of its queries on the replica."""
+        # The home page reads the published snapshot and makes no queries at all.
+        response, primary, replica = self.routed('get', reverse('home'))
+        self.assertEqual((response.status_code, primary, replica), (200, [], []))
+        self.assertReadsFromReplica(reverse('directory'), {'city': 'durham'})
+        self.assertReadsFromReplica(reverse('trucks_by_city', args=['durham']))
+        self.assertReadsFromReplica(reverse('trucks_by_city', args=['durham']), {'open': 'now'})
+        self.assertReadsFromReplica(reverse('trucks_near'),
+                                    {'lat': 35.99, 'lon': -78.9, 'open': 'now'})
+        self.assertReadsFromReplica(reverse('search'), {'q': 'taco'})
+        self.assertReadsFromReplica(reverse('async_directory'))
+        self.assertReadsFromReplica(reverse('async_search'), {'q': 'taco'})
+
+    def test_staff_pages_read_from_replica(self):
+        """Test that signed-in reads, streamed exports included, use the replica."""
+        self.client.force_login(self.staff)
+        response = self.assertReadsFromReplica(reverse('export_trucks', args=['csv']),
+                                               consume=True)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertReadsFromReplica(reverse('export_users', args=['ndjson']), consume=True)
+        # The dashboard's only query is the user, cached by the exports.
+        cache.clear()
+        self.assertReadsFromReplica(reverse('profiling_dashboard'))
+
+    def test_post_uses_primary_and_pins_visitor(self):
+        """Test that a write sends the visitor's reads to the primary until it expires."""
+        self.client.force_login(self.staff)
+        response, primary, replica = self.routed('post', reverse('submit_truck'), {
+            'name': 'Curry in a Hurry', 'city': 'Raleigh', 'cuisine': 'Indian',
+            'description': 'Fast curries', 'contact_email': 'owner@example.com',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(replica, [])
+        self.assertTrue(any('INSERT' in sql for sql in primary))
+
+        response, primary, replica = self.routed('get', reverse('directory'))
+        self.assertEqual(replica, [])
+        self.assertTrue(primary)
+
+        session = self.client.session
+        session[PINNED_UNTIL_SESSION_KEY] = time.time() - 1
+        session.save()
+        self.assertReadsFromReplica(reverse('directory'), {'city': 'raleigh'})
+
+    def test_reads_go_to_primary_without_replicas(self):
+        """Test that with no replicas configured everything stays on the primary."""
+        with self.settings(DIRECTORY_DATABASE_REPLICAS=[]):
+            response, primary, replica = self.routed('get', reverse('directory'))
+        self.assertEqual(replica, [])
+        self.assertTrue(primary)
+
+
+@override_settings(DIRECTORY_DATABASE_REPLICAS=['replica'])
+class AsyncRoutingTest(TransactionTestCase):
+    """Test cases for routing under the async middleware path."""
+
+    databases = {'default', 'replica'}
+
+    def test_async_request_reads_from_replica(self):
+        """Test that an async request's ORM reads go to the replica."""
+        FoodTruck.objects.create(name='Taco Bus', city='Durham', cuisine='Mexican')
+        # Async ORM calls run on this thread, where the query recorder is.
+        url = reverse('async_trucks_by_city', args=['durham'])
+        with queries_by_database() as seen:
+            response = async_to_sync(self.async_client.get)(url)
+        self.assertContains(response, 'Taco Bus')
+        self.assertEqual(seen['default'], [])
+        self.assertTrue(seen['replica'])
@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from .models import FoodTruck
+from .search import FTS_TABLE, SQLiteFTSBackend, search_trucks
+
+
+class SearchTest(TestCase):
+    """Test cases for full-text search over food trucks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a few trucks with overlapping vocabulary."""
+        cls.tacos = FoodTruck.objects.create(
+            name='Taco Paradise', city='Raleigh', cuisine='Mexican',
+            description='Street tacos, burritos and horchata.'
+        )
+        cls.bbq = FoodTruck.objects.create(
+            name='Smoke Stack', city='Durham', cuisine='BBQ',
+            description='Slow smoked brisket with a side of tacos.'
+        )
+        cls.vegan = FoodTruck.objects.create(
+            name='Green Bowls', city='Cary', cuisine='Vegan',
+            description='Grain bowls and smoothies.'
+        )
+
+    def test_name_match_ranks_above_description_match(self):
+        """Test that a hit in the name outranks a hit in the description."""
+        results = search_trucks('tacos')
+        self.assertEqual(results, [self.tacos, self.bbq])
+
+    def test_prefix_and_stemmed_matches(self):
+        """Test that partial words and plural forms still match."""
+        self.assertEqual(search_trucks('brisk'), [self.bbq])
+        self.assertEqual(search_trucks('bowl'), [self.vegan])
+
+    def test_fts_operators_in_input_are_inert(self):
+        """Test that FTS syntax in user input cannot break the query."""
+        self.assertEqual(search_trucks('"tacos" OR NEAR('), [])
+        self.assertEqual(search_trucks('  '), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        """Test that the signal handlers keep the index current."""
+        self.vegan.description = 'Falafel wraps'
+        self.vegan.save()
+        self.assertEqual(search_trucks('falafel'), [self.vegan])
+        self.assertEqual(search_trucks('smoothies'), [])
+
+        self.vegan.delete()
+        self.assertEqual(search_trucks('falafel'), [])
+
+    def test_search_view(self):
+        """Test that the search page lists ranked results."""
+        response = self.client.get(reverse('search'), {'q': 'smoked'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Smoke Stack')
+        self.assertNotContains(response, 'Taco Paradise')
+
+    def test_search_view_without_query(self):
+        """Test that the empty search page renders the form only."""
+        response = self.client.get(reverse('search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['results'], [])
+
+    def test_rebuild_command(self):
+        """Test that the bulk rebuild restores a wiped index."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 table is SQLite specific')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        self.assertEqual(search_trucks('tacos'), [])
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 trucks', out.getvalue())
+        self.assertEqual(search_trucks('tacos'), [self.tacos, self.bbq])
+
+    def test_best_match_found_among_many(self):
+        """Test that ranking covers every match, not only the newest ones."""
+        FoodTruck.objects.bulk_create([
+            FoodTruck(name=f'Cart {i}', city='Cary', cuisine='Snacks',
+                      description='Tacos on weekends.')
+            for i in range(60)
+        ])
+        call_command('rebuild_search_index', stdout=StringIO())
+        results = search_trucks('tacos', limit=5)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0], self.tacos)
+
+    def test_match_expression_quotes_terms(self):
+        """Test that each term becomes a quoted prefix query."""
+        self.assertEqual(
+            SQLiteFTSBackend.match_expression('Vegan BBQ!'), '"vegan"* "bbq"*'
+        )
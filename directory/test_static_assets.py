@@ -0,0 +1,108 @@
+import gzip
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .models import FoodTruck
+from .static_assets import accepted_encodings
+
+STATIC_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'directory.static_assets.CompressedManifestStaticFilesStorage'},
+}
+
+
+class CollectStaticTest(TestCase):
+    """Test cases for hashed, precompressed static files and how they are served."""
+
+    def setUp(self):
+        """Collect the static files into a throwaway STATIC_ROOT."""
+        self.static_root = Path(tempfile.mkdtemp(prefix='tse-static-'))
+        self.addCleanup(shutil.rmtree, self.static_root)
+        settings = override_settings(STATIC_ROOT=str(self.static_root), STORAGES=STATIC_STORAGES)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0, stdout=StringIO())
+        self.css = staticfiles_storage.url('assets/styles/main.css')
+
+    def get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        """Test that the stylesheet gets a hashed name and a gzip sibling."""
+        hashed = self.css.removeprefix('/static/')
+        self.assertRegex(hashed, r'^assets/styles/main\.[0-9a-f]{12}\.css$')
+        original = (self.static_root / hashed).read_bytes()
+        compressed = (self.static_root / (hashed + '.gz')).read_bytes()
+        self.assertEqual(gzip.decompress(compressed), original)
+        self.assertLess(len(compressed), len(original))
+
+    def test_pages_link_hashed_names(self):
+        """Test that templates link the hashed stylesheet and only collected files."""
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, self.css)
+        self.assertNotRegex(response.content.decode(), r'/static/(?![^"]*\.[0-9a-f]{12}\.)')
+
+    def test_hashed_file_is_immutable_and_precompressed(self):
+        """Test that a hashed file is served gzipped with a year-long immutable lifetime."""
+        response = self.get(self.css, accept_encoding='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        body = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertIn(b'--tse-accent', gzip.decompress(body))
+
+        plain = self.get(self.css, accept_encoding='gzip;q=0, identity')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn(b'--tse-accent', b''.join(plain.streaming_content))
+
+    def test_revalidation_and_unhashed_names(self):
+        """Test that repeat requests get a 304 and unhashed names a short lifetime."""
+        first = self.get('/static/assets/styles/main.css', accept_encoding='gzip')
+        self.assertEqual(first['Cache-Control'], 'public, max-age=60')
+        again = self.get('/static/assets/styles/main.css', accept_encoding='gzip',
+                         if_none_match=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        since = self.get('/static/assets/styles/main.css', accept_encoding='gzip',
+                         if_modified_since=first['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+    def test_missing_and_escaping_paths_404(self):
+        """Test that unknown files and paths outside STATIC_ROOT are not served."""
+        self.assertEqual(self.get('/static/assets/nope.css').status_code, 404)
+        self.assertEqual(self.get('/static/../manage.py').status_code, 404)
+        self.assertEqual(self.get('/static/%2e%2e/manage.py').status_code, 404)
+        self.assertEqual(self.client.post(self.css).status_code, 405)
+
+
+class HtmlCachingTest(TestCase):
+    """Test cases for compression and conditional GET on HTML pages."""
+
+    def setUp(self):
+        """Create a truck to list."""
+        FoodTruck.objects.create(name='Taco Bus', city='Durham', cuisine='Mexican')
+
+    def test_pages_are_gzipped_and_revalidated(self):
+        """Test that pages are compressed and a matching ETag gets a 304."""
+        url = reverse('trucks_by_city', args=['durham'])
+        first = self.client.get(url, headers={'accept-encoding': 'gzip'})
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertIn(b'Taco Bus', gzip.decompress(first.content))
+        again = self.client.get(url, headers={'accept-encoding': 'gzip',
+                                              'if-none-match': first['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+
+    def test_accept_encoding_parsing(self):
+        """Test that q-values of zero refuse an encoding."""
+        self.assertEqual(accepted_encodings('gzip, br;q=0.5, deflate;q=0'), {'gzip', 'br'})
+        self.assertEqual(accepted_encodings(''), set())
@@ -0,0 +1,158 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from .dedup import find_duplicates, normalize_link, normalize_name, rebuild_dedup_index
+from .models import CustomUser, FoodTruck, TruckDedupKey, TruckSubmission
+
+
+class NormalizationTest(TestCase):
+    """Test cases for name and link normalization."""
+
+    def test_normalize_name(self):
+        """Test that case, accents, punctuation and filler words are ignored."""
+        self.assertEqual(normalize_name("The Smokin' Joe's BBQ Food Truck, LLC"), 'smokin joes bbq')
+        self.assertEqual(normalize_name('Crêpe Café'), 'crepe cafe')
+        self.assertEqual(normalize_name(None), '')
+
+    def test_normalize_link(self):
+        """Test that scheme, www, case and trailing slashes are ignored, and handles kept."""
+        self.assertEqual(normalize_link('https://www.Instagram.com/@SmokinJoes/?hl=en'),
+                         'instagram.com/smokinjoes')
+        self.assertEqual(normalize_link('instagram.com/smokinjoes'), 'instagram.com/smokinjoes')
+        self.assertEqual(normalize_link('https://x.com/joes'), 'twitter.com/joes')
+        self.assertEqual(normalize_link('http://joesbbq.com/'), 'joesbbq.com')
+        self.assertIsNone(normalize_link('https://facebook.com/'))
+        self.assertIsNone(normalize_link(''))
+
+
+class DuplicateDetectionTest(TestCase):
+    """Test cases for finding existing trucks that match a submission."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a few trucks; signals index them."""
+        cls.joes = FoodTruck.objects.create(
+            name="Smokin' Joe's BBQ", city='Raleigh', cuisine='BBQ',
+            website='https://joesbbq.com/',
+            social_links={'instagram': 'https://instagram.com/smokinjoes'},
+        )
+        cls.tacos = FoodTruck.objects.create(name='Taco Bus', city='Durham', cuisine='Mexican')
+        FoodTruck.objects.create(name='Pho Real', city='Cary', cuisine='Vietnamese')
+
+    def test_similar_name(self):
+        """Test that a differently punctuated name finds the truck."""
+        matches = find_duplicates('Smoking Joes BBQ Truck', city='raleigh')
+        self.assertEqual(matches[0].truck_id, self.joes.pk)
+        self.assertTrue(matches[0].likely)
+        self.assertIn('same city', matches[0].reasons)
+        self.assertEqual(find_duplicates('The Taco Bus')[0].reasons, ['same name'])
+
+    def test_same_link_with_different_name(self):
+        """Test that a shared website or social handle is a likely duplicate."""
+        matches = find_duplicates('Joe and Sons', social_links={'ig': 'http://www.instagram.com/SmokinJoes'})
+        self.assertEqual([m.truck_id for m in matches], [self.joes.pk])
+        self.assertIn('same link: instagram.com/smokinjoes', matches[0].reasons)
+        self.assertTrue(find_duplicates('Anything', website='joesbbq.com')[0].likely)
+
+    def test_unrelated_names_do_not_match(self):
+        """Test that a new name matches nothing."""
+        self.assertEqual(find_duplicates('Curry in a Hurry'), [])
+        self.assertEqual(find_duplicates(''), [])
+
+    def test_lookup_is_two_queries(self):
+        """Test that a check is a key lookup plus one fetch of the candidates."""
+        with self.assertNumQueries(2):
+            find_duplicates("Smokin Joe's", website='https://joesbbq.com')
+
+    def test_index_follows_changes(self):
+        """Test that renames, deletes, imports and rebuilds keep the keys current."""
+        self.tacos.name = 'Burrito Barge'
+        self.tacos.save()
+        self.assertEqual(find_duplicates('Taco Bus'), [])
+        self.assertEqual(find_duplicates('Burrito Barge')[0].truck_id, self.tacos.pk)
+        self.tacos.delete()
+        self.assertEqual(find_duplicates('Burrito Barge'), [])
+
+        keys = set(TruckDedupKey.objects.values_list('truck_id', 'key'))
+        TruckDedupKey.objects.all().delete()
+        self.assertEqual(rebuild_dedup_index(batch_size=1), 2)
+        self.assertEqual(set(TruckDedupKey.objects.values_list('truck_id', 'key')), keys)
+
+
+class SubmitTruckViewTest(TestCase):
+    """Test cases for the public submission form and moderation."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create one listed truck and a user to submit as."""
+        cls.listed = FoodTruck.objects.create(name='Taco Bus', city='Durham', cuisine='Mexican')
+        cls.submitter = CustomUser.objects.create(username='eater')
+
+    def setUp(self):
+        self.client.force_login(self.submitter)
+
+    def post(self, **overrides):
+        data = {
+            'name': 'Curry in a Hurry', 'city': 'Raleigh', 'cuisine': 'Indian',
+            'description': 'Fast curries', 'contact_email': 'owner@example.com',
+            'instagram': 'https://instagram.com/curryhurry',
+        }
+        data.update(overrides)
+        return self.client.post(reverse('submit_truck'), data)
+
+    def test_form_renders(self):
+        """Test that the submission page shows the form."""
+        response = self.client.get(reverse('submit_truck'))
+        self.assertContains(response, 'name="contact_email"')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_requires_sign_in(self):
+        """Test that anonymous visitors are sent to the login page."""
+        self.client.logout()
+        response = self.post()
+        self.assertRedirects(response, reverse('login') + '?next=' + reverse('submit_truck'),
+                             fetch_redirect_response=False)
+        self.assertFalse(TruckSubmission.objects.exists())
+
+    def test_new_truck_is_queued(self):
+        """Test that a valid, unique submission waits for moderation."""
+        response = self.post()
+        self.assertRedirects(response, reverse('submit_truck') + '?submitted=1')
+        submission = TruckSubmission.objects.get()
+        self.assertEqual(submission.status, TruckSubmission.PENDING)
+        self.assertEqual(submission.social_links, {'instagram': 'https://instagram.com/curryhurry'})
+        self.assertFalse(FoodTruck.objects.filter(name='Curry in a Hurry').exists())
+        self.assertContains(self.client.get(response.url), 'Thanks for your submission')
+
+    def test_invalid_submission(self):
+        """Test that missing fields re-render the form with errors."""
+        response = self.post(name='', contact_email='nope')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(TruckSubmission.objects.exists())
+        self.assertTrue(response.context['form'].errors)
+
+    def test_likely_duplicate_needs_confirmation(self):
+        """Test that a likely duplicate is shown back until the submitter confirms."""
+        response = self.post(name='The Taco Bus', city='Durham')
+        self.assertContains(response, 'Is your truck already listed?')
+        self.assertContains(response, 'Taco Bus')
+        self.assertFalse(TruckSubmission.objects.exists())
+
+        self.post(name='The Taco Bus', city='Durham', confirm_new='on')
+        submission = TruckSubmission.objects.get()
+        self.assertEqual(submission.possible_duplicates[0]['truck_id'], self.listed.pk)
+
+    def test_admin_approval_creates_truck(self):
+        """Test that approving a submission in the admin lists the truck."""
+        self.post()
+        self.assertEqual(TruckSubmission.objects.get().submitted_by, self.submitter)
+        admin = CustomUser.objects.create_superuser('mod', 'mod@example.com', 'pw')
+        self.client.force_login(admin)
+        submission = TruckSubmission.objects.get()
+        self.client.post(reverse('admin:directory_trucksubmission_changelist'), {
+            'action': 'approve', '_selected_action': [submission.pk],
+        })
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, TruckSubmission.APPROVED)
+        self.assertEqual(submission.truck.name, 'Curry in a Hurry')
+        self.assertEqual(find_duplicates('Curry in a Hurry')[0].truck_id, submission.truck_id)
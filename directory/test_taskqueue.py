@@ -0,0 +1,206 @@
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from . import tasks  # noqa: F401  (registers the app's tasks)
+from .models import CustomUser, FoodTruck, Task, WebsiteUserProfile
+from .taskqueue import (
+    claim, enqueue, execute, purge_finished, queue_stats, registry, requeue_expired,
+    run_pending, task,
+)
+
+calls = []
+
+
+@task('tests.record', max_attempts=3, backoff_seconds=10)
+def record(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise RuntimeError(f'could not record {value}')
+
+
+class TaskQueueTest(TestCase):
+    """Test cases for enqueueing, claiming and running tasks."""
+
+    def setUp(self):
+        """Start every test with no recorded calls."""
+        calls.clear()
+
+    def test_runs_registered_task(self):
+        """Test that a queued task runs with its kwargs and is marked done."""
+        enqueue('tests.record', {'value': 'a'})
+        enqueue('tests.record', {'value': 'later'}, delay=timedelta(minutes=5))
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, ['a'])
+        done = Task.objects.get(kwargs__value='a')
+        self.assertEqual(done.status, Task.DONE)
+        self.assertEqual(done.attempts, 1)
+        self.assertIsNotNone(done.finished_at)
+
+    def test_failures_back_off_then_fail(self):
+        """Test that a failing task is retried with growing delays, then marked failed."""
+        enqueue('tests.record', {'value': 'x', 'fail': True})
+        delays = []
+        with self.assertLogs('directory.taskqueue', 'ERROR') as logs:
+            for attempt in range(3):
+                Task.objects.update(run_at=timezone.now())
+                before = timezone.now()
+                run_pending()
+                row = Task.objects.get()
+                if row.status == Task.QUEUED:
+                    delays.append(round((row.run_at - before).total_seconds()))
+        self.assertEqual(len(logs.records), 3)
+        self.assertEqual(delays, [10, 20])
+        self.assertEqual(row.status, Task.FAILED)
+        self.assertIn('could not record x', row.last_error)
+        self.assertEqual(len(calls), 3)
+
+    def test_unique_key_coalesces_queued_tasks(self):
+        """Test that a unique key allows one queued task and brings it forward."""
+        enqueue('tests.record', {'value': 1}, delay=timedelta(hours=1), unique_key='k')
+        enqueue('tests.record', {'value': 2}, unique_key='k')
+        row = Task.objects.get()
+        self.assertLessEqual(row.run_at, timezone.now())
+        self.assertEqual(row.kwargs, {'value': 1})
+        claimed = claim()
+        # While it runs, another may queue behind it.
+        enqueue('tests.record', {'value': 3}, unique_key='k')
+        self.assertEqual(Task.objects.count(), 2)
+        execute(claimed[0])
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [1, 3])
+
+    def test_running_task_merges_into_queued_twin(self):
+        """Test that a keyed task with a queued twin is finished, not requeued."""
+        enqueue('tests.record', {'value': 1, 'fail': True}, unique_key='k')
+        failing = claim()[0]
+        enqueue('tests.record', {'value': 2}, unique_key='k')
+        with self.assertLogs('directory.taskqueue', 'ERROR'):
+            self.assertEqual(execute(failing), Task.DONE)
+        self.assertIn('could not record 1', Task.objects.get(pk=failing.pk).last_error)
+
+        lapsed = claim()[0]
+        enqueue('tests.record', {'value': 3}, unique_key='k')
+        Task.objects.filter(pk=lapsed.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(requeue_expired(), 1)
+        self.assertEqual(Task.objects.get(pk=lapsed.pk).status, Task.DONE)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(calls, [1, 3])
+
+    def test_expired_twins_requeue_once(self):
+        """Test that of two lapsed runs sharing a key only one goes back in the queue."""
+        enqueue('tests.record', {'value': 1}, unique_key='k')
+        claim()
+        enqueue('tests.record', {'value': 2}, unique_key='k')
+        claim()
+        Task.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(requeue_expired(), 2)
+        self.assertEqual(
+            list(Task.objects.order_by('id').values_list('status', flat=True)),
+            [Task.DONE, Task.QUEUED],
+        )
+
+    def test_unknown_task_fails(self):
+        """Test that a task nobody registered is marked failed."""
+        enqueue('tests.missing')
+        run_pending()
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_claims_do_not_overlap(self):
+        """Test that batches split the queue and a lapsed lease is requeued."""
+        for value in range(5):
+            enqueue('tests.record', {'value': value})
+        first, second = claim(batch_size=3), claim(batch_size=3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertEqual(claim(), [])
+
+        self.assertEqual(requeue_expired(), 0)
+        Task.objects.filter(pk__in=[row.pk for row in first]).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(requeue_expired(), 3)
+        # The worker that lost its lease can no longer record a result.
+        execute(first[0])
+        self.assertEqual(Task.objects.get(pk=first[0].pk).status, Task.QUEUED)
+        self.assertEqual(run_pending(), 3)
+
+    def test_stats_and_purge(self):
+        """Test that queue metrics count tasks and old finished tasks are purged."""
+        enqueue('tests.record', {'value': 1})
+        enqueue('tests.record', {'value': 2})
+        enqueue('tests.record', {'value': 3}, delay=timedelta(hours=1))
+        run_pending(limit=1)
+        stats = queue_stats()
+        self.assertEqual((stats['queued'], stats['due'], stats['done']), (2, 1, 1))
+        self.assertEqual(stats['finished_in_window'], 1)
+        self.assertGreaterEqual(stats['oldest_due_seconds'], 0)
+        self.assertEqual(purge_finished(), 0)
+        Task.objects.filter(status=Task.DONE).update(
+            finished_at=timezone.now() - timedelta(days=30)
+        )
+        self.assertEqual(purge_finished(), 1)
+
+    def test_app_tasks_are_registered(self):
+        """Test that the app's background work is available to workers."""
+        self.assertLessEqual(
+            {'images.process', 'notifications.fan_out', 'notifications.deliver',
+             'import_trucks', 'truck_pages.refresh'},
+            set(registry),
+        )
+
+
+class QueuedWorkTest(TestCase):
+    """Test cases for the work the app puts on the queue."""
+
+    def test_new_truck_notifications_run_as_tasks(self):
+        """Test that a new truck's emails are fanned out and sent by queued tasks."""
+        user = CustomUser.objects.create(username='eater', email='eater@example.com')
+        WebsiteUserProfile.objects.create(user=user, home_city='Durham')
+        FoodTruck.objects.create(name='Bull City Bites', city='Durham', cuisine='BBQ')
+        self.assertEqual(list(Task.objects.values_list('name', flat=True)),
+                         ['notifications.fan_out'])
+        run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Bull City Bites', mail.outbox[0].subject)
+
+    def test_background_import(self):
+        """Test that import_trucks --background queues the import for a worker."""
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'trucks.ndjson')
+        with open(path, 'w') as handle:
+            handle.write('{"name": "Queued Tacos", "city": "Cary", "cuisine": "Mexican"}\n')
+        out = StringIO()
+        call_command('import_trucks', path, '--background', stdout=out)
+        self.assertIn('Queued import', out.getvalue())
+        self.assertFalse(FoodTruck.objects.exists())
+        row = Task.objects.get(name='import_trucks')
+        self.assertEqual(row.kwargs['path'], path)
+        with redirect_stdout(StringIO()):
+            run_pending()
+        self.assertTrue(FoodTruck.objects.filter(name='Queued Tacos').exists())
+        self.assertEqual(Task.objects.get(pk=row.pk).status, Task.DONE)
+
+
+class RunWorkersCommandTest(TransactionTestCase):
+    """Test cases for the run_workers command."""
+
+    def test_once_drains_queue(self):
+        """Test that run_workers --once runs due tasks on worker threads and exits."""
+        calls.clear()
+        for value in range(4):
+            enqueue('tests.record', {'value': value})
+        out = StringIO()
+        call_command('run_workers', '--once', '--threads', '2', '--batch-size', '2', stdout=out)
+        self.assertEqual(sorted(calls), [0, 1, 2, 3])
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 4)
+        self.assertIn('queued=0', out.getvalue())
@@ -0,0 +1,194 @@
+from datetime import time
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import tasks  # noqa: F401  (registers truck_pages.refresh and .rebuild)
+from .models import (
+    CustomUser, DietaryTag, FoodTruck, FoodTruckOwnerProfile, OperatingHours, Task, TruckPage,
+)
+from .signals import refresh_bulk_trucks
+from .taskqueue import run_pending
+from .truck_pages import neighbourhood_boxes, neighbourhood_index
+
+
+class TruckDetailViewTest(TestCase):
+    """Test cases for the denormalized truck detail page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create an owned truck with hours, tags and two neighbours."""
+        owner = CustomUser.objects.create(username='owner')
+        cls.profile = FoodTruckOwnerProfile.objects.create(
+            user=owner, business_name='Oak City Eats LLC', cuisine_type='Southern',
+            is_verified=True,
+        )
+        cls.truck = FoodTruck.objects.create(
+            name='Smokin Joes', city='Raleigh', cuisine='BBQ', owner=cls.profile,
+            website='https://joesbbq.com', latitude=35.78, longitude=-78.64,
+            social_links={'instagram': 'https://instagram.com/smokinjoes'},
+        )
+        OperatingHours.objects.create(truck=cls.truck, weekday=4, opens_at=time(11),
+                                      closes_at=time(14))
+        cls.truck.dietary_tags.add(DietaryTag.objects.get(slug='gluten-free'))
+        cls.near = FoodTruck.objects.create(name='Taco Bus', city='Raleigh', cuisine='Mexican',
+                                            latitude=35.79, longitude=-78.65)
+        FoodTruck.objects.create(name='Far Away', city='Wilmington', cuisine='Seafood',
+                                 latitude=34.2, longitude=-77.9)
+        run_pending()
+
+    def url(self, truck=None):
+        return reverse('truck_detail', args=[(truck or self.truck).pk])
+
+    def test_page_shows_denormalized_details(self):
+        """Test that owner, links, hours, tags and nearby trucks render from one query."""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url())
+        self.assertContains(response, 'Oak City Eats LLC')
+        self.assertContains(response, 'Verified owner')
+        self.assertContains(response, 'https://instagram.com/smokinjoes')
+        self.assertContains(response, 'Friday')
+        self.assertContains(response, '11:00&ndash;14:00')
+        self.assertContains(response, 'Gluten-Free')
+        self.assertContains(response, reverse('truck_detail', args=[self.near.pk]))
+        self.assertNotContains(response, 'Far Away')
+
+    def test_query_count_is_constant(self):
+        """Test that more hours, tags and neighbours add no queries."""
+        for weekday in range(7):
+            OperatingHours.objects.create(truck=self.truck, weekday=weekday, opens_at=time(17),
+                                          closes_at=time(21))
+        for i in range(5):
+            FoodTruck.objects.create(name=f'Neighbour {i}', city='Raleigh', cuisine='Thai',
+                                     latitude=35.78 + i / 1000, longitude=-78.64)
+        run_pending()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url())
+        self.assertContains(response, 'Sunday')
+        self.assertContains(response, 'Neighbour 4')
+        # Signed in: the session comes from the cache, and the user for the
+        # navigation (and their permissions) from the database once, then
+        # from the cache too.
+        self.client.force_login(self.profile.user)
+        with self.assertNumQueries(3):
+            self.client.get(self.url())
+        with self.assertNumQueries(1):
+            self.client.get(self.url())
+
+    def test_repeat_visit_is_not_modified(self):
+        """Test that a matching If-None-Match or If-Modified-Since gets a 304."""
+        first = self.client.get(self.url())
+        self.assertEqual(first['Cache-Control'], 'no-cache')
+        with self.assertNumQueries(1):
+            again = self.client.get(self.url(), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+        self.assertEqual(again.content, b'')
+        since = self.client.get(self.url(), HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+        # Signing in changes the navigation, so the anonymous copy is stale.
+        self.client.force_login(self.profile.user)
+        signed_in = self.client.get(self.url(), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(signed_in.status_code, 200)
+        self.assertNotEqual(signed_in['ETag'], first['ETag'])
+
+    def test_writes_refresh_page(self):
+        """Test that owner, hours, tag and truck changes rebuild the page."""
+        etag = TruckPage.objects.get(pk=self.truck.pk).etag
+        self.profile.business_name = 'Joe Holdings'
+        self.profile.save()
+        OperatingHours.objects.filter(truck=self.truck).delete()
+        self.truck.dietary_tags.clear()
+        self.truck.description = 'Brisket and ribs'
+        self.truck.save()
+        page = TruckPage.objects.get(pk=self.truck.pk)
+        self.assertNotEqual(page.etag, etag)
+        self.assertEqual(page.data['owner']['business_name'], 'Joe Holdings')
+        self.assertEqual(page.data['hours'], [])
+        self.assertEqual(page.data['dietary_tags'], [])
+        self.assertEqual(page.data['description'], 'Brisket and ribs')
+
+    def test_unchanged_rebuild_keeps_validators(self):
+        """Test that a save that changes nothing shown keeps the ETag and Last-Modified."""
+        before = TruckPage.objects.get(pk=self.truck.pk)
+        self.truck.external_id = 'feed-1'
+        self.truck.save()
+        after = TruckPage.objects.get(pk=self.truck.pk)
+        self.assertEqual((after.etag, after.updated_at), (before.etag, before.updated_at))
+
+    def test_neighbour_pages_follow_on_task_queue(self):
+        """Test that renaming a truck queues a rebuild of the pages listing it."""
+        self.near.name = 'Taco Bus Deluxe'
+        self.near.save()
+        self.assertTrue(Task.objects.filter(name='truck_pages.refresh').exists())
+        self.assertEqual(TruckPage.objects.get(pk=self.truck.pk).data['nearby'][0]['name'],
+                         'Taco Bus')
+        run_pending()
+        self.assertEqual(TruckPage.objects.get(pk=self.truck.pk).data['nearby'][0]['name'],
+                         'Taco Bus Deluxe')
+
+    def test_bulk_writes_share_one_page_rebuild(self):
+        """Test that bulk-written batches queue one rebuild and no neighbour search."""
+        Task.objects.all().delete()
+        batches = [
+            FoodTruck.objects.bulk_create([FoodTruck(name=f'Cart {i}', city='Raleigh',
+                                                     cuisine='Crepes', latitude=35.781,
+                                                     longitude=-78.641)])
+            for i in range(2)
+        ]
+        for batch in batches:
+            with CaptureQueriesContext(connection) as queries:
+                refresh_bulk_trucks(batch)
+            self.assertFalse([query for query in queries if 'latitude' in query['sql']])
+        task = Task.objects.get()
+        self.assertEqual((task.name, task.kwargs), ('truck_pages.rebuild', {}))
+        run_pending()
+        nearby = TruckPage.objects.get(pk=self.truck.pk).data['nearby']
+        self.assertEqual({entry['name'] for entry in nearby}, {'Taco Bus', 'Cart 0', 'Cart 1'})
+
+    def test_neighbourhood_boxes_cover_each_point(self):
+        """Test that distant points get separate boxes, not one box spanning both."""
+        boxes = neighbourhood_boxes([(35.78, -78.64), (35.781, -78.641), (34.2, -77.9)])
+        self.assertEqual(len(boxes), 2)
+        between = FoodTruck.objects.create(name='Halfway', city='Clinton', cuisine='BBQ',
+                                           latitude=35.0, longitude=-78.3)
+        index = neighbourhood_index([(35.78, -78.64), (34.2, -77.9)])
+        found = {truck_id for truck_id, _ in index.within(35.0, -78.3, 500)}
+        self.assertIn(self.near.pk, found)
+        self.assertNotIn(between.pk, found)
+
+    def test_missing_page_is_built_and_missing_truck_404s(self):
+        """Test that a truck without a page gets one on first view."""
+        TruckPage.objects.filter(pk=self.near.pk).delete()
+        self.assertContains(self.client.get(self.url(self.near)), 'Taco Bus')
+        self.assertTrue(TruckPage.objects.filter(pk=self.near.pk).exists())
+        self.assertEqual(self.client.get(reverse('truck_detail', args=[999999])).status_code,
+                         404)
+
+    def test_async_view_matches(self):
+        """Test that the async page serves the same document and validators."""
+        sync = self.client.get(self.url())
+        response = async_to_sync(self.async_client.get)(
+            reverse('async_truck_detail', args=[self.truck.pk])
+        )
+        self.assertContains(response, 'Oak City Eats LLC')
+        self.assertEqual(response['ETag'], sync['ETag'])
+        again = async_to_sync(self.async_client.get)(
+            reverse('async_truck_detail', args=[self.truck.pk]), headers={'If-None-Match': sync['ETag']}
+        )
+        self.assertEqual(again.status_code, 304)
+
+    def test_rebuild_command(self):
+        """Test that rebuild_truck_pages recreates every page."""
+        TruckPage.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_truck_pages', '--batch-size', '2', stdout=out)
+        self.assertIn('Rebuilt 3 truck pages', out.getvalue())
+        nearby = TruckPage.objects.get(pk=self.truck.pk).data['nearby']
+        self.assertEqual([entry['id'] for entry in nearby], [self.near.pk])
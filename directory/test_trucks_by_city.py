@@ -0,0 +1,103 @@
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from .models import FoodTruck
+from .pagination import decode_cursor, encode_cursor, paginate_keyset
+from .views import city_trucks_queryset
+
+
+class TrucksByCityViewTest(TestCase):
+    """Test cases for the database-backed city listing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create trucks across a few cities and cuisines."""
+        FoodTruck.objects.bulk_create([
+            FoodTruck(name=f'Raleigh Truck {i:02d}', city='Raleigh',
+                      cuisine='BBQ' if i % 2 else 'Mexican')
+            for i in range(30)
+        ])
+        FoodTruck.objects.create(name='Durham Dogs', city='Durham', cuisine='American')
+        FoodTruck.objects.create(name='Hill Noodles', city='Chapel Hill', cuisine='Thai')
+
+    def test_city_match_is_case_insensitive(self):
+        """Test that the URL city matches regardless of stored case."""
+        response = self.client.get(reverse('trucks_by_city', args=['RALEIGH']))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Raleigh Truck 00')
+        self.assertNotContains(response, 'Durham Dogs')
+
+    def test_hyphenated_city_segment(self):
+        """Test that multi-word cities can be addressed with hyphens."""
+        response = self.client.get(reverse('trucks_by_city', args=['chapel-hill']))
+        self.assertContains(response, 'Hill Noodles')
+
+    def test_cuisine_filter(self):
+        """Test narrowing a city listing to one cuisine."""
+        response = self.client.get(
+            reverse('trucks_by_city', args=['raleigh']), {'cuisine': 'BBQ'}
+        )
+        self.assertContains(response, 'Raleigh Truck 01')
+        self.assertNotContains(response, 'Raleigh Truck 00')
+
+    def test_empty_city_shows_coming_soon(self):
+        """Test that cities without trucks keep the placeholder message."""
+        response = self.client.get(reverse('trucks_by_city', args=['apex']))
+        self.assertContains(response, 'Coming Soon!')
+
+    def test_keyset_pages_cover_every_truck_once(self):
+        """Test that walking the cursors visits each truck exactly once."""
+        seen = []
+        cursor = None
+        while True:
+            page = paginate_keyset(city_trucks_queryset('raleigh'), cursor, page_size=7)
+            seen.extend(truck.name for truck in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(seen, sorted(seen))
+
+    def test_next_page_link_rendered(self):
+        """Test that the page links to the following cursor."""
+        response = self.client.get(
+            reverse('trucks_by_city', args=['raleigh']), {'page_size': 10}
+        )
+        self.assertContains(response, '?cursor=')
+        self.assertContains(response, '&amp;page_size=10')
+        self.assertEqual(len(response.context['page']), 10)
+
+    def test_invalid_cursor_returns_bad_request(self):
+        """Test that a garbled cursor is rejected instead of raising."""
+        response = self.client.get(
+            reverse('trucks_by_city', args=['raleigh']), {'cursor': '!!!'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_badly_typed_cursor_returns_bad_request(self):
+        """Test that a well-formed cursor holding the wrong types is rejected."""
+        url = reverse('trucks_by_city', args=['raleigh'])
+        for values in (['a', 'x'], [None, 1], ['a', True], ['a', 1.5]):
+            with self.subTest(values=values):
+                response = self.client.get(url, {'cursor': encode_cursor(values)})
+                self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('directory'), {'cursor': encode_cursor(['a', 'x'])})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_round_trip(self):
+        """Test that cursors decode to the values they were built from."""
+        token = encode_cursor(['Taco Truck', 42])
+        self.assertEqual(decode_cursor(token, 2), ['Taco Truck', 42])
+
+    def test_city_lookup_uses_expression_index(self):
+        """Test that SQLite plans the listing query as an index seek."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN is SQLite specific')
+        queryset = city_trucks_queryset('raleigh').order_by('name', 'id')[:25]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('foodtruck_lcity_name_id', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
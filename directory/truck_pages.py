@@ -0,0 +1,257 @@
+"""
+Denormalized truck detail pages.
+
+A truck's detail page is rendered from one ``TruckPage`` row: a JSON
+document with everything the template shows (owner business details,
+social links, hours, dietary tags, image variants and nearby trucks), an
+ETag and the time the document last changed. Serving a page is a single
+primary-key lookup, and a repeat visit whose ``If-None-Match`` or
+``If-Modified-Since`` still matches gets a 304 from that same lookup,
+without rendering.
+
+Documents are rebuilt on write by ``directory.signals``: a truck's own page
+in the transaction that changed it; the pages of trucks near it, whose
+"nearby" lists may now be stale, on the task queue. Bulk writes queue one
+coalesced rebuild of every page instead. ``build_pages`` costs a
+fixed handful of queries per batch, however many trucks are in it. A
+rebuild that produces the same document keeps its ETag and ``updated_at``,
+so clients' cached copies stay valid.
+"""
+
+import hashlib
+import json
+import math
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch, Q
+from django.utils import timezone
+
+from .geo import EARTH_RADIUS_MILES, GeoIndex, bounding_box
+from .images import picture_sources
+from .taskqueue import enqueue
+
+NEARBY_LIMIT = 6
+NEARBY_MILES = 5.0
+BATCH_SIZE = 500
+# Neighbourhood boxes OR-ed into one range query.
+BOXES_PER_QUERY = 50
+
+
+def social_link_items(social_links):
+    """``[{'label', 'url'}]`` for the truck's social links, in a stable order."""
+    if not isinstance(social_links, dict):
+        return []
+    return [
+        {'label': network.replace('_', ' ').title(), 'url': url}
+        for network, url in sorted(social_links.items())
+        if isinstance(url, str) and url
+    ]
+
+
+def image_data(truck):
+    if not truck.image:
+        return None
+    return {'url': truck.image.url, **picture_sources(truck)}
+
+
+def owner_data(owner):
+    if owner is None:
+        return None
+    return {
+        'business_name': owner.business_name,
+        'cuisine_type': owner.cuisine_type,
+        'operating_hours': owner.operating_hours,
+        'is_verified': owner.is_verified,
+    }
+
+
+def location_points(trucks):
+    return [
+        (truck.latitude, truck.longitude) for truck in trucks
+        if truck.latitude is not None and truck.longitude is not None
+    ]
+
+
+def neighbourhood_boxes(points):
+    """
+    Range-query boxes covering ``NEARBY_MILES`` around each of ``points``.
+
+    Points are grouped on a grid of ``NEARBY_MILES`` cells and each group
+    gets one box around its own points, so a cluster shares a box but two
+    distant points never pull in everything between them.
+    """
+    cell = math.degrees(NEARBY_MILES / EARTH_RADIUS_MILES)
+    groups = {}
+    for lat, lon in points:
+        groups.setdefault((math.floor(lat / cell), math.floor(lon / cell)), []).append((lat, lon))
+    boxes = []
+    for group in groups.values():
+        low = bounding_box(min(lat for lat, _ in group), min(lon for _, lon in group),
+                           NEARBY_MILES)
+        high = bounding_box(max(lat for lat, _ in group), max(lon for _, lon in group),
+                            NEARBY_MILES)
+        boxes.append((low[0], high[1], min(low[2], high[2]), max(low[3], high[3])))
+    return boxes
+
+
+def neighbourhood_index(points, using='default'):
+    """
+    A ``GeoIndex`` over the trucks within ``NEARBY_MILES`` of any of
+    ``points``, read with range queries on the latitude/longitude index.
+    """
+    from .models import FoodTruck
+
+    boxes = neighbourhood_boxes(points)
+    located = {}
+    for start in range(0, len(boxes), BOXES_PER_QUERY):
+        condition = Q()
+        for lat_lo, lat_hi, lon_lo, lon_hi in boxes[start:start + BOXES_PER_QUERY]:
+            condition |= Q(latitude__range=(lat_lo, lat_hi), longitude__range=(lon_lo, lon_hi))
+        located.update(
+            (truck_id, (truck_id, lat, lon)) for truck_id, lat, lon in
+            FoodTruck.objects.using(using).filter(condition)
+            .values_list('id', 'latitude', 'longitude')
+        )
+    return GeoIndex.from_points(located.values())
+
+
+def neighbour_ids(points, exclude=(), using='default'):
+    """Ids of trucks within ``NEARBY_MILES`` of any of ``points``."""
+    index = neighbourhood_index(points, using)
+    found = {
+        truck_id
+        for lat, lon in points
+        for truck_id, _ in index.within(lat, lon, NEARBY_MILES)
+    }
+    return sorted(found.difference(exclude))
+
+
+def page_etag(data):
+    encoded = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def build_pages(trucks, index=None, using='default'):
+    """
+    Page documents for ``trucks`` (a ``FoodTruck`` queryset), keyed by id.
+
+    ``index`` is a ``GeoIndex`` to find nearby trucks in; by default one is
+    built over the batch's neighbourhood.
+    """
+    from .models import FoodTruck, OperatingHours
+
+    trucks = list(
+        trucks.using(using).select_related('owner').prefetch_related(
+            Prefetch('hours', queryset=OperatingHours.objects.using(using)
+                     .order_by('start_minute')),
+            'dietary_tags',
+        )
+    )
+    if index is None:
+        index = neighbourhood_index(location_points(trucks), using)
+    nearby = {}
+    for truck in trucks:
+        if truck.latitude is None or truck.longitude is None:
+            nearby[truck.pk] = []
+            continue
+        hits = index.within(truck.latitude, truck.longitude, NEARBY_MILES,
+                            limit=NEARBY_LIMIT + 1)
+        nearby[truck.pk] = [hit for hit in hits if hit[0] != truck.pk][:NEARBY_LIMIT]
+    names = FoodTruck.objects.using(using).only('name', 'city', 'cuisine').in_bulk(
+        {truck_id for hits in nearby.values() for truck_id, _ in hits}
+    )
+
+    pages = {}
+    for truck in trucks:
+        pages[truck.pk] = {
+            'id': truck.pk,
+            'name': truck.name,
+            'city': truck.city,
+            'cuisine': truck.cuisine,
+            'description': truck.description or '',
+            'website': truck.website or '',
+            'social_links': social_link_items(truck.social_links),
+            'image': image_data(truck),
+            'latitude': truck.latitude,
+            'longitude': truck.longitude,
+            'is_verified': truck.is_verified,
+            'owner': owner_data(truck.owner),
+            'hours': [
+                {'day': hours.get_weekday_display(),
+                 'opens': f'{hours.opens_at:%H:%M}', 'closes': f'{hours.closes_at:%H:%M}'}
+                for hours in truck.hours.all()
+            ],
+            'dietary_tags': sorted(tag.name for tag in truck.dietary_tags.all()),
+            'nearby': [
+                {'id': truck_id, 'name': names[truck_id].name, 'city': names[truck_id].city,
+                 'cuisine': names[truck_id].cuisine, 'miles': round(miles, 1)}
+                for truck_id, miles in nearby[truck.pk] if truck_id in names
+            ],
+        }
+    return pages
+
+
+def refresh_truck_pages(truck_ids, index=None, batch_size=BATCH_SIZE, using='default'):
+    """
+    Rebuild the pages of ``truck_ids`` (missing trucks are skipped) and
+    return them as ``{truck_id: TruckPage}``. Only changed pages are
+    written.
+    """
+    from .models import FoodTruck, TruckPage
+
+    truck_ids = sorted(set(truck_ids))
+    pages = {}
+    for start in range(0, len(truck_ids), batch_size):
+        batch = truck_ids[start:start + batch_size]
+        documents = build_pages(FoodTruck.objects.filter(pk__in=batch), index, using)
+        stored = TruckPage.objects.using(using).in_bulk(documents)
+        now = timezone.now()
+        changed = []
+        for truck_id, data in documents.items():
+            etag = page_etag(data)
+            page = stored.get(truck_id)
+            if page is None or page.etag != etag:
+                page = TruckPage(truck_id=truck_id, data=data, etag=etag, updated_at=now)
+                changed.append(page)
+            pages[truck_id] = page
+        if changed:
+            TruckPage.objects.using(using).bulk_create(
+                changed, update_conflicts=True, unique_fields=['truck'],
+                update_fields=['data', 'etag', 'updated_at'],
+            )
+    return pages
+
+
+def schedule_page_refresh(truck_ids, using='default'):
+    """Rebuild the pages of ``truck_ids`` on the task queue, after this transaction."""
+    truck_ids = sorted(set(truck_ids))
+    if truck_ids:
+        enqueue('truck_pages.refresh', {'truck_ids': truck_ids}, using=using)
+
+
+def schedule_page_rebuild(using='default'):
+    """
+    Rebuild every page on the task queue, after this transaction. For bulk
+    writes: calls made while a rebuild is waiting share it.
+    """
+    enqueue('truck_pages.rebuild', unique_key='truck_pages.rebuild', using=using)
+
+
+def rebuild_truck_pages(batch_size=BATCH_SIZE, using='default'):
+    """Rebuild every truck's page; returns the number of pages."""
+    from .models import FoodTruck
+
+    trucks = FoodTruck.objects.using(using)
+    # One index over every truck beats a neighbourhood query per batch.
+    index = GeoIndex.from_points(
+        trucks.filter(latitude__isnull=False, longitude__isnull=False)
+        .values_list('id', 'latitude', 'longitude').iterator(chunk_size=5000)
+    )
+    truck_ids = list(trucks.order_by('pk').values_list('pk', flat=True))
+    total = 0
+    for start in range(0, len(truck_ids), batch_size):
+        with transaction.atomic(using=using):
+            total += len(refresh_truck_pages(truck_ids[start:start + batch_size], index,
+                                             batch_size, using))
+    return total
@@ -1,11 +1,35 @@
 from django.urls import path
-from . import views
+from . import api, async_views, views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('directory/', views.directory, name='directory'),
+    path('trucks/near/', views.trucks_near, name='trucks_near'),
+    path('truck/<int:pk>/', views.truck_detail, name='truck_detail'),
+    path('truck/<int:pk>/edit/', views.truck_edit, name='truck_edit'),
     path('trucks/<str:city>/', views.trucks_by_city, name='trucks_by_city'),
+    path('search/', views.search, name='search'),
     path('submit/', views.submit_truck, name='submit_truck'),
+    path('owners/<int:pk>/edit/', views.owner_profile_edit, name='owner_profile_edit'),
+    path('dashboard/', views.owner_dashboard, name='owner_dashboard'),
+    path('export/trucks.<str:fmt>', views.export_trucks, name='export_trucks'),
+    path('export/users.<str:fmt>', views.export_users, name='export_users'),
+    path('_profiling/', views.profiling_dashboard, name='profiling_dashboard'),
+    path('_profiling/data.json', views.profiling_data, name='profiling_data'),
+
+    # Async versions of the listing and search pages for ASGI deployments.
+    path('async/directory/', async_views.directory, name='async_directory'),
+    path('async/trucks/<str:city>/', async_views.trucks_by_city, name='async_trucks_by_city'),
+    path('async/search/', async_views.search, name='async_search'),
+    path('async/truck/<int:pk>/', async_views.truck_detail, name='async_truck_detail'),
+
+    # Versioned JSON API (directory.api).
+    path('api/v1/trucks/', api.truck_list, name='api_truck_list'),
+    path('api/v1/trucks/search/', api.truck_search, name='api_truck_search'),
+    path('api/v1/trucks/near/', api.trucks_near, name='api_trucks_near'),
+    path('api/v1/trucks/batch/', api.truck_batch, name='api_truck_batch'),
+    path('api/v1/trucks/<int:pk>/', api.truck_detail, name='api_truck_detail'),
+    path('api/v1/me/', api.me, name='api_me'),
     
     # Authentication URLs
     path('login/', views.login_view, name='login'),
@@ -1,21 +1,377 @@
 from django.shortcuts import render
-from django.http import HttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden,
+    JsonResponse, StreamingHttpResponse,
+)
+from django.conf import settings
 from django.contrib.auth import logout
-from django.shortcuts import redirect
+from django.contrib.auth.decorators import login_required
+from django.db.models.functions import Lower
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import http_date, quote_etag
+from django.utils.text import get_valid_filename
+import hashlib
+from functools import partial
+from urllib.parse import urlencode
 
+from .analytics import owner_dashboard_data, track_page_views
+from .cache import (
+    DIRECTORY, HOME, cache_timeout, cached_view, city_scope, cuisine_scope, version_token,
+)
+from .dedup import find_duplicates
+from .exports import FORMATS, export_stream, has_export_token
+from .facets import facet_counts, filter_trucks, parse_filters
+from .forms import OwnerProfileForm, TruckEditForm, TruckSubmissionForm
+from .geo import get_geo_index
+from .home_snapshot import current_snapshot
+from .hours import open_at, parse_open_param
+from .models import (
+    CustomUser, DietaryTag, FoodTruck, FoodTruckOwnerProfile, PageViewEvent, TruckPage,
+)
+from .pagination import (
+    InvalidCursor, clamp_page_size, decode_cursor, paginate_keyset,
+)
+from .permissions import (
+    OWNER, check_object_permission, owner_profile_id, permission_required, role_required,
+)
+from .profiling import samples, summarize
+from .recommendations import recommended_trucks
+from .search import search_trucks
+from .truck_pages import refresh_truck_pages
 
+
+# Trucks checked against the open-hours filter per query in trucks_near.
+OPEN_FILTER_CHUNK = 500
+
+@cached_view(lambda request: [HOME])
 def home(request):
-    return render(request, 'directory/home.html')
+    # Ranked and counted by the home.snapshot task; a cache read, never a query.
+    snapshot = current_snapshot()
+    context = {
+        'top_cities': snapshot['top_cities'],
+        'featured': snapshot['featured'],
+        'trending': snapshot['trending'],
+        # Precomputed by compute_recommendations; empty for visitors.
+        'recommended': recommended_trucks(request.user, limit=6),
+        'cache_timeout': cache_timeout(),
+        'cache_version': version_token([HOME]),
+    }
+    return render(request, 'directory/home.html', context)
 
+@cached_view(lambda request: [DIRECTORY])
 def directory(request):
-    return render(request, 'directory/directory.html')
+    """Faceted browsing by city, cuisine, verified owner and dietary tag."""
+    filters = parse_filters(request.GET)
+    tag = DietaryTag.objects.filter(slug=filters['tag']).first() if 'tag' in filters else None
+    cursor = request.GET.get('cursor') or None
+    if cursor:
+        try:
+            decode_cursor(cursor, 2)
+        except InvalidCursor:
+            return HttpResponseBadRequest('Invalid cursor')
+    trucks = filter_trucks(FoodTruck.objects.all(), filters, tag).only(
+        'id', 'name', 'city', 'cuisine', 'description', 'image', 'image_variants',
+    )
+    page = paginate_keyset(
+        trucks, cursor=cursor, page_size=clamp_page_size(request.GET.get('page_size'))
+    )
+    context = {
+        'facets': facet_counts(filters, tag),
+        'filters': filters,
+        'page': page,
+        'next_query': directory_next_query(filters, page),
+    }
+    return render(request, 'directory/directory.html', context)
+
+def directory_next_query(filters, page):
+    """Query string for the next directory page, keeping the filters and page size."""
+    if not page.has_next:
+        return ''
+    return urlencode({**filters, 'cursor': page.next_cursor, 'page_size': page.page_size})
+
+def normalize_city(city):
+    """Turn a city URL segment such as ``chapel-hill`` into a lookup key."""
+    return city.replace('-', ' ').strip().lower()
+
+def city_trucks_queryset(city, cuisine=None):
+    """
+    Trucks in ``city`` (case-insensitive), optionally narrowed to ``cuisine``.
+
+    Filtering on ``Lower('city')`` rather than ``city__iexact`` keeps the
+    lookup on the ``foodtruck_lcity_*`` expression indexes; ``iexact``
+    compiles to ``LIKE`` on SQLite and cannot use them.
+    """
+    queryset = FoodTruck.objects.alias(city_key=Lower('city')).filter(
+        city_key=normalize_city(city)
+    )
+    if cuisine:
+        queryset = queryset.filter(cuisine=cuisine)
+    return queryset
+
+def city_page_scopes(request, city):
+    """Cache scopes for a city listing; pages filtered by time aren't cached."""
+    if request.GET.get('open'):
+        return None
+    scopes = [city_scope(city)]
+    if request.GET.get('cuisine'):
+        scopes.append(cuisine_scope(request.GET['cuisine']))
+    return scopes
 
+@track_page_views(PageViewEvent.CITY_PAGE)
+@cached_view(city_page_scopes)
 def trucks_by_city(request, city):
-    context = {'city': city}
+    cuisine = request.GET.get('cuisine') or None
+    try:
+        open_time = parse_open_param(request.GET.get('open'))
+    except ValueError:
+        return HttpResponseBadRequest('open must be "now" or an ISO datetime')
+    queryset = city_trucks_queryset(city, cuisine).only(
+        'id', 'name', 'city', 'cuisine', 'description', 'website', 'image',
+        'image_variants',
+    )
+    if open_time:
+        queryset = queryset.filter(open_at(open_time))
+    cursor = request.GET.get('cursor') or None
+    page_size = clamp_page_size(request.GET.get('page_size'))
+    if cursor:
+        try:
+            decode_cursor(cursor, 2)
+        except InvalidCursor:
+            return HttpResponseBadRequest('Invalid cursor')
+    # The page is only fetched if the template's list fragment misses.
+    page = SimpleLazyObject(
+        lambda: paginate_keyset(queryset, cursor=cursor, page_size=page_size)
+    )
+    scopes = city_page_scopes(request, city)
+    context = {
+        'city': city,
+        'cuisine': cuisine,
+        'open': request.GET.get('open', ''),
+        'cursor': cursor or '',
+        'page_size': page_size,
+        'page': page,
+        # Time-filtered pages change minute to minute; don't keep them.
+        'cache_timeout': cache_timeout() if scopes else 0,
+        'cache_version': version_token(scopes) if scopes else '',
+    }
     return render(request, 'directory/trucks_by_city.html', context)
 
+def get_truck_page(pk):
+    """The truck's ``TruckPage``, built now if it has none yet; ``None`` if no such truck."""
+    page = TruckPage.objects.filter(truck_id=pk).first()
+    if page is None:
+        # Trucks created before pages existed, or by a bulk write whose
+        # refresh task hasn't run yet.
+        page = refresh_truck_pages([pk]).get(pk)
+    return page
+
+def page_validators(request, page):
+    """
+    ETag and Last-Modified for a truck page as ``request`` sees it.
+
+    The navigation differs for signed-in visitors, so the ETag includes a
+    hash of the session cookie: signing in or out changes it, and checking
+    it loads no session.
+    """
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME, '')
+    viewer = hashlib.blake2b(session_key.encode(), digest_size=4).hexdigest() if session_key \
+        else 'anon'
+    return quote_etag(f'{page.etag}-{viewer}'), int(page.updated_at.timestamp())
+
+def not_modified(request, page):
+    """A 304 (or 412) response if the visitor's copy of ``page`` is current, else ``None``."""
+    etag, last_modified = page_validators(request, page)
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+def add_page_validators(response, request, page):
+    etag, last_modified = page_validators(request, page)
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    # Revalidate on every visit; the check costs one indexed lookup.
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+@track_page_views(PageViewEvent.TRUCK_PAGE)
+def truck_detail(request, pk):
+    """
+    One truck's page, rendered from its denormalized ``TruckPage``: one
+    query, or a 304 from that same query on a repeat visit.
+    """
+    page = get_truck_page(pk)
+    if page is None:
+        raise Http404('No such truck')
+    response = not_modified(request, page) or render(
+        request, 'directory/truck_detail.html', {'truck': page.data}
+    )
+    return add_page_validators(response, request, page)
+
+def parse_float(value, minimum, maximum):
+    """Parse a query-string float within bounds, or return ``None``."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not minimum <= number <= maximum:
+        return None
+    return number
+
+def trucks_near(request):
+    """Trucks within a radius of a point, or the k nearest to it."""
+    latitude = parse_float(request.GET.get('lat'), -90, 90)
+    longitude = parse_float(request.GET.get('lon'), -180, 180)
+    if latitude is None or longitude is None:
+        return HttpResponseBadRequest('lat and lon are required')
+    radius = parse_float(request.GET.get('radius', 2), 0, 100)
+    if radius is None:
+        return HttpResponseBadRequest('radius must be between 0 and 100 miles')
+    try:
+        open_time = parse_open_param(request.GET.get('open'))
+    except ValueError:
+        return HttpResponseBadRequest('open must be "now" or an ISO datetime')
+
+    trucks = FoodTruck.objects.all()
+    if open_time:
+        trucks = trucks.filter(open_at(open_time))
+
+    def only_open(hits, limit=100):
+        # Nearest first, a chunk at a time: a wide radius can hold more
+        # trucks than one IN list may bind.
+        found = []
+        for start in range(0, len(hits), OPEN_FILTER_CHUNK):
+            chunk = hits[start:start + OPEN_FILTER_CHUNK]
+            open_ids = set(
+                trucks.filter(pk__in=[truck_id for truck_id, _ in chunk])
+                .values_list('pk', flat=True)
+            )
+            found += [hit for hit in chunk if hit[0] in open_ids]
+            if len(found) >= limit:
+                break
+        return found[:limit]
+
+    index = get_geo_index()
+    k = request.GET.get('k')
+    if k:
+        try:
+            k = max(1, min(int(k), 100))
+        except ValueError:
+            return HttpResponseBadRequest('k must be an integer')
+        hits = index.nearest(latitude, longitude, k,
+                             accept=partial(only_open, limit=k) if open_time else None)
+    elif open_time:
+        hits = only_open(index.within(latitude, longitude, radius))
+    else:
+        hits = index.within(latitude, longitude, radius, limit=100)
+
+    trucks = trucks.in_bulk([truck_id for truck_id, _ in hits])
+    results = [
+        (trucks[truck_id], distance)
+        for truck_id, distance in hits if truck_id in trucks
+    ]
+    context = {
+        'latitude': latitude,
+        'longitude': longitude,
+        'radius': radius,
+        'k': k,
+        'open': request.GET.get('open', ''),
+        'results': results,
+    }
+    return render(request, 'directory/trucks_near.html', context)
+
+@track_page_views(PageViewEvent.SEARCH_PAGE)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    results = search_trucks(query) if query else []
+    context = {'query': query, 'results': results}
+    return render(request, 'directory/search.html', context)
+
+def export_response(request, dataset, fmt, **filters):
+    """Stream an export, gzip-encoded when the client accepts it."""
+    if fmt not in FORMATS:
+        raise Http404('Unknown export format')
+    compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+    response = StreamingHttpResponse(
+        export_stream(dataset, fmt, compress=compress, **filters),
+        content_type=FORMATS[fmt],
+    )
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{fmt}"'
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+def export_trucks(request, fmt):
+    """Full truck directory for staff or partners holding the export token."""
+    if not (request.user.is_staff or has_export_token(request)):
+        return HttpResponseForbidden('Export access required')
+    return export_response(request, 'trucks', fmt)
+
+def export_users(request, fmt):
+    """Users with their profile fields, optionally filtered by ``?role=``."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden('Staff access required')
+    role = request.GET.get('role') or None
+    if role and role not in dict(CustomUser.USER_ROLES):
+        return HttpResponseBadRequest('Unknown role')
+    response = export_response(request, 'users', fmt, role=role)
+    if role:
+        response['Content-Disposition'] = (
+            f'attachment; filename="{get_valid_filename(role)}-users.{fmt}"'
+        )
+    return response
+
+@staff_member_required
+def profiling_dashboard(request):
+    """Per-view latency, query and template percentiles from recent requests."""
+    recorded = samples.snapshot()
+    context = {
+        'enabled': getattr(settings, 'DIRECTORY_PROFILING_ENABLED', False),
+        'sample_count': len(recorded),
+        'views': summarize(recorded),
+    }
+    return render(request, 'directory/profiling.html', context)
+
+def profiling_data(request):
+    """JSON version of the profiling dashboard; ``?raw=1`` adds the samples."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden('Staff access required')
+    recorded = samples.snapshot()
+    data = {'samples': len(recorded), 'views': summarize(recorded)}
+    if request.GET.get('raw'):
+        data['recent'] = [sample.as_dict() for sample in recorded]
+    return JsonResponse(data)
+
+@permission_required('directory.add_trucksubmission')
 def submit_truck(request):
-    return render(request, 'directory/submit_truck.html')
+    """
+    Take a truck into the moderation queue. When it looks like a truck
+    already listed, the submitter sees the matches and has to confirm it
+    is a different truck before it is queued.
+    """
+    if request.GET.get('submitted'):
+        return render(request, 'directory/submit_truck.html', {'submitted': True})
+    form = TruckSubmissionForm(request.POST or None)
+    duplicates = []
+    if request.method == 'POST' and form.is_valid():
+        submission = form.save(commit=False)
+        duplicates = find_duplicates(
+            submission.name, submission.website, submission.social_links, submission.city
+        )
+        if form.cleaned_data['confirm_new'] or not any(match.likely for match in duplicates):
+            submission.possible_duplicates = [match.as_dict() for match in duplicates]
+            submission.submitted_by = request.user
+            submission.save()
+            return redirect(f"{reverse('submit_truck')}?submitted=1")
+    context = {
+        'form': form,
+        'duplicates': [match for match in duplicates if match.likely],
+    }
+    return render(request, 'directory/submit_truck.html', context)
 
 # Authentication Views
 def login_view(request):
@@ -31,6 +387,42 @@ def register_view(request):
     """Placeholder register view"""
     return render(request, 'registration/register.html')
 
+@login_required
 def profile_view(request):
-    """Placeholder profile view"""
-    return render(request, 'registration/profile.html')
\ No newline at end of file
+    """The signed-in user's profile, with an owner's trucks to edit."""
+    profile_id = owner_profile_id(request.user)
+    trucks = FoodTruck.objects.filter(owner_id=profile_id).order_by('name') if profile_id else []
+    return render(request, 'registration/profile.html', {'owned_trucks': trucks})
+
+@role_required(OWNER)
+def owner_dashboard(request):
+    """Views of an owner's trucks and clicks through to them, from the daily rollups."""
+    profile = get_object_or_404(FoodTruckOwnerProfile, user=request.user)
+    context = owner_dashboard_data(profile)
+    context['owner_profile'] = profile
+    response = render(request, 'directory/owner_dashboard.html', context)
+    patch_cache_control(response, private=True, max_age=60)
+    return response
+
+@login_required
+def truck_edit(request, pk):
+    """Edit a truck: its owner's, or a site admin's, to change."""
+    truck = get_object_or_404(FoodTruck, pk=pk)
+    check_object_permission(request.user, 'directory.change_foodtruck', truck)
+    form = TruckEditForm(request.POST or None, instance=truck)
+    if request.method == 'POST' and form.is_valid():
+        form.save()
+        return redirect('truck_detail', pk=truck.pk)
+    return render(request, 'directory/truck_edit.html', {'form': form, 'truck': truck})
+
+@login_required
+def owner_profile_edit(request, pk):
+    """Edit a business profile: its owner's, or a site admin's, to change."""
+    profile = get_object_or_404(FoodTruckOwnerProfile, pk=pk)
+    check_object_permission(request.user, 'directory.change_foodtruckownerprofile', profile)
+    form = OwnerProfileForm(request.POST or None, instance=profile)
+    if request.method == 'POST' and form.is_valid():
+        form.save()
+        return redirect('profile')
+    return render(request, 'directory/owner_profile_edit.html',
+                  {'form': form, 'owner_profile': profile})
\ No newline at end of file